@@ -0,0 +1,100 @@
+"""add storefront products read model
+
+Revision ID: 3e8b1f6a9c42
+Revises: 7a4c2e9d1b3f
+Create Date: 2026-10-16 14:03:27.551920
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3e8b1f6a9c42"
+down_revision: Union[str, Sequence[str], None] = "7a4c2e9d1b3f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "storefront_products",
+        sa.Column("product_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("slug", sa.String(length=255), nullable=False),
+        sa.Column(
+            "category",
+            postgresql.ENUM(name="categoryenum", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("prescription_required", sa.Boolean(), nullable=False),
+        sa.Column("sellable_quantity", sa.Integer(), nullable=False),
+        sa.Column("unit_price", sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column("nearest_expiry", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("in_stock", sa.Boolean(), nullable=False),
+        sa.Column("refreshed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("product_id"),
+    )
+    op.create_index(
+        "ix_storefront_products_name",
+        "storefront_products",
+        ["name", "product_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_storefront_products_category_name",
+        "storefront_products",
+        ["category", "name", "product_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_storefront_products_nearest_expiry"),
+        "storefront_products",
+        ["nearest_expiry"],
+        unique=False,
+    )
+
+    # Backfill; same rules as CRUDStorefront.refresh()
+    op.execute(
+        """
+        INSERT INTO storefront_products (
+            product_id, name, slug, category, prescription_required,
+            sellable_quantity, unit_price, nearest_expiry, in_stock, refreshed_at
+        )
+        SELECT p.id, p.name, p.slug, p.category, p.prescription_required,
+               COALESCE(s.quantity, 0), s.price, s.nearest_expiry,
+               COALESCE(s.quantity, 0) > 0, now()
+        FROM products p
+        LEFT JOIN (
+            SELECT product_id,
+                   SUM(current_quantity) AS quantity,
+                   (array_agg(price ORDER BY expiry_date, id))[1] AS price,
+                   MIN(expiry_date) AS nearest_expiry
+            FROM inventory_batches
+            WHERE is_blocked IS false
+              AND expiry_date > now()
+              AND current_quantity > 0
+            GROUP BY product_id
+        ) s ON s.product_id = p.id
+        WHERE p.is_active IS true
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        op.f("ix_storefront_products_nearest_expiry"),
+        table_name="storefront_products",
+    )
+    op.drop_index(
+        "ix_storefront_products_category_name", table_name="storefront_products"
+    )
+    op.drop_index("ix_storefront_products_name", table_name="storefront_products")
+    op.drop_table("storefront_products")
@@ -0,0 +1,71 @@
+"""add stock allocations
+
+Revision ID: 7a4c2e9d1b3f
+Revises: 55c33ac384e6
+Create Date: 2026-10-16 09:12:41.208113
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7a4c2e9d1b3f"
+down_revision: Union[str, Sequence[str], None] = "55c33ac384e6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "stock_allocations",
+        sa.Column(
+            "id",
+            postgresql.UUID(as_uuid=True),
+            server_default=sa.text("gen_random_uuid()"),
+            nullable=False,
+        ),
+        sa.Column("order_item_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("batch_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.CheckConstraint("quantity > 0"),
+        sa.ForeignKeyConstraint(
+            ["batch_id"], ["inventory_batches.id"], ondelete="SET NULL"
+        ),
+        sa.ForeignKeyConstraint(
+            ["order_item_id"], ["order_items.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_stock_allocations_order_item_id"),
+        "stock_allocations",
+        ["order_item_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_stock_allocations_batch_id"),
+        "stock_allocations",
+        ["batch_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_stock_allocations_batch_id"), table_name="stock_allocations")
+    op.drop_index(
+        op.f("ix_stock_allocations_order_item_id"), table_name="stock_allocations"
+    )
+    op.drop_table("stock_allocations")
@@ -0,0 +1,38 @@
+"""add outbox delivered channels
+
+Revision ID: 9d3b6f2a7c15
+Revises: c5f8a2d4e913
+Create Date: 2026-10-17 23:12:41.502317
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9d3b6f2a7c15"
+down_revision: Union[str, Sequence[str], None] = "c5f8a2d4e913"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "notification_outbox",
+        sa.Column(
+            "delivered_channels",
+            postgresql.JSONB(astext_type=sa.Text()),
+            server_default=sa.text("'[]'::jsonb"),
+            nullable=False,
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("notification_outbox", "delivered_channels")
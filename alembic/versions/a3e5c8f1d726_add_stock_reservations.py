@@ -0,0 +1,66 @@
+"""add stock reservations
+
+Revision ID: a3e5c8f1d726
+Revises: f2c7d9a4e1b8
+Create Date: 2026-10-17 16:02:41.318907
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a3e5c8f1d726"
+down_revision: Union[str, Sequence[str], None] = "f2c7d9a4e1b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "stock_reservations",
+        sa.Column("order_id", sa.UUID(), nullable=False),
+        sa.Column("batch_id", sa.UUID(), nullable=False),
+        sa.Column("product_id", sa.UUID(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.CheckConstraint("quantity > 0"),
+        sa.ForeignKeyConstraint(
+            ["batch_id"], ["inventory_batches.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["order_id"], ["orders.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("order_id", "batch_id"),
+    )
+    op.create_index(
+        "ix_stock_reservations_batch_expires",
+        "stock_reservations",
+        ["batch_id", "expires_at"],
+        unique=False,
+        postgresql_include=["quantity"],
+    )
+    op.create_index(
+        "ix_stock_reservations_expires_at",
+        "stock_reservations",
+        ["expires_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_stock_reservations_expires_at", table_name="stock_reservations")
+    op.drop_index(
+        "ix_stock_reservations_batch_expires", table_name="stock_reservations"
+    )
+    op.drop_table("stock_reservations")
@@ -0,0 +1,80 @@
+"""add storefront search indexes
+
+Revision ID: b6d2a4f81e07
+Revises: 3e8b1f6a9c42
+Create Date: 2026-10-16 23:41:09.317254
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b6d2a4f81e07"
+down_revision: Union[str, Sequence[str], None] = "3e8b1f6a9c42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column(
+        "storefront_products",
+        sa.Column("search_text", sa.Text(), server_default="", nullable=False),
+    )
+    op.add_column(
+        "storefront_products",
+        sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True),
+    )
+
+    # Backfill; same values as CRUDStorefront.refresh()
+    op.execute(
+        """
+        UPDATE storefront_products s
+        SET search_text = p.name || ' ' || d.details,
+            search_vector =
+                setweight(to_tsvector('simple'::regconfig, p.name), 'A')
+                || setweight(to_tsvector('simple'::regconfig, d.details), 'B')
+        FROM products p,
+             LATERAL (
+                SELECT COALESCE(p.active_ingredients, '') || ' '
+                       || replace(p.category::text, '_', ' ') AS details
+             ) d
+        WHERE p.id = s.product_id
+        """
+    )
+
+    op.create_index(
+        "ix_storefront_products_search_vector",
+        "storefront_products",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_storefront_products_search_trgm",
+        "storefront_products",
+        ["search_text"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"search_text": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_storefront_products_search_trgm", table_name="storefront_products"
+    )
+    op.drop_index(
+        "ix_storefront_products_search_vector", table_name="storefront_products"
+    )
+    op.drop_column("storefront_products", "search_vector")
+    op.drop_column("storefront_products", "search_text")
+    # pg_trgm is left installed: other objects may depend on it
@@ -0,0 +1,69 @@
+"""add hot stock
+
+Revision ID: b7d1e4a9c352
+Revises: a3e5c8f1d726
+Create Date: 2026-10-17 17:40:12.502114
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d1e4a9c352"
+down_revision: Union[str, Sequence[str], None] = "a3e5c8f1d726"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "products",
+        sa.Column("hot_stock", sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+    op.add_column(
+        "stock_reservations",
+        sa.Column("sold", sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+    op.drop_index(
+        "ix_stock_reservations_batch_expires", table_name="stock_reservations"
+    )
+    op.create_index(
+        "ix_stock_reservations_batch_expires",
+        "stock_reservations",
+        ["batch_id", "expires_at"],
+        unique=False,
+        postgresql_include=["quantity", "sold"],
+    )
+    op.create_index(
+        "ix_stock_reservations_sold",
+        "stock_reservations",
+        ["order_id"],
+        unique=False,
+        postgresql_where=sa.text("sold"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_stock_reservations_sold",
+        table_name="stock_reservations",
+        postgresql_where=sa.text("sold"),
+    )
+    op.drop_index(
+        "ix_stock_reservations_batch_expires", table_name="stock_reservations"
+    )
+    op.create_index(
+        "ix_stock_reservations_batch_expires",
+        "stock_reservations",
+        ["batch_id", "expires_at"],
+        unique=False,
+        postgresql_include=["quantity"],
+    )
+    op.drop_column("stock_reservations", "sold")
+    op.drop_column("products", "hot_stock")
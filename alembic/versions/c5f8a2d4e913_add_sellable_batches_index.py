@@ -0,0 +1,56 @@
+"""add sellable batches index
+
+Revision ID: c5f8a2d4e913
+Revises: b7d1e4a9c352
+Create Date: 2026-10-17 21:05:37.118204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c5f8a2d4e913"
+down_revision: Union[str, Sequence[str], None] = "b7d1e4a9c352"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "inventory_batches",
+        sa.Column("near_expiry_notified_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_inventory_batches_sellable",
+        "inventory_batches",
+        ["product_id", "expiry_date"],
+        unique=False,
+        postgresql_where=sa.text("NOT is_blocked AND current_quantity > 0"),
+        postgresql_include=["id", "current_quantity", "price"],
+        sqlite_where=sa.text("is_blocked = 0 AND current_quantity > 0"),
+    )
+    # uq_product_batch (product_id, batch_number) serves lookups by product
+    op.drop_index(
+        op.f("ix_inventory_batches_product_id"), table_name="inventory_batches"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        op.f("ix_inventory_batches_product_id"),
+        "inventory_batches",
+        ["product_id"],
+        unique=False,
+    )
+    op.drop_index(
+        "ix_inventory_batches_sellable",
+        table_name="inventory_batches",
+        postgresql_where=sa.text("NOT is_blocked AND current_quantity > 0"),
+    )
+    op.drop_column("inventory_batches", "near_expiry_notified_at")
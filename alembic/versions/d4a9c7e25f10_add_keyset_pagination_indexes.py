@@ -0,0 +1,52 @@
+"""add keyset pagination indexes
+
+Revision ID: d4a9c7e25f10
+Revises: b6d2a4f81e07
+Create Date: 2026-10-16 09:12:44.508113
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d4a9c7e25f10"
+down_revision: Union[str, Sequence[str], None] = "b6d2a4f81e07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Each composite index leads with the column of the single-column index
+    # it replaces, so lookups on that column keep an index.
+    op.create_index("ix_products_name_id", "products", ["name", "id"], unique=False)
+    op.drop_index(op.f("ix_products_name"), table_name="products")
+
+    op.create_index(
+        "ix_users_role_created_at", "users", ["role", "created_at", "id"], unique=False
+    )
+    op.drop_index(op.f("ix_users_role"), table_name="users")
+
+    op.create_index(
+        "ix_orders_customer_created_at",
+        "orders",
+        ["customer_id", "created_at", "id"],
+        unique=False,
+    )
+    op.drop_index(op.f("ix_orders_customer_id"), table_name="orders")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        op.f("ix_orders_customer_id"), "orders", ["customer_id"], unique=False
+    )
+    op.drop_index("ix_orders_customer_created_at", table_name="orders")
+
+    op.create_index(op.f("ix_users_role"), "users", ["role"], unique=False)
+    op.drop_index("ix_users_role_created_at", table_name="users")
+
+    op.create_index(op.f("ix_products_name"), "products", ["name"], unique=False)
+    op.drop_index("ix_products_name_id", table_name="products")
@@ -0,0 +1,84 @@
+"""add stripe events inbox
+
+Revision ID: f2c7d9a4e1b8
+Revises: e8f3b1c6a2d9
+Create Date: 2026-10-17 14:21:08.664120
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f2c7d9a4e1b8"
+down_revision: Union[str, Sequence[str], None] = "e8f3b1c6a2d9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "stripe_events",
+        sa.Column("id", sa.String(length=255), nullable=False),
+        sa.Column("type", sa.String(length=100), nullable=False),
+        sa.Column("ordering_key", sa.String(length=255), nullable=True),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("stripe_created", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("pending", "processed", "dead", name="stripe_event_status_enum"),
+            nullable=False,
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column(
+            "next_attempt_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("result", sa.String(length=50), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column(
+            "received_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_stripe_events_due",
+        "stripe_events",
+        ["next_attempt_at"],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    op.create_index(
+        "ix_stripe_events_pending_order",
+        "stripe_events",
+        ["ordering_key", "stripe_created", "received_at"],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_stripe_events_pending_order",
+        table_name="stripe_events",
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    op.drop_index(
+        "ix_stripe_events_due",
+        table_name="stripe_events",
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    op.drop_table("stripe_events")
+    sa.Enum(name="stripe_event_status_enum").drop(op.get_bind(), checkfirst=True)
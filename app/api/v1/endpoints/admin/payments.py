@@ -5,9 +5,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.deps import get_current_admin, get_service
+from app.core.principal_cache import Principal
 from app.db.sessions import get_async_session
 from app.models.order import Order
-from app.models.user import User
 from app.services.payment_service import PaymentService
 
 router = APIRouter(prefix="/payments", tags=["Admin"])
@@ -20,7 +20,7 @@ async def refund_order(
     amount: Decimal | None = None,
     db: AsyncSession = Depends(get_async_session),
     service: PaymentService = Depends(get_service(PaymentService)),
-    current_user: User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
 ):
     order = await db.get(Order, order_id)
 
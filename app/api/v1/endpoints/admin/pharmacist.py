@@ -1,17 +1,16 @@
 import logging
-from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, BackgroundTasks, Depends, Request
+from fastapi import APIRouter, Depends, Query, Request
 from starlette import status
 
 from app.core.deps import get_current_admin, get_service
 from app.core.limiter import limiter
-from app.models.user import User
+from app.core.principal_cache import Principal
+from app.schemas.pagination import CursorPage
 from app.schemas.pharmacist import PharmacistApproveSchema, PharmacistRead
 from app.schemas.user import CreatePharmacistRequest
 from app.services.admin.pharmacist import AdminPharmacistService
-from app.services.auth_service import AuthService
 
 # Initialize logger for security and audit events
 logger = logging.getLogger(__name__)
@@ -24,9 +23,8 @@ router = APIRouter(prefix="/pharmacist", tags=["Admin"])
 async def create_pharmacist(
     request: Request,
     user_data: CreatePharmacistRequest,
-    backgroundtasks: BackgroundTasks,
     service: AdminPharmacistService = Depends(get_service(AdminPharmacistService)),
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
 ):
     """
     Pharmacist Registration Endpoint.
@@ -34,9 +32,7 @@ async def create_pharmacist(
 
     """
 
-    pharmacist = await service.register_pharmacist(
-        user_in=user_data.model_dump(), background_tasks=backgroundtasks
-    )
+    pharmacist = await service.register_pharmacist(user_in=user_data.model_dump())
 
     logger.info(
         f"ADMIN_ACTION: Pharmacist created | "
@@ -51,8 +47,8 @@ async def create_pharmacist(
 @router.delete("/{email}", status_code=status.HTTP_204_NO_CONTENT)
 async def admin_delete_pharmacist(
     email: str,
-    current_admin: User = Depends(get_current_admin),
-    service: AdminPharmacistService = Depends(get_service(AuthService)),
+    current_admin: Principal = Depends(get_current_admin),
+    service: AdminPharmacistService = Depends(get_service(AdminPharmacistService)),
 ):
     """
     Admin-only: Deactivate a pharmacist account via email.
@@ -66,15 +62,15 @@ async def admin_delete_pharmacist(
     return "Pharmacist Account Deactivated"
 
 
-@router.get("/all", response_model=List[PharmacistRead])
+@router.get("/all", response_model=CursorPage[PharmacistRead])
 async def list_pharmacists(
-    skip: int = 0,
-    limit: int = 10,
+    cursor: str | None = None,
+    limit: int = Query(10, ge=1, le=100),
     service: AdminPharmacistService = Depends(get_service(AdminPharmacistService)),
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
 ):
     """Admin only: List all pharmacists for moderation."""
-    return await service.get_pharmacist_list(skip=skip, limit=limit)
+    return await service.get_pharmacist_list(cursor=cursor, limit=limit)
 
 
 @router.patch("/{pharmacist_id}/approve", response_model=PharmacistRead)
@@ -82,7 +78,7 @@ async def approve_pharmacist(
     pharmacist_id: UUID,
     body: PharmacistApproveSchema,
     service: AdminPharmacistService = Depends(get_service(AdminPharmacistService)),
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
 ):
     """Admin only: Approve a pharmacist."""
     return await service.approve_pharmacist_account(
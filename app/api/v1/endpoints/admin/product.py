@@ -1,12 +1,13 @@
 import logging
-from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from redis.asyncio import Redis
 from starlette import status
 
-from app.core.deps import get_current_admin, get_service
-from app.models.user import User
+from app.core.deps import get_current_admin, get_redis, get_service
+from app.core.principal_cache import Principal
+from app.schemas.pagination import CursorPage
 from app.schemas.product import ProductCreate, ProductRead, ProductWithBatches
 from app.services.admin.product_service import AdminProductService
 
@@ -22,24 +23,24 @@ async def create_new_product(
     service: AdminProductService = Depends(
         get_service(AdminProductService)
     ),  # Service handles DB session
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
 ):
     """Admin only: Add a new drug definition to the Catalog."""
 
     return await service.create_product(body)
 
 
-@router.get("/all", response_model=List[ProductWithBatches])
+@router.get("/all", response_model=CursorPage[ProductWithBatches])
 async def list_products_admin(
-    skip: int = 0,
-    limit: int = 20,
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
     service: AdminProductService = Depends(get_service(AdminProductService)),
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
 ):
     """
     Admin only: Get all products (active + inactive) for management.
     """
-    return await service.get_admin_catalog(skip=skip, limit=limit)
+    return await service.get_admin_catalog(cursor=cursor, limit=limit)
 
 
 # SWITCH BETWEEN ACTIVE AND INACTIVE STATES
@@ -47,19 +48,31 @@ async def list_products_admin(
 async def toggle_product_active(
     product_id: UUID,
     service: AdminProductService = Depends(get_service(AdminProductService)),
-    current_user: User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
 ):
 
     return await service.toggle_active_status(product_id)
 
 
+# SWITCH BETWEEN LOCKED AND REDIS-COUNTED (HOT) CHECKOUTS
+@router.patch("/{product_id}/toggle-hot-stock")
+async def toggle_product_hot_stock(
+    product_id: UUID,
+    redis: Redis = Depends(get_redis),
+    service: AdminProductService = Depends(get_service(AdminProductService)),
+    current_user: Principal = Depends(get_current_admin),
+):
+    """Admin only: admit checkouts of a high-demand product through Redis."""
+    return await service.toggle_hot_stock(product_id, redis)
+
+
 @router.delete(
     "/inventory/batches/{batch_number}", status_code=status.HTTP_204_NO_CONTENT
 )
 async def delete_batch(
     batch_number: str,
     service: AdminProductService = Depends(get_service(AdminProductService)),
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
 ):
     """Admin only: Permanently remove an inventory batch."""
     await service.remove_inventory_batch(
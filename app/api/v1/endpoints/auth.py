@@ -1,6 +1,6 @@
 import logging
 
-from fastapi import APIRouter, BackgroundTasks, Depends, Request
+from fastapi import APIRouter, Depends, Request
 from starlette import status
 
 from app.core.deps import get_service
@@ -22,7 +22,6 @@ router = APIRouter(
 async def signup(
     request: Request,
     user_data: RegisterCustomerRequest,
-    backgroundtasks: BackgroundTasks,
     service: AuthService = Depends(get_service(AuthService)),
 ):
     """
@@ -31,9 +30,7 @@ async def signup(
 
     """
 
-    return await service.register_customer(
-        user_in=user_data.model_dump(), background_tasks=backgroundtasks
-    )
+    return await service.register_customer(user_in=user_data.model_dump())
 
 
 @router.post("/login", status_code=status.HTTP_200_OK)
@@ -57,5 +54,17 @@ async def refresh_token(
 ):
     """
     Issue a new access token using a valid refresh token.
+    The refresh token is rotated: use the returned one next time.
     """
     return await service.refresh_access_token(payload.refresh_token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    payload: RefreshTokenRequest,
+    service: AuthService = Depends(get_service(AuthService)),
+):
+    """
+    Revoke the refresh token (and the tokens it was rotated from).
+    """
+    await service.logout(payload.refresh_token)
@@ -1,12 +1,12 @@
 import logging
 from uuid import UUID
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends
 from redis.asyncio import Redis
 from starlette import status
 
-from app.core.deps import get_current_customer, get_redis, get_service
-from app.models.user import User
+from app.core.deps import get_redis, get_service, get_token_customer
+from app.core.principal_cache import Principal
 from app.schemas.cart import CartItemCreate
 from app.services.cart_service import CartService
 from app.services.checkout_service import CheckoutService
@@ -23,8 +23,7 @@ router = APIRouter(
 @router.post("/add", status_code=status.HTTP_200_OK)
 async def add_to_cart(
     item_in: CartItemCreate,
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_customer),
+    current_user: Principal = Depends(get_token_customer),
     service: CartService = Depends(get_service(CartService)),
     redis: Redis = Depends(get_redis),
 ):
@@ -38,20 +37,13 @@ async def add_to_cart(
         quantity=item_in.quantity,
     )
 
-    # Background DB sync
-    background_tasks.add_task(
-        service.sync_to_db,
-        user_id=current_user.id,
-        items=cart["items"],
-    )
-
     return {"message": "Cart updated", "cart": cart}
 
 
 # VIEW CART
 @router.get("", status_code=status.HTTP_200_OK)
 async def view_cart(
-    current_user: User = Depends(get_current_customer),
+    current_user: Principal = Depends(get_token_customer),
     service: CartService = Depends(get_service(CartService)),
     redis: Redis = Depends(get_redis),
 ):
@@ -65,9 +57,8 @@ async def view_cart(
 @router.patch("/update", status_code=status.HTTP_200_OK)
 async def update_cart_item(
     item_in: CartItemCreate,
-    background_tasks: BackgroundTasks,
     service: CartService = Depends(get_service(CartService)),
-    current_user: User = Depends(get_current_customer),
+    current_user: Principal = Depends(get_token_customer),
     redis: Redis = Depends(get_redis),
 ):
     """
@@ -81,13 +72,6 @@ async def update_cart_item(
         quantity=item_in.quantity,
     )
 
-    # Background DB sync
-    background_tasks.add_task(
-        service.sync_to_db,
-        user_id=current_user.id,
-        items=updated_cart["items"],
-    )
-
     return {
         "message": "Cart updated successfully",
         "cart": updated_cart,
@@ -101,26 +85,19 @@ async def update_cart_item(
 )
 async def remove_cart_item(
     product_id: UUID,
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_customer),
+    current_user: Principal = Depends(get_token_customer),
     service: CartService = Depends(get_service(CartService)),
     redis: Redis = Depends(get_redis),
 ):
     """
     Remove a single product from the cart.
     """
-    updated_cart = await service.remove_item(
+    await service.remove_item(
         redis=redis,
         user_id=current_user.id,
         product_id=product_id,
     )
 
-    background_tasks.add_task(
-        service.sync_to_db,
-        user_id=current_user.id,
-        items=updated_cart["items"],
-    )
-
     # 204 → NO RESPONSE BODY
     return None
 
@@ -128,8 +105,7 @@ async def remove_cart_item(
 # CLEAR CART
 @router.delete("/clear", status_code=status.HTTP_200_OK)
 async def clear_cart(
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_customer),
+    current_user: Principal = Depends(get_token_customer),
     service: CartService = Depends(get_service(CartService)),
     redis: Redis = Depends(get_redis),
 ):
@@ -138,12 +114,6 @@ async def clear_cart(
     """
     await service.clear_all(redis, current_user.id)
 
-    background_tasks.add_task(
-        service.sync_to_db,
-        user_id=current_user.id,
-        items=[],
-    )
-
     return {"message": "Cart cleared"}
 
 
@@ -151,7 +121,7 @@ async def clear_cart(
 async def checkout(
     redis: Redis = Depends(get_redis),
     service: CheckoutService = Depends(get_service(CheckoutService)),
-    current_user: User = Depends(get_current_customer),
+    current_user: Principal = Depends(get_token_customer),
 ):
     return await service.checkout(redis=redis, user_id=current_user.id)
 
@@ -160,7 +130,7 @@ async def checkout(
 async def resume_checkout(
     order_id: UUID,
     service: CheckoutService = Depends(get_service(CheckoutService)),
-    current_user=Depends(get_current_customer),
+    current_user=Depends(get_token_customer),
     redis: Redis = Depends(get_redis),
 ):
     """
@@ -1,12 +1,13 @@
 import logging
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from starlette import status
 
 from app.core.deps import get_current_customer, get_service
-from app.models.user import User
-from app.schemas.product import ProductWithBatches
+from app.core.principal_cache import Principal
+from app.schemas.pagination import CursorPage
+from app.schemas.product import StorefrontItem, StorefrontSuggestion
 from app.services.product_service import ProductService
 from app.services.user_service import UserService
 
@@ -15,15 +16,19 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/customer", tags=["Customers"])
 
 
-@router.get("/store", response_model=List[ProductWithBatches])
+@router.get("/store", response_model=CursorPage[StorefrontItem])
 async def storefront_list(
     category: Optional[str] = None,
     search: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 20,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    if_none_match: Optional[str] = Header(None),
     service: ProductService = Depends(get_service(ProductService)),
 ):
-    """Public Storefront: Shows only active products with stock."""
+    """
+    Public Storefront: active products with precomputed stock and price.
+    Served from the response cache; revalidate with If-None-Match.
+    """
     # Validation stays in the router
     valid_categories = ["otc", "supplement", "prescription", "medical_device"]
     if category and category not in valid_categories:
@@ -33,14 +38,30 @@ async def storefront_list(
         )
 
     # All DB logic and potential 500 errors handled by Service/Global Handler
-    return await service.get_catalog(
-        category=category, search=search, skip=skip, limit=limit
+    cached = await service.get_catalog_response(
+        category=category, search=search, cursor=cursor, limit=limit
     )
 
+    # Any catalog change may alter the page, so clients revalidate every time
+    headers = {"ETag": cached.etag, "Cache-Control": "public, no-cache"}
+    if cached.matches(if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+@router.get("/store/suggest", response_model=List[StorefrontSuggestion])
+async def storefront_suggest(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    service: ProductService = Depends(get_service(ProductService)),
+):
+    """Search-as-you-type: matches on word prefixes and tolerates typos."""
+    return await service.suggest(q, limit=limit)
+
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_my_account(
-    current_user: User = Depends(get_current_customer),
+    current_user: Principal = Depends(get_current_customer),
     service: UserService = Depends(get_service(UserService)),
 ):
     """
@@ -1,10 +1,11 @@
 from uuid import UUID
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends, Query
 
 from app.core.deps import get_current_customer, get_service
-from app.models.user import User
+from app.core.principal_cache import Principal
 from app.schemas.order import OrderListResponse
+from app.schemas.pagination import CursorPage
 from app.services.order_service import OrderService
 
 router = APIRouter(
@@ -14,27 +15,26 @@ router = APIRouter(
 
 
 # LIST CUSTOMER ORDERS
-@router.get("", response_model=list[OrderListResponse])
+@router.get("", response_model=CursorPage[OrderListResponse])
 async def list_orders(
-    current_user: User = Depends(get_current_customer),
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_customer),
     service: OrderService = Depends(get_service(OrderService)),
 ):
     """
-    Customer lists their orders.
+    Customer lists their orders, newest first.
     """
     return await service.list_customer_orders(
-        user_id=current_user.id,
+        user_id=current_user.id, cursor=cursor, limit=limit
     )
 
 
 @router.post("/{order_id}/cancel", response_model=OrderListResponse)
 async def cancel_order(
     order_id: UUID,
-    background_tasks: BackgroundTasks,
     current_user=Depends(get_current_customer),
     service: OrderService = Depends(get_service(OrderService)),
 ):
 
-    return await service.cancel_order(
-        order_id=order_id, user=current_user, background_tasks=background_tasks
-    )
+    return await service.cancel_order(order_id=order_id, user=current_user)
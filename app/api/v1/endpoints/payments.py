@@ -1,7 +1,8 @@
+import json
 from uuid import UUID
 
 import stripe
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from redis import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -10,11 +11,10 @@ from app.core.deps import (
     get_current_customer,
     get_redis,
     get_service,
-    get_session_factory,
 )
+from app.core.principal_cache import Principal
 from app.db.sessions import get_async_session
 from app.models.order import Order
-from app.models.user import User
 from app.services.payment_service import PaymentService
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
@@ -25,7 +25,7 @@ router = APIRouter(prefix="/payments", tags=["Payments"])
 async def create_payment_intent(
     order_id: UUID,
     redis: Redis = Depends(get_redis),
-    current_user: User = Depends(get_current_customer),
+    current_user: Principal = Depends(get_current_customer),
     service: PaymentService = Depends(get_service(PaymentService)),
 ):
     try:
@@ -41,16 +41,17 @@ async def create_payment_intent(
 @router.post("/webhooks/stripe")
 async def stripe_webhook(
     request: Request,
-    background_tasks: BackgroundTasks,
-    db_factory=Depends(get_session_factory),
-    redis: Redis = Depends(get_redis),
     service: PaymentService = Depends(get_service(PaymentService)),
 ):
+    """
+    Verify and store the event, then acknowledge at once; the Stripe events
+    worker applies it. Stripe only retries if storing fails.
+    """
     payload = await request.body()
     sig = request.headers.get("stripe-signature")
 
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload,
             sig,
             settings.stripe_webhook_secret,
@@ -58,12 +59,7 @@ async def stripe_webhook(
     except stripe.error.SignatureVerificationError:
         raise HTTPException(400, "Invalid signature")
 
-    return await service.handle_webhook(
-        event=event,
-        redis=redis,
-        db_factory=db_factory,
-        background_tasks=background_tasks,
-    )
+    return await service.record_event(json.loads(payload))
 
 
 # CANCEL ORDER (PRE-PAYMENT)
@@ -71,7 +67,7 @@ async def stripe_webhook(
 async def cancel_order(
     order_id: UUID,
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_customer),
+    current_user: Principal = Depends(get_current_customer),
     service: PaymentService = Depends(get_service(PaymentService)),
 ):
     order = await db.get(Order, order_id)
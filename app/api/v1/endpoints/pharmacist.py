@@ -4,7 +4,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends
 
 from app.core.deps import get_current_active_pharmacist, get_service
-from app.models.user import User
+from app.core.principal_cache import Principal
 from app.schemas.product import BatchCreate
 from app.services.product_service import ProductService
 
@@ -18,7 +18,7 @@ async def add_inventory_batch(
     product_id: UUID,
     body: BatchCreate,
     service: ProductService = Depends(get_service(ProductService)),
-    current_user: User = Depends(get_current_active_pharmacist),
+    current_user: Principal = Depends(get_current_active_pharmacist),
 ):
     """Pharmacist: Add new stock batch to a product."""
     batch = await service.create_batch(product_id=product_id, batch_in=body)
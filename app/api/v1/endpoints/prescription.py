@@ -1,7 +1,7 @@
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, UploadFile
+from fastapi import APIRouter, Depends, File, UploadFile
 
 from app.core.deps import get_current_pharmacist, get_current_user, get_service
 from app.schemas.prescription import (
@@ -47,7 +47,6 @@ async def upload_prescription(
 )
 async def approve_prescription(
     prescription_id: UUID,
-    background_tasks: BackgroundTasks,
     service: PrescriptionService = Depends(get_service(PrescriptionService)),
     pharmacist=Depends(get_current_pharmacist),
 ):
@@ -58,7 +57,6 @@ async def approve_prescription(
     prescription = await service.approve(
         prescription_id=prescription_id,
         pharmacist_id=pharmacist.id,
-        background_tasks=background_tasks,
     )
 
     return prescription
@@ -71,7 +69,6 @@ async def approve_prescription(
 )
 async def reject_prescription(
     body: PrescriptionRejectRequest,
-    background_tasks: BackgroundTasks,
     pharmacist=Depends(get_current_pharmacist),
     service: PrescriptionService = Depends(get_service(PrescriptionService)),
 ):
@@ -82,7 +79,6 @@ async def reject_prescription(
         prescription_id=body.prescription_id,
         pharmacist_id=pharmacist.id,
         reason=body.reason,
-        background_tasks=background_tasks,
     )
 
     return prescription
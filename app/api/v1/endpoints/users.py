@@ -5,7 +5,7 @@ from starlette import status
 
 from app.core.deps import get_allowed_password_changers, get_service
 from app.core.limiter import limiter
-from app.models.user import User
+from app.core.principal_cache import Principal
 from app.schemas.user import ChangePasswordRequest
 from app.services.user_service import UserService
 
@@ -24,7 +24,7 @@ async def update_password(
     request: Request,
     password_data: ChangePasswordRequest,
     service: UserService = Depends(get_service(UserService)),
-    current_user: User = Depends(get_allowed_password_changers),
+    current_user: Principal = Depends(get_allowed_password_changers),
 ):
     """
     Allows an authenticated user to change their password.
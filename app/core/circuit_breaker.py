@@ -0,0 +1,72 @@
+import time
+
+from app.core.metrics import metrics
+
+
+class CircuitOpen(Exception):
+    """The dependency is failing; calls are refused until the reset timeout."""
+
+
+class CircuitBreaker:
+    """
+    Fail fast while a dependency is down instead of making every request
+    wait for its timeout.
+
+    - closed: calls go through; failure_threshold consecutive failures open it.
+    - open: calls raise CircuitOpen at once, for reset_timeout seconds.
+    - half-open: then one trial call goes through; success closes the
+      circuit, failure opens it again.
+
+    Only failures of the dependency itself should be recorded (timeouts,
+    5xx); a rejected request means the dependency is healthy.
+    """
+
+    def __init__(self, name: str, *, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_running = False
+
+        self.is_open = metrics.gauge(f"{name}.circuit_open")
+        self.rejected = metrics.counter(f"{name}.circuit_rejected")
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def before_call(self) -> None:
+        """Raise CircuitOpen unless a call may go through now."""
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half-open" and not self._trial_running:
+            self._trial_running = True
+            return
+        self.rejected.inc()
+        raise CircuitOpen(f"{self.name} circuit is open")
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self.is_open.set(0)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_running or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.is_open.set(1)
+        self._trial_running = False
+
+    def abandon(self) -> None:
+        """A call ended without telling either way (e.g. cancelled)."""
+        self._trial_running = False
+
+    def reset(self) -> None:
+        self.record_success()
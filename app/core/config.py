@@ -42,10 +42,96 @@ class Settings(BaseSettings):
     refresh_token_expire_days: int
     jwt_algorithm: str
 
+    # JWT SIGNING KEYS (app/core/jwt_keys.py)
+    # Comma-separated PEM files of Ed25519 or EC P-256 private keys, newest
+    # first: the first signs, all verify and are published as JWKS. Unset:
+    # tokens are signed with secret_key and jwt_algorithm.
+    # Make one with: python -m app.scripts.generate_jwt_key --alg EdDSA
+    jwt_private_key_files: str | None = None
+    # While moving off secret_key, keep accepting tokens it signed
+    jwt_accept_secret_signed: bool = False
+
+    # PASSWORD HASHING (app/core/password_hasher.py)
+    # bcrypt cost factor; hashes of another cost are redone at next login
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4  # hashing threads per process
+    # Hashes waiting for a thread beyond this many are refused with a 503
+    password_hash_max_queue: int = 32
+
+    # PRINCIPAL CACHE (get_current_user)
+    # Local TTL bounds how long another worker may serve a principal after
+    # an invalidation; the Redis tier is invalidated immediately.
+    principal_cache_enabled: bool = True
+    principal_cache_local_ttl: int = 15
+    principal_cache_redis_ttl: int = 300
+    principal_cache_max_entries: int = 10_000
+
+    # CART WRITE-BEHIND (app/workers/cart_sync.py)
+    # Carts live in Redis; the worker copies dirty carts to cart_items.
+    cart_sync_interval_seconds: float = 5.0
+    cart_sync_batch_size: int = 500  # users per upsert
+    cart_sync_max_batches: int = 20  # per run, so one run cannot starve beat
+    cart_sync_stale_after: int = 300  # re-queue claims of a crashed worker
+
+    # STOREFRONT READ MODEL (app/workers/storefront.py)
+    # How late an expired batch may still count as stock on the storefront.
+    storefront_expiry_refresh_seconds: float = 60.0
+
+    # STOCK RESERVATIONS (app/workers/reservations.py)
+    # Expired reservations stop counting at once; the storefront shows
+    # their units again after at most this long.
+    stock_reservation_release_seconds: float = 60.0
+
+    # HOT STOCK (app/core/hot_stock.py, app/workers/hot_stock.py)
+    # Sold units of hot products are deducted from their batches, and the
+    # Redis counters repaired, at most this late.
+    hot_stock_reconcile_seconds: float = 15.0
+    hot_stock_apply_batch_size: int = 500  # paid orders per run
+    # Counter holds of a checkout that never finished are dropped after this
+    hot_stock_hold_stale_after: int = 60
+
+    # EXPIRY SWEEPER (app/workers/inventory.py)
+    # Expired batches are blocked, and admins told about batches expiring
+    # within near_expiry_days, at most this late.
+    inventory_expiry_sweep_seconds: float = 15 * 60.0
+    inventory_near_expiry_days: int = 30
+
+    # STOREFRONT SEARCH (CRUDStorefront.search)
+    # Minimum pg_trgm word similarity for a typo to match ("amoxcilin" ~ 0.47)
+    storefront_search_typo_threshold: float = 0.4
+    # Latency targets; slower calls are logged and counted
+    storefront_search_target_ms: float = 150.0
+    storefront_suggest_target_ms: float = 50.0
+
+    # STOREFRONT RESPONSE CACHE (app/core/response_cache.py)
+    # Entries are invalidated on every catalog change; the TTL only bounds
+    # how long retired versions occupy Redis.
+    storefront_cache_enabled: bool = True
+    storefront_cache_ttl: int = 600
+    # A recompute holds the lock this long at most; others wait up to
+    # lock_wait seconds for its result before computing it themselves.
+    storefront_cache_lock_ttl: int = 10
+    storefront_cache_lock_wait: float = 2.0
+
     # STRIPE
     stripe_secret_key: str
     stripe_webhook_secret: str
 
+    # STRIPE API (app/services/stripe_gateway.py)
+    # e.g. http://localhost:12111 for app/scripts/fake_stripe.py; None = Stripe
+    stripe_api_base: str | None = None
+    stripe_timeout: float = 10.0
+    stripe_max_connections: int = 20
+    stripe_max_network_retries: int = 2  # safe: every call has an idempotency key
+    # Consecutive outages that open the circuit, and how long it stays open
+    stripe_breaker_failures: int = 5
+    stripe_breaker_reset_seconds: float = 30.0
+
+    # PAYMENT INTENT CACHE (app/core/payment_intent_cache.py)
+    # Comma-separated Fernet keys, newest first; unset = derived from secret_key
+    payment_intent_cache_keys: str | None = None
+    payment_intent_cache_enabled: bool = True
+
     # STORAGE
     s3_bucket: str
     s3_endpoint: str
@@ -53,12 +139,67 @@ class Settings(BaseSettings):
     s3_secret_key: str
     s3_region: str
 
+    # "r2", or "local" to keep files on disk under storage_local_root
     storage: str
+    storage_local_root: str = ".storage"
+
+    # R2 CLIENT (app/storage/r2_storage.py)
+    # boto3 runs on this many threads; each may send this many parts of one
+    # multipart upload at once. The connection pool holds the product.
+    storage_max_workers: int = 8
+    storage_multipart_concurrency: int = 4
+    storage_multipart_threshold: int = 8 * 1024 * 1024
+    storage_multipart_chunksize: int = 8 * 1024 * 1024
+    storage_connect_timeout: float = 5.0
+    storage_read_timeout: float = 30.0
+    # Presigned URLs are reused while this many seconds of validity remain
+    storage_presigned_min_remaining: int = 60
+    storage_presigned_cache_size: int = 10_000
 
     # EMAIL PROVIDER
     sendgrid_api_key: SecretStr
     email_from: str
 
+    # NOTIFICATION TRANSPORT (app/services/notification/transport.py)
+    # Kept-alive connections per process and concurrent provider requests
+    notification_max_connections: int = 20
+    notification_max_in_flight: int = 10
+    notification_timeout: float = 10.0
+    notification_connect_timeout: float = 3.0
+    # Attempts per send; backoff doubles from base up to max (seconds)
+    notification_max_attempts: int = 3
+    notification_backoff_base: float = 0.5
+    notification_backoff_max: float = 8.0
+
+    # NOTIFICATION OUTBOX (app/workers/notifications.py)
+    notification_outbox_interval_seconds: float = 2.0
+    notification_outbox_batch_size: int = 100  # rows claimed per transaction
+    notification_outbox_max_batches: int = 20  # per run, so one run cannot starve beat
+    # Claimed rows are retried if the worker has not finished them by then
+    notification_outbox_lease_seconds: int = 300
+    # Attempts before a row is dead-lettered; retry delay doubles from base
+    notification_outbox_max_attempts: int = 8
+    notification_outbox_retry_base: float = 30.0
+    notification_outbox_retry_max: float = 3600.0
+    notification_outbox_keep_sent_days: int = 7
+
+    # STRIPE EVENT INBOX (app/workers/stripe_events.py)
+    stripe_events_interval_seconds: float = 1.0
+    stripe_events_batch_size: int = 100  # events claimed per transaction
+    stripe_events_parallelism: int = 10  # orders processed at once
+    stripe_events_max_batches: int = 50  # per run, so one run cannot starve beat
+    stripe_events_lease_seconds: int = 120
+    stripe_events_max_attempts: int = 10
+    stripe_events_retry_base: float = 5.0
+    stripe_events_retry_max: float = 600.0
+    # Longer than Stripe retries deliveries (3 days): the stored ids dedupe
+    stripe_events_keep_days: int = 30
+
+    # INVOICES (app/services/invoice_service.py)
+    # Render processes per API/worker process; 0 renders on a thread instead
+    invoice_render_processes: int = 2
+    invoice_regenerate_batch_size: int = 200  # orders loaded and rendered at once
+
     model_config = SettingsConfigDict(
         # This order is important: System Environment Variables (Railway) always
         # override the .env file (Local).
@@ -6,16 +6,24 @@ import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from redis.asyncio import Redis
+from redis.exceptions import RedisError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.config import settings
+from app.core.jwt_keys import jwt_keyring
+from app.core.principal_cache import Principal, principal_cache
+from app.core.redis import redis_client
 from app.core.roles import UserRole
-from app.db.sessions import AsyncSessionLocal, get_async_session
+from app.core.token_versions import token_versions
+from app.db.sessions import (
+    AsyncSessionLocal,
+    get_async_session,
+    release_connection,
+)
 from app.models import User
 from app.services.notification.notification_service import NotificationService
 from app.storage.base import StorageInterface
-from app.storage.r2_storage import R2Storage
+from app.storage.selection import get_storage
 
 # Initialize logger for security events
 logger = logging.getLogger(__name__)
@@ -23,36 +31,19 @@ logger = logging.getLogger(__name__)
 # HTTPBearer is used for "Authorization: Bearer <token>" headers
 oauth2_scheme = HTTPBearer(auto_error=False)
 
-_r2_storage = R2Storage()
-
 T = TypeVar("T")
 
 
-# Create ONE Redis client (connection pool)
-redis_client = Redis.from_url(
-    settings.redis_url,
-    decode_responses=True,  # returns str instead of bytes
-)
-
-
-async def get_current_user(
-    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_async_session),
-) -> User:
-    """
-    Dependency that authenticates requests using a JWT.
-    """
+def _access_claims(
+    token: HTTPAuthorizationCredentials | None,
+) -> tuple[dict, uuid.UUID]:
+    """Verified claims of an access token, and its user id."""
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
         # Decode the token
-        payload = jwt.decode(
-            token.credentials,
-            settings.secret_key,
-            algorithms=[settings.jwt_algorithm],
-            options={"leeway": 30},
-        )
+        payload = jwt_keyring.decode(token.credentials, options={"leeway": 30})
 
         user_id_str: str = payload.get("sub")
 
@@ -74,8 +65,6 @@ async def get_current_user(
             detail="Token is invalid or has expired",
         )
 
-    # DATABASE VERIFICATION
-
     # Convert the string user_id into a proper UUID object.
     # SQLAlchemy's UUID
     try:
@@ -86,26 +75,127 @@ async def get_current_user(
             detail="Invalid user identifier format",
         )
 
-    # Query the database using the converted UUID object
-    result = await session.execute(select(User).where(User.id == user_uuid))
-    user = result.scalar_one_or_none()
+    return payload, user_uuid
+
+
+async def _load_principal(user_uuid: uuid.UUID, session: AsyncSession) -> Principal:
+    """The principal from the principal cache, or the users table on a miss."""
+    principal = await principal_cache.get(user_uuid)
+
+    if principal is None:
+        # Before the read: set() drops the row if the user is invalidated
+        # while we hold it
+        generation = await principal_cache.generation(user_uuid)
+        # Query the database using the converted UUID object
+        result = await session.execute(select(User).where(User.id == user_uuid))
+        user = result.scalar_one_or_none()
+
+        if not user:
+            logger.warning(f"Auth Failure: User {user_uuid} not found in database.")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
+            )
+
+        principal = Principal.from_user(user)
+        # Don't hold the connection for the rest of the request (the handler
+        # may not query at all); its next query takes one again
+        await release_connection(session)
+        await principal_cache.set(principal, generation)
+
+    if not principal.is_active:
+        raise HTTPException(status_code=403, detail="User account disabled")
+
+    return principal
+
+
+async def get_current_user(
+    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> Principal:
+    """
+    Dependency that authenticates requests using a JWT.
+    The principal is served from the principal cache; the users table is
+    only queried on a cache miss.
+    """
+    _, user_uuid = _access_claims(token)
+    return await _load_principal(user_uuid, session)
+
 
-    if not user:
-        logger.warning(f"Auth Failure: User {user_id_str} not found in database.")
+async def get_token_principal(
+    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> Principal:
+    """
+    Like get_current_user, but authorizes from the token's verified claims
+    (id, email, role, license) plus one Redis GET of the user's token
+    version: no principal lookup, no users table. Deactivation and password
+    changes bump the version, which revokes the user's access tokens.
+
+    Tokens without a version (issued before it existed) and Redis errors
+    fall back to get_current_user's lookup.
+    """
+    payload, user_uuid = _access_claims(token)
+
+    version = payload.get("ver")
+    if version is None:
+        return await _load_principal(user_uuid, session)
+
+    try:
+        current = await token_versions.current(user_uuid)
+    except (RedisError, OSError) as e:
+        logger.warning(f"Token version check failed, loading the user: {e}")
+        token_versions.fallbacks.inc()
+        return await _load_principal(user_uuid, session)
+
+    token_versions.checks.inc()
+    if version != current:
+        token_versions.refused.inc()
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
         )
 
-    if not user.is_active:
-        raise HTTPException(status_code=403, detail="User account disabled")
+    return Principal.from_claims(payload)
+
+
+class CurrentUser:
+    """
+    The caller of a claims-authorized endpoint. The principal is at hand;
+    the User row is only queried, once, if the endpoint calls load().
+    """
 
-    return user
+    def __init__(self, principal: Principal, session: AsyncSession):
+        self.principal = principal
+        self.id = principal.id
+        self._session = session
+        self._user: User | None = None
+
+    async def load(self) -> User:
+        if self._user is None:
+            user = await self._session.get(User, self.id)
+            if user is None or not user.is_active:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User not found",
+                )
+            self._user = user
+        return self._user
+
+
+def get_token_user(
+    principal: Principal = Depends(get_token_principal),
+    session: AsyncSession = Depends(get_async_session),
+) -> CurrentUser:
+    """Claims-authorized caller whose User row is loaded on demand."""
+    return CurrentUser(principal, session)
 
 
 # ROLE BASED ACCESS CONTROL (SUB DEPENDENCIES OF GET CURRENT USER)
 
 
-def get_current_customer(current_user: User = Depends(get_current_user)) -> User:
+def get_current_customer(
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     """Require Customer role"""
     if current_user.role != UserRole.CUSTOMER:
         raise HTTPException(
@@ -114,12 +204,16 @@ def get_current_customer(current_user: User = Depends(get_current_user)) -> User
     return current_user
 
 
-def get_any_authenticated_user(current_user: User = Depends(get_current_user)) -> User:
+def get_any_authenticated_user(
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     """Allows any logged-in user to see products"""
     return current_user
 
 
-def get_current_pharmacist(current_user: User = Depends(get_current_user)) -> User:
+def get_current_pharmacist(
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     """Require Pharmacist Role"""
     if current_user.role != UserRole.PHARMACIST:
         raise HTTPException(
@@ -130,8 +224,8 @@ def get_current_pharmacist(current_user: User = Depends(get_current_user)) -> Us
 
 
 def get_current_active_pharmacist(
-    current_user: User = Depends(get_current_pharmacist),
-) -> User:
+    current_user: Principal = Depends(get_current_pharmacist),
+) -> Principal:
     """Require verified pharmacist or admin"""
     if current_user.role == UserRole.PHARMACIST and not current_user.license_verified:
         raise HTTPException(
@@ -141,7 +235,7 @@ def get_current_active_pharmacist(
     return current_user
 
 
-def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+def get_current_admin(current_user: Principal = Depends(get_current_user)) -> Principal:
     """Require admin role"""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -151,8 +245,8 @@ def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
 
 
 def get_allowed_password_changers(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     """Require Customer or User role"""
 
     allowed_roles = [UserRole.CUSTOMER, UserRole.PHARMACIST]
@@ -165,18 +259,47 @@ def get_allowed_password_changers(
     return current_user
 
 
-# SERVICE DEPENDENCIES
+# RBAC FROM TOKEN CLAIMS (OPT-IN, SUB DEPENDENCIES OF GET TOKEN PRINCIPAL)
+# Same checks as above, on the principal from the token claims.
 
 
-async def get_redis() -> Redis:
-    return redis_client
+def get_token_customer(
+    current_user: Principal = Depends(get_token_principal),
+) -> Principal:
+    """Require Customer role"""
+    return get_current_customer(current_user)
+
+
+def get_token_pharmacist(
+    current_user: Principal = Depends(get_token_principal),
+) -> Principal:
+    """Require Pharmacist Role"""
+    return get_current_pharmacist(current_user)
+
+
+async def get_token_active_pharmacist(
+    current_user: Principal = Depends(get_token_pharmacist),
+    session: AsyncSession = Depends(get_async_session),
+) -> Principal:
+    """Require verified pharmacist"""
+    # Claims say unverified until the next login: verified since? Look it up
+    if not current_user.license_verified:
+        current_user = await _load_principal(current_user.id, session)
+    return get_current_active_pharmacist(current_user)
+
+
+def get_token_admin(
+    current_user: Principal = Depends(get_token_principal),
+) -> Principal:
+    """Require admin role"""
+    return get_current_admin(current_user)
 
 
-def get_storage() -> StorageInterface:
+# SERVICE DEPENDENCIES
+
 
-    if settings.storage == "r2":
-        return _r2_storage
-    return False
+async def get_redis() -> Redis:
+    return redis_client
 
 
 def get_notification_service() -> NotificationService:
@@ -191,7 +314,7 @@ def get_service(service_cls: Type[T]):
     def _get(
         db: AsyncSession = Depends(get_async_session),
         notification_service: NotificationService = Depends(get_notification_service),
-        storage: R2Storage = Depends(get_storage),
+        storage: StorageInterface = Depends(get_storage),
     ) -> T:
         try:
             return service_cls(db, notification_service, storage)
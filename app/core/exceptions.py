@@ -33,3 +33,25 @@ class InsufficientStockError(Exception):
     """
 
     pass
+
+
+class StripeUnavailable(Exception):
+    """
+    Raised when Stripe cannot be reached (timeout, network error, 5xx) or
+    its circuit breaker is open.
+
+    Expected Result: 503 Service Unavailable
+    """
+
+    pass
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Raised when the password hashing pool already has as many hashes queued
+    as it accepts (a burst of logins).
+
+    Expected Result: 503 Service Unavailable
+    """
+
+    pass
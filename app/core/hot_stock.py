@@ -0,0 +1,229 @@
+import json
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+from app.core.exceptions import InsufficientStockError
+from app.core.metrics import metrics
+from app.core.redis import redis_client
+
+# Hot stock: for products flagged Product.hot_stock (promotions), checkout
+# admission is an atomic Redis counter instead of a row lock on the product.
+#
+# hot_stock:{product_id}  STRING  units checkouts may still reserve
+# hot_stock:inflight      HASH    token -> {"at": unix time, "items": {id: n}},
+#                                 units taken by checkouts not yet committed
+#
+# A product is hot for checkout while its counter exists. The counter only
+# goes down at checkout: units coming back (cancellations, expiry, restocks)
+# are added by the hot stock worker, which compares every counter with
+# Postgres and repairs the drift.
+
+# Take every line's units, or none. KEYS = [inflight, counter per line],
+# ARGV = [token, then product id and quantity per line]. Lines without a
+# counter are not hot and are skipped. Replies {0, hot product ids...} or
+# {-1, product id} when a counter is short.
+TAKE_SCRIPT = redis_client.register_script(
+    """
+local hot = {}
+for i = 2, #KEYS do
+    local left = redis.call('GET', KEYS[i])
+    if left then
+        if tonumber(left) < tonumber(ARGV[2 * i - 1]) then
+            return {-1, ARGV[2 * i - 2]}
+        end
+        hot[#hot + 1] = i
+    end
+end
+if #hot == 0 then return {0} end
+local items, reply = {}, {0}
+for _, i in ipairs(hot) do
+    redis.call('DECRBY', KEYS[i], ARGV[2 * i - 1])
+    items[ARGV[2 * i - 2]] = tonumber(ARGV[2 * i - 1])
+    reply[#reply + 1] = ARGV[2 * i - 2]
+end
+local t = redis.call('TIME')
+redis.call('HSET', KEYS[1], ARGV[1], cjson.encode({at = tonumber(t[1]), items = items}))
+return reply
+"""
+)
+
+# Undo a take, once. KEYS = [inflight, counters...], ARGV = [token,
+# quantities...]. Counters deleted since (product no longer hot) stay gone.
+GIVE_BACK_SCRIPT = redis_client.register_script(
+    """
+if redis.call('HDEL', KEYS[1], ARGV[1]) == 0 then return 0 end
+for i = 2, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('INCRBY', KEYS[i], ARGV[i])
+    end
+end
+return 1
+"""
+)
+
+# Counters and in-flight units of some products, read atomically. Holds
+# older than ARGV[1] seconds (their checkout died) are dropped first.
+# KEYS = [inflight, counters...], ARGV = [stale_after, product ids...].
+SNAPSHOT_SCRIPT = redis_client.register_script(
+    """
+local t = redis.call('TIME')
+local now = tonumber(t[1])
+local held = {}
+local holds = redis.call('HGETALL', KEYS[1])
+for i = 1, #holds, 2 do
+    local hold = cjson.decode(holds[i + 1])
+    if now - hold.at > tonumber(ARGV[1]) then
+        redis.call('HDEL', KEYS[1], holds[i])
+    else
+        for product_id, quantity in pairs(hold.items) do
+            held[product_id] = (held[product_id] or 0) + quantity
+        end
+    end
+end
+local counters = {}
+for i = 2, #KEYS do
+    local left = redis.call('GET', KEYS[i])
+    if left then counters[ARGV[i]] = left end
+end
+return cjson.encode({counters = counters, held = held})
+"""
+)
+
+# Add ARGV[i] to existing counters only. KEYS = [counters...].
+ADJUST_SCRIPT = redis_client.register_script(
+    """
+for i = 1, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('INCRBY', KEYS[i], ARGV[i])
+    end
+end
+return 1
+"""
+)
+
+
+class HotStock:
+    """
+    Redis admission counters for hot products. Postgres stays the record:
+    checkouts still reserve the units there, and the hot stock worker
+    deducts sold units from the batches and repairs the counters.
+    """
+
+    KEY_PREFIX = "hot_stock"
+    INFLIGHT_KEY = "hot_stock:inflight"
+
+    def __init__(self):
+        self.taken = metrics.counter("hot_stock.units_taken")
+        self.shortages = metrics.counter("hot_stock.shortages")
+        self.given_back = metrics.counter("hot_stock.give_backs")
+        self.repairs = metrics.counter("hot_stock.repairs")
+        self.drift = metrics.gauge("hot_stock.drift_units")
+
+    def _key(self, product_id: UUID) -> str:
+        return f"{self.KEY_PREFIX}:{product_id}"
+
+    async def take(
+        self, redis: Redis, token: str, items: dict[UUID, int]
+    ) -> dict[UUID, int]:
+        """
+        Take the units of every hot product in items, all or nothing, and
+        remember them under token until settle() or give_back(). Returns
+        the units taken per hot product (empty when none is hot). Raises
+        InsufficientStockError if a counter is short.
+        """
+        if not items:
+            return {}
+
+        args = [token]
+        for product_id, quantity in items.items():
+            args.extend((str(product_id), quantity))
+        reply = await TAKE_SCRIPT(
+            keys=[self.INFLIGHT_KEY, *(self._key(product_id) for product_id in items)],
+            args=args,
+            client=redis,
+        )
+
+        if int(reply[0]) < 0:
+            self.shortages.inc()
+            raise InsufficientStockError(f"Insufficient stock for {reply[1]}")
+
+        taken = {UUID(product_id): items[UUID(product_id)] for product_id in reply[1:]}
+        self.taken.inc(sum(taken.values()))
+        return taken
+
+    async def settle(self, redis: Redis, token: str) -> None:
+        """The checkout committed: its reservation now holds the units."""
+        await redis.hdel(self.INFLIGHT_KEY, token)
+
+    async def give_back(self, redis: Redis, token: str, taken: dict[UUID, int]):
+        """The checkout failed: return what take() took."""
+        if not taken:
+            return
+        self.given_back.inc()
+        await GIVE_BACK_SCRIPT(
+            keys=[self.INFLIGHT_KEY, *(self._key(product_id) for product_id in taken)],
+            args=[token, *taken.values()],
+            client=redis,
+        )
+
+    async def snapshot(
+        self, redis: Redis, product_ids: list[UUID], *, stale_after: int
+    ) -> tuple[dict[UUID, int], dict[UUID, int]]:
+        """
+        Counters (absent for products that are not hot for checkout) and
+        units held by in-flight checkouts, at one instant.
+        """
+        reply = json.loads(
+            await SNAPSHOT_SCRIPT(
+                keys=[
+                    self.INFLIGHT_KEY,
+                    *(self._key(product_id) for product_id in product_ids),
+                ],
+                args=[stale_after, *map(str, product_ids)],
+                client=redis,
+            )
+        )
+        # cjson cannot tell an empty table from an empty list
+        counters = {
+            UUID(product_id): int(left)
+            for product_id, left in dict(reply["counters"] or {}).items()
+        }
+        held = {
+            UUID(product_id): int(quantity)
+            for product_id, quantity in dict(reply["held"] or {}).items()
+        }
+        return counters, held
+
+    async def adjust(self, redis: Redis, deltas: dict[UUID, int]) -> None:
+        """Add deltas to the counters that exist (drift repair)."""
+        if not deltas:
+            return
+        self.repairs.inc(len(deltas))
+        await ADJUST_SCRIPT(
+            keys=[self._key(product_id) for product_id in deltas],
+            args=list(deltas.values()),
+            client=redis,
+        )
+
+    async def load(self, redis: Redis, stock: dict[UUID, int]) -> None:
+        """
+        Create the counters of newly hot products. Hold their row locks
+        while reading the stock and loading it, so no checkout slips in.
+        """
+        for product_id, available in stock.items():
+            await redis.set(self._key(product_id), available, nx=True)
+
+    async def disable(self, redis: Redis, product_id: UUID) -> None:
+        await redis.delete(self._key(product_id))
+
+    def stats(self) -> dict:
+        return {
+            "units_taken": self.taken.value,
+            "shortages": self.shortages.value,
+            "give_backs": self.given_back.value,
+            "repairs": self.repairs.value,
+        }
+
+
+hot_stock = HotStock()
@@ -0,0 +1,154 @@
+import base64
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class _Key:
+    kid: str
+    algorithm: str
+    private: ed25519.Ed25519PrivateKey | ec.EllipticCurvePrivateKey
+    public: ed25519.Ed25519PublicKey | ec.EllipticCurvePublicKey
+    jwk: dict
+
+
+def _parse(pem: bytes) -> _Key:
+    private = load_pem_private_key(pem, password=None)
+    if isinstance(private, ed25519.Ed25519PrivateKey):
+        algorithm, jwk = "EdDSA", OKPAlgorithm.to_jwk(private.public_key(), True)
+    elif isinstance(private, ec.EllipticCurvePrivateKey) and isinstance(
+        private.curve, ec.SECP256R1
+    ):
+        algorithm, jwk = "ES256", ECAlgorithm.to_jwk(private.public_key(), True)
+    else:
+        raise ValueError("JWT keys must be Ed25519 or EC P-256 private keys")
+
+    # kid: the RFC 7638 thumbprint, so a key always gets the same id
+    required = {name: jwk[name] for name in ("crv", "kty", "x", "y") if name in jwk}
+    digest = hashlib.sha256(
+        json.dumps(required, sort_keys=True, separators=(",", ":")).encode()
+    ).digest()
+    kid = base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+    jwk = {**jwk, "kid": kid, "alg": algorithm, "use": "sig"}
+    return _Key(kid, algorithm, private, private.public_key(), jwk)
+
+
+class JWTKeyring:
+    """
+    Keys that sign and verify the app's JWTs.
+
+    With asymmetric keys loaded (Ed25519 or P-256, newest first), the first
+    one signs and puts its kid in the token header; all of them verify and
+    are published at /.well-known/jwks.json, so other services and edge
+    proxies can check tokens without any secret. Rotate by loading a new
+    key in front and dropping the old one once its tokens have expired.
+
+    Without keys, tokens are signed with the shared secret_key and
+    jwt_algorithm, as before.
+
+    Keys are parsed once, at load; each token is verified with the parsed
+    key of its kid and only that key's algorithm. The header segment is the
+    same for every token of a key, so its kid is remembered rather than
+    decoded again per token.
+    """
+
+    MAX_HEADERS = 64
+
+    def __init__(self, *, secret: str, secret_algorithm: str):
+        self.secret = secret
+        self.secret_algorithm = secret_algorithm
+        self.accept_secret_signed = True
+        self._signing: _Key | None = None
+        self._keys: dict[str, _Key] = {}
+        self._header_kids: dict[str, str | None] = {}
+
+        self.unknown_kid = metrics.counter("jwt.unknown_kid")
+
+    def load(self, pems: list[bytes], *, accept_secret_signed: bool = False) -> None:
+        """
+        Sign and verify with these PEM private keys, newest first ([] goes
+        back to the shared secret). accept_secret_signed keeps accepting
+        tokens signed with the secret (no kid) while switching over.
+        """
+        keys = [_parse(pem) for pem in pems]
+        self._keys = {key.kid: key for key in keys}
+        self._signing = keys[0] if keys else None
+        self._header_kids = {}
+        self.accept_secret_signed = accept_secret_signed or not keys
+        if keys:
+            logger.info(
+                f"JWT: signing with {self._signing.algorithm} key "
+                f"{self._signing.kid}, {len(keys)} keys verify"
+            )
+
+    @property
+    def algorithm(self) -> str:
+        return self._signing.algorithm if self._signing else self.secret_algorithm
+
+    def encode(self, payload: dict) -> str:
+        if self._signing is None:
+            return jwt.encode(payload, self.secret, algorithm=self.secret_algorithm)
+        return jwt.encode(
+            payload,
+            self._signing.private,
+            algorithm=self._signing.algorithm,
+            headers={"kid": self._signing.kid},
+        )
+
+    def decode(self, token: str, **kwargs) -> dict:
+        """Verify and decode a token; raises jwt.PyJWTError when invalid."""
+        kid = self._kid(token)
+        if kid is None:
+            if not self.accept_secret_signed:
+                raise jwt.InvalidTokenError("Token has no key id")
+            return jwt.decode(
+                token, self.secret, algorithms=[self.secret_algorithm], **kwargs
+            )
+
+        key = self._keys.get(kid)
+        if key is None:
+            self.unknown_kid.inc()
+            raise jwt.InvalidTokenError(f"Unknown key id {kid}")
+        return jwt.decode(token, key.public, algorithms=[key.algorithm], **kwargs)
+
+    def _kid(self, token: str) -> str | None:
+        header = token.partition(".")[0]
+        try:
+            return self._header_kids[header]
+        except KeyError:
+            kid = jwt.get_unverified_header(token).get("kid")
+        # Headers come from the client: only a few are remembered
+        if len(self._header_kids) < self.MAX_HEADERS:
+            self._header_kids[header] = kid
+        return kid
+
+    def jwks(self) -> dict:
+        """Public keys as a JWK Set (none with a shared secret)."""
+        return {"keys": [key.jwk for key in self._keys.values()]}
+
+
+jwt_keyring = JWTKeyring(
+    secret=settings.secret_key, secret_algorithm=settings.jwt_algorithm
+)
+if settings.jwt_private_key_files:
+    jwt_keyring.load(
+        [
+            Path(path.strip()).read_bytes()
+            for path in settings.jwt_private_key_files.split(",")
+        ],
+        accept_secret_signed=settings.jwt_accept_secret_signed,
+    )
@@ -0,0 +1,139 @@
+import base64
+import json
+import logging
+from dataclasses import dataclass
+from uuid import UUID
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class CachedIntent:
+    intent_id: str
+    client_secret: str
+    status: str
+
+
+def _derived_key(secret: str) -> bytes:
+    key = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"payment-intent-cache",
+    ).derive(secret.encode())
+    return base64.urlsafe_b64encode(key)
+
+
+class PaymentIntentCache:
+    """
+    Client secret and status of each order's payment intent, so a retried
+    or refreshed payment page is answered without a Stripe retrieve.
+
+    Entries are Fernet-encrypted (the client secret lets anyone holding it
+    confirm the payment) and expire with the customer's checkout session.
+    The Stripe events worker drops an order's entry whenever its intent
+    changes state. Redis errors are logged and treated as a miss.
+
+    Encryption keys: settings.payment_intent_cache_keys (comma separated,
+    the first encrypts, all decrypt, for rotation), else a key derived from
+    settings.secret_key.
+    """
+
+    KEY_PREFIX = "payment_intent"
+
+    def __init__(self, keys: list[bytes], *, enabled: bool = True):
+        self.cipher = MultiFernet([Fernet(key) for key in keys])
+        self.enabled = enabled
+
+        self.hits = metrics.counter("payment_intent_cache.hits")
+        self.misses = metrics.counter("payment_intent_cache.misses")
+        self.invalidations = metrics.counter("payment_intent_cache.invalidations")
+
+    def _key(self, order_id: UUID) -> str:
+        return f"{self.KEY_PREFIX}:{order_id}"
+
+    async def get(
+        self, redis: Redis, order_id: UUID, intent_id: str
+    ) -> CachedIntent | None:
+        """The cached intent of an order, if it is still intent_id."""
+        if not self.enabled:
+            return None
+
+        try:
+            token = await redis.get(self._key(order_id))
+        except (RedisError, OSError) as e:
+            logger.warning(f"Payment intent cache: Redis read failed: {e}")
+            token = None
+
+        cached = None
+        if token:
+            try:
+                data = json.loads(self.cipher.decrypt(token))
+                cached = CachedIntent(**data)
+            except (InvalidToken, ValueError, TypeError):
+                cached = None
+
+        if cached is None or cached.intent_id != intent_id:
+            self.misses.inc()
+            return None
+
+        self.hits.inc()
+        return cached
+
+    async def set(self, redis: Redis, order_id: UUID, intent, *, ttl: int) -> None:
+        """Cache a Stripe PaymentIntent for ttl seconds."""
+        if not self.enabled or ttl <= 0:
+            return
+
+        token = self.cipher.encrypt(
+            json.dumps(
+                {
+                    "intent_id": intent.id,
+                    "client_secret": intent.client_secret,
+                    "status": intent.status,
+                }
+            ).encode()
+        ).decode()  # Fernet tokens are ASCII; the Redis client decodes replies
+        try:
+            await redis.set(self._key(order_id), token, ex=ttl)
+        except (RedisError, OSError) as e:
+            logger.warning(f"Payment intent cache: Redis write failed: {e}")
+
+    async def invalidate(self, redis: Redis, order_id: UUID) -> None:
+        self.invalidations.inc()
+        try:
+            await redis.delete(self._key(order_id))
+        except (RedisError, OSError) as e:
+            logger.error(
+                f"Payment intent cache: invalidation failed for {order_id}: {e}"
+            )
+
+    def stats(self) -> dict:
+        lookups = self.hits.value + self.misses.value
+        return {
+            "hits": self.hits.value,
+            "misses": self.misses.value,
+            "invalidations": self.invalidations.value,
+            "hit_ratio": round(self.hits.value / lookups, 4) if lookups else 0.0,
+            # every hit is a PaymentIntent retrieve not sent to Stripe
+            "stripe_calls_saved": self.hits.value,
+        }
+
+
+payment_intent_cache = PaymentIntentCache(
+    (
+        [key.strip().encode() for key in settings.payment_intent_cache_keys.split(",")]
+        if settings.payment_intent_cache_keys
+        else [_derived_key(settings.secret_key)]
+    ),
+    enabled=settings.payment_intent_cache_enabled,
+)
@@ -0,0 +1,279 @@
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis import redis_client
+from app.core.roles import UserRole
+
+logger = logging.getLogger(__name__)
+
+# Store a principal read from the users table, unless it was invalidated
+# since: KEYS = [principal, generation], ARGV = [generation read before the
+# users table, principal json, ttl]. Replies 1 (stored) or 0 (stale).
+STORE_SCRIPT = redis_client.register_script(
+    """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then return 0 end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+)
+
+# KEYS = [principal, generation], ARGV = [generation ttl]
+INVALIDATE_SCRIPT = redis_client.register_script(
+    """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+redis.call('DEL', KEYS[1])
+return 1
+"""
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """
+    The authenticated caller as seen by RBAC dependencies.
+    Only the fields needed for authorization, so it is cheap to cache.
+    """
+
+    id: uuid.UUID
+    email: str
+    role: UserRole
+    is_active: bool
+    license_verified: bool
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=UserRole(getattr(user.role, "value", user.role)),
+            is_active=user.is_active,
+            license_verified=user.license_verified,
+        )
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> "Principal":
+        """From the verified claims of an access token (active at issue)."""
+        return cls(
+            id=uuid.UUID(claims["sub"]),
+            email=claims["email"],
+            role=UserRole(claims["role"]),
+            is_active=True,
+            license_verified=bool(claims.get("lic", False)),
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "id": str(self.id),
+                "email": self.email,
+                "role": self.role.value,
+                "is_active": self.is_active,
+                "license_verified": self.license_verified,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Principal":
+        data = json.loads(raw)
+        return cls(
+            id=uuid.UUID(data["id"]),
+            email=data["email"],
+            role=UserRole(data["role"]),
+            is_active=data["is_active"],
+            license_verified=data["license_verified"],
+        )
+
+
+class PrincipalCache:
+    """
+    Two-tier cache of principals keyed by user id.
+
+    - Tier 1: in-process LRU with a short TTL (no network at all).
+    - Tier 2: Redis, shared by all workers, invalidated immediately.
+
+    A miss on both tiers falls back to the users table in get_current_user.
+    Redis errors are logged and treated as a miss; auth never fails because
+    the cache is down.
+
+    Invalidation bumps a per-user generation. A miss reads the generation
+    before the users table and passes it to set(), which stores nothing if
+    the user was invalidated in between: otherwise the row read just before
+    a deactivation would be cached again for the whole Redis TTL.
+    """
+
+    KEY_PREFIX = "principal"
+    GENERATION_PREFIX = "principal_generation"
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        local_ttl: int,
+        redis_ttl: int,
+        max_entries: int,
+        enabled: bool = True,
+    ):
+        self.redis = redis
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._local: OrderedDict[uuid.UUID, tuple[float, Principal]] = OrderedDict()
+        # Bumped by every invalidation in this process (guards the local tier)
+        self._epoch = 0
+
+        self.local_hits = metrics.counter("principal_cache.local_hits")
+        self.redis_hits = metrics.counter("principal_cache.redis_hits")
+        self.misses = metrics.counter("principal_cache.misses")
+        self.invalidations = metrics.counter("principal_cache.invalidations")
+        self.stale_writes = metrics.counter("principal_cache.stale_writes")
+
+    def _key(self, user_id: uuid.UUID) -> str:
+        return f"{self.KEY_PREFIX}:{user_id}"
+
+    def _generation_key(self, user_id: uuid.UUID) -> str:
+        return f"{self.GENERATION_PREFIX}:{user_id}"
+
+    def _get_local(self, user_id: uuid.UUID) -> Principal | None:
+        entry = self._local.get(user_id)
+        if entry is None:
+            return None
+
+        expires_at, principal = entry
+        if expires_at <= time.monotonic():
+            self._local.pop(user_id, None)
+            return None
+
+        self._local.move_to_end(user_id)
+        return principal
+
+    def _set_local(self, principal: Principal) -> None:
+        self._local[principal.id] = (time.monotonic() + self.local_ttl, principal)
+        self._local.move_to_end(principal.id)
+
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def get(self, user_id: uuid.UUID) -> Principal | None:
+        if not self.enabled:
+            return None
+
+        principal = self._get_local(user_id)
+        if principal is not None:
+            self.local_hits.inc()
+            return principal
+
+        try:
+            raw = await self.redis.get(self._key(user_id))
+        except (RedisError, OSError) as e:
+            logger.warning(f"Principal cache: Redis read failed: {e}")
+            raw = None
+
+        if raw:
+            try:
+                principal = Principal.from_json(raw)
+            except (ValueError, KeyError, TypeError):
+                principal = None
+
+        if principal is None:
+            self.misses.inc()
+            return None
+
+        self.redis_hits.inc()
+        self._set_local(principal)
+        return principal
+
+    async def generation(self, user_id: uuid.UUID) -> tuple[int, str | None]:
+        """
+        Read before loading a principal from the users table, and pass to
+        set(). The Redis part is None when Redis is unreachable.
+        """
+        if not self.enabled:
+            return self._epoch, None
+
+        try:
+            raw = await self.redis.get(self._generation_key(user_id))
+        except (RedisError, OSError) as e:
+            logger.warning(f"Principal cache: Redis read failed: {e}")
+            return self._epoch, None
+        return self._epoch, raw or "0"
+
+    async def set(
+        self, principal: Principal, generation: tuple[int, str | None] | None = None
+    ) -> None:
+        """
+        Cache a principal. With the generation read before it was loaded,
+        it is dropped if the user was invalidated since.
+        """
+        if not self.enabled:
+            return
+
+        key = self._key(principal.id)
+        try:
+            if generation is None:
+                await self.redis.set(key, principal.to_json(), ex=self.redis_ttl)
+            elif generation[1] is not None:
+                stored = await STORE_SCRIPT(
+                    keys=[key, self._generation_key(principal.id)],
+                    args=[generation[1], principal.to_json(), self.redis_ttl],
+                    client=self.redis,
+                )
+                if not stored:
+                    self.stale_writes.inc()
+                    return
+        except (RedisError, OSError) as e:
+            logger.warning(f"Principal cache: Redis write failed: {e}")
+
+        if generation is not None and generation[0] != self._epoch:
+            self.stale_writes.inc()
+            return
+        self._set_local(principal)
+
+    async def invalidate(self, user_id: uuid.UUID) -> None:
+        """Drop a principal after its role/status/license changed."""
+        self.invalidations.inc()
+        self._epoch += 1
+        self._local.pop(user_id, None)
+        try:
+            await INVALIDATE_SCRIPT(
+                keys=[self._key(user_id), self._generation_key(user_id)],
+                args=[self.redis_ttl],
+                client=self.redis,
+            )
+        except (RedisError, OSError) as e:
+            logger.error(f"Principal cache: invalidation failed for {user_id}: {e}")
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    def stats(self) -> dict:
+        lookups = self.local_hits.value + self.redis_hits.value + self.misses.value
+        hits = self.local_hits.value + self.redis_hits.value
+        return {
+            "local_hits": self.local_hits.value,
+            "redis_hits": self.redis_hits.value,
+            "misses": self.misses.value,
+            "invalidations": self.invalidations.value,
+            "stale_writes": self.stale_writes.value,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "local_entries": len(self._local),
+        }
+
+
+principal_cache = PrincipalCache(
+    redis_client,
+    local_ttl=settings.principal_cache_local_ttl,
+    redis_ttl=settings.principal_cache_redis_ttl,
+    max_entries=settings.principal_cache_max_entries,
+    enabled=settings.principal_cache_enabled,
+)
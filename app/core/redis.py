@@ -0,0 +1,9 @@
+from redis.asyncio import Redis
+
+from app.core.config import settings
+
+# Create ONE Redis client (connection pool) shared by the API and the caches
+redis_client = Redis.from_url(
+    settings.redis_url,
+    decode_responses=True,  # returns str instead of bytes
+)
@@ -0,0 +1,178 @@
+import logging
+import uuid
+
+from redis.asyncio import Redis
+
+from app.core.config import settings
+from app.core.exceptions import AuthenticationFailed
+from app.core.metrics import metrics
+from app.core.redis import redis_client
+from app.core.security import create_refresh_token
+from app.core.token_versions import token_versions
+
+logger = logging.getLogger(__name__)
+
+# Refresh token rotation. Every login starts a token family; each refresh
+# spends the presented token and returns the family's next one.
+#
+# refresh_family:{family}  STRING  jti of the family's only usable token
+# refresh_user:{user_id}   HASH    family -> 1, the user's families
+#
+# Presenting a spent token of a live family means it was copied: the whole
+# family is revoked (reuse detection). Both keys expire with the tokens.
+
+# KEYS = [family, user families], ARGV = [jti, family, ttl]
+ISSUE_SCRIPT = redis_client.register_script(
+    """
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('HSET', KEYS[2], ARGV[2], 1)
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return 1
+"""
+)
+
+# Spend jti for new_jti. KEYS = [family, user families], ARGV = [jti,
+# new_jti, family, ttl]. Replies 1 (rotated), 0 (family revoked or
+# expired) or -1 (spent token reused: family revoked now).
+ROTATE_SCRIPT = redis_client.register_script(
+    """
+local current = redis.call('GET', KEYS[1])
+if not current then return 0 end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('HDEL', KEYS[2], ARGV[3])
+    return -1
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return 1
+"""
+)
+
+# Every family of a user, at once, and their access tokens by bumping the
+# token version (app/core/token_versions.py). KEYS = [user families, token
+# version], ARGV = [family key prefix]. Replies the number of families
+# revoked.
+REVOKE_USER_SCRIPT = redis_client.register_script(
+    """
+local families = redis.call('HKEYS', KEYS[1])
+for _, family in ipairs(families) do
+    redis.call('DEL', ARGV[1] .. family)
+end
+redis.call('DEL', KEYS[1])
+redis.call('INCR', KEYS[2])
+return #families
+"""
+)
+
+
+class RefreshTokenStore:
+    """
+    Rotating refresh tokens with revocation, kept in Redis: a refresh is
+    one script call (no DB read), and revoking a token or all of a user's
+    tokens is one call too.
+
+    Unlike the principal cache, Redis errors are not swallowed: a refresh
+    that cannot be checked is refused.
+    """
+
+    FAMILY_PREFIX = "refresh_family:"
+    USER_PREFIX = "refresh_user:"
+
+    def __init__(self, redis: Redis, *, ttl: int):
+        self.redis = redis
+        self.ttl = ttl
+
+        self.issued = metrics.counter("refresh_tokens.issued")
+        self.rotated = metrics.counter("refresh_tokens.rotated")
+        self.refused = metrics.counter("refresh_tokens.refused")
+        self.reuse_detected = metrics.counter("refresh_tokens.reuse_detected")
+        self.revoked = metrics.counter("refresh_tokens.revoked_families")
+
+    def _keys(self, family: str, user_id) -> list[str]:
+        return [f"{self.FAMILY_PREFIX}{family}", f"{self.USER_PREFIX}{user_id}"]
+
+    async def issue(self, user) -> str:
+        """Start a token family for a login; returns its first token."""
+        family, jti = uuid.uuid4().hex, uuid.uuid4().hex
+        await ISSUE_SCRIPT(
+            keys=self._keys(family, user.id),
+            args=[jti, family, self.ttl],
+            client=self.redis,
+        )
+        self.issued.inc()
+        return create_refresh_token(user, family=family, jti=jti)
+
+    async def rotate(self, claims: dict) -> str:
+        """
+        Spend the refresh token with these (verified) claims and return the
+        family's next one. Raises AuthenticationFailed if the token is not
+        the family's latest, or the family was revoked.
+        """
+        family, jti = claims.get("fam"), claims.get("jti")
+        if not family or not jti:
+            self.refused.inc()
+            raise AuthenticationFailed("Refresh token was revoked")
+
+        new_jti = uuid.uuid4().hex
+        result = int(
+            await ROTATE_SCRIPT(
+                keys=self._keys(family, claims["sub"]),
+                args=[jti, new_jti, family, self.ttl],
+                client=self.redis,
+            )
+        )
+        if result == 0:
+            self.refused.inc()
+            raise AuthenticationFailed("Refresh token was revoked")
+        if result < 0:
+            self.reuse_detected.inc()
+            self.revoked.inc()
+            logger.warning(
+                f"Refresh token reused for user {claims['sub']}; "
+                f"revoked token family {family}"
+            )
+            raise AuthenticationFailed("Refresh token was already used")
+
+        self.rotated.inc()
+        return create_refresh_token(claims, family=family, jti=new_jti)
+
+    async def revoke(self, claims: dict) -> None:
+        """Revoke the family of a refresh token (logout)."""
+        family = claims.get("fam")
+        if not family:
+            return
+        family_key, user_key = self._keys(family, claims["sub"])
+        if await self.redis.delete(family_key):
+            self.revoked.inc()
+        await self.redis.hdel(user_key, family)
+
+    async def revoke_user(self, user_id) -> int:
+        """
+        Revoke every token of a user (deactivation, password change): their
+        refresh token families, and their access tokens for the claims-only
+        dependencies.
+        """
+        revoked = int(
+            await REVOKE_USER_SCRIPT(
+                keys=[f"{self.USER_PREFIX}{user_id}", token_versions.key(user_id)],
+                args=[self.FAMILY_PREFIX],
+                client=self.redis,
+            )
+        )
+        self.revoked.inc(revoked)
+        return revoked
+
+    def stats(self) -> dict:
+        return {
+            "issued": self.issued.value,
+            "rotated": self.rotated.value,
+            "refused": self.refused.value,
+            "reuse_detected": self.reuse_detected.value,
+            "revoked_families": self.revoked.value,
+        }
+
+
+refresh_tokens = RefreshTokenStore(
+    redis_client, ttl=settings.refresh_token_expire_days * 24 * 60 * 60
+)
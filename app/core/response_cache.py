@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResponse:
+    """A serialized JSON body and its ETag."""
+
+    body: str
+    etag: str
+
+    @classmethod
+    def build(cls, body: str) -> "CachedResponse":
+        digest = hashlib.blake2b(body.encode(), digest_size=12).hexdigest()
+        return cls(body=body, etag=f'"{digest}"')
+
+    def matches(self, if_none_match: str | None) -> bool:
+        """Whether a request's If-None-Match header names this body."""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+
+class ResponseCache:
+    """
+    Redis cache of serialized responses for one group of public endpoints.
+
+    - Keys are built from normalized query params plus a version number.
+      Bumping the version (one INCR) invalidates every entry at once; the old
+      entries are never read again and simply expire.
+    - Single-flight: on a miss only one caller computes. Callers in the same
+      process await its result; callers in other workers wait for the entry
+      that the holder of a short Redis lock writes.
+    - Redis errors are logged and treated as a miss; pages are then computed
+      every time, as if there were no cache.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        namespace: str,
+        *,
+        ttl: int,
+        lock_ttl: int,
+        lock_wait: float,
+        enabled: bool = True,
+    ):
+        self.redis = redis
+        self.namespace = namespace
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self.enabled = enabled
+        self._inflight: dict[str, asyncio.Future] = {}
+
+        self.hits = metrics.counter(f"{namespace}_cache.hits")
+        self.misses = metrics.counter(f"{namespace}_cache.misses")
+        self.coalesced = metrics.counter(f"{namespace}_cache.coalesced")
+        self.invalidations = metrics.counter(f"{namespace}_cache.invalidations")
+
+    @property
+    def _version_key(self) -> str:
+        return f"{self.namespace}:version"
+
+    def _key(self, version: str, params: dict) -> str:
+        normalized = json.dumps(params, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+        return f"{self.namespace}:v{version}:{digest}"
+
+    async def get_or_compute(
+        self, params: dict, compute: Callable[[], Awaitable[str]]
+    ) -> CachedResponse:
+        """The cached response for params, computing it (once) on a miss."""
+        if not self.enabled:
+            return CachedResponse.build(await compute())
+
+        try:
+            version = await self.redis.get(self._version_key) or "0"
+            key = self._key(version, params)
+            cached = await self._read(key)
+        except (RedisError, OSError) as e:
+            logger.warning(f"Response cache ({self.namespace}): read failed: {e}")
+            return CachedResponse.build(await compute())
+
+        if cached is not None:
+            self.hits.inc()
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                response = await asyncio.shield(inflight)
+                self.coalesced.inc()
+                return response
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                # The computing request went away (client disconnected)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._fill(key, compute)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved, so unawaited failures are not logged
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _read(self, key: str) -> CachedResponse | None:
+        raw = await self.redis.get(key)
+        if raw is None:
+            return None
+        etag, _, body = raw.partition("\n")
+        return CachedResponse(body=body, etag=etag)
+
+    async def _fill(self, key: str, compute) -> CachedResponse:
+        """Compute under the cross-worker lock, or wait for whoever holds it."""
+        lock = f"{key}:lock"
+        try:
+            acquired = await self.redis.set(lock, "1", ex=self.lock_ttl, nx=True)
+            if not acquired:
+                cached = await self._wait_for(key)
+                if cached is not None:
+                    self.coalesced.inc()
+                    return cached
+        except (RedisError, OSError) as e:
+            logger.warning(f"Response cache ({self.namespace}): lock failed: {e}")
+            acquired = False
+
+        # Holder of the lock, or the holder took too long
+        self.misses.inc()
+        try:
+            response = CachedResponse.build(await compute())
+            await self._write(key, response)
+        finally:
+            if acquired:
+                await self._release(lock)
+        return response
+
+    async def _write(self, key: str, response: CachedResponse) -> None:
+        try:
+            await self.redis.set(key, f"{response.etag}\n{response.body}", ex=self.ttl)
+        except (RedisError, OSError) as e:
+            logger.warning(f"Response cache ({self.namespace}): write failed: {e}")
+
+    async def _release(self, lock: str) -> None:
+        try:
+            await self.redis.delete(lock)
+        except (RedisError, OSError) as e:
+            logger.warning(f"Response cache ({self.namespace}): unlock failed: {e}")
+
+    async def _wait_for(self, key: str) -> CachedResponse | None:
+        deadline = time.monotonic() + self.lock_wait
+        delay = 0.01
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            cached = await self._read(key)
+            if cached is not None:
+                return cached
+            delay = min(delay * 2, 0.1)
+        return None
+
+    async def invalidate(self, redis: Redis | None = None) -> None:
+        """
+        Retire every entry by moving to a new version. Workers pass the
+        Redis client of their own event loop: the API's is bound to the
+        API's loop.
+        """
+        self.invalidations.inc()
+        try:
+            await (redis or self.redis).incr(self._version_key)
+        except (RedisError, OSError) as e:
+            logger.error(f"Response cache ({self.namespace}): bump failed: {e}")
+
+    async def invalidate_on_commit(self, session: AsyncSession) -> None:
+        """
+        Invalidate for a change made in session's open transaction.
+
+        Bumps now, so nobody is served the old data from the cache, and again
+        once the transaction commits: a reader that recomputed between the two
+        saw the uncommitted-yet state of the database and cached the old data.
+
+        Uses the session's Redis client (info["redis"], set by
+        worker_resources) if it has one.
+        """
+        info = session.sync_session.info
+        redis = info.get("redis")
+        await self.invalidate(redis)
+        info.setdefault("response_caches", {})[self] = redis
+
+    def clear(self) -> None:
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits.value + self.misses.value + self.coalesced.value
+        served = self.hits.value + self.coalesced.value
+        return {
+            "hits": self.hits.value,
+            "misses": self.misses.value,
+            "coalesced": self.coalesced.value,
+            "invalidations": self.invalidations.value,
+            "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Bumps scheduled by commit hooks, referenced until done
+_pending: set[asyncio.Task] = set()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    caches = session.info.pop("response_caches", None)
+    if not caches:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:  # a sync session; AsyncSession always runs in a loop
+        return
+    for cache, redis in caches.items():
+        # Commit hooks cannot await; the bump is one round trip
+        task = loop.create_task(cache.invalidate(redis))
+        _pending.add(task)
+        task.add_done_callback(_pending.discard)
+
+
+async def settle_invalidations() -> None:
+    """
+    Wait for the bumps scheduled by commits on this event loop. Workers
+    call it before closing their Redis client and loop, which would
+    otherwise cancel them.
+    """
+    loop = asyncio.get_running_loop()
+    pending = [task for task in _pending if task.get_loop() is loop]
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session: Session) -> None:
+    session.info.pop("response_caches", None)
+
+
+storefront_cache = ResponseCache(
+    redis_client,
+    "storefront",
+    ttl=settings.storefront_cache_ttl,
+    lock_ttl=settings.storefront_cache_lock_ttl,
+    lock_wait=settings.storefront_cache_lock_wait,
+    enabled=settings.storefront_cache_enabled,
+)
@@ -0,0 +1,108 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Hashable
+
+WORD = re.compile(r"\w+")
+
+# Match quality of one query token against one indexed word
+EXACT, PREFIX, TYPO = 1.0, 0.8, 0.6
+# Extra score when the word is in the product name rather than elsewhere
+NAME_BONUS = 0.5
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased words, as both search backends split queries."""
+    return WORD.findall(text.lower())
+
+
+def trigrams(word: str) -> set[str]:
+    """Trigrams of a word padded like pg_trgm does (two spaces before, one after)."""
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: str, b: str) -> float:
+    """Share of trigrams two words have in common (pg_trgm similarity)."""
+    ta, tb = trigrams(a), trigrams(b)
+    return len(ta & tb) / len(ta | tb)
+
+
+class LocalSearchIndex:
+    """
+    In-process inverted index for databases without tsvector/pg_trgm
+    (SQLite in tests). It searches like the Postgres backend: every query
+    token must match a word of the document exactly or as a prefix, with
+    name matches ranked first; only if nothing matches are words within
+    typo distance accepted too.
+    """
+
+    def __init__(self, typo_threshold: float):
+        self.typo_threshold = typo_threshold
+        self._names: dict[Hashable, str] = {}
+        self._name_words: dict[Hashable, set[str]] = {}
+        self._postings: dict[str, set[Hashable]] = defaultdict(set)
+        self._by_trigram: dict[str, set[str]] = defaultdict(set)
+        self._vocabulary: list[str] | None = None  # sorted lazily
+
+    def add(self, key: Hashable, name: str, text: str) -> None:
+        self._names[key] = name
+        self._name_words[key] = set(tokenize(name))
+        for word in set(tokenize(name)) | set(tokenize(text)):
+            if word not in self._postings:
+                for trigram in trigrams(word):
+                    self._by_trigram[trigram].add(word)
+            self._postings[word].add(key)
+        self._vocabulary = None
+
+    def _expand(self, token: str, typos: bool) -> dict[str, float]:
+        """Indexed words matching a query token, with their match quality."""
+        matches = {token: EXACT} if token in self._postings else {}
+
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        vocabulary = self._vocabulary
+
+        i = bisect_left(vocabulary, token)
+        while i < len(vocabulary) and vocabulary[i].startswith(token):
+            matches.setdefault(vocabulary[i], PREFIX)
+            i += 1
+
+        if not typos:
+            return matches
+
+        candidates = set().union(*(self._by_trigram[t] for t in trigrams(token)))
+        for word in candidates - matches.keys():
+            score = similarity(token, word)
+            if score >= self.typo_threshold:
+                matches[word] = TYPO * score
+        return matches
+
+    def search(self, query: str) -> list[Hashable]:
+        """Keys of all matching documents, best first (ties by name)."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        return self._search(tokens, typos=False) or self._search(tokens, typos=True)
+
+    def _search(self, tokens: list[str], typos: bool) -> list[Hashable]:
+        scores: dict[Hashable, float] | None = None
+        for token in tokens:
+            token_scores: dict[Hashable, float] = {}
+            for word, quality in self._expand(token, typos).items():
+                for key in self._postings[word]:
+                    score = quality + (
+                        NAME_BONUS if word in self._name_words[key] else 0.0
+                    )
+                    token_scores[key] = max(token_scores.get(key, 0.0), score)
+
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    key: scores[key] + score
+                    for key, score in token_scores.items()
+                    if key in scores
+                }
+
+        return sorted(scores, key=lambda key: (-scores[key], self._names[key]))
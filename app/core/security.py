@@ -2,10 +2,10 @@ import logging
 from datetime import datetime, timedelta, timezone
 
 import bcrypt
-import jwt
 
 from app.core.config import settings
 from app.core.exceptions import PasswordVerificationError
+from app.core.jwt_keys import jwt_keyring
 
 # Initialize logger for tracking token generation events
 logger = logging.getLogger(__name__)
@@ -14,7 +14,28 @@ logger = logging.getLogger(__name__)
 # JWT
 
 
-def create_access_token(user) -> str:
+def _identity(user) -> dict:
+    """
+    Identity claims of a token. user is a User, or the verified claims of a
+    refresh token: rotation re-issues them without a DB read.
+    """
+    if isinstance(user, dict):
+        return {
+            "sub": user["sub"],
+            "email": user["email"],
+            "role": user["role"],
+            "lic": user.get("lic", False),
+        }
+    # Ensure user.id is a string as UUID objects aren't JSON serializable by default
+    return {
+        "sub": str(user.id),
+        "email": str(user.email),
+        "role": user.role.value,
+        "lic": bool(user.license_verified),
+    }
+
+
+def create_access_token(user, *, version: int = 0) -> str:
     """
     Generates a short-lived JWT Access Token.
 
@@ -23,6 +44,8 @@ def create_access_token(user) -> str:
     - type: The type which is access token
     - email: Included for quick frontend display without a DB lookup
     - role: The role of the user
+    - lic: Whether the user's license was verified (pharmacists)
+    - ver: The user's token version at issue, see app/core/token_versions.py
     - exp: Expiration timestamp (Default: 20 minutes)
     """
 
@@ -31,25 +54,26 @@ def create_access_token(user) -> str:
         minutes=settings.access_token_expire_minutes
     )
 
-    # Ensure user.id is a string as UUID objects aren't JSON serializable by default
     payload = {
-        "sub": str(user.id),
+        **_identity(user),
         "type": "access",
-        "email": str(user.email),
-        "role": user.role.value,
+        "ver": version,
         "iat": now,
         "exp": expire,
     }
 
-    token = jwt.encode(payload, settings.secret_key, algorithm=settings.jwt_algorithm)
-    logger.debug(f"JWT: Access token created for user {user.id}")
+    token = jwt_keyring.encode(payload)
+    logger.debug(f"JWT: Access token created for user {payload['sub']}")
     return token
 
 
-def create_refresh_token(user) -> str:
+def create_refresh_token(user, *, family: str, jti: str) -> str:
     """
     Generates a long-lived JWT Refresh Token.
     Used to obtain a new access token without re-entering credentials.
+
+    - fam: The token family (one per login), see app/core/refresh_tokens.py
+    - jti: This token's id; only the family's latest one may be used
     """
 
     now = datetime.now(timezone.utc)
@@ -59,16 +83,16 @@ def create_refresh_token(user) -> str:
 
     # We add a 'type' claim to prevent refresh tokens from being used as access tokens
     payload = {
-        "sub": str(user.id),
+        **_identity(user),
         "type": "refresh",
-        "email": str(user.email),
-        "role": user.role.value,
+        "fam": family,
+        "jti": jti,
         "iat": now,
         "exp": expire,
     }
 
-    token = jwt.encode(payload, settings.secret_key, algorithm=settings.jwt_algorithm)
-    logger.debug(f"JWT: Refresh token created for user {user.id}")
+    token = jwt_keyring.encode(payload)
+    logger.debug(f"JWT: Refresh token created for user {payload['sub']}")
     return token
 
 
@@ -77,20 +101,27 @@ def create_refresh_token(user) -> str:
 MAX_BYTE_LENGTH = 72
 
 
-def hash_password(password: str) -> str:
-    """Hashes a plain-text password using native Bcrypt."""
+def hash_password(password: str, rounds: int | None = None) -> str:
+    """
+    Hashes a plain-text password using native Bcrypt (blocking: from async
+    code, use password_hasher.hash).
+    """
 
     # Ensure UTF-8 byte length check (some emojis/chars are > 1 byte)
     if len(password.encode("utf-8")) > MAX_BYTE_LENGTH:
         logger.warning("Password hashing failed: Input exceeds 72-byte limit.")
         raise PasswordVerificationError("Password too long")
 
+    salt = bcrypt.gensalt(rounds=rounds or settings.bcrypt_rounds)
     # hashpw returns bytes, so we decode to utf-8 string for DB storage
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifies a plain-text password against a stored hash."""
+    """
+    Verifies a plain-text password against a stored hash (blocking: from
+    async code, use password_hasher.verify).
+    """
     try:
         return bcrypt.checkpw(
             plain_password.encode("utf-8"), hashed_password.encode("utf-8")
@@ -98,3 +129,12 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except Exception:
         logger.error("Password verification failed due to internal error")
         return False
+
+
+def password_needs_rehash(hashed_password: str, rounds: int | None = None) -> bool:
+    """True if the hash was made with another cost factor ("$2b$12$...")."""
+    try:
+        cost = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return False  # not a bcrypt hash (e.g. a deactivated account)
+    return cost != (rounds or settings.bcrypt_rounds)
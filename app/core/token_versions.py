@@ -0,0 +1,50 @@
+import uuid
+
+from redis.asyncio import Redis
+
+from app.core.metrics import metrics
+from app.core.redis import redis_client
+
+
+class TokenVersions:
+    """
+    Per-user access token version, kept in Redis (absent means 0).
+
+    Access tokens carry the version current when they were issued ("ver").
+    The claims-only RBAC dependencies (get_token_principal and friends)
+    refuse a token whose version is no longer current, so bumping the
+    version revokes every access token of a user at once. It is bumped by
+    RefreshTokenStore.revoke_user, together with the refresh tokens.
+
+    Only users whose tokens were ever revoked have a key. Redis errors are
+    raised: callers fall back to the principal cache / users table.
+    """
+
+    KEY_PREFIX = "token_version"
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+        self.checks = metrics.counter("token_versions.checks")
+        self.refused = metrics.counter("token_versions.refused")
+        self.fallbacks = metrics.counter("token_versions.fallbacks")
+
+    def key(self, user_id: uuid.UUID | str) -> str:
+        return f"{self.KEY_PREFIX}:{user_id}"
+
+    async def current(self, user_id: uuid.UUID | str) -> int:
+        raw = await self.redis.get(self.key(user_id))
+        return int(raw) if raw else 0
+
+    async def bump(self, user_id: uuid.UUID | str) -> int:
+        return int(await self.redis.incr(self.key(user_id)))
+
+    def stats(self) -> dict:
+        return {
+            "checks": self.checks.value,
+            "refused": self.refused.value,
+            "fallbacks": self.fallbacks.value,
+        }
+
+
+token_versions = TokenVersions(redis_client)
@@ -1,25 +1,188 @@
 import json
-from typing import Dict, List
+import time
+from typing import Dict, List, Tuple
 from uuid import UUID
 
 from redis.asyncio import Redis
-from sqlalchemy import delete, select
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.redis import redis_client
 from app.models.cart import CartItem
 
+# Cart layout v2: one HASH per cart at cart:{user_id},
+# field = product_id, value = quantity.
+#
+# Every access is a single Lua script that applies the change, refreshes
+# the TTL and replies with [status, cart] so the caller gets the resulting
+# cart in the same round trip. The cart is HGETALL encoded by cjson: one bulk
+# string is far cheaper to parse client-side than a RESP array per field.
+# Negative statuses are the CartCRUD.* codes below; v1 JSON carts are
+# migrated on first access.
+#
+# Write-behind: mutations also add the user to the dirty ZSET (score = first
+# time it became dirty). The cart sync worker moves users to the in-flight
+# ZSET while it writes them to cart_items. While a user is in either set,
+# Redis is authoritative and an empty cart is NOT re-hydrated from the DB.
+#
+# KEYS = [cart, dirty, inflight]; the user id is always the last ARGV.
+
+_CART_KIND = """
+local kind = redis.call('TYPE', KEYS[1])['ok']
+if kind == 'string' then return {-2} end
+"""
+
+_MARK_DIRTY = """
+local function mark_dirty()
+    local now = redis.call('TIME')
+    redis.call('ZADD', KEYS[2], 'NX', now[1] + now[2] / 1000000, ARGV[#ARGV])
+end
+"""
+
+READ_CART_SCRIPT = redis_client.register_script(
+    _CART_KIND
+    + """
+if kind == 'none'
+    and not redis.call('ZSCORE', KEYS[2], ARGV[1])
+    and not redis.call('ZSCORE', KEYS[3], ARGV[1]) then
+    return {-1}
+end
+return {0, cjson.encode(redis.call('HGETALL', KEYS[1]))}
+"""
+)
+
+ADD_ITEM_SCRIPT = redis_client.register_script(
+    _CART_KIND
+    + _MARK_DIRTY
+    + """
+if kind == 'none' and ARGV[5] == '0' then return {-1} end
+local target = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0') + tonumber(ARGV[2])
+local cap = tonumber(ARGV[3])
+if cap >= 0 and target > cap then return {-3} end
+redis.call('HSET', KEYS[1], ARGV[1], target)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+mark_dirty()
+return {target, cjson.encode(redis.call('HGETALL', KEYS[1]))}
+"""
+)
+
+SET_ITEM_SCRIPT = redis_client.register_script(
+    _CART_KIND
+    + _MARK_DIRTY
+    + """
+if kind == 'none' then return {-1} end
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then return {-4} end
+local quantity = tonumber(ARGV[2])
+if quantity > 0 then
+    redis.call('HSET', KEYS[1], ARGV[1], quantity)
+else
+    redis.call('HDEL', KEYS[1], ARGV[1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+mark_dirty()
+return {quantity, cjson.encode(redis.call('HGETALL', KEYS[1]))}
+"""
+)
+
+REMOVE_ITEM_SCRIPT = redis_client.register_script(
+    _CART_KIND
+    + _MARK_DIRTY
+    + """
+if kind == 'none' then return {-1} end
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+mark_dirty()
+return {0, cjson.encode(redis.call('HGETALL', KEYS[1]))}
+"""
+)
+
+CLEAR_CART_SCRIPT = redis_client.register_script(
+    _MARK_DIRTY
+    + """
+redis.call('DEL', KEYS[1])
+mark_dirty()
+return 1
+"""
+)
+
+REPLACE_CART_SCRIPT = redis_client.register_script(
+    """
+redis.call('DEL', KEYS[1])
+if #ARGV > 1 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+    if tonumber(ARGV[1]) > 0 then redis.call('EXPIRE', KEYS[1], ARGV[1]) end
+end
+return 1
+"""
+)
+
+# Move the oldest dirty users to the in-flight set and return them with the
+# time they became dirty. Claims left in flight by a crashed worker for more
+# than ARGV[2] seconds are put back first.
+CLAIM_DIRTY_SCRIPT = redis_client.register_script(
+    """
+local t = redis.call('TIME')
+local now = t[1] + t[2] / 1000000
+local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now - tonumber(ARGV[2]))
+for _, user_id in ipairs(stale) do
+    redis.call('ZREM', KEYS[2], user_id)
+    redis.call('ZADD', KEYS[1], 'NX', now, user_id)
+end
+local claimed = redis.call('ZRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1, 'WITHSCORES')
+for i = 1, #claimed, 2 do
+    redis.call('ZREM', KEYS[1], claimed[i])
+    redis.call('ZADD', KEYS[2], now, claimed[i])
+end
+return claimed
+"""
+)
+
 
 class CartCRUD:
+    # Script statuses
+    MISSING = -1  # no cart in Redis (hydrate from DB, then retry)
+    LEGACY = -2  # v1 JSON payload under the key
+    OVER_CAP = -3  # the new quantity would exceed the cap
+    NOT_IN_CART = -4
+
+    CART_TTL = 1209600  # 14 days
+
+    DIRTY_KEY = "cart_sync:dirty"
+    INFLIGHT_KEY = "cart_sync:inflight"
+
+    # Rows per INSERT statement (asyncpg allows 32767 bind parameters)
+    UPSERT_CHUNK = 1000
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
     def _key(self, user_id: UUID) -> str:
         return f"cart:{user_id}"
 
+    @staticmethod
+    def _to_items(flat: list) -> List[Dict]:
+        return [
+            {"product_id": str(flat[i]), "quantity": int(flat[i + 1])}
+            for i in range(0, len(flat), 2)
+        ]
+
     # REDIS OPERATIONS
-    async def get_redis_items(self, redis: Redis, user_id: UUID) -> List[Dict]:
+    async def get_redis_items(self, redis: Redis, user_id: UUID) -> List[Dict] | None:
+        """
+        The cart held in Redis, or None when Redis has no cart and no pending
+        write-behind for the user (the caller may then fall back to the DB).
+        """
+        result, items = await self._run(READ_CART_SCRIPT, redis, user_id, [])
+        return None if result == self.MISSING else items
 
-        data = await redis.get(self._key(user_id))
+    async def _migrate_v1(self, redis: Redis, user_id: UUID) -> List[Dict]:
+        """
+        Rewrite a v1 JSON cart as a v2 hash, keeping its TTL. A v1 key without
+        one gets the cart TTL, like carts written by the v2 scripts.
+        """
+        key = self._key(user_id)
+        data = await redis.get(key)
 
         if not data:
             return []
@@ -30,7 +193,7 @@ class CartCRUD:
         try:
             payload = json.loads(data)
         except json.JSONDecodeError:
-            await redis.delete(self._key(user_id))
+            await redis.delete(key)
             return []
 
         if isinstance(payload, dict):
@@ -40,14 +203,17 @@ class CartCRUD:
             items = payload
 
         else:
-            await redis.delete(self._key(user_id))
+            await redis.delete(key)
             return []
 
         if not isinstance(items, list):
-            await redis.delete(self._key(user_id))
+            await redis.delete(key)
             return []
 
-        return items
+        ttl = await redis.ttl(key)
+        return await self.set_redis_items(
+            redis, user_id, items, ttl if ttl > 0 else self.CART_TTL
+        )
 
     async def set_redis_items(
         self,
@@ -55,16 +221,128 @@ class CartCRUD:
         user_id: UUID,
         items: List[Dict],
         ttl: int,
-    ):
-        payload = {
-            "v": 1,
-            "items": items,
-        }
+    ) -> List[Dict]:
+        """Replace the whole cart (used to hydrate Redis from the DB)."""
+        quantities: Dict[str, int] = {}
+        for item in items:
+            product_id = str(item["product_id"])
+            quantities[product_id] = quantities.get(product_id, 0) + int(
+                item["quantity"]
+            )
+
+        args = [ttl]
+        for product_id, quantity in quantities.items():
+            if quantity > 0:
+                args.extend((product_id, quantity))
+
+        await REPLACE_CART_SCRIPT(keys=[self._key(user_id)], args=args, client=redis)
+        return self._to_items(args[1:])
+
+    async def _run(
+        self, script, redis: Redis, user_id: UUID, args: list
+    ) -> Tuple[int, List[Dict]]:
+        keys = [self._key(user_id), self.DIRTY_KEY, self.INFLIGHT_KEY]
+        args = [*args, str(user_id)]
+        reply = await script(keys=keys, args=args, client=redis)
+
+        if int(reply[0]) == self.LEGACY:
+            await self._migrate_v1(redis, user_id)
+            reply = await script(keys=keys, args=args, client=redis)
+
+        # cjson encodes an empty HGETALL as {}, which is just as empty
+        flat = json.loads(reply[1]) if len(reply) > 1 else []
+        return int(reply[0]), self._to_items(flat)
+
+    async def add_quantity(
+        self,
+        redis: Redis,
+        user_id: UUID,
+        product_id: UUID,
+        quantity: int,
+        *,
+        cap: int,
+        ttl: int,
+        create: bool = False,
+    ) -> Tuple[int, List[Dict]]:
+        """
+        Atomically add to a line unless the new total would exceed `cap`
+        (pass -1 for no cap). Returns (new quantity or status, cart items).
+        Without `create`, a cart missing from Redis returns MISSING.
+        """
+        return await self._run(
+            ADD_ITEM_SCRIPT,
+            redis,
+            user_id,
+            [str(product_id), quantity, cap, ttl, int(create)],
+        )
 
-        await redis.set(self._key(user_id), json.dumps(payload), ex=ttl)
+    async def set_quantity(
+        self,
+        redis: Redis,
+        user_id: UUID,
+        product_id: UUID,
+        quantity: int,
+        *,
+        ttl: int,
+    ) -> Tuple[int, List[Dict]]:
+        """Set an existing line; quantity 0 removes it."""
+        return await self._run(
+            SET_ITEM_SCRIPT, redis, user_id, [str(product_id), quantity, ttl]
+        )
+
+    async def remove_product(
+        self, redis: Redis, user_id: UUID, product_id: UUID, *, ttl: int
+    ) -> Tuple[int, List[Dict]]:
+        return await self._run(
+            REMOVE_ITEM_SCRIPT, redis, user_id, [str(product_id), ttl]
+        )
 
-    async def delete_redis_cart(self, redis: Redis, user_id: UUID):
-        await redis.delete(self._key(user_id))
+    async def clear_redis_cart(self, redis: Redis, user_id: UUID):
+        """Delete the cart; the sync worker then deletes its DB rows."""
+        await CLEAR_CART_SCRIPT(
+            keys=[self._key(user_id), self.DIRTY_KEY],
+            args=[str(user_id)],
+            client=redis,
+        )
+
+    # WRITE-BEHIND BOOKKEEPING
+    async def claim_dirty(
+        self, redis: Redis, *, limit: int, stale_after: int
+    ) -> List[Tuple[UUID, float]]:
+        """Claim up to `limit` dirty carts, oldest first, with their dirty time."""
+        reply = await CLAIM_DIRTY_SCRIPT(
+            keys=[self.DIRTY_KEY, self.INFLIGHT_KEY],
+            args=[limit, stale_after],
+            client=redis,
+        )
+        return [
+            (UUID(str(reply[i])), float(reply[i + 1])) for i in range(0, len(reply), 2)
+        ]
+
+    async def complete_dirty(self, redis: Redis, user_ids: List[UUID]):
+        if user_ids:
+            await redis.zrem(self.INFLIGHT_KEY, *(str(u) for u in user_ids))
+
+    async def requeue_dirty(self, redis: Redis, claimed: List[Tuple[UUID, float]]):
+        """Return failed claims to the dirty set, keeping their original age."""
+        if not claimed:
+            return
+        await redis.zadd(
+            self.DIRTY_KEY, {str(u): score for u, score in claimed}, lt=True
+        )
+        await self.complete_dirty(redis, [u for u, _ in claimed])
+
+    async def dirty_backlog(self, redis: Redis) -> dict:
+        pending = await redis.zcard(self.DIRTY_KEY)
+        in_flight = await redis.zcard(self.INFLIGHT_KEY)
+        oldest = await redis.zrange(self.DIRTY_KEY, 0, 0, withscores=True)
+        return {
+            "pending": pending,
+            "in_flight": in_flight,
+            "oldest_age_seconds": (
+                round(max(0.0, time.time() - oldest[0][1]), 3) if oldest else 0.0
+            ),
+        }
 
     # DATABASE OPERATIONS
     async def get_db_items(
@@ -81,3 +359,48 @@ class CartCRUD:
         user_id: UUID,
     ):
         await self.session.execute(delete(CartItem).where(CartItem.user_id == user_id))
+
+    async def upsert_db_carts(self, carts: Dict[UUID, List[Dict]]) -> int:
+        """
+        Make cart_items match the given carts for many users at once:
+        one INSERT ... ON CONFLICT (user_id, product_id) DO UPDATE per chunk
+        (uq_user_product_cart), then one DELETE of lines no longer in a cart.
+        Unchanged lines are not rewritten. Returns rows inserted/updated/deleted.
+        Does NOT commit.
+        """
+        if not carts:
+            return 0
+
+        rows = [
+            {
+                "user_id": user_id,
+                "product_id": UUID(str(item["product_id"])),
+                "quantity": item["quantity"],
+                "price_at_add": 0,
+            }
+            for user_id, items in carts.items()
+            for item in items
+        ]
+
+        dialect = self.session.bind.dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+        written = 0
+        for start in range(0, len(rows), self.UPSERT_CHUNK):
+            stmt = insert(CartItem).values(rows[start : start + self.UPSERT_CHUNK])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[CartItem.user_id, CartItem.product_id],
+                set_={"quantity": stmt.excluded.quantity},
+                where=CartItem.quantity != stmt.excluded.quantity,
+            )
+            written += (await self.session.execute(stmt)).rowcount
+
+        kept = [(row["user_id"], row["product_id"]) for row in rows]
+        stale = delete(CartItem).where(CartItem.user_id.in_(carts.keys()))
+        if kept:
+            stale = stale.where(
+                tuple_(CartItem.user_id, CartItem.product_id).not_in(kept)
+            )
+        written += (await self.session.execute(stale)).rowcount
+
+        return written
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.enums import OutboxStatus
+from app.models.notification_outbox import NotificationOutbox
+
+
+class NotificationOutboxCRUD:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def enqueue(self, dedup_key: str, payload: dict) -> bool:
+        """
+        Add a notification to the outbox; a key that is already there is
+        left alone, so retried requests and redelivered webhooks notify once.
+
+        Does NOT commit: the row belongs to the caller's transaction and is
+        only sent if that transaction commits. Returns whether it was added.
+        """
+        dialect = self.session.bind.dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        now = datetime.now(timezone.utc)
+
+        stmt = (
+            insert(NotificationOutbox)
+            .values(
+                dedup_key=dedup_key,
+                payload=payload,
+                status=OutboxStatus.PENDING,
+                attempts=0,
+                next_attempt_at=now,
+                created_at=now,
+            )
+            .on_conflict_do_nothing(index_elements=["dedup_key"])
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount > 0
+
+    async def claim_batch(
+        self, *, limit: int, lease_seconds: int, due_by: datetime | None = None
+    ) -> list[NotificationOutbox]:
+        """
+        Lease up to limit due rows to this worker, oldest first.
+
+        Rows locked by another worker's claim are skipped (SKIP LOCKED), and
+        claimed rows are pushed lease_seconds ahead, so concurrent workers
+        never take the same row; a worker that dies mid-send leaves its rows
+        to be picked up again when the lease runs out. Each claim counts as
+        an attempt. Only rows due by due_by (default: now) are claimed.
+        Does NOT commit; commit before sending.
+        """
+        now = datetime.now(timezone.utc)
+        due = (
+            select(NotificationOutbox.id)
+            .where(
+                NotificationOutbox.status == OutboxStatus.PENDING,
+                NotificationOutbox.next_attempt_at <= (due_by or now),
+            )
+            .order_by(NotificationOutbox.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        ids = (await self.session.execute(due)).scalars().all()
+        if not ids:
+            return []
+
+        result = await self.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(ids))
+            .values(
+                attempts=NotificationOutbox.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=lease_seconds),
+            )
+            .returning(NotificationOutbox)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars().all())
+
+    async def mark_sent(self, ids: list[UUID]) -> None:
+        if not ids:
+            return
+        await self.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(ids))
+            .values(
+                status=OutboxStatus.SENT,
+                sent_at=datetime.now(timezone.utc),
+                last_error=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def mark_delivered(
+        self, row: NotificationOutbox, channels: list[str]
+    ) -> None:
+        """Record channels that delivered, so retries skip them."""
+        delivered = row.delivered_channels + [
+            channel for channel in channels if channel not in row.delivered_channels
+        ]
+        await self.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == row.id)
+            .values(delivered_channels=delivered)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def mark_failed(
+        self, row: NotificationOutbox, *, error: str, max_attempts: int, retry_in: float
+    ) -> OutboxStatus:
+        """
+        Schedule another attempt in retry_in seconds, or dead-letter the row
+        once it has used max_attempts. Returns the row's new status.
+        """
+        values = {"last_error": error[:2000]}
+        if row.attempts >= max_attempts:
+            values["status"] = OutboxStatus.DEAD
+        else:
+            values["next_attempt_at"] = datetime.now(timezone.utc) + timedelta(
+                seconds=retry_in
+            )
+
+        await self.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == row.id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return values.get("status", OutboxStatus.PENDING)
+
+    async def purge_sent(self, older_than: timedelta) -> int:
+        """Delete sent rows older than older_than; dead rows are kept."""
+        result = await self.session.execute(
+            delete(NotificationOutbox).where(
+                NotificationOutbox.status == OutboxStatus.SENT,
+                NotificationOutbox.sent_at < datetime.now(timezone.utc) - older_than,
+            )
+        )
+        return result.rowcount
+
+    async def status_counts(self) -> dict[str, int]:
+        rows = await self.session.execute(
+            select(NotificationOutbox.status, func.count()).group_by(
+                NotificationOutbox.status
+            )
+        )
+        counts = {status.value: 0 for status in OutboxStatus}
+        counts.update({status.value: count for status, count in rows.all()})
+        return counts
@@ -1,9 +1,20 @@
+from collections import defaultdict, deque
+from typing import TYPE_CHECKING
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.crud.pagination import Keyset, Page
 from app.models.order import Order, OrderStatus
+from app.models.stock_allocation import StockAllocation
+
+if TYPE_CHECKING:
+    from app.crud.product import BatchAllocation
+
+# Served by ix_orders_customer_created_at
+_NEWEST_FIRST = Keyset(Order.created_at, Order.id, descending=True)
 
 
 class OrderCRUD:
@@ -13,13 +24,14 @@ class OrderCRUD:
     async def get_by_id(self, order_id: UUID) -> Order | None:
         return await self.session.get(Order, order_id)
 
-    async def get_customer_orders(self, customer_id: UUID):
-        result = await self.session.execute(
-            select(Order)
-            .where(Order.customer_id == customer_id)
-            .order_by(Order.created_at.desc())
+    async def get_customer_orders(
+        self, customer_id: UUID, *, cursor: str | None = None, limit: int = 20
+    ) -> Page[Order]:
+        """A customer's orders, newest first."""
+        stmt = select(Order).where(Order.customer_id == customer_id)
+        return await _NEWEST_FIRST.paginate(
+            self.session, stmt, cursor=cursor, limit=limit
         )
-        return result.scalars().all()
 
     async def get_active_order(self, customer_id: UUID) -> Order | None:
         result = await self.session.execute(
@@ -39,7 +51,68 @@ class OrderCRUD:
         )
         return result.scalar_one_or_none()
 
+    async def transition(
+        self, order: Order, status: OrderStatus, *, expected: OrderStatus
+    ) -> bool:
+        """
+        Set the order's status only if the database still has it at expected
+        (one conditional UPDATE), for writes made without the row lock:
+        a Stripe event processed in the meantime wins. Returns whether it
+        was set. Does NOT commit.
+        """
+        result = await self.session.execute(
+            update(Order)
+            .where(Order.id == order.id, Order.status == expected)
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            return False
+        set_committed_value(order, "status", status)
+        return True
+
     async def save(self, order: Order) -> None:
         self.session.add(order)
         await self.session.commit()
         await self.session.refresh(order)
+
+    def add_allocations(
+        self, order: Order, allocations: list["BatchAllocation"]
+    ) -> list[StockAllocation]:
+        """
+        Record which batches supplied each order line (needed for recalls).
+        Lines are filled in order from the FEFO allocations of their product;
+        the line's batch_id points at the first batch that supplied it.
+        """
+        pending: dict[UUID, deque[list]] = defaultdict(deque)
+        for allocation in allocations:
+            pending[allocation.product_id].append(
+                [allocation.batch_id, allocation.quantity]
+            )
+
+        records = []
+        for item in order.items:
+            remaining = item.quantity
+            queue = pending[item.product_id]
+
+            while remaining > 0 and queue:
+                batch_id, available = queue[0]
+                take = min(available, remaining)
+
+                if item.batch_id is None:
+                    item.batch_id = batch_id
+
+                records.append(
+                    StockAllocation(
+                        order_item_id=item.id, batch_id=batch_id, quantity=take
+                    )
+                )
+
+                remaining -= take
+                if take == available:
+                    queue.popleft()
+                else:
+                    queue[0][1] -= take
+
+        self.session.add_all(records)
+        return records
@@ -0,0 +1,128 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Generic, TypeVar
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Page(Generic[T]):
+    """One page of results; next_cursor is None on the last page."""
+
+    items: list[T]
+    next_cursor: str | None
+
+
+def encode_cursor(payload: Any) -> str:
+    """Opaque, URL-safe token for a JSON-serializable payload."""
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+    )
+
+
+def decode_cursor(cursor: str) -> Any:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise _invalid_cursor()
+
+
+class Keyset:
+    """
+    Seek pagination over a unique sort key, e.g. (name, id) or
+    (created_at, id). Instead of OFFSET, the next page starts right after
+    the last row of the previous one:
+
+        WHERE (name, id) > (:last_name, :last_id) ORDER BY name, id LIMIT n
+
+    which an index on the same columns answers without reading the skipped
+    rows, however deep the page. The last key travels in the opaque cursor.
+    """
+
+    def __init__(self, *columns, descending: bool = False):
+        self.columns = columns
+        self.descending = descending
+
+    def _parse(self, value, column):
+        python_type = column.type.python_type
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is UUID:
+            return UUID(value)
+        return python_type(value)
+
+    def _decode(self, cursor: str) -> tuple:
+        values = decode_cursor(cursor)
+        if not isinstance(values, list) or len(values) != len(self.columns):
+            raise _invalid_cursor()
+        try:
+            return tuple(
+                self._parse(value, column)
+                for value, column in zip(values, self.columns)
+            )
+        except (TypeError, ValueError):
+            raise _invalid_cursor()
+
+    def _key(self, row) -> str:
+        return encode_cursor([getattr(row, column.key) for column in self.columns])
+
+    async def paginate(
+        self,
+        session: AsyncSession,
+        stmt: Select,
+        *,
+        cursor: str | None,
+        limit: int,
+    ) -> Page:
+        """Run stmt (a select of one entity) for the page after cursor."""
+        key = tuple_(*self.columns)
+        if cursor:
+            last = tuple_(*self._decode(cursor))
+            stmt = stmt.where(key < last if self.descending else key > last)
+
+        order = [c.desc() if self.descending else c.asc() for c in self.columns]
+        # One extra row tells whether there is a next page
+        stmt = stmt.order_by(*order).limit(limit + 1)
+
+        rows = (await session.execute(stmt)).scalars().all()
+        if len(rows) <= limit:
+            return Page(items=list(rows), next_cursor=None)
+        return Page(items=list(rows[:limit]), next_cursor=self._key(rows[limit - 1]))
+
+
+def decode_offset(cursor: str | None) -> int:
+    """
+    Position for results that have no indexable order (relevance-ranked
+    search); such cursors carry an offset rather than a key.
+    """
+    if not cursor:
+        return 0
+    payload = decode_cursor(cursor)
+    offset = payload.get("offset") if isinstance(payload, dict) else None
+    if not isinstance(offset, int) or offset < 0:
+        raise _invalid_cursor()
+    return offset
+
+
+def offset_page(rows: list[T], *, offset: int, limit: int) -> Page[T]:
+    """Page from limit + 1 rows fetched at offset."""
+    if len(rows) <= limit:
+        return Page(items=list(rows), next_cursor=None)
+    return Page(
+        items=list(rows[:limit]), next_cursor=encode_cursor({"offset": offset + limit})
+    )
@@ -1,21 +1,144 @@
 import logging
 import re
-from datetime import datetime, timezone
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Iterable
 from uuid import UUID
 
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import (
+    String,
+    bindparam,
+    case,
+    cast,
+    func,
+    literal_column,
+    select,
+    update,
+)
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from starlette import status
 
+from app.core.exceptions import InsufficientStockError
+from app.core.hot_stock import hot_stock
+from app.crud.pagination import Keyset, Page
+from app.crud.storefront import CRUDStorefront
 from app.models.inventory import InventoryBatch
 from app.models.product import Product
 from app.schemas.product import BatchCreate, ProductCreate
 
 logger = logging.getLogger(__name__)
 
+# Served by ix_products_name_id
+_BY_NAME = Keyset(Product.name, Product.id)
+
+# First key of the per-product allocation locks (see lock_allocation)
+ALLOCATION_LOCK = 4110
+
+
+@dataclass(frozen=True)
+class BatchAllocation:
+    """Units of a product taken from one batch by a stock deduction."""
+
+    product_id: UUID
+    batch_id: UUID
+    quantity: int
+
+
+@dataclass(frozen=True)
+class SellableStock:
+    """Sellable stock of one product, summed over its sellable batches."""
+
+    product_id: UUID
+    name: str
+    prescription_required: bool
+    available: int
+    # Price of the batch that sells next (FEFO); None when nothing is sellable
+    unit_price: Decimal | None
+
+
+@dataclass(frozen=True)
+class ExpiringBatch:
+    """A sellable batch close to its expiry date (expiry sweeper)."""
+
+    batch_id: UUID
+    batch_number: str
+    product_id: UUID
+    product_name: str
+    expiry_date: datetime
+    quantity: int
+
+
+def fefo_allocation(
+    requested: dict[UUID, int],
+    now: datetime,
+    *,
+    lock: bool = False,
+    skip_locked: bool = False,
+):
+    """
+    CTE (id, product_id, take) spreading each requested quantity over the
+    product's sellable batches, earliest expiry first, taking at most the
+    free (unreserved) units of each batch. A product may get less than
+    requested when it runs out; callers compare.
+
+    lock=True locks the batches FOR UPDATE.
+    """
+    batches = (
+        select(
+            InventoryBatch.id,
+            InventoryBatch.product_id,
+            InventoryBatch.free_quantity(now).label("free_quantity"),
+            InventoryBatch.expiry_date,
+        )
+        .where(
+            InventoryBatch.product_id.in_(requested.keys()),
+            *InventoryBatch.sellable(now),
+        )
+        .order_by(
+            InventoryBatch.product_id,
+            InventoryBatch.expiry_date,
+            InventoryBatch.id,
+        )
+    )
+    if lock:
+        batches = batches.with_for_update(skip_locked=skip_locked)
+    batches = batches.cte("batches")
+
+    # Units of the same product already covered by earlier-expiring batches
+    covered_before = (
+        func.sum(batches.c.free_quantity).over(
+            partition_by=batches.c.product_id,
+            order_by=(batches.c.expiry_date, batches.c.id),
+        )
+        - batches.c.free_quantity
+    )
+    running = select(
+        batches.c.id,
+        batches.c.product_id,
+        batches.c.free_quantity,
+        covered_before.label("covered_before"),
+    ).cte("running")
+
+    wanted = case(requested, value=running.c.product_id)
+    missing = wanted - running.c.covered_before
+    return (
+        select(
+            running.c.id,
+            running.c.product_id,
+            case(
+                (running.c.free_quantity < missing, running.c.free_quantity),
+                else_=missing,
+            ).label("take"),
+        )
+        .where(running.c.covered_before < wanted)
+        .cte("alloc")
+    )
+
 
 class CRUDProduct:
 
@@ -26,6 +149,13 @@ class CRUDProduct:
         # Simple slugifier: Lowercase, replace spaces/special chars with hyphens
         return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
 
+    async def catalog_changed(self, product_ids: Iterable[UUID]) -> None:
+        """
+        Bring everything derived from the catalog up to date for these
+        products. Call it in the same transaction as the change, before commit.
+        """
+        await CRUDStorefront(self.session).refresh(product_ids)
+
     async def get(self, id: UUID) -> Product | None:
         """Fetch a product by ID."""
         return await self.session.get(Product, id)
@@ -40,6 +170,8 @@ class CRUDProduct:
         self.session.add(db_obj)
 
         try:
+            await self.session.flush()
+            await self.catalog_changed([db_obj.id])
             await self.session.commit()
 
         except IntegrityError as e:
@@ -59,37 +191,25 @@ class CRUDProduct:
         return db_obj
 
     async def get_multi_product(
-        self, *, skip: int = 0, limit: int = 20, active: bool | None
-    ) -> list[Product]:
+        self, *, cursor: str | None = None, limit: int = 20, active: bool | None
+    ) -> Page[Product]:
         """Fetch all active products and their associated inventory batches."""
         stmt = (
             select(Product)
             .options(selectinload(Product.batches))
             .where(Product.is_active == active)
-            .offset(skip)
-            .limit(limit)
-            .order_by(Product.name.asc())
         )
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
+        return await _BY_NAME.paginate(self.session, stmt, cursor=cursor, limit=limit)
 
     async def get_multi_product_admin(
         self,
         *,
-        skip: int = 0,
+        cursor: str | None = None,
         limit: int = 20,
-    ) -> list[Product]:
+    ) -> Page[Product]:
         """Fetch ALL products (active + inactive) with their batches."""
-        stmt = (
-            select(Product)
-            .options(selectinload(Product.batches))
-            .order_by(Product.name.asc())
-            .offset(skip)
-            .limit(limit)
-        )
-
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
+        stmt = select(Product).options(selectinload(Product.batches))
+        return await _BY_NAME.paginate(self.session, stmt, cursor=cursor, limit=limit)
 
     async def create_new_batch(
         self, *, product_id: UUID, obj_in: BatchCreate
@@ -124,6 +244,8 @@ class CRUDProduct:
         self.session.add(db_obj)
 
         try:
+            await self.session.flush()
+            await self.catalog_changed([product_id])
             await self.session.commit()
             await self.session.refresh(db_obj)
 
@@ -144,56 +266,245 @@ class CRUDProduct:
 
         if batch:
             await self.session.delete(batch)
+            await self.session.flush()
+            await self.catalog_changed([batch.product_id])
             await self.session.commit()
             return True
         return False
 
-    async def deduct_stock_fefo(self, *, product_id: UUID, quantity: int):
+    async def lock_products(
+        self, product_ids: Iterable[UUID], *, skip_locked: bool = False
+    ) -> None:
         """
-        Deduct stock using First-Expired-First-Out (FEFO) logic.
-        Ensures we don't sell blocked or expired items.
+        Serialize stock decisions per product until the transaction ends:
+        checkouts reserving and payments deducting the same products take
+        turns; everything else (reads, other products) is unaffected.
+
+        Run it as its own statement before reading free stock: in READ
+        COMMITTED each statement sees what was committed before it started,
+        so the next one sees every reservation made by the previous holder.
         """
-        # Fetch all available, non-blocked, unexpired batches sorted by expiry
-        stmt = (
-            select(InventoryBatch)
+        await self.session.execute(
+            select(Product.id)
+            .where(Product.id.in_(set(product_ids)))
+            .order_by(Product.id)  # same order everywhere: no deadlocks
+            .with_for_update(key_share=True, skip_locked=skip_locked)
+        )
+
+    async def lock_allocation(self, product_ids: Iterable[UUID]) -> None:
+        """
+        Serialize FEFO allocations (reservations and deductions) per product
+        until the transaction ends, with a transaction-level advisory lock
+        per product. Hot products are reserved without lock_products, and a
+        Redis counter only bounds their total: without this, two checkouts
+        would split the same free units of the earliest batch.
+
+        Take it after any lock_products of the transaction, as its own
+        statement before the allocation reads free stock. Only needed on
+        PostgreSQL: SQLite (test backend) holds a database-wide write lock.
+        """
+        product_ids = set(product_ids)
+        if not product_ids or self.session.bind.dialect.name != "postgresql":
+            return
+
+        await self.session.execute(
+            select(
+                func.pg_advisory_xact_lock(
+                    ALLOCATION_LOCK, func.hashtext(cast(Product.id, String))
+                )
+            )
+            .where(Product.id.in_(product_ids))
+            .order_by(Product.id)  # same order everywhere: no deadlocks
+        )
+
+    async def load_hot_stock(self, redis, product_ids: Iterable[UUID]) -> None:
+        """
+        Create the Redis counters of hot products from their free stock,
+        read under their row locks so no checkout slips in between (they
+        lock these products until the counter exists). Commit afterwards
+        to release the locks.
+        """
+        product_ids = set(product_ids)
+        await self.lock_products(product_ids)
+        stock = await self.get_sellable_stock(product_ids)
+        await hot_stock.load(
+            redis, {product_id: stock[product_id].available for product_id in stock}
+        )
+
+    async def get_sellable_stock(
+        self,
+        product_ids: Iterable[UUID],
+        *,
+        lock: bool = False,
+        unlocked: Iterable[UUID] = (),
+    ) -> dict[UUID, SellableStock]:
+        """
+        Sellable stock for many products in one grouped query, net of
+        unexpired reservations. Unknown products are absent from the
+        result; products without sellable batches are returned with
+        available=0.
+
+        A batch reserved beyond its units counts negative: dropping it
+        would count its reservations' surplus as free in the next batch.
+
+        With lock=True the products are locked first (see lock_products),
+        so the stock and FEFO prices read stay true until the transaction
+        ends. Keep that transaction short. Products in unlocked are left
+        alone (hot products, admitted by their Redis counter).
+        """
+        product_ids = set(product_ids)
+        if not product_ids:
+            return {}
+
+        locked = product_ids - set(unlocked)
+        if lock and locked:
+            await self.lock_products(locked)
+
+        now = datetime.now(timezone.utc)
+        in_stock = (
+            select(
+                InventoryBatch.id,
+                InventoryBatch.product_id,
+                InventoryBatch.free_quantity(now).label("free_quantity"),
+                InventoryBatch.price,
+                InventoryBatch.expiry_date,
+            )
             .where(
-                InventoryBatch.product_id == product_id,
-                InventoryBatch.is_blocked.is_(False),
-                InventoryBatch.expiry_date > datetime.now(timezone.utc),
-                InventoryBatch.current_quantity > 0,
+                InventoryBatch.product_id.in_(product_ids),
+                *InventoryBatch.in_stock(now),
             )
-            .order_by(InventoryBatch.expiry_date.asc())
+            .cte("in_stock")
         )
 
-        result = await self.session.execute(stmt)
-        batches = result.scalars().all()
+        next_price = (
+            select(in_stock.c.price)
+            .where(in_stock.c.product_id == Product.id, in_stock.c.free_quantity > 0)
+            .order_by(in_stock.c.expiry_date, in_stock.c.id)
+            .limit(1)
+            .correlate(Product)
+            .scalar_subquery()
+        )
 
-        total_available = sum(b.current_quantity for b in batches)
-        if total_available < quantity:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Insufficient stock. Requested: {quantity}, Available: {total_available}",
+        stmt = (
+            select(
+                Product.id,
+                Product.name,
+                Product.prescription_required,
+                func.coalesce(func.sum(in_stock.c.free_quantity), 0),
+                next_price,
             )
+            .outerjoin(in_stock, in_stock.c.product_id == Product.id)
+            .where(Product.id.in_(product_ids))
+            .group_by(Product.id, Product.name, Product.prescription_required)
+        )
 
-        remaining_to_deduct = quantity
+        rows = (await self.session.execute(stmt)).all()
+        return {
+            row[0]: SellableStock(
+                product_id=row[0],
+                name=row[1],
+                prescription_required=row[2],
+                available=max(int(row[3]), 0),
+                unit_price=row[4],
+            )
+            for row in rows
+        }
 
-        for batch in batches:
-            if remaining_to_deduct <= 0:
-                break
+    async def deduct_stock_for_order(
+        self,
+        *,
+        items: Iterable[tuple[UUID, int]],
+        skip_locked: bool = False,
+    ) -> list[BatchAllocation]:
+        """
+        Deduct stock for a whole order using First-Expired-First-Out (FEFO).
 
-            if batch.current_quantity >= remaining_to_deduct:
-                # This batch can cover the rest of the order
-                batch.current_quantity -= remaining_to_deduct
-                remaining_to_deduct = 0
+        After locking the products (see lock_products), one statement for
+        every line of the order:
+        - lock the sellable batches of all ordered products (FOR UPDATE),
+        - allocate each product's units over them in expiry order, taking
+          only units nobody else has reserved (see fefo_allocation), and
+        - UPDATE ... RETURNING the per-batch allocations.
 
-            else:
-                # Empty this batch and move to the next
-                remaining_to_deduct -= batch.current_quantity
-                batch.current_quantity = 0
+        Release the order's own reservation first, in the same transaction,
+        so its units count as free.
 
-        await self.session.commit()
-        logger.info(f"Deducted {quantity} items for product {product_id}")
-        return True
+        With skip_locked=True, products and batches locked by another
+        transaction are skipped instead of waited on, so a shortfall may
+        only be temporary.
+
+        Does NOT commit: the caller commits once, together with the order,
+        or rolls back on InsufficientStockError.
+        """
+        requested: dict[UUID, int] = defaultdict(int)
+        for product_id, quantity in items:
+            requested[product_id] += quantity
+
+        if not requested:
+            return []
+
+        await self.lock_products(requested.keys(), skip_locked=skip_locked)
+        await self.lock_allocation(requested.keys())
+        alloc = fefo_allocation(
+            requested, datetime.now(timezone.utc), lock=True, skip_locked=skip_locked
+        )
+
+        if self.session.bind.dialect.name == "postgresql":
+            stmt = (
+                update(InventoryBatch)
+                .where(InventoryBatch.id == alloc.c.id)
+                .values(current_quantity=InventoryBatch.current_quantity - alloc.c.take)
+                .returning(InventoryBatch.id, InventoryBatch.product_id, alloc.c.take)
+                .execution_options(synchronize_session=False)
+            )
+            rows = (await self.session.execute(stmt)).all()
+        else:
+            # SQLite (test backend) cannot RETURNING from an UPDATE ... FROM
+            # table; the database-wide write lock makes plan-then-update safe.
+            rows = (
+                await self.session.execute(
+                    select(alloc.c.id, alloc.c.product_id, alloc.c.take)
+                )
+            ).all()
+            if rows:
+                batches = InventoryBatch.__table__
+                await self.session.execute(
+                    update(batches)
+                    .where(batches.c.id == bindparam("batch_id"))
+                    .values(
+                        current_quantity=batches.c.current_quantity - bindparam("take")
+                    ),
+                    [{"batch_id": row[0], "take": row[2]} for row in rows],
+                )
+
+        allocations = [
+            BatchAllocation(product_id=product_id, batch_id=batch_id, quantity=take)
+            for batch_id, product_id, take in rows
+        ]
+
+        allocated: dict[UUID, int] = defaultdict(int)
+        for allocation in allocations:
+            allocated[allocation.product_id] += allocation.quantity
+
+        short = {
+            product_id: (quantity, allocated[product_id])
+            for product_id, quantity in requested.items()
+            if allocated[product_id] < quantity
+        }
+        if short:
+            details = ", ".join(
+                f"{product_id} (requested: {wanted}, available: {got})"
+                for product_id, (wanted, got) in short.items()
+            )
+            raise InsufficientStockError(f"Insufficient stock for {details}")
+
+        await self.catalog_changed(requested.keys())
+
+        logger.info(
+            f"FEFO deduction: {sum(requested.values())} units "
+            f"across {len(allocations)} batches"
+        )
+        return allocations
 
     async def restock_product(
         self,
@@ -203,7 +514,8 @@ class CRUDProduct:
     ):
         """
         Restock product by adding quantity back to the MOST RECENT batches.
-        (LIFO is acceptable for refunds in pharmacies.)
+        (LIFO is acceptable for refunds in pharmacies.) Does NOT commit: the
+        refund commits every line with the order's status change.
         """
 
         stmt = (
@@ -227,7 +539,81 @@ class CRUDProduct:
             batch.current_quantity += remaining
             remaining = 0
 
-        await self.session.commit()
+        await self.session.flush()
+        await self.catalog_changed([product_id])
+
+    async def block_expired_batches(self) -> int:
+        """
+        Block the batches past their expiry date, which takes them out of
+        ix_inventory_batches_sellable, and refresh their products. Returns
+        how many batches were blocked. Does NOT commit.
+        """
+        stmt = (
+            update(InventoryBatch)
+            .where(
+                ~InventoryBatch.is_blocked,
+                InventoryBatch.expiry_date <= datetime.now(timezone.utc),
+            )
+            .values(is_blocked=True)
+            .returning(InventoryBatch.product_id)
+            .execution_options(synchronize_session=False)
+        )
+        product_ids = (await self.session.scalars(stmt)).all()
+        await self.catalog_changed(set(product_ids))
+        return len(product_ids)
+
+    async def claim_near_expiry_batches(
+        self, *, within: timedelta
+    ) -> list[ExpiringBatch]:
+        """
+        Sellable batches expiring within the given time that nobody was told
+        about yet, marked as told (near_expiry_notified_at). Does NOT commit:
+        the caller commits with the notifications.
+        """
+        now = datetime.now(timezone.utc)
+        stmt = (
+            update(InventoryBatch)
+            .where(
+                ~InventoryBatch.is_blocked,
+                InventoryBatch.current_quantity > literal_column("0"),
+                InventoryBatch.expiry_date > now,
+                InventoryBatch.expiry_date <= now + within,
+                InventoryBatch.near_expiry_notified_at.is_(None),
+            )
+            .values(near_expiry_notified_at=now)
+            .returning(
+                InventoryBatch.id,
+                InventoryBatch.batch_number,
+                InventoryBatch.product_id,
+                InventoryBatch.expiry_date,
+                InventoryBatch.current_quantity,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = (await self.session.execute(stmt)).all()
+        if not rows:
+            return []
+
+        names = dict(
+            (
+                await self.session.execute(
+                    select(Product.id, Product.name).where(
+                        Product.id.in_({row.product_id for row in rows})
+                    )
+                )
+            ).all()
+        )
+        return [
+            ExpiringBatch(
+                batch_id=row.id,
+                batch_number=row.batch_number,
+                product_id=row.product_id,
+                product_name=names[row.product_id],
+                expiry_date=row.expiry_date,
+                quantity=row.current_quantity,
+            )
+            for row in sorted(rows, key=lambda row: row.expiry_date)
+        ]
 
     async def get_available_products(
         self,
@@ -237,9 +623,7 @@ class CRUDProduct:
             .join(Product.batches)
             .where(
                 Product.is_active,
-                InventoryBatch.current_quantity > 0,
-                InventoryBatch.expiry_date > datetime.now(timezone.utc),
-                InventoryBatch.is_blocked.is_(False),
+                *InventoryBatch.sellable(datetime.now(timezone.utc)),
             )
             .distinct()
         )
@@ -248,30 +632,3 @@ class CRUDProduct:
 
         return result.scalars().all()
         # This only returns drugs that actually have "Sellable" stock
-
-    async def get_storefront(
-        self,
-        *,
-        category: str = None,
-        search: str = None,
-        skip: int = 0,
-        limit: int = 20,
-    ):
-
-        stmt = select(Product).options(selectinload(Product.batches))
-
-        # Apply filters
-        stmt = stmt.where(Product.is_active)
-
-        if category:
-            stmt = stmt.where(Product.category == category)
-
-        if search:
-            stmt = stmt.where(Product.name.ilike(f"%{search}%"))
-
-        # Apply pagination and ordering
-        stmt = stmt.offset(skip).limit(limit).order_by(Product.name.asc())
-
-        # Execute
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
@@ -0,0 +1,249 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Iterable
+from uuid import UUID
+
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.exceptions import InsufficientStockError
+from app.crud.order import OrderCRUD
+from app.crud.product import BatchAllocation, CRUDProduct, fefo_allocation
+from app.models.order import Order
+from app.models.stock_reservation import StockReservation
+
+logger = logging.getLogger(__name__)
+
+
+class StockReservationCRUD:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def reserve(
+        self,
+        *,
+        order_id: UUID,
+        items: Iterable[tuple[UUID, int]],
+        expires_at: datetime,
+        unrefreshed: Iterable[UUID] = (),
+    ) -> list[BatchAllocation]:
+        """
+        Hold stock for an order until expires_at, replacing whatever it
+        held before: each line's units are spread FEFO over the product's
+        free batch units, in one INSERT ... SELECT. Raises
+        InsufficientStockError if any line cannot be covered.
+
+        The storefront rows of products in unrefreshed are left to the hot
+        stock worker: every checkout of a hot product would queue on them.
+
+        Lock the products first (CRUDProduct.lock_products), in a previous
+        statement of the same transaction; hot products, admitted by their
+        Redis counter, may skip that. Either way the allocation itself is
+        serialized per product (CRUDProduct.lock_allocation). Does NOT
+        commit.
+        """
+        requested: dict[UUID, int] = defaultdict(int)
+        for product_id, quantity in items:
+            requested[product_id] += quantity
+
+        if not requested:
+            return []
+
+        released = await self._delete(order_id)
+        await CRUDProduct(self.session).lock_allocation(requested.keys())
+        alloc = fefo_allocation(requested, datetime.now(timezone.utc))
+        stmt = (
+            insert(StockReservation)
+            .from_select(
+                ["order_id", "batch_id", "product_id", "quantity", "expires_at"],
+                select(
+                    literal(order_id, StockReservation.order_id.type),
+                    alloc.c.id,
+                    alloc.c.product_id,
+                    alloc.c.take,
+                    literal(expires_at, StockReservation.expires_at.type),
+                ),
+            )
+            .returning(
+                StockReservation.batch_id,
+                StockReservation.product_id,
+                StockReservation.quantity,
+            )
+        )
+        rows = (await self.session.execute(stmt)).all()
+
+        reserved: dict[UUID, int] = defaultdict(int)
+        for _, product_id, quantity in rows:
+            reserved[product_id] += quantity
+
+        short = [
+            f"{product_id} (requested: {quantity}, available: {reserved[product_id]})"
+            for product_id, quantity in requested.items()
+            if reserved[product_id] < quantity
+        ]
+        if short:
+            raise InsufficientStockError(f"Insufficient stock for {', '.join(short)}")
+
+        await CRUDProduct(self.session).catalog_changed(
+            (released | requested.keys()) - set(unrefreshed)
+        )
+        return [
+            BatchAllocation(product_id=product_id, batch_id=batch_id, quantity=quantity)
+            for batch_id, product_id, quantity in rows
+        ]
+
+    async def release(self, order_id: UUID) -> set[UUID]:
+        """
+        Drop an order's reservation (cancelled or rejected order) and
+        refresh the storefront. Returns the products whose stock it held.
+        Does NOT commit.
+        """
+        released = await self._delete(order_id)
+        await CRUDProduct(self.session).catalog_changed(released)
+        return released
+
+    async def consume(self, order_id: UUID) -> set[UUID]:
+        """
+        Free an order's reservation so the payment can deduct the units
+        (CRUDProduct.deduct_stock_for_order) in the same transaction:
+        nobody can take them in between, and the deduction refreshes the
+        storefront. Returns the products whose stock it held. Does NOT
+        commit.
+        """
+        return await self._delete(order_id)
+
+    async def sell(
+        self, *, order_id: UUID, items: Iterable[tuple[UUID, int]]
+    ) -> set[UUID]:
+        """
+        Mark an order's reservation of these products sold, on payment:
+        the units stay held until apply_sold deducts them, off the payment
+        path (hot products, see app.core.hot_stock). Only products whose
+        whole quantity is still reserved are sold; returns them, the rest
+        must be deducted now. Does NOT commit.
+        """
+        requested: dict[UUID, int] = defaultdict(int)
+        for product_id, quantity in items:
+            requested[product_id] += quantity
+
+        if not requested:
+            return set()
+
+        held = dict(
+            (
+                await self.session.execute(
+                    select(
+                        StockReservation.product_id, func.sum(StockReservation.quantity)
+                    )
+                    .where(
+                        StockReservation.order_id == order_id,
+                        StockReservation.product_id.in_(requested.keys()),
+                    )
+                    .group_by(StockReservation.product_id)
+                )
+            ).all()
+        )
+        covered = {
+            product_id
+            for product_id, quantity in requested.items()
+            if held.get(product_id, 0) >= quantity
+        }
+        if covered:
+            await self.session.execute(
+                update(StockReservation)
+                .where(
+                    StockReservation.order_id == order_id,
+                    StockReservation.product_id.in_(covered),
+                )
+                .values(sold=True)
+            )
+        return covered
+
+    async def apply_sold(
+        self, *, order_ids: Iterable[UUID] | None = None, limit: int = 500
+    ) -> int:
+        """
+        Deduct sold reservations from stock, FEFO over the product's free
+        units, and record the orders' batch allocations: the deduction the
+        payment skipped, for many orders in one transaction. Each order
+        runs in a savepoint; one whose stock is short stays sold, and is
+        logged and retried. Returns the orders applied. Does NOT commit.
+        """
+        stmt = (
+            select(Order)
+            .options(selectinload(Order.items))
+            .where(
+                Order.id.in_(
+                    select(StockReservation.order_id).where(StockReservation.sold)
+                )
+            )
+            .order_by(Order.paid_at)
+            .limit(limit)
+        )
+        if order_ids is not None:
+            stmt = stmt.where(Order.id.in_(list(order_ids)))
+        orders = (await self.session.scalars(stmt)).all()
+        if not orders:
+            return 0
+
+        crud_product = CRUDProduct(self.session)
+        # All at once and in order, as every deduction locks them anyway
+        product_ids = {item.product_id for order in orders for item in order.items}
+        await crud_product.lock_products(product_ids)
+        await crud_product.lock_allocation(product_ids)
+
+        applied = 0
+        for order in orders:
+            try:
+                async with self.session.begin_nested():
+                    rows = (
+                        await self.session.execute(
+                            delete(StockReservation)
+                            .where(
+                                StockReservation.order_id == order.id,
+                                StockReservation.sold,
+                            )
+                            .returning(
+                                StockReservation.product_id, StockReservation.quantity
+                            )
+                        )
+                    ).all()
+                    allocations = await crud_product.deduct_stock_for_order(items=rows)
+                    OrderCRUD(self.session).add_allocations(order, allocations)
+                applied += 1
+            except InsufficientStockError as e:
+                logger.error(f"Sold stock of order {order.id} is not on hand: {e}")
+
+        return applied
+
+    async def _delete(self, order_id: UUID) -> set[UUID]:
+        result = await self.session.execute(
+            delete(StockReservation)
+            .where(
+                StockReservation.order_id == order_id,
+                StockReservation.sold.is_(False),
+            )
+            .returning(StockReservation.product_id)
+        )
+        return set(result.scalars().all())
+
+    async def release_expired(self) -> set[UUID]:
+        """
+        Delete expired reservations. They stopped counting when they
+        expired; this reclaims the rows and refreshes the storefront rows,
+        which cannot notice an expiry by themselves. Returns the products
+        they held stock of. Does NOT commit.
+        """
+        result = await self.session.execute(
+            delete(StockReservation)
+            .where(
+                StockReservation.expires_at <= datetime.now(timezone.utc),
+                StockReservation.sold.is_(False),
+            )
+            .returning(StockReservation.product_id)
+        )
+        released = set(result.scalars().all())
+        await CRUDProduct(self.session).catalog_changed(released)
+        return released
@@ -0,0 +1,290 @@
+from datetime import datetime, timezone
+from typing import Iterable
+from uuid import UUID
+
+from sqlalchemy import (
+    String,
+    case,
+    cast,
+    delete,
+    func,
+    literal,
+    literal_column,
+    null,
+    select,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.response_cache import storefront_cache
+from app.core.search_index import LocalSearchIndex, tokenize
+from app.crud.pagination import Keyset, Page, decode_offset, offset_page
+from app.models.inventory import InventoryBatch
+from app.models.product import Product
+from app.models.storefront import SEARCH_CONFIG, StorefrontProduct
+
+# Columns copied from the source query on every refresh
+_REFRESHED = (
+    "name",
+    "slug",
+    "category",
+    "prescription_required",
+    "sellable_quantity",
+    "unit_price",
+    "nearest_expiry",
+    "in_stock",
+    "search_text",
+    "search_vector",
+    "refreshed_at",
+)
+
+# Served by ix_storefront_products_name / ix_storefront_products_category_name
+_BY_NAME = Keyset(StorefrontProduct.name, StorefrontProduct.product_id)
+
+
+class CRUDStorefront:
+    """Reads and maintains the storefront_products read model."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def refresh(self, product_ids: Iterable[UUID] | None = None) -> None:
+        """
+        Recompute the storefront rows of the given products (all products
+        when None) from products and inventory_batches, in one upsert plus
+        one delete for products that are inactive or gone.
+
+        Does NOT commit: callers refresh inside the transaction that changed
+        the catalog, so readers never see the two disagree. Cached storefront
+        responses are invalidated now and again on commit.
+        """
+        if product_ids is not None:
+            product_ids = set(product_ids)
+            if not product_ids:
+                return
+
+        now = datetime.now(timezone.utc)
+
+        # Sellable batches, numbered in FEFO order within each product;
+        # reserved units are not for sale
+        ranked = select(
+            InventoryBatch.product_id,
+            InventoryBatch.free_quantity(now).label("free_quantity"),
+            InventoryBatch.price,
+            InventoryBatch.expiry_date,
+            func.row_number()
+            .over(
+                partition_by=InventoryBatch.product_id,
+                order_by=(InventoryBatch.expiry_date, InventoryBatch.id),
+            )
+            .label("fefo_rank"),
+        ).where(*InventoryBatch.sellable(now))
+        if product_ids is not None:
+            ranked = ranked.where(InventoryBatch.product_id.in_(product_ids))
+        ranked = ranked.subquery("ranked")
+
+        stock = (
+            select(
+                ranked.c.product_id,
+                func.sum(ranked.c.free_quantity).label("quantity"),
+                func.max(case((ranked.c.fefo_rank == 1, ranked.c.price))).label(
+                    "price"
+                ),
+                func.min(ranked.c.expiry_date).label("nearest_expiry"),
+            )
+            .group_by(ranked.c.product_id)
+            .subquery("stock")
+        )
+
+        quantity = func.coalesce(stock.c.quantity, 0)
+        details = (
+            func.coalesce(Product.active_ingredients, "")
+            + " "
+            + func.replace(cast(Product.category, String), "_", " ")
+        )
+        dialect = self.session.bind.dialect.name
+        if dialect == "postgresql":
+            search_vector = func.setweight(
+                func.to_tsvector(SEARCH_CONFIG, Product.name), literal_column("'A'")
+            ).op("||")(
+                func.setweight(
+                    func.to_tsvector(SEARCH_CONFIG, details), literal_column("'B'")
+                )
+            )
+        else:
+            search_vector = null()
+        source = (
+            select(
+                Product.id,
+                Product.name,
+                Product.slug,
+                Product.category,
+                Product.prescription_required,
+                quantity,
+                stock.c.price,
+                stock.c.nearest_expiry,
+                quantity > 0,
+                Product.name + " " + details,
+                search_vector,
+                literal(now, StorefrontProduct.refreshed_at.type),
+            ).outerjoin(stock, stock.c.product_id == Product.id)
+            # The WHERE also keeps SQLite's upsert-from-SELECT unambiguous
+            .where(Product.is_active.is_(True))
+        )
+        if product_ids is not None:
+            source = source.where(Product.id.in_(product_ids))
+
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+        stmt = insert(StorefrontProduct).from_select(
+            ["product_id", *_REFRESHED], source
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StorefrontProduct.product_id],
+            set_={column: stmt.excluded[column] for column in _REFRESHED},
+        )
+        await self.session.execute(stmt)
+
+        stale = delete(StorefrontProduct).where(
+            StorefrontProduct.product_id.not_in(
+                select(Product.id).where(Product.is_active.is_(True))
+            )
+        )
+        if product_ids is not None:
+            stale = stale.where(StorefrontProduct.product_id.in_(product_ids))
+        await self.session.execute(stale)
+
+        await storefront_cache.invalidate_on_commit(self.session)
+
+    async def refresh_expired(self) -> int:
+        """
+        Refresh products whose earliest sellable batch has expired since
+        their last refresh. Returns how many products were refreshed.
+        """
+        stmt = select(StorefrontProduct.product_id).where(
+            StorefrontProduct.nearest_expiry <= datetime.now(timezone.utc)
+        )
+        product_ids = (await self.session.execute(stmt)).scalars().all()
+        await self.refresh(product_ids)
+        return len(product_ids)
+
+    async def get_page(
+        self,
+        *,
+        category: str | None = None,
+        cursor: str | None = None,
+        limit: int = 20,
+    ) -> Page[StorefrontProduct]:
+        """One page of the storefront, ordered by name."""
+        stmt = select(StorefrontProduct)
+
+        if category:
+            stmt = stmt.where(StorefrontProduct.category == category)
+
+        return await _BY_NAME.paginate(self.session, stmt, cursor=cursor, limit=limit)
+
+    async def search(
+        self,
+        query: str,
+        *,
+        category: str | None = None,
+        cursor: str | None = None,
+        limit: int = 20,
+    ) -> Page[StorefrontProduct]:
+        """
+        Ranked search over name, active ingredients and category.
+
+        Every query word must match a word by prefix ("amox" finds
+        Amoxicillin); name matches rank first. Only when nothing matches
+        that way are typos tried: trigram word similarity against the text.
+        Postgres uses the tsvector and pg_trgm GIN indexes; other databases
+        fall back to an in-process index.
+
+        Relevance has no index to seek on, so search cursors hold an offset.
+        """
+        skip = decode_offset(cursor)
+        tokens = tokenize(query)
+        if not tokens:
+            return Page(items=[], next_cursor=None)
+
+        if self.session.bind.dialect.name != "postgresql":
+            rows = await self._search_local(
+                tokens, category=category, skip=skip, limit=limit + 1
+            )
+            return offset_page(rows, offset=skip, limit=limit)
+
+        phrase = " ".join(tokens)
+        name_first = case(
+            (StorefrontProduct.name.istartswith(phrase, autoescape=True), 1.0),
+            else_=0.0,
+        )
+
+        tsquery = func.to_tsquery(
+            SEARCH_CONFIG, " & ".join(f"{token}:*" for token in tokens)
+        )
+        matches = StorefrontProduct.search_vector.op("@@")(tsquery)
+        rank = func.ts_rank(StorefrontProduct.search_vector, tsquery) + name_first
+
+        rows = await self._ranked_page(matches, rank, category, skip, limit + 1)
+        if rows or (skip and await self._any(matches, category)):
+            return offset_page(rows, offset=skip, limit=limit)
+
+        # Typo fallback. Slower (similarity is computed per candidate), so it
+        # only runs for queries that found nothing above.
+        await self.session.execute(
+            select(
+                func.set_config(
+                    "pg_trgm.word_similarity_threshold",
+                    str(settings.storefront_search_typo_threshold),
+                    True,  # this transaction only
+                )
+            )
+        )
+        matches = literal(phrase).op("<%")(StorefrontProduct.search_text)
+        rank = (
+            func.word_similarity(phrase, StorefrontProduct.name)
+            + func.word_similarity(phrase, StorefrontProduct.search_text)
+            + name_first
+        )
+        rows = await self._ranked_page(matches, rank, category, skip, limit + 1)
+        return offset_page(rows, offset=skip, limit=limit)
+
+    async def _ranked_page(self, matches, rank, category, skip, limit):
+        stmt = select(StorefrontProduct).where(matches)
+        if category:
+            stmt = stmt.where(StorefrontProduct.category == category)
+
+        stmt = (
+            stmt.order_by(
+                rank.desc(), StorefrontProduct.name, StorefrontProduct.product_id
+            )
+            .offset(skip)
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def _any(self, matches, category) -> bool:
+        stmt = select(StorefrontProduct.product_id).where(matches)
+        if category:
+            stmt = stmt.where(StorefrontProduct.category == category)
+        return await self.session.scalar(select(stmt.exists()))
+
+    async def _search_local(
+        self, tokens: list[str], *, category: str | None, skip: int, limit: int
+    ) -> list[StorefrontProduct]:
+        """Search fallback: index the (filtered) storefront rows in process."""
+        stmt = select(StorefrontProduct)
+        if category:
+            stmt = stmt.where(StorefrontProduct.category == category)
+        rows = {
+            row.product_id: row for row in (await self.session.execute(stmt)).scalars()
+        }
+
+        index = LocalSearchIndex(settings.storefront_search_typo_threshold)
+        for row in rows.values():
+            index.add(row.product_id, row.name, row.search_text)
+
+        ranked = index.search(" ".join(tokens))
+        return [rows[product_id] for product_id in ranked[skip : skip + limit]]
@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, exists, func, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.db.enums import StripeEventStatus
+from app.models.stripe_event import StripeEvent
+
+
+def ordering_key(payload: dict) -> str | None:
+    """
+    The payment intent an event belongs to: the object itself for
+    payment_intent.* events, the charge's payment intent for charge.* events.
+    """
+    obj = (payload.get("data") or {}).get("object") or {}
+    if str(payload.get("type", "")).startswith("payment_intent."):
+        return obj.get("id")
+    return obj.get("payment_intent")
+
+
+class StripeEventCRUD:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def record(self, payload: dict) -> bool:
+        """
+        Store a verified event. Returns False for an event that is already
+        stored (Stripe redelivers), which is then left alone.
+        Does NOT commit.
+        """
+        dialect = self.session.bind.dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        now = datetime.now(timezone.utc)
+        created = payload.get("created")
+
+        stmt = (
+            insert(StripeEvent)
+            .values(
+                id=payload["id"],
+                type=payload["type"],
+                ordering_key=ordering_key(payload),
+                payload=payload,
+                stripe_created=(
+                    datetime.fromtimestamp(created, timezone.utc) if created else now
+                ),
+                status=StripeEventStatus.PENDING,
+                attempts=0,
+                next_attempt_at=now,
+                received_at=now,
+            )
+            .on_conflict_do_nothing(index_elements=["id"])
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount > 0
+
+    async def claim_batch(
+        self, *, limit: int, lease_seconds: int, due_by: datetime | None = None
+    ) -> list[StripeEvent]:
+        """
+        Lease up to limit due events, each the oldest pending event of its
+        order: a later event of the same order waits until the earlier one
+        is processed or dead, so a batch never holds two events of one order
+        and its events can be processed in parallel.
+
+        Events locked by another worker are skipped; leased ones stay pending
+        (blocking their order's later events) until processed or the lease
+        runs out. Each claim counts as an attempt. Does NOT commit.
+        """
+        now = datetime.now(timezone.utc)
+        older = aliased(StripeEvent)
+        position = (StripeEvent.stripe_created, StripeEvent.received_at, StripeEvent.id)
+
+        has_older_pending = exists().where(
+            older.ordering_key == StripeEvent.ordering_key,
+            older.status == StripeEventStatus.PENDING,
+            tuple_(older.stripe_created, older.received_at, older.id)
+            < tuple_(*position),
+        )
+        due = (
+            select(StripeEvent.id)
+            .where(
+                StripeEvent.status == StripeEventStatus.PENDING,
+                StripeEvent.next_attempt_at <= (due_by or now),
+                ~has_older_pending,
+            )
+            .order_by(*position)
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=StripeEvent)
+        )
+        ids = (await self.session.execute(due)).scalars().all()
+        if not ids:
+            return []
+
+        result = await self.session.execute(
+            update(StripeEvent)
+            .where(StripeEvent.id.in_(ids))
+            .values(
+                attempts=StripeEvent.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=lease_seconds),
+            )
+            .returning(StripeEvent)
+            .execution_options(synchronize_session=False)
+        )
+        return sorted(
+            result.scalars().all(),
+            key=lambda event: (event.stripe_created, event.received_at, event.id),
+        )
+
+    async def mark_processed(self, event: StripeEvent, result: str | None) -> None:
+        await self.session.execute(
+            update(StripeEvent)
+            .where(StripeEvent.id == event.id)
+            .values(
+                status=StripeEventStatus.PROCESSED,
+                result=result,
+                processed_at=datetime.now(timezone.utc),
+                last_error=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def mark_failed(
+        self, event: StripeEvent, *, error: str, max_attempts: int, retry_in: float
+    ) -> StripeEventStatus:
+        """
+        Schedule another attempt in retry_in seconds, or give the event up
+        once it has used max_attempts. Returns the event's new status.
+        """
+        values = {"last_error": error[:2000]}
+        if event.attempts >= max_attempts:
+            values["status"] = StripeEventStatus.DEAD
+        else:
+            values["next_attempt_at"] = datetime.now(timezone.utc) + timedelta(
+                seconds=retry_in
+            )
+
+        await self.session.execute(
+            update(StripeEvent)
+            .where(StripeEvent.id == event.id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return values.get("status", StripeEventStatus.PENDING)
+
+    async def purge_processed(self, older_than: timedelta) -> int:
+        """
+        Delete processed events older than older_than. Keep them longer than
+        Stripe keeps retrying (3 days): the stored id is what deduplicates.
+        """
+        result = await self.session.execute(
+            delete(StripeEvent).where(
+                StripeEvent.status == StripeEventStatus.PROCESSED,
+                StripeEvent.processed_at < datetime.now(timezone.utc) - older_than,
+            )
+        )
+        return result.rowcount
+
+    async def status(self) -> dict:
+        rows = await self.session.execute(
+            select(StripeEvent.status, func.count()).group_by(StripeEvent.status)
+        )
+        counts = {status.value: 0 for status in StripeEventStatus}
+        counts.update({status.value: count for status, count in rows.all()})
+
+        oldest = await self.session.scalar(
+            select(func.min(StripeEvent.received_at)).where(
+                StripeEvent.status == StripeEventStatus.PENDING
+            )
+        )
+        if oldest is not None and oldest.tzinfo is None:  # SQLite drops the zone
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        counts["oldest_pending_seconds"] = (
+            round((datetime.now(timezone.utc) - oldest).total_seconds(), 3)
+            if oldest
+            else 0.0
+        )
+        return counts
@@ -4,13 +4,18 @@ from uuid import UUID
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.principal_cache import principal_cache
 from app.core.roles import UserRole
+from app.crud.pagination import Keyset, Page
 from app.models.user import User
 from app.schemas.pharmacist import PharmacistApproveSchema
 
 # Initialize logger for tracking auth events
 logger = logging.getLogger(__name__)
 
+# Served by ix_users_role_created_at
+_BY_SIGNUP = Keyset(User.created_at, User.id)
+
 
 class UserCRUD:
     def __init__(self, session: AsyncSession):
@@ -32,15 +37,14 @@ class UserCRUD:
         await self.session.flush()
         return new_user
 
-    async def get_all_pharmacists(self, skip: int = 0, limit: int = 10):
-        stmt = (
-            select(User)
-            .where(User.role == UserRole.PHARMACIST.value, User.is_active)
-            .offset(skip)
-            .limit(limit)
+    async def get_all_pharmacists(
+        self, cursor: str | None = None, limit: int = 10
+    ) -> Page[User]:
+        """Active pharmacists, oldest accounts first."""
+        stmt = select(User).where(
+            User.role == UserRole.PHARMACIST.value, User.is_active
         )
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
+        return await _BY_SIGNUP.paginate(self.session, stmt, cursor=cursor, limit=limit)
 
     async def verify_pharmacist(self, *, db_obj: User, obj_in: PharmacistApproveSchema):
 
@@ -49,4 +53,6 @@ class UserCRUD:
 
         await self.session.commit()
         await self.session.refresh(db_obj)
+
+        await principal_cache.invalidate(db_obj.id)
         return db_obj
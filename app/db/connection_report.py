@@ -0,0 +1,76 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.metrics import Histogram
+
+# ASGI scope of the request being served; set by the tracing middleware
+_request_scope: ContextVar[dict | None] = ContextVar("db_request_scope", default=None)
+
+
+def _route(scope: dict | None) -> str:
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    if route is None:
+        return "unrouted"
+    return f"{scope.get('method', '')} {route.path}".strip()
+
+
+class ConnectionHoldReport:
+    """
+    How long each route keeps a pooled connection checked out, from pool
+    checkout to checkin (one sample per checkout).
+
+    A session only checks out a connection on its first query and holds it
+    until the transaction ends, so a route that queries and then awaits
+    Redis or Stripe shows up here with a hold time far above its query
+    time. Routes that never query never appear.
+    """
+
+    def __init__(self):
+        self._routes: dict[str, Histogram] = {}
+
+    def install(self, engine: AsyncEngine) -> None:
+        event.listen(engine.sync_engine, "checkout", self._checkout)
+        event.listen(engine.sync_engine, "checkin", self._checkin)
+
+    def uninstall(self, engine: AsyncEngine) -> None:
+        event.remove(engine.sync_engine, "checkout", self._checkout)
+        event.remove(engine.sync_engine, "checkin", self._checkin)
+
+    @contextmanager
+    def track(self, scope: dict):
+        """Attribute the connections checked out in this block to scope's route."""
+        token = _request_scope.set(scope)
+        try:
+            yield
+        finally:
+            _request_scope.reset(token)
+
+    def _checkout(self, dbapi_connection, record, proxy) -> None:
+        # Keyed by report: several can watch one engine (benchmarks)
+        record.info[self] = (time.perf_counter(), _request_scope.get())
+
+    def _checkin(self, dbapi_connection, record) -> None:
+        started = record.info.pop(self, None)
+        if started is None:
+            return
+        started_at, scope = started
+        route = _route(scope)
+        histogram = self._routes.get(route)
+        if histogram is None:
+            histogram = self._routes[route] = Histogram(f"db.hold_ms {route}")
+        histogram.observe((time.perf_counter() - started_at) * 1000)
+
+    def stats(self) -> dict:
+        return {
+            route: histogram.summary()
+            for route, histogram in sorted(self._routes.items())
+        }
+
+
+connection_report = ConnectionHoldReport()
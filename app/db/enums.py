@@ -31,3 +31,15 @@ class PrescriptionStatus(str, Enum):
     PENDING = "pending"
     APPROVED = "approved"
     REJECTED = "rejected"
+
+
+class OutboxStatus(str, Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    DEAD = "dead"  # gave up after the last retry; kept for inspection
+
+
+class StripeEventStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSED = "processed"
+    DEAD = "dead"  # failed on every attempt; kept for inspection
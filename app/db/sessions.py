@@ -3,6 +3,7 @@ import logging
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.db.connection_report import connection_report
 
 # Initialize the logger for async database events
 logger = logging.getLogger(__name__)
@@ -39,11 +40,34 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+# Per-route connection hold times, on /metrics
+connection_report.install(async_engine)
+
+
+async def release_connection(session: AsyncSession) -> None:
+    """
+    End the session's read-only transaction so its connection goes back to
+    the pool before slow non-DB work (Stripe calls, ...). A session checks
+    out a connection on its first query and otherwise keeps it, idle in
+    transaction, until the request ends.
+
+    Loaded objects stay usable (expire_on_commit=False) and the next query
+    checks out a connection again. A session with pending changes is left
+    alone: those are committed by the caller, not here.
+    """
+    if not session.in_transaction():
+        return
+    if session.new or session.dirty or session.deleted:
+        return
+    await session.commit()
+
 
 # FASTAPI DEPENDENCY
 async def get_async_session() -> AsyncSession:
     """
     FastAPI Dependency that provides an asynchronous database session.
+    No connection is checked out until its first query, so requests served
+    from Redis, or refused by auth, never take one from the pool.
     """
     async with AsyncSessionLocal() as session:
         try:
@@ -2,7 +2,7 @@ import logging
 import os
 import uuid
 
-from fastapi import Depends, FastAPI, Request
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
@@ -15,15 +15,32 @@ from sqlalchemy.ext.asyncio import AsyncSession
 import app.core.stripe
 from app.api.v1.router import router as v1_router
 from app.core.config import settings
+from app.core.deps import get_current_admin, get_redis
 from app.core.exceptions import (
     AuthenticationFailed,
     NotAuthorized,
+    PasswordHasherBusy,
     PasswordVerificationError,
+    StripeUnavailable,
 )
+from app.core.hot_stock import hot_stock
+from app.core.jwt_keys import jwt_keyring
 from app.core.limiter import limiter
 from app.core.logging import request_id_var, setup_logging
+from app.core.metrics import metrics
+from app.core.password_hasher import password_hasher
+from app.core.payment_intent_cache import payment_intent_cache
+from app.core.principal_cache import principal_cache
+from app.core.refresh_tokens import refresh_tokens
 from app.core.ssl import configure_ssl
-from app.db.sessions import get_async_session
+from app.core.token_versions import token_versions
+from app.db.connection_report import connection_report
+from app.db.sessions import async_engine, get_async_session
+from app.workers.cart_sync import cart_sync_status
+from app.workers.hot_stock import hot_stock_status
+from app.workers.inventory import inventory_status
+from app.workers.notifications import outbox_status
+from app.workers.stripe_events import stripe_events_status
 
 # LOGGING
 setup_logging()
@@ -58,6 +75,24 @@ async def not_authorized_handler(request: Request, exc: NotAuthorized):
     )
 
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(StripeUnavailable)
+async def stripe_unavailable_handler(request: Request, exc: StripeUnavailable):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Payments are temporarily unavailable, please retry."},
+        headers={"Retry-After": str(int(settings.stripe_breaker_reset_seconds))},
+    )
+
+
 # ROUTERS
 app.include_router(v1_router, prefix="/api/v1")
 
@@ -104,7 +139,8 @@ async def security_and_tracing_middleware(request: Request, call_next):
     token = request_id_var.set(request_id)
 
     try:
-        response = await call_next(request)
+        with connection_report.track(request.scope):
+            response = await call_next(request)
 
         response.headers["X-Request-Id"] = request_id
         response.headers["X-Content-Type-Options"] = "nosniff"
@@ -128,6 +164,13 @@ async def security_and_tracing_middleware(request: Request, call_next):
         request_id_var.reset(token)
 
 
+# PUBLIC KEYS: other services and edge proxies verify our JWTs with these
+@app.get("/.well-known/jwks.json")
+async def jwks(response: Response):
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return jwt_keyring.jwks()
+
+
 # HEALTH CHECKS
 @app.get("/health")
 async def health_check(db: AsyncSession = Depends(get_async_session)):
@@ -151,3 +194,29 @@ async def health_check(db: AsyncSession = Depends(get_async_session)):
         health_status["dependencies"]["redis"] = str(e)
 
     return health_status
+
+
+# METRICS (ADMIN ONLY)
+@app.get("/metrics")
+async def metrics_snapshot(
+    current_admin=Depends(get_current_admin),
+    redis: Redis = Depends(get_redis),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return {
+        "metrics": metrics.snapshot(),
+        "principal_cache": principal_cache.stats(),
+        "payment_intent_cache": payment_intent_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "refresh_tokens": refresh_tokens.stats(),
+        "token_versions": token_versions.stats(),
+        "db_connections": {
+            "pool": async_engine.pool.status(),
+            "hold_ms_by_route": connection_report.stats(),
+        },
+        "cart_sync": await cart_sync_status(redis),
+        "hot_stock": {**hot_stock.stats(), **await hot_stock_status(redis)},
+        "inventory": await inventory_status(redis),
+        "notification_outbox": await outbox_status(db),
+        "stripe_events": await stripe_events_status(db),
+    }
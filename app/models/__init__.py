@@ -1,7 +1,12 @@
 from app.models.cart import CartItem as CartItem
 from app.models.inventory import InventoryBatch as InventoryBatch
+from app.models.notification_outbox import NotificationOutbox as NotificationOutbox
 from app.models.order import Order as Order
 from app.models.order_item import OrderItem as OrderItem
 from app.models.prescription import Prescription as Prescription
 from app.models.product import Product as Product
+from app.models.stock_allocation import StockAllocation as StockAllocation
+from app.models.stock_reservation import StockReservation as StockReservation
+from app.models.storefront import StorefrontProduct as StorefrontProduct
+from app.models.stripe_event import StripeEvent as StripeEvent
 from app.models.user import User as User
@@ -1,4 +1,5 @@
 import uuid
+from datetime import datetime
 from decimal import Decimal
 
 from sqlalchemy import (
@@ -6,17 +7,22 @@ from sqlalchemy import (
     CheckConstraint,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
     UniqueConstraint,
     func,
+    literal_column,
+    or_,
+    select,
     text,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
+from app.models.stock_reservation import StockReservation
 
 
 class InventoryBatch(Base):
@@ -33,7 +39,6 @@ class InventoryBatch(Base):
         UUID(as_uuid=True),
         ForeignKey("products.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
 
     # Stock Tracking
@@ -63,6 +68,11 @@ class InventoryBatch(Base):
         Boolean, default=False, nullable=False
     )  # Manual or automatic block
 
+    # Set when admins were told the batch expires soon (expiry sweeper)
+    near_expiry_notified_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
     created_at: Mapped[DateTime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
@@ -70,11 +80,60 @@ class InventoryBatch(Base):
 
     # Constraints
     __table_args__ = (
+        # Also serves lookups by product_id alone
         UniqueConstraint("product_id", "batch_number", name="uq_product_batch"),
         CheckConstraint(
             "current_quantity <= initial_quantity", name="check_stock_limit"
         ),
+        # FEFO lookups: the sellable batches of some products, by expiry,
+        # read from the index alone. Queries must repeat the predicate
+        # literally (see sellable()) for the planner to use it.
+        Index(
+            "ix_inventory_batches_sellable",
+            "product_id",
+            "expiry_date",
+            postgresql_where=text("NOT is_blocked AND current_quantity > 0"),
+            postgresql_include=["id", "current_quantity", "price"],
+            sqlite_where=text("is_blocked = 0 AND current_quantity > 0"),
+        ),
     )
 
     # Relationship back to the Product Master
     product = relationship("Product", back_populates="batches")
+
+    @classmethod
+    def reserved(cls, now: datetime):
+        """Units of the batch held by unexpired or sold stock reservations."""
+        return (
+            select(func.coalesce(func.sum(StockReservation.quantity), 0))
+            .where(
+                StockReservation.batch_id == cls.id,
+                or_(StockReservation.expires_at > now, StockReservation.sold),
+            )
+            .correlate(cls)
+            .scalar_subquery()
+        )
+
+    @classmethod
+    def free_quantity(cls, now: datetime):
+        """Units on hand that nobody has reserved."""
+        return cls.current_quantity - cls.reserved(now)
+
+    @classmethod
+    def in_stock(cls, now: datetime) -> tuple:
+        """
+        Filter for batches with units on hand that are unblocked and
+        unexpired, reserved or not. The first two terms are the predicate
+        of ix_inventory_batches_sellable, spelled the same way (a bound 0
+        would not prove it).
+        """
+        return (
+            ~cls.is_blocked,
+            cls.current_quantity > literal_column("0"),
+            cls.expiry_date > now,
+        )
+
+    @classmethod
+    def sellable(cls, now: datetime) -> tuple:
+        """Filter for batches that may be sold: in stock, with free units."""
+        return (*cls.in_stock(now), cls.free_quantity(now) > 0)
@@ -0,0 +1,81 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import JSON, DateTime, Enum, Index, Integer, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.db.enums import OutboxStatus
+
+
+class NotificationOutbox(Base):
+    """
+    A notification to send, written in the same transaction as the change
+    it announces, so it is sent if and only if that change committed.
+    The notifications worker drains pending rows in batches.
+    """
+
+    __tablename__ = "notification_outbox"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        server_default=text("gen_random_uuid()"),
+    )
+
+    # One notification per business event, however often it is enqueued,
+    # e.g. "order-cancelled:<order id>"
+    dedup_key: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+
+    # NotificationService.notify arguments: email, phone, message, channels,
+    # and invoice_order_id when the order's invoice is attached
+    payload: Mapped[dict] = mapped_column(
+        JSONB().with_variant(JSON(), "sqlite"), nullable=False
+    )
+
+    # Channels that already delivered: a retry only sends on the others
+    delivered_channels: Mapped[list[str]] = mapped_column(
+        JSONB().with_variant(JSON(), "sqlite"),
+        nullable=False,
+        default=list,
+        server_default=text("'[]'"),
+    )
+
+    status: Mapped[OutboxStatus] = mapped_column(
+        Enum(
+            OutboxStatus,
+            name="outbox_status_enum",
+            values_callable=lambda enum: [e.value for e in enum],
+        ),
+        nullable=False,
+        default=OutboxStatus.PENDING,
+    )
+
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # When the row is due: now for new rows, later after a failure, and a
+    # lease ahead while a worker is sending it
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    sent_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    __table_args__ = (
+        # The worker's queue: only pending rows, oldest due first
+        Index(
+            "ix_notification_outbox_due",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+    )
@@ -2,7 +2,17 @@ import uuid
 from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, Numeric, String, func, text
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Numeric,
+    String,
+    func,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -23,7 +33,6 @@ class Order(Base):
     customer_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         ForeignKey("users.id", ondelete="RESTRICT"),
-        index=True,
         nullable=False,
     )
 
@@ -80,3 +89,8 @@ class Order(Base):
         uselist=False,
         back_populates="order",
     )
+
+    __table_args__ = (
+        # A customer's order history, newest first, paged by (created_at, id)
+        Index("ix_orders_customer_created_at", "customer_id", "created_at", "id"),
+    )
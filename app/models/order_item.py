@@ -54,3 +54,9 @@ class OrderItem(Base):
     order = relationship("Order", back_populates="items")
     product = relationship("Product")
     batch = relationship("InventoryBatch")
+    allocations = relationship(
+        "StockAllocation",
+        back_populates="order_item",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
@@ -6,9 +6,11 @@ from sqlalchemy import (
     CheckConstraint,
     DateTime,
     Enum,
+    Index,
     Integer,
     String,
     Text,
+    false,
     func,
 )
 from sqlalchemy.dialects.postgresql import UUID
@@ -30,7 +32,6 @@ class Product(Base):
     name: Mapped[str] = mapped_column(
         String(255),
         nullable=False,
-        index=True,
     )
 
     slug: Mapped[str] = mapped_column(
@@ -66,6 +67,12 @@ class Product(Base):
         Boolean, default=True
     )  # Admin can hide product globally
 
+    # Checkouts are admitted by a Redis counter instead of row locks, for
+    # promotions (see app.core.hot_stock)
+    hot_stock: Mapped[bool] = mapped_column(
+        Boolean, default=False, server_default=false(), nullable=False
+    )
+
     # Tracking
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
@@ -79,3 +86,8 @@ class Product(Base):
         "InventoryBatch", back_populates="product", cascade="all, delete-orphan"
     )
     cart_items = relationship("CartItem", back_populates="product")
+
+    __table_args__ = (
+        # Name lookups and keyset pagination by (name, id)
+        Index("ix_products_name_id", "name", "id"),
+    )
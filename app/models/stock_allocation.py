@@ -0,0 +1,51 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import CheckConstraint, DateTime, ForeignKey, Integer, func, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.db.base import Base
+
+
+class StockAllocation(Base):
+    """
+    Which inventory batch supplied how many units of an order line.
+    Written when stock is deducted so a batch recall can find every order.
+    """
+
+    __tablename__ = "stock_allocations"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        server_default=text("gen_random_uuid()"),
+    )
+
+    order_item_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("order_items.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    # Kept nullable so deleting a batch never deletes sales history
+    batch_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("inventory_batches.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
+
+    quantity: Mapped[int] = mapped_column(
+        Integer, CheckConstraint("quantity > 0"), nullable=False
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    # Relationships
+    order_item = relationship("OrderItem", back_populates="allocations")
+    batch = relationship("InventoryBatch")
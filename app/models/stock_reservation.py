@@ -0,0 +1,88 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import (
+    Boolean,
+    CheckConstraint,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    false,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class StockReservation(Base):
+    """
+    Units of a batch held for an order between checkout and payment.
+
+    Reserved units are not sellable to anyone else until expires_at
+    (see InventoryBatch.free_quantity). Payment turns the reservation into
+    a stock deduction; cancellation and prescription rejection delete it;
+    expired rows are deleted by the reservations worker.
+
+    Sold rows (hot products, see app.core.hot_stock) are paid for but not
+    yet deducted from their batch: they hold the units, whatever
+    expires_at says, until the hot stock worker deducts them.
+    """
+
+    __tablename__ = "stock_reservations"
+
+    order_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("orders.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    batch_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("inventory_batches.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    # Denormalized from the batch, for refreshing the storefront on release
+    product_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("products.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    quantity: Mapped[int] = mapped_column(
+        Integer, CheckConstraint("quantity > 0"), nullable=False
+    )
+
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+    sold: Mapped[bool] = mapped_column(
+        Boolean, default=False, server_default=false(), nullable=False
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        # "How much of this batch is held right now?"
+        Index(
+            "ix_stock_reservations_batch_expires",
+            "batch_id",
+            "expires_at",
+            postgresql_include=["quantity", "sold"],
+        ),
+        # The reservations worker's queue
+        Index("ix_stock_reservations_expires_at", "expires_at"),
+        # The hot stock worker's queue
+        Index(
+            "ix_stock_reservations_sold",
+            "order_id",
+            postgresql_where=text("sold"),
+        ),
+    )
@@ -0,0 +1,97 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    literal_column,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.db.enums import CategoryEnum
+
+
+class StorefrontProduct(Base):
+    """
+    Read model behind the public storefront: one row per active product with
+    its sellable stock already summed and its FEFO price already picked.
+
+    Written only by CRUDStorefront.refresh(), which runs whenever a product or
+    one of its batches changes, and periodically for batches that expired.
+    """
+
+    __tablename__ = "storefront_products"
+
+    product_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("products.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    slug: Mapped[str] = mapped_column(String(255), nullable=False)
+    category: Mapped[CategoryEnum] = mapped_column(
+        Enum(CategoryEnum, values_callable=lambda enum: [e.value for e in enum]),
+        nullable=False,
+    )
+    prescription_required: Mapped[bool] = mapped_column(Boolean, nullable=False)
+
+    # Summed over unblocked, unexpired, non-empty batches
+    sellable_quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # Price of the batch that sells next (FEFO); None when out of stock
+    unit_price: Mapped[Decimal | None] = mapped_column(
+        Numeric(precision=10, scale=2), nullable=True
+    )
+
+    # When the earliest sellable batch expires and this row goes stale
+    nearest_expiry: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
+
+    in_stock: Mapped[bool] = mapped_column(Boolean, nullable=False)
+
+    # Name, active ingredients and category in one text; typo search
+    # matches it by trigram similarity
+    search_text: Mapped[str] = mapped_column(Text, nullable=False, server_default="")
+
+    # Postgres only: search_text as words, name words weighted higher.
+    # Stored rather than an expression index so ranking need not re-parse.
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR().with_variant(Text(), "sqlite"), nullable=True
+    )
+
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_storefront_products_name", "name", "product_id"),
+        Index("ix_storefront_products_category_name", "category", "name", "product_id"),
+        # Search indexes are Postgres only; elsewhere LocalSearchIndex is used
+        Index(
+            "ix_storefront_products_search_vector",
+            "search_vector",
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_storefront_products_search_trgm",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+# 'simple' keeps drug names unstemmed, so prefixes like "amox" still match
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, DateTime, Enum, Index, Integer, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.db.enums import StripeEventStatus
+
+
+class StripeEvent(Base):
+    """
+    Inbox of verified Stripe webhook events. The webhook only stores the
+    event; the Stripe events worker processes it, in order per order.
+    """
+
+    __tablename__ = "stripe_events"
+
+    # Stripe's event id: a redelivered event hits the primary key
+    id: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+    type: Mapped[str] = mapped_column(String(100), nullable=False)
+
+    # Events with the same key are processed one at a time, oldest first.
+    # The payment intent id: an order has exactly one payment intent.
+    ordering_key: Mapped[str | None] = mapped_column(String(255), nullable=True)
+
+    # The event as Stripe sent it
+    payload: Mapped[dict] = mapped_column(
+        JSONB().with_variant(JSON(), "sqlite"), nullable=False
+    )
+
+    # When Stripe created the event; deliveries can arrive out of order
+    stripe_created: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+    status: Mapped[StripeEventStatus] = mapped_column(
+        Enum(
+            StripeEventStatus,
+            name="stripe_event_status_enum",
+            values_callable=lambda enum: [e.value for e in enum],
+        ),
+        nullable=False,
+        default=StripeEventStatus.PENDING,
+    )
+
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Due time; pushed ahead while a worker holds the event, and on failure
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    # The handler's outcome, e.g. "ok" or "already_processed"
+    result: Mapped[str | None] = mapped_column(String(50), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    received_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    processed_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    __table_args__ = (
+        # The worker's queue
+        Index(
+            "ix_stripe_events_due",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+        # "Is there an older pending event for this order?"
+        Index(
+            "ix_stripe_events_pending_order",
+            "ordering_key",
+            "stripe_created",
+            "received_at",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+    )
@@ -1,7 +1,7 @@
 import uuid
 from datetime import date, datetime
 
-from sqlalchemy import Boolean, Date, DateTime, Enum, String, func, text
+from sqlalchemy import Boolean, Date, DateTime, Enum, Index, String, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -43,7 +43,6 @@ class User(Base):
         ),
         nullable=False,
         default=UserRole.CUSTOMER,
-        index=True,
     )
 
     # Pharmacist-specific (employees, not owners)
@@ -90,3 +89,8 @@ class User(Base):
         back_populates="customer",
         cascade="all, delete-orphan",
     )
+
+    __table_args__ = (
+        # Role filters and keyset pagination of a role by (created_at, id)
+        Index("ix_users_role_created_at", "role", "created_at", "id"),
+    )
@@ -0,0 +1,17 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel, ConfigDict
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """
+    A page of a keyset-paginated list. Pass next_cursor back as ?cursor= to
+    get the following page; it is null on the last one.
+    """
+
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
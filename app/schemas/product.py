@@ -91,9 +91,39 @@ class ProductRead(BaseModel):
     age_restriction: int | None
     storage_condition: str | None
     is_active: bool
+    hot_stock: bool
 
     model_config = ConfigDict(from_attributes=True)
 
 
 class ProductWithBatches(ProductRead):
     batches: List[BatchRead]
+
+
+# STOREFRONT (customer-facing, served from the storefront read model)
+class StorefrontItem(BaseModel):
+    """One storefront row: stock and FEFO price are precomputed."""
+
+    product_id: UUID
+    name: str
+    slug: str
+    category: CategoryEnum
+    prescription_required: bool
+    unit_price: Decimal | None
+    sellable_quantity: int
+    nearest_expiry: datetime | None
+    in_stock: bool
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class StorefrontSuggestion(BaseModel):
+    """Autocomplete entry for the storefront search box."""
+
+    product_id: UUID
+    name: str
+    slug: str
+    category: CategoryEnum
+    in_stock: bool
+
+    model_config = ConfigDict(from_attributes=True)
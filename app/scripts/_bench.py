@@ -0,0 +1,46 @@
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+
+async def run_load(
+    fn: Callable[[], Awaitable], *, total: int, concurrency: int
+) -> dict:
+    """
+    Fire `total` calls of `fn` with at most `concurrency` in flight and
+    return throughput plus latency percentiles (ms).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def _one():
+        async with semaphore:
+            start = time.perf_counter()
+            await fn()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+    return {
+        "total": total,
+        "seconds": round(elapsed, 3),
+        "per_sec": round(total / elapsed, 1),
+        "p50_ms": round(pct(50), 2),
+        "p99_ms": round(pct(99), 2),
+    }
+
+
+def print_table(title: str, rows: dict[str, dict]) -> None:
+    print(f"\n{title}")
+    for label, stats in rows.items():
+        print(
+            f"  {label:<28} {stats['per_sec']:>10}/s  "
+            f"p50={stats['p50_ms']}ms  p99={stats['p99_ms']}ms"
+        )
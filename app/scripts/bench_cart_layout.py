@@ -0,0 +1,102 @@
+"""
+Benchmark: cart layout v1 (one JSON string) vs v2 (HASH + Lua scripts).
+
+For several cart sizes, measures add-to-cart ops/sec (v1: GET + decode +
+modify + encode + SET, as CartService did before; v2: one ADD_ITEM_SCRIPT
+call), full-cart reads, and the bytes Redis needs per cart (MEMORY USAGE).
+
+Runs against the configured REDIS_URL and only touches bench:* keys.
+
+    python -m app.scripts.bench_cart_layout --ops 5000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import uuid
+
+from app.core.redis import redis_client
+from app.crud.cart import CartCRUD
+from app.scripts._bench import print_table, run_load
+
+TTL = 600
+
+
+def _items(lines: int) -> list[dict]:
+    return [{"product_id": str(uuid.uuid4()), "quantity": 1} for _ in range(lines)]
+
+
+async def _v1_add(key: str, product_id: str) -> None:
+    payload = json.loads(await redis_client.get(key))
+    for item in payload["items"]:
+        if item["product_id"] == product_id:
+            item["quantity"] += 1
+            break
+    await redis_client.set(key, json.dumps(payload), ex=TTL)
+
+
+async def _v1_read(key: str) -> list[dict]:
+    return json.loads(await redis_client.get(key))["items"]
+
+
+async def main(ops: int, concurrency: int, sizes: list[int]):
+    crud = CartCRUD(session=None)
+
+    for lines in sizes:
+        items = _items(lines)
+        product_id = items[0]["product_id"]
+        v1_key = f"bench:cart:v1:{lines}"
+        v2_user = f"bench:{lines}"  # CartCRUD keys it as cart:bench:{lines}
+        v2_key = crud._key(v2_user)
+
+        await redis_client.set(v1_key, json.dumps({"v": 1, "items": items}), ex=TTL)
+        await crud.set_redis_items(redis_client, v2_user, items, TTL)
+
+        results = {
+            "v1 add (GET+JSON+SET)": await run_load(
+                lambda: _v1_add(v1_key, product_id),
+                total=ops,
+                concurrency=concurrency,
+            ),
+            "v2 add (HASH + Lua)": await run_load(
+                lambda: crud.add_quantity(
+                    redis_client, v2_user, product_id, 1, cap=-1, ttl=TTL
+                ),
+                total=ops,
+                concurrency=concurrency,
+            ),
+            "v1 read (GET+JSON)": await run_load(
+                lambda: _v1_read(v1_key),
+                total=ops,
+                concurrency=concurrency,
+            ),
+            "v2 read (Lua HGETALL)": await run_load(
+                lambda: crud.get_redis_items(redis_client, v2_user),
+                total=ops,
+                concurrency=concurrency,
+            ),
+        }
+
+        v1_bytes = await redis_client.memory_usage(v1_key)
+        v2_bytes = await redis_client.memory_usage(v2_key)
+
+        # v1 loses concurrent increments; v2 must count every one
+        v1_final = json.loads(await redis_client.get(v1_key))["items"][0]["quantity"]
+        v2_final = int(await redis_client.hget(v2_key, product_id))
+
+        print_table(f"Cart with {lines} lines", results)
+        print(f"  bytes per cart: v1={v1_bytes}  v2={v2_bytes}")
+        print(f"  increments kept: v1={v1_final - 1}/{ops}  v2={v2_final - 1}/{ops}")
+
+        await redis_client.delete(v1_key, v2_key)
+
+    await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 25, 100])
+    args = parser.parse_args()
+    asyncio.run(main(args.ops, args.concurrency, args.sizes))
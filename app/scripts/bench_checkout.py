@@ -0,0 +1,220 @@
+"""
+Benchmark: checkouts/sec and SQL statements per checkout for carts of 1, 10
+and 50 lines, per-line loading (a Product get and a FEFO batch SELECT per
+cart line, as CheckoutService used to) vs CheckoutService.checkout (one
+locked stock query, one multi-row INSERT of the order items).
+
+Seeds products, batches and one user per checkout into the configured
+DATABASE_URL, puts the carts in REDIS_URL, and deletes everything it
+created.
+
+    python -m app.scripts.bench_checkout --checkouts 200 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import event, insert, select, text
+
+from app.core.redis import redis_client
+from app.crud.cart import CartCRUD
+from app.db.enums import CategoryEnum, OrderStatus
+from app.db.sessions import AsyncSessionLocal, async_engine
+from app.models.inventory import InventoryBatch
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.product import Product
+from app.models.user import User
+from app.scripts._bench import print_table, run_load
+from app.services.cart_service import CartService
+from app.services.checkout_service import CheckoutService
+
+PREFIX = "bench-co-"
+SIZES = (1, 10, 50)
+
+
+async def _seed_catalog(products: int) -> list[uuid.UUID]:
+    ids = [uuid.uuid4() for _ in range(products)]
+    now = datetime.now(timezone.utc)
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            insert(Product),
+            [
+                {
+                    "id": product_id,
+                    "name": f"Bench Product {i}",
+                    "slug": f"{PREFIX}{i}",
+                    "category": CategoryEnum.SUPPLEMENT,
+                    "prescription_required": False,
+                    "is_active": True,
+                }
+                for i, product_id in enumerate(ids)
+            ],
+        )
+        await conn.execute(
+            insert(InventoryBatch),
+            [
+                {
+                    "product_id": product_id,
+                    "batch_number": f"{PREFIX}{i}-{days}",
+                    "initial_quantity": 1_000_000,
+                    "current_quantity": 1_000_000,
+                    "price": Decimal("10.00") + days,
+                    "expiry_date": now + timedelta(days=days),
+                }
+                for i, product_id in enumerate(ids)
+                for days in (90, 180, 365)
+            ],
+        )
+        await conn.execute(text("ANALYZE products, inventory_batches"))
+    return ids
+
+
+async def _seed_users(count: int) -> list[uuid.UUID]:
+    ids = [uuid.uuid4() for _ in range(count)]
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "full_name": "bench buyer",
+                    "email": f"{PREFIX}{user_id.hex}@example.com",
+                    "phone_number": f"+{user_id.int % 10**13:013d}",
+                    "address": "bench street",
+                    "date_of_birth": date(1990, 1, 1),
+                    "hashed_password": "x",
+                }
+                for user_id in ids
+            ],
+        )
+    return ids
+
+
+async def _per_line_checkout(user_id: uuid.UUID) -> None:
+    """The previous shape: two SELECTs per cart line, then the inserts."""
+    async with AsyncSessionLocal() as session:
+        cart = await CartService(session).get_cart(redis_client, user_id)
+        order = Order(
+            customer_id=user_id,
+            status=OrderStatus.CHECKOUT_STARTED,
+            total_amount=Decimal("0.00"),
+        )
+        session.add(order)
+        await session.flush()
+
+        total = Decimal("0.00")
+        for item in cart["items"]:
+            product = await session.get(Product, uuid.UUID(item["product_id"]))
+            batch = await session.scalar(
+                select(InventoryBatch)
+                .where(
+                    InventoryBatch.product_id == product.id,
+                    *InventoryBatch.sellable(datetime.now(timezone.utc)),
+                )
+                .order_by(InventoryBatch.expiry_date)
+                .limit(1)
+            )
+            total += batch.price * item["quantity"]
+            session.add(
+                OrderItem(
+                    order_id=order.id,
+                    product_id=product.id,
+                    quantity=item["quantity"],
+                    price_at_purchase=batch.price,
+                )
+            )
+
+        order.total_amount = total
+        order.status = OrderStatus.READY_FOR_PAYMENT
+        await session.commit()
+
+
+async def _checkout(user_id: uuid.UUID) -> None:
+    async with AsyncSessionLocal() as session:
+        await CheckoutService(session).checkout(user_id=user_id, redis=redis_client)
+
+
+async def _fill_carts(users: list[uuid.UUID], products: list[uuid.UUID], lines: int):
+    crud = CartCRUD(None)
+    for user_id in users:
+        await crud.set_redis_items(
+            redis_client,
+            user_id,
+            [{"product_id": str(p), "quantity": 1} for p in products[:lines]],
+            600,
+        )
+
+
+async def _run(fn, users, products, lines, concurrency) -> dict:
+    await _fill_carts(users, products, lines)
+    pending = iter(users)
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        stats = await run_load(
+            lambda: fn(next(pending)), total=len(users), concurrency=concurrency
+        )
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+    stats["statements"] = round(statements / len(users), 1)
+    return stats
+
+
+async def _cleanup(users: list[uuid.UUID]) -> None:
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            text(
+                "DELETE FROM orders WHERE customer_id IN "
+                f"(SELECT id FROM users WHERE email LIKE '{PREFIX}%')"
+            )
+        )
+        await conn.execute(text(f"DELETE FROM users WHERE email LIKE '{PREFIX}%'"))
+        # batches go with their product (ON DELETE CASCADE)
+        await conn.execute(text(f"DELETE FROM products WHERE slug LIKE '{PREFIX}%'"))
+
+    for start in range(0, len(users), 500):
+        chunk = [str(user_id) for user_id in users[start : start + 500]]
+        await redis_client.delete(
+            *(f"checkout:{user_id}" for user_id in chunk),
+            *(f"cart:{user_id}" for user_id in chunk),
+        )
+        # checkout cleared the carts, queueing these users for the cart sync
+        await redis_client.zrem(CartCRUD.DIRTY_KEY, *chunk)
+
+
+async def main(checkouts: int, concurrency: int):
+    await _cleanup([])  # leftovers of an interrupted run
+    products = await _seed_catalog(max(SIZES))
+    seeded = await _seed_users(checkouts * len(SIZES) * 2)
+    users = list(seeded)
+    print(f"{checkouts} checkouts per case, concurrency {concurrency}")
+
+    try:
+        modes = {"per line": _per_line_checkout, "bulk + reservation": _checkout}
+        for lines in SIZES:
+            rows = {}
+            for label, fn in modes.items():
+                batch, users = users[:checkouts], users[checkouts:]
+                rows[label] = await _run(fn, batch, products, lines, concurrency)
+            print_table(f"{lines}-line carts, checkouts/sec", rows)
+            for label, stats in rows.items():
+                print(f"  {label:<28} {stats['statements']:>10} statements/checkout")
+    finally:
+        await _cleanup(seeded)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkouts", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.checkouts, args.concurrency))
@@ -0,0 +1,136 @@
+"""
+Benchmark: payment intent creation with the connection held across the
+Stripe call (before) and released before it (after).
+
+Runs the app in-process (ASGI transport) against the configured DATABASE_URL
+(pool_size=10, max_overflow=20) and REDIS_URL. Stripe is replaced by a stub
+that answers after --stripe-ms, so the pool, not Stripe, is the limit being
+measured. Prints requests/sec and the per-route connection hold report.
+
+    python -m app.scripts.bench_db_connections --requests 1000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import uuid
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete
+
+from app.core.redis import redis_client
+from app.core.roles import UserRole
+from app.core.security import create_access_token
+from app.db.connection_report import ConnectionHoldReport
+from app.db.enums import OrderStatus
+from app.db.sessions import AsyncSessionLocal, async_engine
+from app.main import app
+from app.models.order import Order
+from app.models.user import User
+from app.scripts._bench import print_table, run_load
+from app.services.stripe_gateway import stripe_gateway
+
+
+async def _no_release(session):
+    return None
+
+
+async def main(total: int, concurrency: int, stripe_ms: int):
+    async with AsyncSessionLocal() as session:
+        user = User(
+            full_name="Bench User",
+            email=f"bench_{uuid.uuid4().hex[:8]}@bench.local",
+            phone_number="+2340000000000",
+            address="bench",
+            date_of_birth=date(1990, 1, 1),
+            hashed_password="BENCH",
+            role=UserRole.CUSTOMER,
+        )
+        session.add(user)
+        await session.flush()
+        orders = [
+            Order(
+                customer_id=user.id,
+                total_amount=Decimal("100.00"),
+                status=OrderStatus.READY_FOR_PAYMENT,
+            )
+            for _ in range(2 * total)
+        ]
+        session.add_all(orders)
+        await session.commit()
+        order_ids = [order.id for order in orders]
+
+    await redis_client.set(f"checkout:{user.id}", "1", ex=3600)
+    headers = {"Authorization": f"Bearer {create_access_token(user)}"}
+
+    async def slow_stripe(**params):
+        await asyncio.sleep(stripe_ms / 1000)
+        return SimpleNamespace(
+            id=f"pi_{uuid.uuid4().hex}",
+            client_secret=f"pi_secret_{uuid.uuid4().hex}",
+            status="requires_payment_method",
+        )
+
+    results, holds = {}, {}
+    route = "POST /api/v1/payments/order/{order_id}"
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://localhost"
+        ) as client:
+            pending = iter(order_ids)
+
+            async def hit():
+                response = await client.post(
+                    f"/api/v1/payments/order/{next(pending)}", headers=headers
+                )
+                response.raise_for_status()
+
+            with patch.object(
+                stripe_gateway, "create_payment_intent", side_effect=slow_stripe
+            ):
+                with (
+                    patch(
+                        "app.services.payment_service.release_connection", _no_release
+                    ),
+                    patch("app.core.deps.release_connection", _no_release),
+                ):
+                    label = "before (held across Stripe)"
+                    report = ConnectionHoldReport()
+                    report.install(async_engine)
+                    results[label] = await run_load(
+                        hit, total=total, concurrency=concurrency
+                    )
+                    report.uninstall(async_engine)
+                    holds[label] = report.stats()[route]
+
+                label = "after (released)"
+                report = ConnectionHoldReport()
+                report.install(async_engine)
+                results[label] = await run_load(
+                    hit, total=total, concurrency=concurrency
+                )
+                report.uninstall(async_engine)
+                holds[label] = report.stats()[route]
+    finally:
+        await redis_client.delete(f"checkout:{user.id}")
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(Order).where(Order.customer_id == user.id))
+            await session.execute(delete(User).where(User.id == user.id))
+            await session.commit()
+
+    print_table(f"POST /api/v1/payments/order/{{id}} (Stripe {stripe_ms}ms)", results)
+    print("\nConnection hold per checkout (ms)")
+    for label, hold in holds.items():
+        print(f"  {label:<28} {hold}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--stripe-ms", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.stripe_ms))
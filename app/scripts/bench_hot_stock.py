@@ -0,0 +1,189 @@
+"""
+Benchmark: a promotion, where every buyer wants the same product.
+Each operation is a checkout followed by its payment-succeeded webhook,
+with the product row-locked (hot stock off) vs admitted by its Redis
+counter (hot stock on; the sold units are deducted afterwards by one
+reconcile run, timed separately).
+
+Seeds a product, its batches and one user per order into the configured
+DATABASE_URL, puts the carts in REDIS_URL, and deletes everything it
+created.
+
+    python -m app.scripts.bench_hot_stock --orders 300 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy import insert, text, update
+
+from app.core.redis import redis_client
+from app.crud.cart import CartCRUD
+from app.crud.product import CRUDProduct
+from app.db.enums import CategoryEnum
+from app.db.sessions import AsyncSessionLocal, async_engine
+from app.models.inventory import InventoryBatch
+from app.models.product import Product
+from app.models.user import User
+from app.scripts._bench import print_table, run_load
+from app.services.checkout_service import CheckoutService
+from app.services.notification.notification_service import NotificationService
+from app.services.payment_service import PaymentService
+from app.workers.hot_stock import reconcile_hot_stock
+
+PREFIX = "bench-hot-"
+
+
+async def _seed(users: int) -> tuple[uuid.UUID, list[uuid.UUID]]:
+    product_id = uuid.uuid4()
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    now = datetime.now(timezone.utc)
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            insert(Product).values(
+                id=product_id,
+                name="Bench Promotion",
+                slug=f"{PREFIX}product",
+                category=CategoryEnum.SUPPLEMENT,
+                prescription_required=False,
+                is_active=True,
+            )
+        )
+        await conn.execute(
+            insert(InventoryBatch),
+            [
+                {
+                    "product_id": product_id,
+                    "batch_number": f"{PREFIX}{days}",
+                    "initial_quantity": 1_000_000,
+                    "current_quantity": 1_000_000,
+                    "price": Decimal("10.00"),
+                    "expiry_date": now + timedelta(days=days),
+                }
+                for days in (90, 180, 365)
+            ],
+        )
+        await conn.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "full_name": "bench buyer",
+                    "email": f"{PREFIX}{user_id.hex}@example.com",
+                    "phone_number": f"+{user_id.int % 10**13:013d}",
+                    "address": "bench street",
+                    "date_of_birth": date(1990, 1, 1),
+                    "hashed_password": "x",
+                }
+                for user_id in user_ids
+            ],
+        )
+        await conn.execute(text("ANALYZE products, inventory_batches"))
+    return product_id, user_ids
+
+
+async def _set_hot(product_id: uuid.UUID, hot: bool) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(Product).where(Product.id == product_id).values(hot_stock=hot)
+        )
+        await session.commit()
+        if hot:
+            await CRUDProduct(session).load_hot_stock(redis_client, [product_id])
+            await session.commit()
+        else:
+            await redis_client.delete(f"hot_stock:{product_id}")
+
+
+async def _buy(user_id: uuid.UUID) -> None:
+    async with AsyncSessionLocal() as session:
+        checkout = await CheckoutService(session).checkout(
+            user_id=user_id, redis=redis_client
+        )
+    intent = SimpleNamespace(metadata={"order_id": str(checkout["order_id"])})
+    result = await PaymentService(
+        None, NotificationService()
+    )._handle_payment_succeeded(intent, redis_client, AsyncSessionLocal)
+    assert result["status"] == "ok", result
+
+
+async def _run(product_id, users, concurrency) -> dict:
+    crud = CartCRUD(None)
+    for user_id in users:
+        await crud.set_redis_items(
+            redis_client, user_id, [{"product_id": str(product_id), "quantity": 1}], 600
+        )
+    pending = iter(users)
+    return await run_load(
+        lambda: _buy(next(pending)), total=len(users), concurrency=concurrency
+    )
+
+
+async def _cleanup(users: list[uuid.UUID]) -> None:
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            text(
+                "DELETE FROM notification_outbox WHERE dedup_key IN "
+                "(SELECT 'payment-succeeded:' || id FROM orders WHERE customer_id IN "
+                f"(SELECT id FROM users WHERE email LIKE '{PREFIX}%'))"
+            )
+        )
+        await conn.execute(
+            text(
+                "DELETE FROM orders WHERE customer_id IN "
+                f"(SELECT id FROM users WHERE email LIKE '{PREFIX}%')"
+            )
+        )
+        await conn.execute(text(f"DELETE FROM users WHERE email LIKE '{PREFIX}%'"))
+        await conn.execute(text(f"DELETE FROM products WHERE slug LIKE '{PREFIX}%'"))
+
+    for start in range(0, len(users), 500):
+        chunk = [str(user_id) for user_id in users[start : start + 500]]
+        await redis_client.delete(
+            *(f"checkout:{user_id}" for user_id in chunk),
+            *(f"cart:{user_id}" for user_id in chunk),
+        )
+        await redis_client.zrem(CartCRUD.DIRTY_KEY, *chunk)
+
+
+async def main(orders: int, concurrency: int):
+    await _cleanup([])  # leftovers of an interrupted run
+    product_id, users = await _seed(orders * 2)
+    print(f"{orders} orders of one product per mode, concurrency {concurrency}")
+
+    try:
+        rows = {}
+        await _set_hot(product_id, False)
+        rows["row locks"] = await _run(product_id, users[:orders], concurrency)
+
+        await _set_hot(product_id, True)
+        rows["hot stock (Redis counter)"] = await _run(
+            product_id, users[orders:], concurrency
+        )
+        started = time.perf_counter()
+        result = await reconcile_hot_stock(
+            redis_client, AsyncSessionLocal, batch_size=orders, stale_after=60
+        )
+        reconcile_ms = (time.perf_counter() - started) * 1000
+
+        print_table("checkout + payment, orders/sec", rows)
+        print(
+            f"  reconcile: {result['orders_applied']} orders deducted in "
+            f"{reconcile_ms:.0f}ms, drift {result['drift_units']} units"
+        )
+    finally:
+        await _set_hot(product_id, False)
+        await _cleanup(users)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.orders, args.concurrency))
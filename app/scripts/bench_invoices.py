@@ -0,0 +1,142 @@
+"""
+Benchmark: invoice PDFs rendered on the event loop (as the Stripe webhook
+used to) vs in the render process pool, one by one and in bulk.
+
+For each mode, prints invoices/sec and how late a 10 ms ticker on the same
+event loop ran while invoices were rendering (what every other request on
+that worker would have felt). No database needed: the orders are synthetic.
+
+    python -m app.scripts.bench_invoices --invoices 500 --lines 12 --processes 4
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from app.scripts._bench import print_table, run_load
+from app.services.invoice_service import (
+    InvoiceLine,
+    InvoiceRenderer,
+    InvoiceSnapshot,
+    render_invoice,
+)
+
+
+def _snapshot(number: int, lines: int) -> InvoiceSnapshot:
+    return InvoiceSnapshot(
+        order_id=f"bench-{number:06d}",
+        paid_at=datetime.now(timezone.utc),
+        total=Decimal("1499.99") * lines,
+        lines=tuple(
+            InvoiceLine(
+                name=f"Paracetamol Tablets 500mg x{i}",
+                quantity=1 + i % 3,
+                unit_price=Decimal("1499.99"),
+            )
+            for i in range(lines)
+        ),
+    )
+
+
+async def _loop_lag(stop: asyncio.Event) -> float:
+    """Worst delay (ms) of a 10 ms sleep on this loop until stop is set."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, (time.perf_counter() - start - 0.01) * 1000)
+    return round(worst, 1)
+
+
+async def _measure(fn, *, total: int, concurrency: int) -> dict:
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_loop_lag(stop))
+    stats = await run_load(fn, total=total, concurrency=concurrency)
+    stop.set()
+    stats["loop_lag_ms"] = await ticker
+    return stats
+
+
+async def _bulk(renderer: InvoiceRenderer, snapshots: list) -> dict:
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_loop_lag(stop))
+    start = time.perf_counter()
+    await renderer.render_many(snapshots)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return {
+        "per_sec": round(len(snapshots) / elapsed, 1),
+        "seconds": round(elapsed, 3),
+        "loop_lag_ms": await ticker,
+    }
+
+
+async def main(invoices: int, lines: int, processes: int, concurrency: int):
+    snapshots = [_snapshot(n, lines) for n in range(invoices)]
+    sizes = [len(render_invoice(s)) for s in snapshots[:10]]
+    print(
+        f"{invoices} invoices x {lines} lines, ~{sum(sizes) // len(sizes)} bytes each, "
+        f"{processes} render processes on {os.cpu_count()} CPUs"
+    )
+
+    pending = iter(snapshots * 2)
+
+    async def inline():
+        render_invoice(next(pending))  # what the webhook did: blocks the loop
+
+    threaded = InvoiceRenderer(processes=0)
+    pooled = InvoiceRenderer(processes=processes)
+    await pooled.render(snapshots[0])  # start the pool outside the timings
+
+    try:
+        rows = {
+            "on the event loop": await _measure(
+                inline, total=invoices, concurrency=concurrency
+            ),
+            "thread (processes=0)": await _measure(
+                lambda: threaded.render(next(pending)),
+                total=invoices,
+                concurrency=concurrency,
+            ),
+        }
+        pending = iter(snapshots * 2)
+        rows[f"process pool ({processes})"] = await _measure(
+            lambda: pooled.render(next(pending)),
+            total=invoices,
+            concurrency=concurrency,
+        )
+        print_table("Invoices/sec, one render call per invoice", rows)
+
+        bulk = await _bulk(pooled, snapshots)
+        print(
+            f"  {f'bulk render_many ({processes})':<28} {bulk['per_sec']:>10}/s  "
+            f"({invoices} in {bulk['seconds']}s)"
+        )
+
+        print("\nWorst event-loop delay while rendering")
+        for label, stats in rows.items():
+            print(f"  {label:<28} {stats['loop_lag_ms']:>10} ms")
+        print(f"  {'bulk render_many':<28} {bulk['loop_lag_ms']:>10} ms")
+
+        long_order = _snapshot(0, 500)
+        start = time.perf_counter()
+        pdf = render_invoice(long_order)
+        print(
+            f"\n500-line order: {(time.perf_counter() - start) * 1000:.1f} ms, "
+            f"{pdf.count(b'/Type /Page') - pdf.count(b'/Type /Pages')} pages"
+        )
+    finally:
+        pooled.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=12)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.invoices, args.lines, args.processes, args.concurrency))
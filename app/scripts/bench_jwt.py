@@ -0,0 +1,117 @@
+"""
+Benchmark: access token verification per signing algorithm.
+
+For the shared secret (HS256) and each asymmetric key type (EdDSA, ES256):
+- sign:              JWTKeyring.encode
+- decode:            JWTKeyring.decode (parsed key of the kid)
+- decode, PEM:       jwt.decode with the public PEM, parsed on every call
+                     (what a verifier without a key cache does)
+- get_current_user:  the whole dependency, principal served from the local
+                     tier of the principal cache (no DB, no Redis round trip)
+
+Needs REDIS_URL (the principal cache writes its entry there once).
+
+    python -m app.scripts.bench_jwt --tokens 20000
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core.deps import get_current_user
+from app.core.jwt_keys import jwt_keyring
+from app.core.principal_cache import Principal, principal_cache
+from app.core.roles import UserRole
+from app.core.security import create_access_token
+from app.scripts.generate_jwt_key import generate
+
+
+def _per_sec(fn, total: int) -> float:
+    started = time.perf_counter()
+    for _ in range(total):
+        fn()
+    return total / (time.perf_counter() - started)
+
+
+async def _per_sec_async(fn, total: int) -> float:
+    started = time.perf_counter()
+    for _ in range(total):
+        await fn()
+    return total / (time.perf_counter() - started)
+
+
+async def _measure(principal: Principal, total: int) -> dict:
+    token = create_access_token(principal)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    algorithm = jwt_keyring.algorithm
+
+    if jwt_keyring.jwks()["keys"]:
+        key = next(iter(jwt_keyring._keys.values())).public
+        verify_key = key.public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+    else:
+        verify_key = jwt_keyring.secret
+
+    claims = {
+        "sub": str(principal.id),
+        "type": "access",
+        "email": principal.email,
+        "role": principal.role.value,
+        "exp": datetime.now(timezone.utc) + timedelta(minutes=15),
+    }
+    return {
+        "sign": _per_sec(lambda: jwt_keyring.encode(claims), total),
+        "decode": _per_sec(lambda: jwt_keyring.decode(token), total),
+        "decode, PEM": _per_sec(
+            lambda: jwt.decode(token, verify_key, algorithms=[algorithm]), total
+        ),
+        "get_current_user": await _per_sec_async(
+            lambda: get_current_user(token=credentials, session=None), total
+        ),
+    }
+
+
+async def main(total: int):
+    principal = Principal(
+        id=uuid.uuid4(),
+        email="bench@bench.local",
+        role=UserRole.CUSTOMER,
+        is_active=True,
+        license_verified=False,
+    )
+    await principal_cache.set(principal)
+
+    results = {}
+    try:
+        jwt_keyring.load([])
+        results[f"{jwt_keyring.secret_algorithm} (secret)"] = await _measure(
+            principal, total
+        )
+        for algorithm in ("EdDSA", "ES256"):
+            jwt_keyring.load([generate(algorithm)])
+            results[algorithm] = await _measure(principal, total)
+    finally:
+        await principal_cache.invalidate(principal.id)
+
+    columns = list(next(iter(results.values())))
+    print(f"\nJWT operations/sec ({total} per cell)")
+    print(f"  {'':<16}" + "".join(f"{column:>18}" for column in columns))
+    for label, row in results.items():
+        print(
+            f"  {label:<16}" + "".join(f"{row[column]:>18,.0f}" for column in columns)
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.tokens))
@@ -0,0 +1,80 @@
+"""
+Benchmark: requests/sec of an authenticated endpoint with and without the
+principal cache in get_current_user.
+
+Runs the app in-process (ASGI transport) against the configured DATABASE_URL
+and REDIS_URL, so the "before" numbers include the real users-table round trip.
+
+    python -m app.scripts.bench_principal_cache --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import uuid
+from datetime import date
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete
+
+from app.core.principal_cache import principal_cache
+from app.core.roles import UserRole
+from app.core.security import create_access_token
+from app.db.sessions import AsyncSessionLocal
+from app.main import app
+from app.models.user import User
+from app.scripts._bench import print_table, run_load
+
+
+async def main(total: int, concurrency: int):
+    async with AsyncSessionLocal() as session:
+        user = User(
+            full_name="Bench User",
+            email=f"bench_{uuid.uuid4().hex[:8]}@bench.local",
+            phone_number="+2340000000000",
+            address="bench",
+            date_of_birth=date(1990, 1, 1),
+            hashed_password="BENCH",
+            role=UserRole.CUSTOMER,
+        )
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+
+    headers = {"Authorization": f"Bearer {create_access_token(user)}"}
+    results = {}
+
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://localhost"
+        ) as client:
+
+            async def hit():
+                response = await client.get("/api/v1/orders", headers=headers)
+                response.raise_for_status()
+
+            principal_cache.enabled = False
+            results["before (DB per request)"] = await run_load(
+                hit, total=total, concurrency=concurrency
+            )
+
+            principal_cache.enabled = True
+            principal_cache.clear()
+            results["after (principal cache)"] = await run_load(
+                hit, total=total, concurrency=concurrency
+            )
+    finally:
+        await principal_cache.invalidate(user.id)
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(User).where(User.id == user.id))
+            await session.commit()
+
+    print_table("GET /api/v1/orders", results)
+    print(f"\nCache stats: {principal_cache.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,275 @@
+"""
+Benchmark: /customer/store served from products + every batch (the previous
+selectinload query, ProductWithBatches-shaped payload) vs the
+storefront_products read model (StorefrontItem payload).
+
+Seeds a synthetic catalog (default 50k products x 10 batches = 500k batches,
+with expired, blocked and empty batches mixed in) into the configured
+DATABASE_URL, measures how long refreshes take, then pages/sec and payload size for a
+few typical queries (deep pages: OFFSET before, a keyset cursor after),
+also through the Redis response cache (REDIS_URL), and deletes everything it
+created.
+
+    python -m app.scripts.bench_storefront --products 50000 --batches 10
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from pydantic import TypeAdapter
+from sqlalchemy import select, text
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.core.response_cache import storefront_cache
+from app.crud.pagination import encode_cursor
+from app.crud.storefront import CRUDStorefront
+from app.db.sessions import AsyncSessionLocal, async_engine
+from app.models.product import Product
+from app.models.storefront import StorefrontProduct
+from app.schemas.product import StorefrontItem
+from app.scripts._bench import print_table, run_load
+from app.services.product_service import ProductService
+
+PREFIX = "bench-sf-"
+
+STOREFRONT_PAYLOAD = TypeAdapter(list[StorefrontItem])
+
+# Names look like "Amoxicillin Capsules 12345": 40 stems x 5 forms, so a
+# stem prefix matches ~2.5% of the catalog, as in a real pharmacy.
+STEMS = (
+    "Amoxicillin Paracetamol Ibuprofen Metformin Omeprazole Lisinopril "
+    "Atorvastatin Amlodipine Azithromycin Ciprofloxacin Cetirizine Loratadine "
+    "Diclofenac Naproxen Prednisolone Salbutamol Fluconazole Doxycycline "
+    "Metronidazole Clotrimazole Ranitidine Losartan Simvastatin Warfarin "
+    "Aspirin Codeine Tramadol Insulin Levothyroxine Folic Zinc Magnesium "
+    "Calcium Vitamin Multivitamin Glucosamine Melatonin Probiotic Thermometer "
+    "Nebulizer"
+).split()
+FORMS = ["Tablets", "Capsules", "Syrup", "Cream", "Drops"]
+
+SEED_PRODUCTS = f"""
+INSERT INTO products (
+    id, name, slug, category, active_ingredients, prescription_required, is_active
+)
+SELECT gen_random_uuid(),
+       (CAST(:stems AS text[]))[1 + i % 40] || ' ' || (CAST(:forms AS text[]))[1 + (i / 40) % 5] || ' ' || i,
+       '{PREFIX}' || i,
+       (ARRAY['supplement', 'otc', 'medical_device', 'prescription']::categoryenum[])[1 + i % 4],
+       (CAST(:stems AS text[]))[1 + (i * 7) % 40],
+       i % 4 = 3,
+       true
+FROM generate_series(1, :products) AS i
+"""
+
+# A quarter of the batches are unsellable: expired, blocked or empty
+SEED_BATCHES = f"""
+INSERT INTO inventory_batches (
+    id, product_id, batch_number, initial_quantity, current_quantity,
+    price, expiry_date, is_blocked
+)
+SELECT gen_random_uuid(), p.id, p.slug || '-' || b, 100,
+       CASE WHEN b % 4 = 1 THEN 0 ELSE 1 + (b * 7) % 100 END,
+       round((1 + random() * 99)::numeric, 2),
+       CASE WHEN b % 4 = 2 THEN now() - interval '1 day'
+            ELSE now() + (b * 30 || ' days')::interval END,
+       b % 4 = 3 AND b > 4
+FROM products p CROSS JOIN generate_series(1, :batches) AS b
+WHERE p.slug LIKE '{PREFIX}%'
+"""
+
+CASES = {
+    "first page": {},
+    "category page": {"category": "otc"},
+    "search": {"search": "amoxicillin caps"},
+    "typo search": {"search": "amoxcilin"},
+    "suggest (limit=8)": {"search": "parac", "limit": 8},
+    "deep page (skip=10000)": {"skip": 10_000},
+}
+
+
+def _columns(obj, **extra) -> dict:
+    return {
+        column.key: getattr(obj, column.key) for column in obj.__table__.columns
+    } | extra
+
+
+async def _legacy_page(category=None, search=None, skip=0, limit=20) -> bytes:
+    """The storefront query as it was before the read model."""
+    stmt = select(Product).options(selectinload(Product.batches))
+    stmt = stmt.where(Product.is_active)
+    if category:
+        stmt = stmt.where(Product.category == category)
+    if search:
+        stmt = stmt.where(Product.name.ilike(f"%{search}%"))
+    stmt = stmt.offset(skip).limit(limit).order_by(Product.name.asc())
+
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(stmt)).scalars().all()
+        # Built without validation: BatchRead rejects the expired batches
+        # this query returned, which made the old endpoint fail outright.
+        return json.dumps(
+            [
+                _columns(product, batches=[_columns(b) for b in product.batches])
+                for product in rows
+            ],
+            default=str,
+        ).encode()
+
+
+async def _storefront_page(search=None, skip=0, **filters) -> bytes:
+    async with AsyncSessionLocal() as session:
+        crud = CRUDStorefront(session)
+        if skip:
+            # Clients reach deep pages by following cursors; start from the
+            # cursor that page skip/limit + 1 would have been given
+            filters["cursor"] = await _cursor_at(session, skip)
+        if search:
+            page = await crud.search(search, **filters)
+        else:
+            page = await crud.get_page(**filters)
+        return STOREFRONT_PAYLOAD.dump_json(
+            STOREFRONT_PAYLOAD.validate_python(page.items)
+        )
+
+
+async def _cached_page(skip=0, **filters) -> bytes:
+    async with AsyncSessionLocal() as session:
+        if skip:
+            filters["cursor"] = await _cursor_at(session, skip)
+        cached = await ProductService(session).get_catalog_response(**filters)
+        return cached.body.encode()
+
+
+async def _stampede(concurrency: int) -> None:
+    """Right after an invalidation, how many concurrent requests recompute."""
+    await storefront_cache.invalidate()
+    before = storefront_cache.misses.value
+    await asyncio.gather(*(_cached_page() for _ in range(concurrency)))
+    print(
+        f"\nStampede: {concurrency} concurrent requests after an invalidation "
+        f"-> {storefront_cache.misses.value - before} recompute(s)"
+    )
+
+
+_cursors: dict[int, str] = {}
+
+
+async def _cursor_at(session, skip: int) -> str:
+    if skip not in _cursors:
+        stmt = (
+            select(StorefrontProduct.name, StorefrontProduct.product_id)
+            .order_by(StorefrontProduct.name, StorefrontProduct.product_id)
+            .offset(skip - 1)
+            .limit(1)
+        )
+        _cursors[skip] = encode_cursor(list((await session.execute(stmt)).one()))
+    return _cursors[skip]
+
+
+async def _timed(label: str, coro) -> None:
+    start = time.perf_counter()
+    await coro
+    print(f"  {label:<34} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+
+async def _refresh(product_ids=None) -> None:
+    async with AsyncSessionLocal() as session:
+        await CRUDStorefront(session).refresh(product_ids)
+        await session.commit()
+
+
+async def _cleanup() -> None:
+    async with async_engine.begin() as conn:
+        # storefront rows and batches go with their product (ON DELETE CASCADE)
+        await conn.execute(text(f"DELETE FROM products WHERE slug LIKE '{PREFIX}%'"))
+
+
+async def main(products: int, batches: int, requests: int, concurrency: int):
+    print(f"Seeding {products} products x {batches} batches...")
+    await _cleanup()  # leftovers of an interrupted run
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            text(SEED_PRODUCTS),
+            {"products": products, "stems": STEMS, "forms": FORMS},
+        )
+        await conn.execute(text(SEED_BATCHES), {"batches": batches})
+        await conn.execute(text("ANALYZE products, inventory_batches"))
+        sample = (
+            (
+                await conn.execute(
+                    text(
+                        f"SELECT id FROM products WHERE slug LIKE '{PREFIX}%' LIMIT 100"
+                    )
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    try:
+        print("\nRefresh")
+        await _timed("full rebuild", _refresh())
+        await _timed("one product (per batch write)", _refresh(sample[:1]))
+        await _timed("100 products (large order)", _refresh(sample))
+        async with async_engine.begin() as conn:
+            await conn.execute(text("ANALYZE storefront_products"))
+
+        for case, filters in CASES.items():
+            legacy_bytes = len(await _legacy_page(**filters))
+            storefront_bytes = len(await _storefront_page(**filters))
+            after = await run_load(
+                lambda: _storefront_page(**filters),
+                total=requests,
+                concurrency=concurrency,
+            )
+            print_table(
+                f"{case} {filters or ''}",
+                {
+                    "products + batches": await run_load(
+                        lambda: _legacy_page(**filters),
+                        total=requests,
+                        concurrency=concurrency,
+                    ),
+                    "storefront read model": after,
+                    "read model + response cache": await run_load(
+                        lambda: _cached_page(**filters),
+                        total=requests,
+                        concurrency=concurrency,
+                    ),
+                },
+            )
+            print(f"  payload bytes: before={legacy_bytes}  after={storefront_bytes}")
+            if "search" in filters:
+                # Latency targets are per request, so measure them unloaded
+                target = (
+                    settings.storefront_suggest_target_ms
+                    if case.startswith("suggest")
+                    else settings.storefront_search_target_ms
+                )
+                alone = await run_load(
+                    lambda: _storefront_page(**filters), total=200, concurrency=1
+                )
+                verdict = "ok" if alone["p99_ms"] <= target else "MISSED"
+                print(
+                    f"  one at a time: p50={alone['p50_ms']}ms "
+                    f"p99={alone['p99_ms']}ms (target {target:.0f} ms: {verdict})"
+                )
+
+        await _stampede(concurrency)
+    finally:
+        await storefront_cache.invalidate()
+        await _cleanup()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--batches", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.products, args.batches, args.requests, args.concurrency))
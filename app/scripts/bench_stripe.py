@@ -0,0 +1,111 @@
+"""
+Benchmark: payment intents created with the blocking stripe-python calls
+PaymentService used to make vs through the async StripeGateway.
+
+Runs the fake Stripe API (app.scripts.fake_stripe) over real HTTP on a
+background thread, with --latency-ms added to every request to stand in
+for the round trip to Stripe. For each mode, prints intents/sec, latency
+percentiles and the worst delay of a 10 ms ticker on the same event loop
+(what every other request on that worker would have felt).
+
+    python -m app.scripts.bench_stripe --requests 300 --latency-ms 40
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+import uuid
+
+import stripe
+import uvicorn
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.scripts._bench import print_table, run_load
+from app.scripts.bench_invoices import _loop_lag
+from app.scripts.fake_stripe import create_app
+from app.services.stripe_gateway import StripeGateway
+
+API_KEY = "sk_test_bench"
+
+
+def _start_fake(port: int, latency: float) -> uvicorn.Server:
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_app(latency=latency),
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+        )
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _measure(fn, *, total: int, concurrency: int) -> dict:
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_loop_lag(stop))
+    stats = await run_load(fn, total=total, concurrency=concurrency)
+    stop.set()
+    stats["loop_lag_ms"] = await ticker
+    return stats
+
+
+async def main(requests: int, latency_ms: float, concurrency: int, port: int):
+    server = _start_fake(port, latency_ms / 1000)
+    api_base = f"http://127.0.0.1:{port}"
+    print(
+        f"{requests} payment intents, {latency_ms} ms simulated Stripe latency, "
+        f"concurrency {concurrency}"
+    )
+
+    params = {"amount": 5000, "currency": "ngn", "metadata": {"order_id": "bench"}}
+
+    stripe.api_key = API_KEY
+    stripe.api_base = api_base
+    stripe.default_http_client = stripe.RequestsClient()
+
+    async def blocking():
+        # What PaymentService did: a synchronous call inside a coroutine
+        stripe.PaymentIntent.create(**params, idempotency_key=uuid.uuid4().hex)
+
+    gateway = StripeGateway(
+        API_KEY,
+        api_base=api_base,
+        timeout=10.0,
+        max_connections=concurrency,
+        max_network_retries=0,
+        breaker=CircuitBreaker("bench_stripe", failure_threshold=5, reset_timeout=30),
+    )
+
+    async def pooled():
+        await gateway.create_payment_intent(**params, idempotency_key=uuid.uuid4().hex)
+
+    try:
+        rows = {
+            "sync stripe-python": await _measure(
+                blocking, total=requests, concurrency=concurrency
+            ),
+            "async StripeGateway": await _measure(
+                pooled, total=requests, concurrency=concurrency
+            ),
+        }
+        print_table("Payment intents/sec", rows)
+
+        print("\nWorst event-loop delay while calling Stripe")
+        for label, stats in rows.items():
+            print(f"  {label:<28} {stats['loop_lag_ms']:>10} ms")
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=12111)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency_ms, args.concurrency, args.port))
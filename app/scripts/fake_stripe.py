@@ -0,0 +1,163 @@
+"""
+A local stand-in for the parts of the Stripe API that PaymentService uses,
+so tests and benchmarks run offline against the real stripe-python client.
+
+    python -m app.scripts.fake_stripe --port 12111 --latency-ms 40
+    STRIPE_API_BASE=http://127.0.0.1:12111 uvicorn app.main:app
+
+Supports creating, retrieving and cancelling payment intents and creating
+refunds, replays responses for a repeated Idempotency-Key like Stripe does,
+and answers unknown ids with Stripe's 404 error body. Faults are injected
+through app.state: latency (seconds added to every request) and
+fail_next (how many of the next requests get a 500).
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import secrets
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+_KEY = re.compile(r"[^\[\]]+")
+
+
+def _parse_form(items: list[tuple[str, str]]) -> dict:
+    # Stripe encodes nested params as metadata[order_id]=...
+    params: dict = {}
+    for name, value in items:
+        *parents, leaf = _KEY.findall(name)
+        target = params
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value
+    return params
+
+
+def _error(status: int, message: str, *, kind: str, param: str | None = None):
+    error = {"type": kind, "message": message}
+    if param:
+        error["param"] = param
+    return JSONResponse({"error": error}, status_code=status)
+
+
+def _not_found(kind: str, object_id: str):
+    return _error(
+        404,
+        f"No such {kind}: '{object_id}'",
+        kind="invalid_request_error",
+        param="id",
+    )
+
+
+def create_app(*, latency: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Fake Stripe")
+    app.state.latency = latency
+    app.state.fail_next = 0
+    app.state.requests = 0
+    intents: dict[str, dict] = {}
+    replays: dict[str, tuple[int, dict]] = {}
+
+    @app.middleware("http")
+    async def faults(request: Request, call_next):
+        app.state.requests += 1
+        if app.state.latency:
+            await asyncio.sleep(app.state.latency)
+        if app.state.fail_next > 0:
+            app.state.fail_next -= 1
+            return _error(500, "An unknown error occurred", kind="api_error")
+
+        key = request.headers.get("idempotency-key")
+        if request.method == "POST" and key:
+            if key in replays:
+                status, body = replays[key]
+                return JSONResponse(
+                    body, status_code=status, headers={"idempotent-replayed": "true"}
+                )
+            response = await call_next(request)
+            body = json.loads(
+                b"".join([chunk async for chunk in response.body_iterator])
+            )
+            if response.status_code < 500:
+                replays[key] = (response.status_code, body)
+            return JSONResponse(body, status_code=response.status_code)
+        return await call_next(request)
+
+    @app.post("/v1/payment_intents")
+    async def create_payment_intent(request: Request):
+        params = _parse_form(list((await request.form()).multi_items()))
+        if "amount" not in params or "currency" not in params:
+            missing = "amount" if "amount" not in params else "currency"
+            return _error(
+                400,
+                f"Missing required param: {missing}.",
+                kind="invalid_request_error",
+                param=missing,
+            )
+
+        intent_id = f"pi_{secrets.token_hex(12)}"
+        intent = {
+            "id": intent_id,
+            "object": "payment_intent",
+            "amount": int(params["amount"]),
+            "currency": params["currency"],
+            "client_secret": f"{intent_id}_secret_{secrets.token_hex(12)}",
+            "status": "requires_payment_method",
+            "metadata": params.get("metadata", {}),
+            "created": int(time.time()),
+            "livemode": False,
+        }
+        intents[intent_id] = intent
+        return intent
+
+    @app.get("/v1/payment_intents/{intent_id}")
+    async def retrieve_payment_intent(intent_id: str):
+        if intent_id not in intents:
+            return _not_found("payment_intent", intent_id)
+        return intents[intent_id]
+
+    @app.post("/v1/payment_intents/{intent_id}/cancel")
+    async def cancel_payment_intent(intent_id: str):
+        intent = intents.get(intent_id)
+        if intent is None:
+            return _not_found("payment_intent", intent_id)
+        intent["status"] = "canceled"
+        return intent
+
+    @app.post("/v1/refunds")
+    async def create_refund(request: Request):
+        params = _parse_form(list((await request.form()).multi_items()))
+        intent = intents.get(params.get("payment_intent", ""))
+        if intent is None:
+            return _not_found("payment_intent", params.get("payment_intent", ""))
+
+        refund = {
+            "id": f"re_{secrets.token_hex(12)}",
+            "object": "refund",
+            "amount": int(params.get("amount", intent["amount"])),
+            "currency": intent["currency"],
+            "payment_intent": intent["id"],
+            "status": "pending",
+            "created": int(time.time()),
+        }
+        return refund
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(latency=args.latency_ms / 1000),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning",
+    )
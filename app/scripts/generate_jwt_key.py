@@ -0,0 +1,35 @@
+"""
+Print a new JWT signing key (PEM) for JWT_PRIVATE_KEY_FILES.
+
+    python -m app.scripts.generate_jwt_key --alg EdDSA > jwt-2026-10.pem
+
+To rotate, put the new file first in JWT_PRIVATE_KEY_FILES and keep the
+old one after it until the longest-lived tokens it signed have expired.
+"""
+
+import argparse
+import sys
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+
+def generate(algorithm: str) -> bytes:
+    if algorithm == "EdDSA":
+        key = ed25519.Ed25519PrivateKey.generate()
+    elif algorithm == "ES256":
+        key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        raise ValueError(f"Unsupported algorithm {algorithm}")
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--alg", choices=["EdDSA", "ES256"], default="EdDSA")
+    args = parser.parse_args()
+    sys.stdout.write(generate(args.alg).decode())
@@ -1,13 +1,15 @@
 import logging
 from uuid import UUID
 
-from fastapi import BackgroundTasks, HTTPException
+from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from app.core.exceptions import AuthenticationFailed
+from app.core.password_hasher import password_hasher
+from app.core.principal_cache import principal_cache
+from app.core.refresh_tokens import refresh_tokens
 from app.core.roles import UserRole
-from app.core.security import hash_password
 from app.crud.user import UserCRUD
 from app.models.user import User
 from app.schemas.pharmacist import PharmacistApproveSchema
@@ -25,9 +27,7 @@ class AdminPharmacistService:
         self.session = session
         self.notification_service = notification_service
 
-    async def register_pharmacist(
-        self, user_in: dict, background_tasks: BackgroundTasks
-    ) -> User:
+    async def register_pharmacist(self, user_in: dict) -> User:
         """Handles logic for pharmacist registration."""
         email = user_in["email"].lower()
 
@@ -42,7 +42,7 @@ class AdminPharmacistService:
         user_data = {
             **user_in,
             "email": email,
-            "hashed_password": hash_password(password),
+            "hashed_password": await password_hasher.hash(password),
             "role": UserRole.PHARMACIST,
         }
 
@@ -50,10 +50,6 @@ class AdminPharmacistService:
 
             new_pharmacist = await self.user_crud.create_user(user_data)
 
-            # Commit
-            await self.session.commit()
-            await self.session.refresh(new_pharmacist)
-
             # Unified Notification Logic
             if not new_pharmacist.license_verified:
                 msg = f"Hi {new_pharmacist.full_name}, your account is created. Please submit your license for activation."
@@ -62,14 +58,19 @@ class AdminPharmacistService:
                     f"Hi {new_pharmacist.full_name}, your pharmacist account is ready!"
                 )
 
-            background_tasks.add_task(
-                self.notification_service.notify,
+            await self.notification_service.enqueue(
+                self.session,
+                dedup_key=f"pharmacist-welcome:{new_pharmacist.id}",
                 email=new_pharmacist.email,
                 phone=None,
                 channels=["email"],
                 message=msg,
             )
 
+            # Commit
+            await self.session.commit()
+            await self.session.refresh(new_pharmacist)
+
             logger.info(f"Pharmacist registered: {new_pharmacist.id}")
 
             return new_pharmacist
@@ -79,7 +80,7 @@ class AdminPharmacistService:
             logger.error(f"Pharmacist registration Failed: {str(e)}")
             raise
 
-    async def deactivate_pharmacist_by_email(self, email: str) -> None:
+    async def deactivate_pharmacist_by_email(self, email: str) -> User:
         """
         Soft-deletes and anonymizes a pharmacist account.
         """
@@ -110,8 +111,12 @@ class AdminPharmacistService:
             logger.error(f"Error deactivating pharmacist {email}: {str(e)}")
             raise
 
-    async def get_pharmacist_list(self, skip: int, limit: int):
-        return await self.user_crud.get_all_pharmacists(skip=skip, limit=limit)
+        await principal_cache.invalidate(user.id)
+        await refresh_tokens.revoke_user(user.id)
+        return user
+
+    async def get_pharmacist_list(self, cursor: str | None, limit: int):
+        return await self.user_crud.get_all_pharmacists(cursor=cursor, limit=limit)
 
     async def approve_pharmacist_account(
         self,
@@ -5,6 +5,7 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+from app.core.hot_stock import hot_stock
 from app.crud.product import CRUDProduct
 from app.models.product import Product
 from app.schemas.product import ProductCreate
@@ -25,12 +26,14 @@ class AdminProductService:
         await self.session.refresh(product)
         return product
 
-    async def get_admin_catalog(self, skip: int = 0, limit: int = 20):
+    async def get_admin_catalog(self, cursor: str | None = None, limit: int = 20):
         """
         Fetches full product list including inactive items.
-        Returns a list of products
+        Returns a page of products
         """
-        return await self.product_crud.get_multi_product_admin(skip=skip, limit=limit)
+        return await self.product_crud.get_multi_product_admin(
+            cursor=cursor, limit=limit
+        )
 
     async def toggle_active_status(self, product_id: UUID):
         """Business logic to flip a product's active status."""
@@ -48,6 +51,8 @@ class AdminProductService:
             f"set to {'ACTIVE' if product.is_active else 'INACTIVE'}"
         )
 
+        await self.session.flush()
+        await self.product_crud.catalog_changed([product.id])
         await self.session.commit()
         await self.session.refresh(product)
 
@@ -57,6 +62,38 @@ class AdminProductService:
             "message": "Product status updated successfully.",
         }
 
+    async def toggle_hot_stock(self, product_id: UUID, redis):
+        """
+        Switch a product between row-locked checkouts and Redis counter
+        admission (app.core.hot_stock), e.g. for the length of a promotion.
+        """
+        product = await self.session.get(Product, product_id)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
+            )
+
+        product.hot_stock = not product.hot_stock
+        await self.session.commit()
+
+        if product.hot_stock:
+            await self.product_crud.load_hot_stock(redis, [product.id])
+            await self.session.commit()
+        else:
+            # Units it already sold are still deducted by the hot stock worker
+            await hot_stock.disable(redis, product.id)
+
+        logger.info(
+            f"ADMIN ACTION: Product {product.id} ({product.name}) "
+            f"hot stock {'ON' if product.hot_stock else 'OFF'}"
+        )
+
+        return {
+            "id": product.id,
+            "hot_stock": product.hot_stock,
+            "message": "Product stock mode updated successfully.",
+        }
+
     async def remove_inventory_batch(self, batch_number: str, admin_email: str):
         """Service logic to remove a batch and log the administrator responsible."""
         success = await self.product_crud.delete_batch_by_number(batch_number)
@@ -1,19 +1,19 @@
 import logging
-from uuid import UUID
 
 import jwt
-from fastapi import BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.config import settings
-from app.core.exceptions import AuthenticationFailed, PasswordVerificationError
-from app.core.roles import UserRole
-from app.core.security import (
-    create_access_token,
-    create_refresh_token,
-    hash_password,
-    verify_password,
+from app.core.exceptions import (
+    AuthenticationFailed,
+    PasswordHasherBusy,
+    PasswordVerificationError,
 )
+from app.core.jwt_keys import jwt_keyring
+from app.core.password_hasher import password_hasher
+from app.core.refresh_tokens import refresh_tokens
+from app.core.roles import UserRole
+from app.core.security import create_access_token, password_needs_rehash
+from app.core.token_versions import token_versions
 from app.crud.user import UserCRUD
 from app.services.notification.notification_service import NotificationService
 
@@ -29,7 +29,7 @@ class AuthService:
         self.session = session
         self.notification_service = notification_service
 
-    async def register_customer(self, user_in: dict, background_tasks: BackgroundTasks):
+    async def register_customer(self, user_in: dict):
         email = user_in["email"].lower()
 
         # Logic: Check existence
@@ -42,7 +42,7 @@ class AuthService:
         user_data = {
             **user_in,
             "email": email,
-            "hashed_password": hash_password(user_in["password"]),
+            "hashed_password": await password_hasher.hash(user_in["password"]),
             "role": UserRole.CUSTOMER,
         }
         user_data.pop("password", None)
@@ -50,20 +50,20 @@ class AuthService:
         try:
             # CRUD: Save to database
             new_customer = await self.user_crud.create_user(user_data)
-            await self.session.commit()
-            await self.session.refresh(new_customer)
-
-            # Logic: Token Generation
-            access_token = create_access_token(new_customer)
-            refresh_token = create_refresh_token(new_customer)
-
-            background_tasks.add_task(
-                self.notification_service.notify,
+            await self.notification_service.enqueue(
+                self.session,
+                dedup_key=f"welcome:{new_customer.id}",
                 email=new_customer.email,
                 phone=None,
                 channels=["email"],
                 message=f"Welcome {new_customer.full_name}, your account is ready.",
             )
+            await self.session.commit()
+            await self.session.refresh(new_customer)
+
+            # Logic: Token Generation
+            access_token = create_access_token(new_customer)
+            refresh_token = await refresh_tokens.issue(new_customer)
 
             logger.info(f"User registered successfully: {new_customer.id}")
 
@@ -87,12 +87,16 @@ class AuthService:
         """
         email = email.lower()
 
+        # Fast path: when the hashing pool is saturated, refuse (503) before
+        # spending a query on a login that could not be verified anyway
+        password_hasher.check_capacity()
+
         # Fetch user via CRUD
         user = await self.user_crud.get_by_email(email)
 
         # Verify identity and status
         # check both user existence and password in one block to prevent timing attacks that could reveal if an email exists.
-        if not user or not verify_password(password, user.hashed_password):
+        if not user or not await password_hasher.verify(password, user.hashed_password):
             logger.warning(f"Login failed: Invalid credentials for {email}")
             raise PasswordVerificationError("Invalid email or password.")
 
@@ -102,12 +106,17 @@ class AuthService:
                 "User account is inactive. Please contact support."
             )
 
+        if password_needs_rehash(user.hashed_password, password_hasher.rounds):
+            await self._rehash(user, password)
+
         # Generate tokens
         logger.info(f"Login successful: User {user.id}")
 
         return {
-            "access_token": create_access_token(user),
-            "refresh_token": create_refresh_token(user),
+            "access_token": create_access_token(
+                user, version=await token_versions.current(user.id)
+            ),
+            "refresh_token": await refresh_tokens.issue(user),
             "token_type": "bearer",
             "user": {
                 "id": user.id,
@@ -117,41 +126,61 @@ class AuthService:
             },
         }
 
-    async def refresh_access_token(self, refresh_token: str) -> dict:
+    async def _rehash(self, user, password: str) -> None:
         """
-        Validates a refresh token and issues a new access token.
+        Re-hash a password stored with another bcrypt cost factor, now that
+        we have it in plain text, so changing bcrypt_rounds takes effect at
+        each user's next login. Best effort: the login succeeds regardless.
         """
         try:
-            # Decode and Validate JWT
-            payload = jwt.decode(
-                refresh_token, settings.secret_key, algorithms=[settings.jwt_algorithm]
-            )
+            user.hashed_password = await password_hasher.hash(password)
+            await self.session.commit()
+        except PasswordHasherBusy:
+            return  # next login
+        except Exception:
+            await self.session.rollback()
+            logger.exception(f"Password rehash failed for user {user.id}")
+            return
 
-            # Check Token Type
-            if payload.get("type") != "refresh":
-                raise AuthenticationFailed("Invalid token type")
+        password_hasher.rehashed.inc()
+        logger.info(f"Password rehashed with the current cost for user {user.id}")
 
-            user_id = payload.get("sub")
-            if not user_id:
-                raise AuthenticationFailed("Token payload missing subject")
+    def _decode_refresh_token(self, refresh_token: str) -> dict:
+        try:
+            payload = jwt_keyring.decode(refresh_token)
+        except jwt.PyJWTError as e:
+            logger.error(f"Refresh token validation failed: {str(e)}")
+            raise AuthenticationFailed("Token expired or invalid")
 
-            # Fetch User via CRUD
-            user = await self.user_crud.get_by_id(UUID(user_id))
+        # Check Token Type
+        if payload.get("type") != "refresh":
+            raise AuthenticationFailed("Invalid token type")
+        if not payload.get("sub"):
+            raise AuthenticationFailed("Token payload missing subject")
+        return payload
 
-            # Identity & Status Check
-            if not user or not user.is_active:
-                logger.warning(f"Refresh failed: User {user_id} not found or inactive")
-                raise AuthenticationFailed("User not found or inactive")
+    async def refresh_access_token(self, refresh_token: str) -> dict:
+        """
+        Validates a refresh token and issues a new access token, rotating
+        the refresh token: the presented one is spent and a new one returned.
 
-            # Generate New Access Token
-            logger.info(f"Access token refreshed for user: {user.id}")
-            new_access_token = create_access_token(user)
+        No DB read: the token store (Redis) says whether the token is still
+        usable, and deactivating a user revokes all of their tokens there.
+        """
+        payload = self._decode_refresh_token(refresh_token)
+        new_refresh_token = await refresh_tokens.rotate(payload)
 
-            return {
-                "access_token": new_access_token,
-                "token_type": "bearer",
-            }
+        logger.info(f"Access token refreshed for user: {payload['sub']}")
+        return {
+            "access_token": create_access_token(
+                payload, version=await token_versions.current(payload["sub"])
+            ),
+            "refresh_token": new_refresh_token,
+            "token_type": "bearer",
+        }
 
-        except (jwt.PyJWTError, ValueError) as e:
-            logger.error(f"Refresh token validation failed: {str(e)}")
-            raise AuthenticationFailed("Token expired or invalid")
+    async def logout(self, refresh_token: str) -> None:
+        """Revoke the refresh token's family (this login, on this device)."""
+        payload = self._decode_refresh_token(refresh_token)
+        await refresh_tokens.revoke(payload)
+        logger.info(f"Logout: refresh tokens revoked for user {payload['sub']}")
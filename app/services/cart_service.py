@@ -1,23 +1,62 @@
-from datetime import datetime, timezone
+from collections import defaultdict
 from uuid import UUID
 
 from fastapi import HTTPException
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from app.crud.cart import CartCRUD
-from app.models.cart import CartItem
-from app.models.inventory import InventoryBatch
+from app.crud.product import CRUDProduct, SellableStock
 
 
 class CartService:
-    CART_TTL = 1209600  # 14 days
+    CART_TTL = CartCRUD.CART_TTL
 
     def __init__(self, session: AsyncSession):
         self.cart_crud = CartCRUD(session)
+        self.product_crud = CRUDProduct(session)
         self.session = session
 
+    async def validate_cart(
+        self, items: list[dict], *, lock: bool = False, unlocked=()
+    ) -> dict[UUID, SellableStock]:
+        """
+        Check every cart line against sellable stock with one query.
+        Quantities are summed across all sellable batches of a product.
+        Returns the stock per product so callers can reuse names/prices;
+        lock=True keeps it valid until the transaction ends, except for
+        the products in unlocked (see CRUDProduct.get_sellable_stock).
+        """
+        requested: dict[UUID, int] = defaultdict(int)
+        for item in items:
+            requested[UUID(str(item["product_id"]))] += item["quantity"]
+
+        stock = await self.product_crud.get_sellable_stock(
+            requested.keys(), lock=lock, unlocked=unlocked
+        )
+
+        missing = [
+            str(product_id) for product_id in requested if product_id not in stock
+        ]
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Product not found: {', '.join(missing)}",
+            )
+
+        short = [
+            f"{stock[product_id].name} (available: {stock[product_id].available})"
+            for product_id, quantity in requested.items()
+            if quantity > stock[product_id].available
+        ]
+        if short:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Requested quantity exceeds available stock: {', '.join(short)}",
+            )
+
+        return stock
+
     async def get_cart(self, redis, user_id: UUID):
         """
         Retrieve cart from Redis first, fallback to DB.
@@ -25,8 +64,9 @@ class CartService:
         # Try Redis
         items = await self.cart_crud.get_redis_items(redis, user_id)
 
-        # If empty, try DB and repopulate Redis
-        if not items:
+        # Not in Redis (and no pending sync): try DB and repopulate Redis
+        if items is None:
+            items = []
             db_items = await self.cart_crud.get_db_items(user_id)
             if db_items:
                 items = [
@@ -37,6 +77,10 @@ class CartService:
                     redis, user_id, items, self.CART_TTL
                 )
 
+        return self._summary(items)
+
+    @staticmethod
+    def _summary(items: list[dict]) -> dict:
         return {
             "items": items,
             "total_items": sum(i["quantity"] for i in items),
@@ -51,7 +95,9 @@ class CartService:
     ):
         """
         Add an item to the cart (Redis-first).
-        DB sync must be handled by the router via BackgroundTasks.
+        The stock cap is enforced atomically in Redis, so concurrent adds
+        from several tabs cannot overshoot it or lose each other's updates.
+        The DB copy is written behind by the cart sync worker.
         """
         if quantity <= 0:
             raise HTTPException(
@@ -59,50 +105,39 @@ class CartService:
                 detail="Quantity must be positive",
             )
 
-        # Get existing cart to see current quantity
-        cart = await self.get_cart(redis, user_id)
-        items = cart["items"]
+        # Stock across all sellable batches caps the line total
+        stock = await self.product_crud.get_sellable_stock([product_id])
 
-        current_qty_in_cart = next(
-            (i["quantity"] for i in items if i["product_id"] == str(product_id)), 0
-        )
-        target_quantity = current_qty_in_cart + quantity
-
-        # Stock validation (FEFO + timezone-safe)
-        batch = await self.session.scalar(
-            select(InventoryBatch)
-            .where(
-                InventoryBatch.product_id == product_id,
-                InventoryBatch.is_blocked.is_(False),
-                InventoryBatch.expiry_date > datetime.now(timezone.utc),
-                InventoryBatch.current_quantity >= target_quantity,
+        if product_id not in stock:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
             )
-            .order_by(InventoryBatch.expiry_date.asc())
+
+        cap = stock[product_id].available
+        result, items = await self.cart_crud.add_quantity(
+            redis, user_id, product_id, quantity, cap=cap, ttl=self.CART_TTL
         )
 
-        if not batch:
+        if result == CartCRUD.MISSING:
+            # Not in Redis: restore any DB cart first, then add
+            await self.get_cart(redis, user_id)
+            result, items = await self.cart_crud.add_quantity(
+                redis,
+                user_id,
+                product_id,
+                quantity,
+                cap=cap,
+                ttl=self.CART_TTL,
+                create=True,
+            )
+
+        if result == CartCRUD.OVER_CAP:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Cannot add {quantity} more. Total exceeds available stock.",
             )
 
-        # Update items list
-        found = False
-        for item in items:
-            if item["product_id"] == str(product_id):
-                item["quantity"] = target_quantity
-                found = True
-                break
-        if not found:
-            items.append({"product_id": str(product_id), "quantity": quantity})
-
-        # Save to Redis immediately
-        await self.cart_crud.set_redis_items(redis, user_id, items, self.CART_TTL)
-
-        return {
-            "items": items,
-            "total_items": sum(i["quantity"] for i in items),
-        }
+        return self._summary(items)
 
     async def update_item(
         self,
@@ -115,42 +150,31 @@ class CartService:
         Update quantity of an item in the cart.
         If quantity == 0 → remove item.
         """
-        cart = await self.get_cart(redis, user_id)
+        if quantity > 0:
+            await self.validate_cart([{"product_id": product_id, "quantity": quantity}])
+
+        result, items = await self.cart_crud.set_quantity(
+            redis, user_id, product_id, quantity, ttl=self.CART_TTL
+        )
 
-        if cart["total_items"] == 0:
+        if result == CartCRUD.MISSING:
+            await self.get_cart(redis, user_id)
+            result, items = await self.cart_crud.set_quantity(
+                redis, user_id, product_id, quantity, ttl=self.CART_TTL
+            )
+
+        if result == CartCRUD.MISSING:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Cart is empty"
             )
 
-        items = cart["items"]
-        updated_items = []
-        found = False  # Initialize a flag
-
-        for item in items:
-            if item["product_id"] == str(product_id):
-                found = True  # Mark as found
-                if quantity > 0:
-                    updated_items.append(
-                        {"product_id": str(product_id), "quantity": quantity}
-                    )
-                # If quantity == 0, we simply don't append it (effectively removing it)
-            else:
-                updated_items.append(item)
-
         # Check if the item was actually in the cart
-        if not found:
+        if result == CartCRUD.NOT_IN_CART:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Item not found in cart"
             )
 
-        await self.cart_crud.set_redis_items(
-            redis, user_id, updated_items, self.CART_TTL
-        )
-
-        return {
-            "items": updated_items,
-            "total_items": sum(i["quantity"] for i in updated_items),
-        }
+        return self._summary(items)
 
     async def remove_item(
         self,
@@ -161,52 +185,21 @@ class CartService:
         """
         Remove a single product from the cart.
         """
-        cart = await self.get_cart(redis, user_id)
-        items = cart["items"]
-
-        updated_items = [
-            item for item in items if item["product_id"] != str(product_id)
-        ]
-
-        await self.cart_crud.set_redis_items(
-            redis, user_id, updated_items, self.CART_TTL
+        result, items = await self.cart_crud.remove_product(
+            redis, user_id, product_id, ttl=self.CART_TTL
         )
 
-        return {
-            "items": updated_items,
-            "total_items": sum(i["quantity"] for i in updated_items),
-        }
-
-    async def sync_to_db(
-        self,
-        user_id: UUID,
-        items: list,
-    ):
-        """
-        Sync Redis cart to PostgreSQL.
-        Must be called from router BackgroundTasks.
-        """
-        try:
-            await self.cart_crud.clear_db_cart(user_id)
-
-            for item in items:
-                self.session.add(
-                    CartItem(
-                        user_id=user_id,
-                        product_id=UUID(item["product_id"]),
-                        quantity=item["quantity"],
-                        price_at_add=0.0,
-                    )
-                )
-
-            await self.session.commit()
+        if result == CartCRUD.MISSING:
+            await self.get_cart(redis, user_id)
+            result, items = await self.cart_crud.remove_product(
+                redis, user_id, product_id, ttl=self.CART_TTL
+            )
 
-        except Exception:
-            await self.session.rollback()
+        return self._summary(items)
 
     async def clear_all(self, redis, user_id: UUID):
         """
-        Clear cart from Redis and DB.
+        Clear the cart. Redis is cleared now; the cart sync worker deletes
+        the DB rows.
         """
-        await self.cart_crud.delete_redis_cart(redis, user_id)
-        await self.cart_crud.clear_db_cart(user_id)
+        await self.cart_crud.clear_redis_cart(redis, user_id)
@@ -1,19 +1,23 @@
 import json
-from datetime import datetime, timezone
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+from app.core.exceptions import InsufficientStockError
+from app.core.hot_stock import hot_stock
 from app.crud.order import OrderCRUD
+from app.crud.product import CRUDProduct
+from app.crud.stock_reservation import StockReservationCRUD
 from app.db.enums import OrderStatus
-from app.models.inventory import InventoryBatch
 from app.models.order import Order
 from app.models.order_item import OrderItem
-from app.models.product import Product
 from app.services.cart_service import CartService
 
 
@@ -22,6 +26,7 @@ class CheckoutService:
 
     def __init__(self, session: AsyncSession):
         self.order_crud = OrderCRUD(session)
+        self.product_crud = CRUDProduct(session)
         self.cart_service = CartService(session)
         self.session = session
 
@@ -48,78 +53,15 @@ class CheckoutService:
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Cart is empty"
             )
 
-        total = Decimal("0.00")
-        requires_prescription = False
-        now = datetime.now(timezone.utc)
-
-        # Create order shell
-        order = Order(
-            customer_id=user_id,
-            status=OrderStatus.CHECKOUT_STARTED,
-            total_amount=Decimal("0.00"),
-        )
-        self.session.add(order)
-        await self.session.flush()  # get order.id
-
-        # Validate inventory + build order items
+        requested: dict[UUID, int] = defaultdict(int)
         for item in cart["items"]:
-            product = await self.session.get(Product, UUID(item["product_id"]))
-
-            if not product:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Product {item.product_id} not found",
-                )
-
-            quantity = item["quantity"]
-
-            # Find first available unexpired batch for this product
-            batch = await self.session.scalar(
-                select(InventoryBatch)
-                .where(
-                    InventoryBatch.product_id == product.id,
-                    InventoryBatch.is_blocked.is_(False),
-                    InventoryBatch.current_quantity >= quantity,
-                    InventoryBatch.expiry_date > now,
-                )
-                .order_by(InventoryBatch.expiry_date.asc())
-            )
-
-            if not batch:
-                await self.session.rollback()
-                raise HTTPException(
-                    status=status.HTTP_400_BAD_REQUEST,
-                    detail=f"No sellable stock for {product.name}",
-                )
-
-            if product.prescription_required:
-                requires_prescription = True
-
-            unit_price = batch.price
-            quantity = item["quantity"]
-
-            total += unit_price * quantity
+            requested[UUID(item["product_id"])] += item["quantity"]
 
-            self.session.add(
-                OrderItem(
-                    order_id=order.id,
-                    product_id=product.id,
-                    quantity=quantity,
-                    price_at_purchase=unit_price,
-                )
+        async with self._hot_stock_hold(redis, requested) as hot:
+            order, total, requires_prescription = await self._place_order(
+                user_id, cart["items"], hot
             )
 
-        # Finalize order
-        order.total_amount = total
-        order.requires_prescription = requires_prescription
-        order.status = (
-            OrderStatus.AWAITING_PRESCRIPTION
-            if requires_prescription
-            else OrderStatus.READY_FOR_PAYMENT
-        )
-
-        await self.session.commit()
-
         # Create Redis checkout session
         await redis.set(
             f"checkout:{user_id}",
@@ -143,6 +85,103 @@ class CheckoutService:
             "next_step": ("UPLOAD_PRESCRIPTION" if requires_prescription else "PAY"),
         }
 
+    async def _place_order(self, user_id: UUID, items: list[dict], hot):
+        """Write and reserve the order for a validated cart, and commit."""
+        # Validate and price every line in one query, with the products
+        # locked until the commit below, so the stock and FEFO prices the
+        # order is built from are still there when it is reserved. Hot
+        # products were admitted by their counter instead; only their
+        # allocation is serialized (see CRUDProduct.lock_allocation).
+        stock = await self.cart_service.validate_cart(items, lock=True, unlocked=hot)
+
+        lines = [(stock[UUID(item["product_id"])], item["quantity"]) for item in items]
+        total = sum(
+            (product.unit_price * quantity for product, quantity in lines),
+            Decimal("0.00"),
+        )
+        requires_prescription = any(
+            product.prescription_required for product, _ in lines
+        )
+
+        order = Order(
+            customer_id=user_id,
+            status=(
+                OrderStatus.AWAITING_PRESCRIPTION
+                if requires_prescription
+                else OrderStatus.READY_FOR_PAYMENT
+            ),
+            total_amount=total,
+            requires_prescription=requires_prescription,
+        )
+        self.session.add(order)
+        await self.session.flush()  # get order.id
+
+        # All lines in one multi-row INSERT
+        await self.session.execute(
+            insert(OrderItem),
+            [
+                {
+                    "order_id": order.id,
+                    "product_id": product.product_id,
+                    "quantity": quantity,
+                    "price_at_purchase": product.unit_price,
+                }
+                for product, quantity in lines
+            ],
+        )
+
+        # Hold the stock until the checkout session ends
+        await self._reserve(
+            order.id,
+            [(product.product_id, quantity) for product, quantity in lines],
+            hot,
+        )
+
+        await self.session.commit()
+        return order, total, requires_prescription
+
+    @asynccontextmanager
+    async def _hot_stock_hold(self, redis, items: dict[UUID, int]):
+        """
+        Take the hot products' units from their Redis counters for the
+        block, which reserves them in Postgres: given back if it raises,
+        settled once it is done. Yields the hot products. 409 if a counter
+        is short.
+        """
+        token = uuid4().hex
+        try:
+            taken = await hot_stock.take(redis, token, items)
+        except InsufficientStockError as e:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Some items are no longer in stock",
+            ) from e
+
+        try:
+            yield taken.keys()
+        except BaseException:
+            await hot_stock.give_back(redis, token, taken)
+            raise
+        if taken:
+            await hot_stock.settle(redis, token)
+
+    async def _reserve(self, order_id: UUID, items, hot=()) -> None:
+        """Reserve the order's stock for CHECKOUT_TTL; 409 if it is gone."""
+        try:
+            await StockReservationCRUD(self.session).reserve(
+                order_id=order_id,
+                items=items,
+                expires_at=datetime.now(timezone.utc)
+                + timedelta(seconds=self.CHECKOUT_TTL),
+                unrefreshed=hot,
+            )
+        except InsufficientStockError as e:
+            await self.session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Some items are no longer in stock",
+            ) from e
+
     async def resume_checkout(
         self,
         *,
@@ -171,6 +210,26 @@ class CheckoutService:
                 detail=f"Order cannot be resumed (status={order.status})",
             )
 
+        # Hold the stock again for the new session (the checkout's
+        # reservation has usually expired during prescription review)
+        lines = (
+            await self.session.execute(
+                select(OrderItem.product_id, OrderItem.quantity).where(
+                    OrderItem.order_id == order.id
+                )
+            )
+        ).all()
+        requested: dict[UUID, int] = defaultdict(int)
+        for product_id, quantity in lines:
+            requested[product_id] += quantity
+
+        async with self._hot_stock_hold(redis, requested) as hot:
+            locked = requested.keys() - hot
+            if locked:
+                await self.product_crud.lock_products(locked)
+            await self._reserve(order.id, lines, hot)
+            await self.session.commit()
+
         # Create fresh Redis checkout session
         await redis.set(
             f"checkout:{user_id}",
@@ -1,38 +1,266 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
 from io import BytesIO
+from typing import Iterable, Sequence
+from uuid import UUID
 
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import getFont, stringWidth
 from reportlab.pdfgen import canvas
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.order import Order
+from app.models.order_item import OrderItem
+
+logger = logging.getLogger(__name__)
+
+render_ms = metrics.histogram("invoice.render_ms")
+
+# Page layout (points, A4 portrait)
+PAGE_WIDTH, PAGE_HEIGHT = A4
+LEFT, RIGHT = 60, PAGE_WIDTH - 60
+FIRST_ROW_Y = PAGE_HEIGHT - 130
+BOTTOM_Y = 90
+ROW_HEIGHT = 18
+ROWS_PER_PAGE = int((FIRST_ROW_Y - BOTTOM_Y) // ROW_HEIGHT)
+
+FONT, FONT_BOLD, FONT_SIZE = "Helvetica", "Helvetica-Bold", 10
+NAME_WIDTH = 290
+# Item and Qty are left-aligned at their x; the prices right-aligned
+ITEM_X, QTY_X, UNIT_PRICE_X, AMOUNT_X = LEFT, LEFT + 310, LEFT + 400, RIGHT
+
+
+@dataclass(frozen=True)
+class InvoiceLine:
+    name: str
+    quantity: int
+    unit_price: Decimal
+
+    @property
+    def amount(self) -> Decimal:
+        return self.unit_price * self.quantity
+
+
+@dataclass(frozen=True)
+class InvoiceSnapshot:
+    """
+    Everything an invoice shows, detached from the ORM so it can be pickled
+    to a render process and rendered after the session is gone.
+    """
+
+    order_id: str
+    paid_at: datetime | None
+    total: Decimal
+    lines: tuple[InvoiceLine, ...]
+
+    @classmethod
+    def from_order(cls, order: Order) -> "InvoiceSnapshot":
+        """order must have items and their products loaded."""
+        return cls(
+            order_id=str(order.id),
+            paid_at=order.paid_at,
+            total=order.total_amount,
+            lines=tuple(
+                InvoiceLine(
+                    name=item.product.name,
+                    quantity=item.quantity,
+                    unit_price=item.price_at_purchase,
+                )
+                for item in order.items
+            ),
+        )
+
+
+def _money(amount: Decimal) -> str:
+    return f"N{amount:,.2f}"
+
+
+@lru_cache(maxsize=4096)
+def _fit(name: str) -> str:
+    """The product name, shortened with an ellipsis to fit the Item column."""
+    if stringWidth(name, FONT, FONT_SIZE) <= NAME_WIDTH:
+        return name
+    while name and stringWidth(name + "...", FONT, FONT_SIZE) > NAME_WIDTH:
+        name = name[:-1]
+    return name.rstrip() + "..."
+
+
+def _draw_chrome(p: canvas.Canvas) -> None:
+    """What every page has in common, drawn once per document as a form."""
+    p.setFont(FONT_BOLD, 18)
+    p.drawString(LEFT, PAGE_HEIGHT - 60, "E-Pharmacy")
+    p.setFont(FONT_BOLD, 14)
+    p.drawRightString(RIGHT, PAGE_HEIGHT - 60, "INVOICE")
+
+    header_y = FIRST_ROW_Y + ROW_HEIGHT
+    p.setFont(FONT_BOLD, FONT_SIZE)
+    p.drawString(ITEM_X, header_y, "Item")
+    p.drawString(QTY_X, header_y, "Qty")
+    p.drawRightString(UNIT_PRICE_X, header_y, "Unit price")
+    p.drawRightString(AMOUNT_X, header_y, "Amount")
+    p.line(LEFT, header_y - 5, RIGHT, header_y - 5)
+    p.line(LEFT, BOTTOM_Y - 15, RIGHT, BOTTOM_Y - 15)
+
+
+def _pages(lines: Sequence[InvoiceLine]) -> list[Sequence[InvoiceLine]]:
+    pages = [
+        lines[start : start + ROWS_PER_PAGE]
+        for start in range(0, len(lines), ROWS_PER_PAGE)
+    ] or [()]
+    # The total needs two rows under the last line
+    if len(pages[-1]) > ROWS_PER_PAGE - 2:
+        pages.append(())
+    return pages
 
-class InvoiceService:
-    @staticmethod
-    async def generate_pdf_bytes(order) -> BytesIO:
-        buffer = BytesIO()
-        p = canvas.Canvas(buffer)
 
-        # Header
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(100, 800, f"INVOICE - Order #{order.id}")
+def render_invoice(snapshot: InvoiceSnapshot) -> bytes:
+    """
+    Render an invoice PDF. CPU-bound and pure: runs in a render process
+    (see InvoiceRenderer), never on the event loop.
 
-        # Customer Info
-        p.setFont("Helvetica", 12)
-        p.drawString(100, 770, f"Date: {order.paid_at.strftime('%Y-%m-%d %H:%M')}")
+    Long orders continue on further pages, each with the page chrome (a
+    form XObject drawn once and referenced by every page), the order
+    number and "Page i of n"; the total ends the last page.
+    """
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+    p.setTitle(f"Invoice {snapshot.order_id}")
 
-        # Items Table
-        y = 730
-        p.drawString(100, y, "Item")
-        p.drawString(400, y, "Price")
-        p.line(100, y - 5, 500, y - 5)
+    p.beginForm("chrome")
+    _draw_chrome(p)
+    p.endForm()
 
-        for item in order.items:
-            y -= 20
-            p.drawString(100, y, f"{item.product.name} (x{item.quantity})")
-            p.drawString(400, y, f"N{item.price_at_purchase}")
+    paid = snapshot.paid_at.strftime("%Y-%m-%d %H:%M") if snapshot.paid_at else "-"
+    pages = _pages(snapshot.lines)
 
-        # Total
-        p.line(100, y - 10, 500, y - 10)
-        p.drawString(400, y - 30, f"Total: N{order.total_amount}")
+    for number, rows in enumerate(pages, start=1):
+        p.doForm("chrome")
+        p.setFont(FONT, FONT_SIZE)
+        p.drawString(LEFT, PAGE_HEIGHT - 85, f"Order #{snapshot.order_id}")
+        p.drawString(LEFT, PAGE_HEIGHT - 100, f"Date: {paid}")
+        p.drawRightString(RIGHT, BOTTOM_Y - 30, f"Page {number} of {len(pages)}")
+
+        y = FIRST_ROW_Y
+        for line in rows:
+            p.drawString(ITEM_X, y, _fit(line.name))
+            p.drawString(QTY_X, y, str(line.quantity))
+            p.drawRightString(UNIT_PRICE_X, y, _money(line.unit_price))
+            p.drawRightString(AMOUNT_X, y, _money(line.amount))
+            y -= ROW_HEIGHT
+
+        if number == len(pages):
+            p.line(UNIT_PRICE_X - 60, y + 8, RIGHT, y + 8)
+            p.setFont(FONT_BOLD, FONT_SIZE + 1)
+            p.drawRightString(
+                RIGHT, y - ROW_HEIGHT + 8, f"Total: {_money(snapshot.total)}"
+            )
 
         p.showPage()
-        p.save()
-        buffer.seek(0)
-        return buffer
+
+    p.save()
+    return buffer.getvalue()
+
+
+def _render_chunk(snapshots: list[InvoiceSnapshot]) -> list[bytes]:
+    return [render_invoice(snapshot) for snapshot in snapshots]
+
+
+def _warm_up() -> None:
+    """Render-process initializer: load the fonts' metrics before the first job."""
+    for font in (FONT, FONT_BOLD):
+        getFont(font)
+    render_invoice(
+        InvoiceSnapshot(order_id="warm-up", paid_at=None, total=Decimal(0), lines=())
+    )
+
+
+class InvoiceRenderer:
+    """
+    Renders invoices in a pool of worker processes, so PDF work uses other
+    cores and never blocks an event loop.
+
+    The pool is started on first use (spawned: forking a process that runs
+    an event loop and DB threads is unsafe) and kept for the life of the
+    process. With processes=0, invoices render on a thread instead: the loop
+    stays free, but rendering shares this process's GIL. So do daemonic
+    processes, which may not start children: Celery's prefork workers.
+    """
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self._executor: Executor | None = None
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up,
+            )
+        return self._executor
+
+    async def _submit(self, fn, arg):
+        if not self.processes or multiprocessing.current_process().daemon:
+            return await asyncio.to_thread(fn, arg)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._pool(), fn, arg
+            )
+        except BrokenProcessPool:
+            # A render process died (e.g. OOM-killed); start afresh next time
+            logger.error("Invoice render pool broke; restarting it")
+            self.shutdown(wait=False)
+            raise
+
+    async def render(self, snapshot: InvoiceSnapshot) -> bytes:
+        with render_ms.time():
+            return await self._submit(render_invoice, snapshot)
+
+    async def render_many(
+        self, snapshots: Sequence[InvoiceSnapshot], *, chunksize: int = 20
+    ) -> list[bytes]:
+        """
+        Render many invoices across the pool, chunksize per job to keep the
+        pickling round trips few. Results are in input order.
+        """
+        chunks = [
+            list(snapshots[start : start + chunksize])
+            for start in range(0, len(snapshots), chunksize)
+        ]
+        rendered = await asyncio.gather(
+            *(self._submit(_render_chunk, chunk) for chunk in chunks)
+        )
+        return [pdf for chunk in rendered for pdf in chunk]
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+invoice_renderer = InvoiceRenderer(processes=settings.invoice_render_processes)
+
+
+class InvoiceService:
+    @staticmethod
+    async def load_snapshots(
+        session: AsyncSession, order_ids: Iterable[UUID]
+    ) -> list[InvoiceSnapshot]:
+        """Snapshots of the given orders (missing ones skipped), in one query."""
+        orders = await session.scalars(
+            select(Order)
+            .options(selectinload(Order.items).selectinload(OrderItem.product))
+            .where(Order.id.in_(list(order_ids)))
+        )
+        return [InvoiceSnapshot.from_order(order) for order in orders]
@@ -1,16 +1,39 @@
+import base64
 import logging
 
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from sendgrid.helpers.mail import (
+    Attachment,
+    Disposition,
+    FileContent,
+    FileName,
+    FileType,
+    Mail,
+)
 
 from app.core.config import settings
 from app.services.notification.base import NotificationChannel
+from app.services.notification.transport import (
+    HttpTransport,
+    TransportError,
+    notification_transport,
+)
 
 logger = logging.getLogger(__name__)
 
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+
 
 class EmailNotification(NotificationChannel):
-    async def send(self, recipient: str, message: str, **kwargs) -> bool:
+    """
+    SendGrid email. The message is built with SendGrid's helpers and posted
+    to its v3 API over the shared async transport, so a send never blocks
+    the event loop.
+    """
+
+    def __init__(self, transport: HttpTransport = notification_transport):
+        self.transport = transport
+
+    def _build(self, recipient: str, message: str, **kwargs) -> dict:
         # Pull extra data out of kwargs safely
         attachment = kwargs.get("attachment")
         filename = kwargs.get("filename", "invoice.pdf")
@@ -23,16 +46,6 @@ class EmailNotification(NotificationChannel):
         )
 
         if attachment:
-            import base64
-
-            from sendgrid.helpers.mail import (
-                Attachment,
-                Disposition,
-                FileContent,
-                FileName,
-                FileType,
-            )
-
             encoded_file = base64.b64encode(attachment).decode()
             mail.add_attachment(
                 Attachment(
@@ -42,42 +55,19 @@ class EmailNotification(NotificationChannel):
                     Disposition("attachment"),
                 )
             )
+        return mail.get()
 
+    async def send(self, recipient: str, message: str, **kwargs) -> bool:
         try:
-            sg = SendGridAPIClient(settings.sendgrid_api_key)
-            # SendGrid's client is synchronous;
-            sg.send(mail)
+            await self.transport.post(
+                SENDGRID_SEND_URL,
+                json=self._build(recipient, message, **kwargs),
+                headers={
+                    "Authorization": "Bearer "
+                    + settings.sendgrid_api_key.get_secret_value()
+                },
+            )
             return True
-        except Exception as e:
-            # Handle SSL Certificate Verify Failed (Common in corporate/local envs)
-            if "CERTIFICATE_VERIFY_FAILED" in str(e):
-                logger.warning(
-                    "SSL Certificate verification failed. Retrying with unverified context."
-                )
-                import ssl
-
-                # Verify we are in a safe environment to do this?
-                # For now, we assume if it failed, we try this fallback.
-                try:
-                    # Save original context creator
-                    original_create_default_https_context = (
-                        ssl._create_default_https_context
-                    )
-                    # Bypass verification
-                    ssl._create_default_https_context = ssl._create_unverified_context
-
-                    sg_unverified = SendGridAPIClient(settings.sendgrid_api_key)
-                    sg_unverified.send(mail)
-                    logger.info("Email sent successfully with unverified context.")
-                    return True
-                except Exception as retry_e:
-                    logger.error(f"Retry failed: {retry_e}")
-                    # Fall through to return False
-                finally:
-                    # Restore original context
-                    ssl._create_default_https_context = (
-                        original_create_default_https_context
-                    )
-
+        except TransportError as e:
             logger.error(f"Email send failed: {e}")
             return False
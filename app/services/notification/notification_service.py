@@ -1,10 +1,24 @@
+import asyncio
+import logging
 from typing import List
+from uuid import UUID
 
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.notification_outbox import NotificationOutboxCRUD
 from app.services.notification.email import EmailNotification
 from app.services.notification.whatsapp import WhatsAppNotification
 
+logger = logging.getLogger(__name__)
+
 
 class NotificationService:
+    """
+    Services enqueue() notifications in the transaction of the change they
+    announce; the notifications worker (app/workers/notifications.py) later
+    notify()s them from the outbox.
+    """
+
     def __init__(self):
         self.channels = {
             "email": EmailNotification(),
@@ -20,12 +34,51 @@ class NotificationService:
         channels: List[str],
         attachment: bytes | None = None,
         filename: str = "invoice.pdf",
-    ):
-        for channel in channels:
-            if channel == "email" and email:
-                await self.channels["email"].send(
-                    email, message, attachment=attachment, filename=filename
-                )
-
-            if channel == "whatsapp" and phone:
-                await self.channels["whatsapp"].send(phone, message)
+    ) -> list[str]:
+        """
+        Send on every requested channel at once; one failing spares the rest.
+        Returns the channels that failed (none when all delivered).
+        """
+        sends = {}
+        if "email" in channels and email:
+            sends["email"] = self.channels["email"].send(
+                email, message, attachment=attachment, filename=filename
+            )
+        if "whatsapp" in channels and phone:
+            sends["whatsapp"] = self.channels["whatsapp"].send(phone, message)
+
+        results = await asyncio.gather(*sends.values(), return_exceptions=True)
+        failed = []
+        for channel, result in zip(sends, results):
+            if isinstance(result, Exception):
+                logger.error(f"Notification via {channel} failed: {result!r}")
+            if result is not True:
+                failed.append(channel)
+        return failed
+
+    async def enqueue(
+        self,
+        session: AsyncSession,
+        *,
+        dedup_key: str,
+        email: str | None,
+        phone: str | None,
+        message: str,
+        channels: List[str],
+        invoice_order_id: UUID | None = None,
+    ) -> bool:
+        """
+        Queue a notification in session's open transaction (see
+        NotificationOutboxCRUD.enqueue). With invoice_order_id, the order's
+        invoice is rendered and attached when the notification is sent.
+        """
+        return await NotificationOutboxCRUD(session).enqueue(
+            dedup_key,
+            {
+                "email": email,
+                "phone": phone,
+                "message": message,
+                "channels": list(channels),
+                "invoice_order_id": str(invoice_order_id) if invoice_order_id else None,
+            },
+        )
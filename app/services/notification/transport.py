@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import random
+import ssl
+
+import certifi
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Worth another attempt: throttling and provider-side failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+request_ms = metrics.histogram("notification.request_ms")
+retries = metrics.counter("notification.retries")
+failures = metrics.counter("notification.failures")
+
+
+class TransportError(Exception):
+    """A provider request that failed after every retry."""
+
+
+class HttpTransport:
+    """
+    Shared async HTTP client for notification providers.
+
+    One httpx.AsyncClient per event loop keeps TLS connections alive between
+    sends (the API has one loop; each Celery task run has its own). A
+    semaphore bounds how many requests are in flight, and failed requests
+    are retried with exponential backoff and jitter, honouring Retry-After.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int,
+        max_in_flight: int,
+        timeout: float,
+        connect_timeout: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.max_connections = max_connections
+        self.max_in_flight = max_in_flight
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Tests swap in httpx.MockTransport
+        self.transport = transport
+        self._ssl_context = ssl.create_default_context(cafile=certifi.where())
+        self._clients: dict[asyncio.AbstractEventLoop, tuple] = {}
+
+    def _client(self) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(loop)
+        if entry is None:
+            # Forget clients of loops that have since closed
+            for closed in [known for known in self._clients if known.is_closed()]:
+                del self._clients[closed]
+
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                verify=self._ssl_context,
+                transport=self.transport,
+            )
+            entry = (client, asyncio.Semaphore(self.max_in_flight))
+            self._clients[loop] = entry
+        return entry
+
+    def _backoff(self, attempt: int, response: httpx.Response | None) -> float:
+        retry_after = response.headers.get("Retry-After") if response else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        delay = min(self.backoff_base * 2 ** (attempt - 1), self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        """POST with retries; raises TransportError once attempts run out."""
+        client, in_flight = self._client()
+
+        for attempt in range(1, self.max_attempts + 1):
+            response, error = None, None
+            try:
+                async with in_flight:
+                    with request_ms.time():
+                        response = await client.post(url, **kwargs)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response
+                error = f"HTTP {response.status_code}"
+            except httpx.HTTPStatusError as e:
+                # 4xx other than 429: the request itself is wrong
+                failures.inc()
+                raise TransportError(
+                    f"{url} rejected the request: {e.response.status_code} "
+                    f"{e.response.text[:200]}"
+                ) from e
+            except httpx.TransportError as e:
+                error = repr(e)
+
+            if attempt == self.max_attempts:
+                failures.inc()
+                raise TransportError(f"{url} failed after {attempt} attempts: {error}")
+
+            delay = self._backoff(attempt, response)
+            retries.inc()
+            logger.warning(
+                f"Notification request to {url} failed ({error}); "
+                f"retry {attempt}/{self.max_attempts - 1} in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        """Close the client of the running loop (at shutdown)."""
+        entry = self._clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].aclose()
+
+
+notification_transport = HttpTransport(
+    max_connections=settings.notification_max_connections,
+    max_in_flight=settings.notification_max_in_flight,
+    timeout=settings.notification_timeout,
+    connect_timeout=settings.notification_connect_timeout,
+    max_attempts=settings.notification_max_attempts,
+    backoff_base=settings.notification_backoff_base,
+    backoff_max=settings.notification_backoff_max,
+)
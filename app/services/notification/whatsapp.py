@@ -2,6 +2,7 @@ from app.services.notification.base import NotificationChannel
 
 
 class WhatsAppNotification(NotificationChannel):
-    async def send(self, recipient: str, message: str, **kwargs):
+    async def send(self, recipient: str, message: str, **kwargs) -> bool:
         # integrate Twilio / Meta WhatsApp later
         print(f"[WHATSAPP] To: {recipient} | Message: {message}")
+        return True
@@ -1,13 +1,14 @@
 import logging
 from uuid import UUID
 
-from fastapi import BackgroundTasks, HTTPException
+from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+from app.core.principal_cache import Principal
 from app.crud.order import OrderCRUD
+from app.crud.stock_reservation import StockReservationCRUD
 from app.models.order import Order, OrderStatus
-from app.models.user import User
 from app.services.notification.notification_service import NotificationService
 
 logger = logging.getLogger(__name__)
@@ -17,11 +18,16 @@ class OrderService:
     def __init__(
         self, session: AsyncSession, notification_service: NotificationService
     ):
+        self.session = session
         self.notification_service = notification_service
         self.order_crud = OrderCRUD(session)
 
-    async def list_customer_orders(self, user_id: UUID):
-        return await self.order_crud.get_customer_orders(user_id)
+    async def list_customer_orders(
+        self, user_id: UUID, cursor: str | None = None, limit: int = 20
+    ):
+        return await self.order_crud.get_customer_orders(
+            user_id, cursor=cursor, limit=limit
+        )
 
     async def get_customer_order(self, order_id: UUID) -> Order:
         order = await self.order_crud.get_by_id(order_id)
@@ -33,9 +39,7 @@ class OrderService:
 
         return order
 
-    async def cancel_order(
-        self, *, order_id: UUID, user: User, background_tasks: BackgroundTasks
-    ) -> Order:
+    async def cancel_order(self, *, order_id: UUID, user: Principal) -> Order:
         order = await self.order_crud.get_by_id(order_id)
 
         if not order:
@@ -60,16 +64,17 @@ class OrderService:
             )
 
         order.status = OrderStatus.CANCELLED
-        await self.order_crud.save(order)
-
-        logger.info(f"Order {order_id} cancelled successfully.")
-
-        background_tasks.add_task(
-            self.notification_service.notify,
+        await StockReservationCRUD(self.session).release(order.id)
+        await self.notification_service.enqueue(
+            self.session,
+            dedup_key=f"order-cancelled:{order.id}",
             email=user.email,
             phone=None,
             channels=["email"],
             message=f"Order #{str(order.id)[:8]} has been cancelled successfully",
         )
+        await self.order_crud.save(order)
+
+        logger.info(f"Order {order_id} cancelled successfully.")
 
         return order
@@ -4,32 +4,44 @@ from decimal import Decimal
 from uuid import UUID
 
 import stripe
-from fastapi import BackgroundTasks
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.core.exceptions import InsufficientStockError
+from app.core.payment_intent_cache import PaymentIntentCache, payment_intent_cache
+from app.crud.order import OrderCRUD
 from app.crud.product import CRUDProduct
+from app.crud.stock_reservation import StockReservationCRUD
+from app.crud.stripe_event import StripeEventCRUD
 from app.db.enums import OrderStatus
+from app.db.sessions import release_connection
 from app.models.order import Order
 from app.models.order_item import OrderItem
 from app.models.user import User
 from app.services.cart_service import CartService
-from app.services.invoice_service import InvoiceService
 from app.services.notification.notification_service import NotificationService
+from app.services.stripe_gateway import StripeGateway, stripe_gateway
 
 logger = logging.getLogger(__name__)
 
 CHECKOUT_TTL_SECONDS = 15 * 60
-STRIPE_EVENT_TTL = 60 * 60 * 24
 
 
 class PaymentService:
 
-    def __init__(self, db: AsyncSession, notification_service: NotificationService):
+    def __init__(
+        self,
+        db: AsyncSession,
+        notification_service: NotificationService,
+        *,
+        gateway: StripeGateway = stripe_gateway,
+        intent_cache: PaymentIntentCache = payment_intent_cache,
+    ):
         self.db = db
         self.notification_service = notification_service
+        self.gateway = gateway
+        self.intent_cache = intent_cache
 
     # CREATE PAYMENT INTENT
     async def create_payment_intent(
@@ -46,13 +58,32 @@ class PaymentService:
         if order.status != OrderStatus.READY_FOR_PAYMENT:
             raise ValueError("Order is not ready for payment")
 
-        if not await redis.exists(f"checkout:{order.customer_id}"):
+        # No connection held idle across the Redis and Stripe calls
+        await release_connection(self.db)
+
+        # The cached intent lives exactly as long as the checkout session
+        session_ttl = await redis.ttl(f"checkout:{order.customer_id}")
+        if session_ttl == -2:
             raise ValueError("Checkout session expired")
+        if session_ttl < 0:
+            session_ttl = CHECKOUT_TTL_SECONDS
 
         # Reuse existing intent
         if order.payment_intent_id:
+            cached = await self.intent_cache.get(
+                redis, order.id, order.payment_intent_id
+            )
+            if cached:
+                return {
+                    "client_secret": cached.client_secret,
+                    "order_id": order.id,
+                }
+
             try:
-                intent = stripe.PaymentIntent.retrieve(order.payment_intent_id)
+                intent = await self.gateway.retrieve_payment_intent(
+                    order.payment_intent_id
+                )
+                await self.intent_cache.set(redis, order.id, intent, ttl=session_ttl)
                 return {
                     "client_secret": intent.client_secret,
                     "order_id": order.id,
@@ -62,7 +93,7 @@ class PaymentService:
 
         amount_kobo = int(order.total_amount * Decimal("100"))
 
-        intent = stripe.PaymentIntent.create(
+        intent = await self.gateway.create_payment_intent(
             amount=amount_kobo,
             currency="ngn",
             metadata={
@@ -78,6 +109,7 @@ class PaymentService:
 
         order.payment_intent_id = intent.id
         await self.db.commit()
+        await self.intent_cache.set(redis, order.id, intent, ttl=session_ttl)
 
         return {
             "client_secret": intent.client_secret,
@@ -85,25 +117,32 @@ class PaymentService:
         }
 
     # STRIPE WEBHOOK ENTRYPOINT
-    async def handle_webhook(
+    async def record_event(self, payload: dict) -> dict:
+        """
+        Store a verified webhook event in the stripe_events inbox and commit;
+        the Stripe events worker processes it. Redelivered events are
+        recognised by their id and stored once.
+        """
+        if not payload.get("id") or not payload.get("type"):
+            return {"status": "invalid_event"}
+
+        recorded = await StripeEventCRUD(self.db).record(payload)
+        await self.db.commit()
+        return {"status": "received" if recorded else "duplicate"}
+
+    # STRIPE EVENT PROCESSING (app/workers/stripe_events.py)
+    async def process_event(
         self,
         *,
         event: stripe.Event,
         redis,
         db_factory,
-        background_tasks: BackgroundTasks,
     ) -> dict:
-        event_id = (
-            event.get("id") if isinstance(event, dict) else getattr(event, "id", None)
-        )
-        event_key = f"stripe:event:{event_id}"
-
-        # Idempotency
-        if await redis.get(event_key):
-            return {"status": "duplicate"}
-
-        await redis.set(event_key, "1", ex=STRIPE_EVENT_TTL)
-
+        """
+        Apply one stored event. Raises on errors worth retrying; the returned
+        status records the outcome otherwise. Safe to run again for the same
+        event: every handler checks the order's state first.
+        """
         event_type = (
             event.get("type")
             if isinstance(event, dict)
@@ -118,24 +157,18 @@ class PaymentService:
             return {"status": "invalid_payload"}
 
         if event_type == "payment_intent.succeeded":
-            return await self._handle_payment_succeeded(
-                data, redis, db_factory, background_tasks
-            )
+            return await self._handle_payment_succeeded(data, redis, db_factory)
 
         if event_type == "payment_intent.payment_failed":
-            return await self._handle_payment_failed(data, db_factory)
+            return await self._handle_payment_failed(data, redis, db_factory)
 
         if event_type in ("charge.refunded", "charge.refund.updated"):
-            return await self._handle_refund_succeeded(
-                data, db_factory, background_tasks
-            )
+            return await self._handle_refund_succeeded(data, redis, db_factory)
 
         return {"status": "ignored"}
 
     # PAYMENT SUCCEEDED
-    async def _handle_payment_succeeded(
-        self, intent, redis, db_factory, background_tasks: BackgroundTasks
-    ) -> dict:
+    async def _handle_payment_succeeded(self, intent, redis, db_factory) -> dict:
 
         order_id_str = intent.metadata.get("order_id")
         if not order_id_str:
@@ -143,6 +176,7 @@ class PaymentService:
             return {"status": "missing_order_id"}
 
         order_id = UUID(order_id_str)
+        await self.intent_cache.invalidate(redis, order_id)
 
         async with db_factory() as db:
             order = await db.scalar(
@@ -155,56 +189,64 @@ class PaymentService:
             if not order or order.status == OrderStatus.PAID:
                 return {"status": "already_processed"}
 
-            # Deduct inventory
+            # Deduct inventory for every line in one statement, one commit
             try:
+                reservations = StockReservationCRUD(db)
+                # Hot products' reserved units are sold as they are and
+                # deducted later in bulk, by the hot stock worker
+                sold = await reservations.sell(
+                    order_id=order.id,
+                    items=[
+                        (item.product_id, item.quantity)
+                        for item in order.items
+                        if item.product.hot_stock
+                    ],
+                )
+                # The other units reserved at checkout become a deduction
+                await reservations.consume(order.id)
                 crud_product = CRUDProduct(db)
 
-                for item in order.items:
-                    await crud_product.deduct_stock_fefo(
-                        product_id=item.product_id,
-                        quantity=item.quantity,
-                    )
+                allocations = await crud_product.deduct_stock_for_order(
+                    items=[
+                        (item.product_id, item.quantity)
+                        for item in order.items
+                        if item.product_id not in sold
+                    ]
+                )
+                OrderCRUD(db).add_allocations(order, allocations)
 
                 order.status = OrderStatus.PAID
                 order.paid_at = datetime.now(timezone.utc)
 
+                # The invoice is rendered and attached when the email is sent
+                user = await db.get(User, order.customer_id)
+                await self.notification_service.enqueue(
+                    db,
+                    dedup_key=f"payment-succeeded:{order.id}",
+                    email=user.email,
+                    phone=None,
+                    message=f"Thank you for your purchase! Order #{order.id} is being processed.",
+                    channels=["email"],
+                    invoice_order_id=order.id,
+                )
+
                 await db.commit()
                 logger.info("Inventory deducted for order %s", order.id)
 
                 try:
-                    # Clear Redis first (Independent of DB session)
                     await redis.delete(f"checkout:{order.customer_id}")
-                    await redis.delete(f"cart:{order.customer_id}")
 
-                    # Clear DB Cart using the service
-                    # We pass the active 'db' session
+                    # Clears Redis now; the cart sync worker clears the DB rows
                     cart_service = CartService(db)
                     await cart_service.clear_all(redis, order.customer_id)
-
-                    # Must commit again because clear_db_cart performs a DELETE
-                    await db.commit()
                     logger.info("Cart cleared for user %s", order.customer_id)
                 except Exception as cart_err:
                     logger.error(f"Post-payment cart cleanup failed: {cart_err}")
 
-                # handle notification
-                user = await db.get(User, order.customer_id)
-
-                invoice_bytes = await InvoiceService.generate_pdf_bytes(order)
-
-                background_tasks.add_task(
-                    self.notification_service.notify,
-                    email=user.email,
-                    phone=None,
-                    message=f"Thank you for your purchase! Order #{order.id} is being processed.",
-                    channels=["email"],
-                    attachment=invoice_bytes.getvalue(),  # Send as actual file
-                    filename=f"Invoice_{order.id}.pdf",
-                )
-
                 logger.info("Payment succeeded for order %s", order.id)
 
             except InsufficientStockError:
+                await db.rollback()
                 logger.error(
                     f"Stock ran out before payment webhook for Order {order.id}"
                 )
@@ -213,7 +255,7 @@ class PaymentService:
             except Exception:
                 await db.rollback()
                 logger.exception("Payment webhook failed")
-                return {"status": "error_handled"}
+                raise  # retried by the Stripe events worker
 
         return {"status": "ok"}
 
@@ -221,6 +263,7 @@ class PaymentService:
     async def _handle_payment_failed(
         self,
         intent,
+        redis,
         db_factory,
     ) -> dict:
         order_id_str = intent.metadata.get("order_id")
@@ -228,6 +271,7 @@ class PaymentService:
             return {"status": "missing_order_id"}
 
         order_id = UUID(order_id_str)
+        await self.intent_cache.invalidate(redis, order_id)
 
         async with db_factory() as db:
             order = await db.get(Order, order_id)
@@ -238,9 +282,7 @@ class PaymentService:
         return {"status": "payment_failed"}
 
     # REFUND SUCCEEDED → RESTORE INVENTORY
-    async def _handle_refund_succeeded(
-        self, charge, db_factory, background_tasks: BackgroundTasks
-    ) -> dict:
+    async def _handle_refund_succeeded(self, charge, redis, db_factory) -> dict:
         payment_intent_id = charge.get("payment_intent")
         if not payment_intent_id:
             return {"status": "ignored"}
@@ -250,33 +292,45 @@ class PaymentService:
                 select(Order)
                 .options(selectinload(Order.items))
                 .where(Order.payment_intent_id == payment_intent_id)
+                .with_for_update()  # Locks the order row during processing
             )
 
             if not order or order.status == OrderStatus.REFUNDED:
                 return {"status": "already_refunded"}
 
-            # Restore inventory
-            crud_product = CRUDProduct(db)
+            await self.intent_cache.invalidate(redis, order.id)
 
-            for item in order.items:
-                await crud_product.restock_product(
-                    product_id=item.product_id,
-                    quantity=item.quantity,
-                )
+            # Restock, status and email in one transaction: a retry after a
+            # failure anywhere in it starts from an untouched order
+            try:
+                # Restore inventory, once any sold units it still holds are deducted
+                await StockReservationCRUD(db).apply_sold(order_ids=[order.id])
+                crud_product = CRUDProduct(db)
 
-            order.status = OrderStatus.REFUNDED
-            order.refunded_at = datetime.utcnow()
-            await db.commit()
+                for item in order.items:
+                    await crud_product.restock_product(
+                        product_id=item.product_id,
+                        quantity=item.quantity,
+                    )
 
-            user = await db.get(User, order.customer_id)
+                order.status = OrderStatus.REFUNDED
+                order.refunded_at = datetime.utcnow()
 
-            background_tasks.add_task(
-                self.notification_service.notify,
-                email=user.email,
-                phone=None,
-                channels=["email"],
-                message=f"Payment Refunded for order: #{order.id}",
-            )
+                user = await db.get(User, order.customer_id)
+                await self.notification_service.enqueue(
+                    db,
+                    dedup_key=f"refund:{order.id}",
+                    email=user.email,
+                    phone=None,
+                    channels=["email"],
+                    message=f"Payment Refunded for order: #{order.id}",
+                )
+                await db.commit()
+
+            except Exception:
+                await db.rollback()
+                logger.exception("Refund webhook failed")
+                raise  # retried by the Stripe events worker
 
         logger.info("Refund processed for order %s", order.id)
 
@@ -292,13 +346,18 @@ class PaymentService:
         if order.status != OrderStatus.PAID:
             raise ValueError("Order is not refundable")
 
-        refund = stripe.Refund.create(
+        await release_connection(self.db)
+        refund = await self.gateway.create_refund(
             payment_intent=order.payment_intent_id,
             amount=int(amount * 100) if amount else None,
             idempotency_key=f"refund-order-{order.id}",
         )
 
-        order.status = OrderStatus.REFUND_PENDING
+        # The order's lock went with the connection: a charge.refunded event
+        # processed during the call already set REFUNDED, and stays
+        await OrderCRUD(self.db).transition(
+            order, OrderStatus.REFUND_PENDING, expected=OrderStatus.PAID
+        )
         await self.db.commit()
 
         return {
@@ -315,14 +374,27 @@ class PaymentService:
         if order.status == OrderStatus.PAID:
             raise ValueError("Paid orders must be refunded")
 
+        expected = order.status
         if order.payment_intent_id:
+            await release_connection(self.db)
             try:
-                stripe.PaymentIntent.cancel(
+                await self.gateway.cancel_payment_intent(
                     order.payment_intent_id,
                     idempotency_key=f"cancel-order-{order.id}",
                 )
             except stripe.error.StripeError:
                 pass
 
-        order.status = OrderStatus.CANCELLED
+        # Unless a payment_intent.succeeded event was processed during the
+        # call: the order is paid, and its stock sold
+        if not await OrderCRUD(self.db).transition(
+            order, OrderStatus.CANCELLED, expected=expected
+        ):
+            await self.db.rollback()
+            await self.db.refresh(order)
+            if order.status == OrderStatus.PAID:
+                raise ValueError("Paid orders must be refunded")
+            return
+
+        await StockReservationCRUD(self.db).release(order.id)
         await self.db.commit()
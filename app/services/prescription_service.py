@@ -2,10 +2,11 @@ import logging
 from datetime import datetime, timezone
 from uuid import UUID, uuid4
 
-from fastapi import BackgroundTasks, HTTPException, UploadFile
+from fastapi import HTTPException, UploadFile
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.crud.stock_reservation import StockReservationCRUD
 from app.db.enums import OrderStatus, PrescriptionStatus
 from app.models.order import Order
 from app.models.prescription import Prescription
@@ -41,11 +42,11 @@ class PrescriptionService:
         ext = "." + file.filename.split(".")[-1].lower()
         storage_key = f"prescriptions/{file_id}{ext}"
 
-        file_bytes = await file.read()
-        await self.storage.upload(
+        # Streamed from the spooled upload, not read into memory first
+        await self.storage.upload_stream(
             file_id=storage_key,
             file_name=file.filename,
-            file_bytes=file_bytes,
+            stream=file.file,
             content_type=file.content_type,
         )
 
@@ -111,7 +112,6 @@ class PrescriptionService:
         *,
         prescription_id: UUID,
         pharmacist_id: UUID,
-        background_tasks: BackgroundTasks,
     ) -> Prescription:
         prescription = await self.session.get(Prescription, prescription_id)
 
@@ -132,19 +132,19 @@ class PrescriptionService:
 
         order.status = OrderStatus.READY_FOR_PAYMENT
 
-        await self.session.commit()
-        await self.session.refresh(prescription)
-
         user = await self.session.get(User, order.customer_id)
-
-        background_tasks.add_task(
-            self.notification_service.notify,
+        await self.notification_service.enqueue(
+            self.session,
+            dedup_key=f"prescription-approved:{prescription.id}",
             email=user.email,
             phone=None,
             channels=["email"],
             message=f"Your Prescription for order: #{order.id} has been approved",
         )
 
+        await self.session.commit()
+        await self.session.refresh(prescription)
+
         logger.info(
             f"Prescription {prescription_id} {prescription.status.value} by Pharmacist {pharmacist_id}"
         )
@@ -157,7 +157,6 @@ class PrescriptionService:
         prescription_id: UUID,
         pharmacist_id: UUID,
         reason: str,
-        background_tasks: BackgroundTasks,
     ) -> Prescription:
         prescription = await self.session.get(Prescription, prescription_id)
 
@@ -177,20 +176,21 @@ class PrescriptionService:
             raise HTTPException(500, "Order linked to prescription not found")
 
         order.status = OrderStatus.CANCELLED
-
-        await self.session.commit()
-        await self.session.refresh(prescription)
+        await StockReservationCRUD(self.session).release(order.id)
 
         user = await self.session.get(User, order.customer_id)
-
-        background_tasks.add_task(
-            self.notification_service.notify,
+        await self.notification_service.enqueue(
+            self.session,
+            dedup_key=f"prescription-rejected:{prescription.id}",
             email=user.email,
             phone=None,
             channels=["email"],
             message=f"Your Prescription for order: #{order.id} was rejected reason: {prescription.rejection_reason}",
         )
 
+        await self.session.commit()
+        await self.session.refresh(prescription)
+
         logger.info(
             f"Prescription {prescription_id} {prescription.status.value} by Pharmacist {pharmacist_id}"
         )
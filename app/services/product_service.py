@@ -1,19 +1,45 @@
 import logging
+import time
 from uuid import UUID
 
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.metrics import Histogram, metrics
+from app.core.response_cache import CachedResponse, storefront_cache
+from app.core.search_index import tokenize
 from app.crud.product import CRUDProduct
-from app.schemas.product import BatchCreate
+from app.crud.storefront import CRUDStorefront
+from app.schemas.pagination import CursorPage
+from app.schemas.product import BatchCreate, StorefrontItem
 
 logger = logging.getLogger(__name__)
 
+search_ms = metrics.histogram("storefront.search_ms")
+suggest_ms = metrics.histogram("storefront.suggest_ms")
+searches_over_target = metrics.counter("storefront.searches_over_target")
+
+StorefrontPage = CursorPage[StorefrontItem]
+
+
+def _observe(histogram: Histogram, started: float, target_ms: float, query: str):
+    """Record a search latency and flag it when it misses its target."""
+    elapsed = (time.perf_counter() - started) * 1000
+    histogram.observe(elapsed)
+    if elapsed > target_ms:
+        searches_over_target.inc()
+        logger.warning(
+            f"Slow storefront search: {elapsed:.0f} ms (target {target_ms:.0f} ms) "
+            f"for {query!r}"
+        )
+
 
 class ProductService:
 
     def __init__(self, session: AsyncSession):
         self.product_crud = CRUDProduct(session)
+        self.storefront_crud = CRUDStorefront(session)
         self.session = session
 
     async def create_batch(self, product_id: UUID, batch_in: BatchCreate):
@@ -50,10 +76,54 @@ class ProductService:
         self,
         category: str = None,
         search: str = None,
-        skip: int = 0,
+        cursor: str = None,
         limit: int = 20,
     ):
-        """Fetch filtered storefront products."""
-        return await self.product_crud.get_storefront(
-            category=category, search=search, skip=skip, limit=limit
+        """
+        Fetch filtered storefront products from the storefront read model.
+        With a search term, results are ranked by relevance instead of name.
+        """
+        if not search:
+            return await self.storefront_crud.get_page(
+                category=category, cursor=cursor, limit=limit
+            )
+
+        started = time.perf_counter()
+        page = await self.storefront_crud.search(
+            search, category=category, cursor=cursor, limit=limit
         )
+        _observe(search_ms, started, settings.storefront_search_target_ms, search)
+        return page
+
+    async def get_catalog_response(
+        self,
+        category: str = None,
+        search: str = None,
+        cursor: str = None,
+        limit: int = 20,
+    ) -> CachedResponse:
+        """
+        get_catalog as serialized JSON, from the storefront response cache.
+        Queries that differ only in case or spacing share an entry.
+        """
+        params = {
+            "category": category,
+            "search": " ".join(tokenize(search)) if search else None,
+            "cursor": cursor,
+            "limit": limit,
+        }
+
+        async def compute() -> str:
+            page = await self.get_catalog(
+                category=category, search=search, cursor=cursor, limit=limit
+            )
+            return StorefrontPage.model_validate(page).model_dump_json()
+
+        return await storefront_cache.get_or_compute(params, compute)
+
+    async def suggest(self, query: str, limit: int = 8):
+        """Autocomplete: the best few storefront matches for a partial query."""
+        started = time.perf_counter()
+        page = await self.storefront_crud.search(query, limit=limit)
+        _observe(suggest_ms, started, settings.storefront_suggest_target_ms, query)
+        return page.items
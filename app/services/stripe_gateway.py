@@ -0,0 +1,169 @@
+import asyncio
+import logging
+
+import httpx
+import stripe
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpen
+from app.core.config import settings
+from app.core.exceptions import StripeUnavailable
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Stripe being down or overloaded, as opposed to rejecting the request
+OUTAGE_ERRORS = (
+    stripe.error.APIConnectionError,
+    stripe.error.APIError,
+    stripe.error.RateLimitError,
+)
+
+api_calls = metrics.counter("stripe.api_calls")
+failures = metrics.counter("stripe.failures")
+
+
+class _PooledHTTPXClient(stripe.HTTPXClient):
+    # stripe-python builds a default httpx.AsyncClient; use ours instead, with
+    # the pool limits (and, in tests, the transport) we chose
+    def __init__(self, client: httpx.AsyncClient, timeout: float):
+        super().__init__(timeout=timeout)
+        self._client_async = client
+
+
+class StripeGateway:
+    """
+    Async access to the Stripe API for PaymentService.
+
+    Requests go through stripe-python's async methods on a shared
+    httpx.AsyncClient per event loop, so connections are reused and the loop
+    is never blocked. Every call has a timeout and a latency histogram
+    (stripe.<operation>_ms); outages (network errors, 5xx, 429) count
+    against a circuit breaker and surface as StripeUnavailable, which the
+    API answers with 503. Other Stripe errors (invalid requests, card
+    errors) propagate unchanged.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        api_base: str | None,
+        timeout: float,
+        max_connections: int,
+        max_network_retries: int,
+        breaker: CircuitBreaker,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.api_key = api_key
+        self.api_base = api_base
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_network_retries = max_network_retries
+        self.breaker = breaker
+        # Tests and benchmarks swap in the fake Stripe server's transport
+        self.transport = transport
+        self._clients: dict[asyncio.AbstractEventLoop, stripe.StripeClient] = {}
+        self._latency: dict[str, object] = {}
+
+    def _client(self) -> stripe.StripeClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            # Forget clients of loops that have since closed
+            for closed in [known for known in self._clients if known.is_closed()]:
+                del self._clients[closed]
+
+            http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self.transport,
+            )
+            client = stripe.StripeClient(
+                self.api_key,
+                base_addresses={"api": self.api_base} if self.api_base else None,
+                max_network_retries=self.max_network_retries,
+                http_client=_PooledHTTPXClient(http, self.timeout),
+            )
+            self._clients[loop] = client
+        return client
+
+    def _histogram(self, operation: str):
+        if operation not in self._latency:
+            self._latency[operation] = metrics.histogram(f"stripe.{operation}_ms")
+        return self._latency[operation]
+
+    async def _call(self, operation: str, request):
+        try:
+            self.breaker.before_call()
+        except CircuitOpen as e:
+            raise StripeUnavailable(str(e)) from e
+
+        api_calls.inc()
+        try:
+            with self._histogram(operation).time():
+                result = await request(self._client().v1)
+        except OUTAGE_ERRORS as e:
+            self.breaker.record_failure()
+            failures.inc()
+            logger.error(f"Stripe {operation} failed: {e!r}")
+            raise StripeUnavailable(f"Stripe {operation} failed") from e
+        except stripe.error.StripeError:
+            # Stripe answered: it is up, the request was wrong
+            self.breaker.record_success()
+            raise
+        except BaseException:
+            self.breaker.abandon()
+            raise
+
+        self.breaker.record_success()
+        return result
+
+    async def create_payment_intent(
+        self, *, idempotency_key: str, **params
+    ) -> stripe.PaymentIntent:
+        return await self._call(
+            "payment_intent_create",
+            lambda v1: v1.payment_intents.create_async(
+                params=params, options={"idempotency_key": idempotency_key}
+            ),
+        )
+
+    async def retrieve_payment_intent(self, intent_id: str) -> stripe.PaymentIntent:
+        return await self._call(
+            "payment_intent_retrieve",
+            lambda v1: v1.payment_intents.retrieve_async(intent_id),
+        )
+
+    async def cancel_payment_intent(
+        self, intent_id: str, *, idempotency_key: str
+    ) -> stripe.PaymentIntent:
+        return await self._call(
+            "payment_intent_cancel",
+            lambda v1: v1.payment_intents.cancel_async(
+                intent_id, options={"idempotency_key": idempotency_key}
+            ),
+        )
+
+    async def create_refund(self, *, idempotency_key: str, **params) -> stripe.Refund:
+        return await self._call(
+            "refund_create",
+            lambda v1: v1.refunds.create_async(
+                params=params, options={"idempotency_key": idempotency_key}
+            ),
+        )
+
+
+stripe_gateway = StripeGateway(
+    settings.stripe_secret_key,
+    api_base=settings.stripe_api_base,
+    timeout=settings.stripe_timeout,
+    max_connections=settings.stripe_max_connections,
+    max_network_retries=settings.stripe_max_network_retries,
+    breaker=CircuitBreaker(
+        "stripe",
+        failure_threshold=settings.stripe_breaker_failures,
+        reset_timeout=settings.stripe_breaker_reset_seconds,
+    ),
+)
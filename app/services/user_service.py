@@ -8,8 +8,10 @@ from app.core.exceptions import (
     NotAuthorized,
     PasswordVerificationError,
 )
+from app.core.password_hasher import password_hasher
+from app.core.principal_cache import principal_cache
+from app.core.refresh_tokens import refresh_tokens
 from app.core.roles import UserRole
-from app.core.security import hash_password, verify_password
 from app.crud.user import UserCRUD
 
 # Initialize logger for tracking auth events
@@ -56,6 +58,9 @@ class UserService:
             logger.exception(f"Critical failure during user anonymization: {user_id}")
             raise
 
+        await principal_cache.invalidate(user_id)
+        await refresh_tokens.revoke_user(user_id)
+
     async def change_password(
         self, user_id: UUID, old_password: str, new_password: str
     ) -> None:
@@ -68,20 +73,21 @@ class UserService:
             raise AuthenticationFailed("User not found.")
 
         # Verify Old Password
-        if not verify_password(old_password, user.hashed_password):
+        if not await password_hasher.verify(old_password, user.hashed_password):
             logger.warning(
                 f"Password change failed: Incorrect old password for user {user_id}"
             )
             raise PasswordVerificationError("Old password is incorrect.")
 
-        # Security Logic: Prevent setting the same password
-        if verify_password(new_password, user.hashed_password):
+        # Security Logic: Prevent setting the same password. The old password
+        # matches the hash, so comparing plain texts is enough (no 2nd bcrypt)
+        if new_password == old_password:
             raise PasswordVerificationError(
                 "New password cannot be the same as the old password."
             )
 
         # Hash and Update
-        user.hashed_password = hash_password(new_password)
+        user.hashed_password = await password_hasher.hash(new_password)
 
         try:
             # Commit
@@ -92,3 +98,6 @@ class UserService:
             await self.session.rollback()
             logger.exception(f"Error updating password for {user_id}")
             raise
+
+        # Sessions started with the old password must log in again
+        await refresh_tokens.revoke_user(user_id)
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import BinaryIO
 
 
 class StorageInterface(ABC):
@@ -11,6 +12,20 @@ class StorageInterface(ABC):
     async def upload():
         pass
 
+    async def upload_stream(
+        self, file_id: str, file_name: str, stream: BinaryIO, content_type: str
+    ):
+        """
+        Upload from a binary file object. Backends that can stream override
+        this; the default reads the stream whole and calls upload().
+        """
+        return await self.upload(
+            file_id=file_id,
+            file_name=file_name,
+            file_bytes=stream.read(),
+            content_type=content_type,
+        )
+
     @abstractmethod
     async def get_file_path():
         pass
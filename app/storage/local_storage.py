@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import shutil
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO
+from urllib.parse import urlencode
+
+from app.storage.base import StorageInterface
+from app.storage.presigned_cache import PresignedUrlCache
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class LocalStorage(StorageInterface):
+    """
+    Filesystem stand-in for R2Storage (STORAGE=local, and the tests): same
+    keys, same contract, files under a root directory. "Presigned" URLs are
+    file:// URLs carrying their expiry, cached like the real ones.
+    """
+
+    def __init__(self, root: str | Path, *, presigned_min_remaining: int = 60):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._presigned = PresignedUrlCache(
+            max_entries=1000, min_remaining=presigned_min_remaining
+        )
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root):
+            raise ValueError(f"Storage key escapes the root: {key!r}")
+        return path
+
+    def generate_presigned_url(self, key: str, expires_in: int = 300) -> str:
+        url = self._presigned.get(key, expires_in)
+        if url is not None:
+            return url
+
+        signed_at = time.monotonic()
+        expires = int(time.time()) + expires_in
+        url = f"{self._path(key).as_uri()}?{urlencode({'expires': expires})}"
+        self._presigned.set(key, expires_in, url, signed_at)
+        return url
+
+    async def upload(
+        self, file_id: str, file_name: str, file_bytes: bytes, content_type: str
+    ):
+        await self.upload_stream(
+            file_id=file_id,
+            file_name=file_name,
+            stream=BytesIO(file_bytes),
+            content_type=content_type,
+        )
+
+    async def upload_stream(
+        self, file_id: str, file_name: str, stream: BinaryIO, content_type: str
+    ):
+        path = self._path(file_id)
+        await asyncio.to_thread(self._copy, stream, path)
+        logger.info(f"Local storage uploaded: {file_id}")
+
+    @staticmethod
+    def _copy(stream: BinaryIO, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as out:
+            shutil.copyfileobj(stream, out, CHUNK_SIZE)
+
+    async def get_file_path(self, file_id: str) -> str:
+        path = self._path(file_id)
+        if not path.exists():
+            raise FileNotFoundError(file_id)
+        return str(path)
+
+    def read(self, file_id: str) -> bytes:
+        """Stored content of a key (for tests and local tooling)."""
+        return self._path(file_id).read_bytes()
@@ -0,0 +1,41 @@
+import time
+from collections import OrderedDict
+
+
+class PresignedUrlCache:
+    """
+    In-process LRU of presigned URLs, reused while they stay valid.
+
+    A URL is handed out again only while at least min_remaining seconds of
+    its validity are left, so a client never receives a link that expires
+    before it can be followed.
+    """
+
+    def __init__(self, *, max_entries: int, min_remaining: int):
+        self.max_entries = max_entries
+        self.min_remaining = min_remaining
+        self._urls: OrderedDict[tuple[str, int], tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str, expires_in: int) -> str | None:
+        entry = self._urls.get((key, expires_in))
+        if entry is None:
+            return None
+
+        expires_at, url = entry
+        if expires_at - time.monotonic() < min(self.min_remaining, expires_in / 2):
+            self._urls.pop((key, expires_in), None)
+            return None
+
+        self._urls.move_to_end((key, expires_in))
+        return url
+
+    def set(self, key: str, expires_in: int, url: str, signed_at: float) -> None:
+        """signed_at: time.monotonic() taken before the URL was signed."""
+        self._urls[(key, expires_in)] = (signed_at + expires_in, url)
+        self._urls.move_to_end((key, expires_in))
+
+        while len(self._urls) > self.max_entries:
+            self._urls.popitem(last=False)
+
+    def clear(self) -> None:
+        self._urls.clear()
@@ -1,30 +1,84 @@
+import asyncio
 import logging
-import os
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from io import BytesIO
+from typing import BinaryIO
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.storage.base import StorageInterface
+from app.storage.presigned_cache import PresignedUrlCache
 
 logger = logging.getLogger(__name__)
 
+upload_ms = metrics.histogram("storage.upload_ms")
+presigned_hits = metrics.counter("storage.presigned_cache_hits")
+
 
 class R2Storage(StorageInterface):
+    """
+    S3-compatible storage (Cloudflare R2) without blocking the event loop.
+
+    boto3 is synchronous, so every network call runs on a dedicated, bounded
+    thread pool; a slow upload occupies one of its threads, never the loop.
+    The client's connection pool is sized for that pool times the parts one
+    multipart upload sends in parallel.
+    """
+
     def __init__(self):
+        workers = settings.storage_max_workers
+        concurrency = settings.storage_multipart_concurrency
+
         self.client = boto3.client(
             "s3",
             endpoint_url=settings.s3_endpoint,
             aws_access_key_id=settings.s3_access_key,
             aws_secret_access_key=settings.s3_secret_key,
             region_name=settings.s3_region,
+            config=Config(
+                max_pool_connections=workers * concurrency,
+                connect_timeout=settings.storage_connect_timeout,
+                read_timeout=settings.storage_read_timeout,
+                retries={"max_attempts": 3, "mode": "standard"},
+            ),
         )
         self.bucket = settings.s3_bucket
 
+        # Files above the threshold go up as parallel multipart chunks
+        self.transfer_config = TransferConfig(
+            multipart_threshold=settings.storage_multipart_threshold,
+            multipart_chunksize=settings.storage_multipart_chunksize,
+            max_concurrency=concurrency,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="storage"
+        )
+        self._presigned = PresignedUrlCache(
+            max_entries=settings.storage_presigned_cache_size,
+            min_remaining=settings.storage_presigned_min_remaining,
+        )
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
     def generate_presigned_url(self, key: str, expires_in: int = 300) -> str:
+        # Signing is local (no network), but it is repeated for every view of
+        # the same prescription; reuse the URL while it is still valid.
+        url = self._presigned.get(key, expires_in)
+        if url is not None:
+            presigned_hits.inc()
+            return url
 
-        return self.client.generate_presigned_url(
+        signed_at = time.monotonic()
+        url = self.client.generate_presigned_url(
             "get_object",
             Params={
                 "Bucket": self.bucket,
@@ -32,35 +86,53 @@ class R2Storage(StorageInterface):
             },
             ExpiresIn=expires_in,
         )
+        self._presigned.set(key, expires_in, url, signed_at)
+        return url
 
     async def upload(
         self, file_id: str, file_name: str, file_bytes: bytes, content_type: str
     ):
+        await self.upload_stream(
+            file_id=file_id,
+            file_name=file_name,
+            stream=BytesIO(file_bytes),
+            content_type=content_type,
+        )
+
+    async def upload_stream(
+        self, file_id: str, file_name: str, stream: BinaryIO, content_type: str
+    ):
+        """
+        Upload a file object chunk by chunk (multipart when large), so the
+        file is never held in memory whole.
+        """
         try:
-            self.client.put_object(
-                Bucket=self.bucket,
-                Key=file_id,
-                Body=BytesIO(file_bytes),
-                ContentType=content_type,
-            )
+            with upload_ms.time():
+                await self._run(
+                    self.client.upload_fileobj,
+                    stream,
+                    self.bucket,
+                    file_id,
+                    ExtraArgs={"ContentType": content_type},
+                    Config=self.transfer_config,
+                )
             logger.info(f"R2 uploaded: {file_id}")
         except Exception as e:
             logger.error(f"R2 upload failed: {str(e)}")
             raise
 
-    def get_file_path(self, file_id: str) -> str:
+    async def get_file_path(self, file_id: str) -> str:
         safe_name = file_id.replace("/", "_")
         with tempfile.NamedTemporaryFile(prefix=safe_name, delete=False) as tmp_file:
             temp_path = tmp_file.name
 
-        if os.path.exists(temp_path):
-            return temp_path
-
         try:
-            self.client.download_file(
+            await self._run(
+                self.client.download_file,
                 Bucket=self.bucket,
                 Key=file_id,
                 Filename=temp_path,
+                Config=self.transfer_config,
             )
             return temp_path
         except Exception as e:
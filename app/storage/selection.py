@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+from app.core.config import settings
+from app.storage.base import StorageInterface
+from app.storage.local_storage import LocalStorage
+from app.storage.r2_storage import R2Storage
+
+
+@lru_cache
+def _r2_storage() -> R2Storage:
+    return R2Storage()
+
+
+@lru_cache
+def _local_storage() -> LocalStorage:
+    return LocalStorage(settings.storage_local_root)
+
+
+def get_storage() -> StorageInterface:
+    """
+    The storage backend named by settings.storage ("r2" or "local"), one
+    per process. The API takes it as a dependency; workers call it.
+    """
+    if settings.storage == "r2":
+        return _r2_storage()
+    if settings.storage == "local":
+        return _local_storage()
+    raise ValueError(
+        f"Unknown storage backend {settings.storage!r} (expected 'r2' or 'local')"
+    )
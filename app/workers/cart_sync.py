@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from uuid import UUID
+
+from redis.asyncio import Redis
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud.cart import CartCRUD
+from app.workers.celery_app import celery_app
+from app.workers.runtime import worker_resources
+
+logger = logging.getLogger(__name__)
+
+# Worker-side totals are also kept in Redis so the API's /metrics can show them
+STATS_KEY = "cart_sync:stats"
+
+rows_written = metrics.counter("cart_sync.rows_written")
+carts_flushed = metrics.counter("cart_sync.carts_flushed")
+carts_dropped = metrics.counter("cart_sync.carts_dropped")
+flush_failures = metrics.counter("cart_sync.failures")
+lag_seconds = metrics.gauge("cart_sync.lag_seconds")
+flush_ms = metrics.histogram("cart_sync.flush_ms")
+
+
+async def _write(
+    session_factory: async_sessionmaker, carts: dict[UUID, list[dict]]
+) -> tuple[int, list[UUID]]:
+    """
+    Upsert a batch of carts in one transaction. If the batch violates a
+    constraint (user or product deleted meanwhile), retry cart by cart and
+    drop the carts that cannot be written, so one bad cart never blocks the
+    queue. Returns (rows written, dropped user ids).
+    """
+    try:
+        async with session_factory() as session:
+            written = await CartCRUD(session).upsert_db_carts(carts)
+            await session.commit()
+        return written, []
+    except IntegrityError:
+        logger.warning("Cart sync: batch rejected, retrying cart by cart")
+
+    written, dropped = 0, []
+    for user_id, items in carts.items():
+        try:
+            async with session_factory() as session:
+                written += await CartCRUD(session).upsert_db_carts({user_id: items})
+                await session.commit()
+        except IntegrityError:
+            logger.error(f"Cart sync: dropping unwritable cart of user {user_id}")
+            dropped.append(user_id)
+    return written, dropped
+
+
+async def flush_dirty_carts(
+    redis: Redis,
+    session_factory: async_sessionmaker,
+    *,
+    batch_size: int,
+    max_batches: int,
+    stale_after: int,
+) -> dict:
+    """
+    Drain the dirty-cart set: claim the oldest dirty users, read their
+    current carts from Redis and write them to cart_items in one upsert per
+    batch. However many mutations a user made since the last run, their
+    cart is written once.
+    """
+    crud = CartCRUD(session=None)
+    totals = {"batches": 0, "carts": 0, "rows": 0, "dropped": 0}
+
+    for _ in range(max_batches):
+        claimed = await crud.claim_dirty(
+            redis, limit=batch_size, stale_after=stale_after
+        )
+        if not claimed:
+            lag_seconds.set(0.0)
+            break
+
+        oldest = min(score for _, score in claimed)
+        lag_seconds.set(round(max(0.0, time.time() - oldest), 3))
+        user_ids = [user_id for user_id, _ in claimed]
+
+        try:
+            with flush_ms.time():
+                carts = await asyncio.gather(
+                    *(crud.get_redis_items(redis, user_id) for user_id in user_ids)
+                )
+                written, dropped = await _write(
+                    session_factory,
+                    {u: items or [] for u, items in zip(user_ids, carts)},
+                )
+        except Exception:
+            flush_failures.inc()
+            logger.exception(f"Cart sync: batch of {len(claimed)} carts failed")
+            await crud.requeue_dirty(redis, claimed)
+            raise
+
+        await crud.complete_dirty(redis, user_ids)
+
+        rows_written.inc(written)
+        carts_flushed.inc(len(user_ids) - len(dropped))
+        carts_dropped.inc(len(dropped))
+
+        totals["batches"] += 1
+        totals["carts"] += len(user_ids) - len(dropped)
+        totals["rows"] += written
+        totals["dropped"] += len(dropped)
+
+    if totals["batches"]:
+        await redis.hincrby(STATS_KEY, "carts_flushed", totals["carts"])
+        await redis.hincrby(STATS_KEY, "rows_written", totals["rows"])
+        await redis.hincrby(STATS_KEY, "carts_dropped", totals["dropped"])
+        logger.info(f"Cart sync: {totals}")
+
+    await redis.hset(STATS_KEY, "last_lag_seconds", lag_seconds.value)
+    return totals
+
+
+async def cart_sync_status(redis: Redis) -> dict:
+    """Backlog and worker totals, for the API's /metrics."""
+    stats = await redis.hgetall(STATS_KEY)
+    return {
+        **await CartCRUD(session=None).dirty_backlog(redis),
+        **{name: float(value) for name, value in stats.items()},
+    }
+
+
+async def _run() -> dict:
+    async with worker_resources() as (session_factory, redis):
+        return await flush_dirty_carts(
+            redis,
+            session_factory,
+            batch_size=settings.cart_sync_batch_size,
+            max_batches=settings.cart_sync_max_batches,
+            stale_after=settings.cart_sync_stale_after,
+        )
+
+
+@celery_app.task(name="cart_sync.flush_dirty_carts")
+def flush_dirty_carts_task() -> dict:
+    return asyncio.run(_run())
@@ -0,0 +1,74 @@
+from celery import Celery
+
+from app.core.config import settings
+
+# Background worker (write-behind, periodic jobs).
+# Run worker and beat together:
+#   celery -A app.workers.celery_app worker --beat --loglevel=info
+celery_app = Celery(
+    "e_pharmacy",
+    broker=settings.redis_url,
+    include=[
+        "app.workers.cart_sync",
+        "app.workers.hot_stock",
+        "app.workers.inventory",
+        "app.workers.invoices",
+        "app.workers.notifications",
+        "app.workers.reservations",
+        "app.workers.storefront",
+        "app.workers.stripe_events",
+    ],
+)
+
+celery_app.conf.update(
+    task_ignore_result=True,
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        "flush-dirty-carts": {
+            "task": "cart_sync.flush_dirty_carts",
+            "schedule": settings.cart_sync_interval_seconds,
+            # A run that is still queued when the next one is due is useless
+            "options": {"expires": settings.cart_sync_interval_seconds},
+        },
+        "drain-notification-outbox": {
+            "task": "notifications.drain_outbox",
+            "schedule": settings.notification_outbox_interval_seconds,
+            "options": {"expires": settings.notification_outbox_interval_seconds},
+        },
+        "purge-sent-notifications": {
+            "task": "notifications.purge_sent",
+            "schedule": 60 * 60,
+            "options": {"expires": 60 * 60},
+        },
+        "process-stripe-events": {
+            "task": "stripe_events.process",
+            "schedule": settings.stripe_events_interval_seconds,
+            "options": {"expires": settings.stripe_events_interval_seconds},
+        },
+        "purge-processed-stripe-events": {
+            "task": "stripe_events.purge_processed",
+            "schedule": 24 * 60 * 60,
+            "options": {"expires": 60 * 60},
+        },
+        "release-expired-reservations": {
+            "task": "reservations.release_expired",
+            "schedule": settings.stock_reservation_release_seconds,
+            "options": {"expires": settings.stock_reservation_release_seconds},
+        },
+        "reconcile-hot-stock": {
+            "task": "hot_stock.reconcile",
+            "schedule": settings.hot_stock_reconcile_seconds,
+            "options": {"expires": settings.hot_stock_reconcile_seconds},
+        },
+        "sweep-expired-batches": {
+            "task": "inventory.sweep_expiry",
+            "schedule": settings.inventory_expiry_sweep_seconds,
+            "options": {"expires": settings.inventory_expiry_sweep_seconds},
+        },
+        "refresh-expired-storefront": {
+            "task": "storefront.refresh_expired",
+            "schedule": settings.storefront_expiry_refresh_seconds,
+            "options": {"expires": settings.storefront_expiry_refresh_seconds},
+        },
+    },
+)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.core.hot_stock import hot_stock
+from app.core.metrics import metrics
+from app.crud.product import CRUDProduct
+from app.crud.stock_reservation import StockReservationCRUD
+from app.models.product import Product
+from app.workers.celery_app import celery_app
+from app.workers.runtime import worker_resources
+
+logger = logging.getLogger(__name__)
+
+# Worker-side totals are also kept in Redis so the API's /metrics can show them
+STATS_KEY = "hot_stock:stats"
+
+orders_applied = metrics.counter("hot_stock.orders_applied")
+apply_ms = metrics.histogram("hot_stock.apply_ms")
+
+
+async def reconcile_hot_stock(
+    redis: Redis,
+    session_factory: async_sessionmaker,
+    *,
+    batch_size: int,
+    stale_after: int,
+) -> dict:
+    """
+    Bring Postgres and the hot stock counters back together:
+
+    1. deduct the units sold to paid orders from their batches, for up to
+       batch_size orders in one transaction (StockReservationCRUD.apply_sold);
+    2. compare each hot product's counter with its free stock in Postgres,
+       less the units of checkouts still in flight, and add the difference
+       (drift: cancellations, expired reservations, restocks, lost holds).
+       Counters with no key (Redis lost them) are loaded again, and the
+       storefront rows of hot products are refreshed.
+
+    The counters are read before Postgres: a checkout committing in between
+    is counted twice, so a repair errs low, never high (no oversell), and
+    the next run corrects it.
+    """
+    async with session_factory() as session:
+        with apply_ms.time():
+            applied = await StockReservationCRUD(session).apply_sold(limit=batch_size)
+            await session.commit()
+    orders_applied.inc(applied)
+
+    async with session_factory() as session:
+        crud = CRUDProduct(session)
+        hot = (await session.scalars(select(Product.id).where(Product.hot_stock))).all()
+
+        drift = {}
+        if hot:
+            counters, held = await hot_stock.snapshot(
+                redis, list(hot), stale_after=stale_after
+            )
+            stock = await crud.get_sellable_stock(counters.keys())
+            for product_id, left in counters.items():
+                expected = stock[product_id].available - held.get(product_id, 0)
+                if expected != left:
+                    drift[product_id] = expected - left
+                    logger.warning(
+                        f"Hot stock: counter of {product_id} is {left}, "
+                        f"Postgres says {expected}; repairing"
+                    )
+            await hot_stock.adjust(redis, drift)
+
+            # Hot checkouts leave their storefront rows alone
+            await crud.catalog_changed(hot)
+            await session.commit()
+
+            missing = set(hot) - counters.keys()
+            if missing:
+                await crud.load_hot_stock(redis, missing)
+                await session.commit()
+                logger.warning(f"Hot stock: reloaded {len(missing)} missing counters")
+
+    drift_units = sum(abs(delta) for delta in drift.values())
+    hot_stock.drift.set(drift_units)
+
+    await redis.hincrby(STATS_KEY, "orders_applied", applied)
+    await redis.hincrby(STATS_KEY, "repairs", len(drift))
+    await redis.hset(
+        STATS_KEY, mapping={"hot_products": len(hot), "last_drift_units": drift_units}
+    )
+    return {
+        "orders_applied": applied,
+        "hot_products": len(hot),
+        "repaired": len(drift),
+        "drift_units": drift_units,
+    }
+
+
+async def hot_stock_status(redis: Redis) -> dict:
+    """Worker totals and last drift, for the API's /metrics."""
+    stats = await redis.hgetall(STATS_KEY)
+    return {name: float(value) for name, value in stats.items()}
+
+
+async def _run() -> dict:
+    async with worker_resources() as (session_factory, redis):
+        return await reconcile_hot_stock(
+            redis,
+            session_factory,
+            batch_size=settings.hot_stock_apply_batch_size,
+            stale_after=settings.hot_stock_hold_stale_after,
+        )
+
+
+@celery_app.task(name="hot_stock.reconcile")
+def reconcile_task() -> dict:
+    return asyncio.run(_run())
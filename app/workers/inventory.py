@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.roles import UserRole
+from app.crud.product import CRUDProduct
+from app.models.user import User
+from app.services.notification.notification_service import NotificationService
+from app.workers.celery_app import celery_app
+from app.workers.runtime import worker_resources
+
+logger = logging.getLogger(__name__)
+
+# Worker-side totals are also kept in Redis so the API's /metrics can show them
+STATS_KEY = "inventory:stats"
+
+batches_blocked = metrics.counter("inventory.expired_batches_blocked")
+near_expiry_batches = metrics.counter("inventory.near_expiry_batches")
+
+
+async def sweep_expiry(
+    redis: Redis,
+    session_factory: async_sessionmaker,
+    notification_service: NotificationService,
+    *,
+    near_expiry_days: int,
+) -> dict:
+    """
+    One pass of the expiry sweeper, in one transaction:
+
+    1. block the batches that have expired, so stock queries and the
+       partial index ix_inventory_batches_sellable no longer see them;
+    2. tell every active admin, once per batch, about the sellable batches
+       expiring within near_expiry_days (through the notification outbox).
+    """
+    async with session_factory() as session:
+        crud = CRUDProduct(session)
+        blocked = await crud.block_expired_batches()
+        expiring = await crud.claim_near_expiry_batches(
+            within=timedelta(days=near_expiry_days)
+        )
+
+        admins = []
+        if expiring:
+            admins = (
+                await session.scalars(
+                    select(User).where(User.role == UserRole.ADMIN, User.is_active)
+                )
+            ).all()
+            if not admins:
+                logger.warning(
+                    f"Expiry sweep: {len(expiring)} batches expire soon, "
+                    "but there is no active admin to tell"
+                )
+        for batch in expiring:
+            message = (
+                f"Batch {batch.batch_number} of {batch.product_name} "
+                f"({batch.quantity} units) expires on {batch.expiry_date:%Y-%m-%d}."
+            )
+            for admin in admins:
+                await notification_service.enqueue(
+                    session,
+                    dedup_key=f"batch-near-expiry:{batch.batch_id}:{admin.id}",
+                    email=admin.email,
+                    phone=None,
+                    channels=["email"],
+                    message=message,
+                )
+        await session.commit()
+
+    batches_blocked.inc(blocked)
+    near_expiry_batches.inc(len(expiring))
+    await redis.hincrby(STATS_KEY, "expired_batches_blocked", blocked)
+    await redis.hincrby(STATS_KEY, "near_expiry_batches", len(expiring))
+    if blocked or expiring:
+        logger.info(
+            f"Expiry sweep: blocked {blocked} expired batches, "
+            f"{len(expiring)} batches expire within {near_expiry_days} days"
+        )
+    return {"blocked": blocked, "near_expiry": len(expiring)}
+
+
+async def inventory_status(redis: Redis) -> dict:
+    """Worker totals, for the API's /metrics."""
+    stats = await redis.hgetall(STATS_KEY)
+    return {name: float(value) for name, value in stats.items()}
+
+
+async def _run() -> dict:
+    async with worker_resources() as (session_factory, redis):
+        return await sweep_expiry(
+            redis,
+            session_factory,
+            NotificationService(),
+            near_expiry_days=settings.inventory_near_expiry_days,
+        )
+
+
+@celery_app.task(name="inventory.sweep_expiry")
+def sweep_expiry_task() -> dict:
+    return asyncio.run(_run())
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.order import Order
+from app.services.invoice_service import InvoiceService, invoice_renderer
+from app.storage.base import StorageInterface
+from app.storage.selection import get_storage
+from app.workers.celery_app import celery_app
+from app.workers.runtime import worker_resources
+
+logger = logging.getLogger(__name__)
+
+invoices_regenerated = metrics.counter("invoice.regenerated")
+
+
+def invoice_key(order_id: UUID | str) -> str:
+    return f"invoices/{order_id}.pdf"
+
+
+async def regenerate_invoices(
+    session_factory: async_sessionmaker,
+    storage: StorageInterface,
+    *,
+    order_ids: list[UUID] | None = None,
+    paid_since: datetime | None = None,
+    batch_size: int,
+) -> int:
+    """
+    Re-render the invoices of paid orders (the given ones, or all paid since
+    paid_since, or all) and store them at invoices/<order id>.pdf.
+
+    Orders are walked in id order, batch_size at a time: one query loads a
+    batch's snapshots, the render pool renders the batch across its
+    processes, and the uploads run concurrently. Returns invoices written.
+    """
+    written, last_id = 0, None
+    while True:
+        stmt = select(Order.id).where(Order.paid_at.is_not(None))
+        if order_ids is not None:
+            stmt = stmt.where(Order.id.in_(order_ids))
+        if paid_since is not None:
+            stmt = stmt.where(Order.paid_at >= paid_since)
+        if last_id is not None:
+            stmt = stmt.where(Order.id > last_id)
+        stmt = stmt.order_by(Order.id).limit(batch_size)
+
+        async with session_factory() as session:
+            ids = (await session.execute(stmt)).scalars().all()
+            if not ids:
+                break
+            snapshots = await InvoiceService.load_snapshots(session, ids)
+
+        pdfs = await invoice_renderer.render_many(snapshots)
+        await asyncio.gather(
+            *(
+                storage.upload(
+                    file_id=invoice_key(snapshot.order_id),
+                    file_name=f"Invoice_{snapshot.order_id}.pdf",
+                    file_bytes=pdf,
+                    content_type="application/pdf",
+                )
+                for snapshot, pdf in zip(snapshots, pdfs)
+            )
+        )
+
+        written += len(pdfs)
+        invoices_regenerated.inc(len(pdfs))
+        last_id = ids[-1]
+        logger.info(f"Invoices: regenerated {written} so far")
+
+    return written
+
+
+async def _run(order_ids: list[str] | None, paid_since: str | None) -> int:
+    async with worker_resources() as (session_factory, _):
+        return await regenerate_invoices(
+            session_factory,
+            get_storage(),
+            order_ids=[UUID(order_id) for order_id in order_ids] if order_ids else None,
+            paid_since=datetime.fromisoformat(paid_since) if paid_since else None,
+            batch_size=settings.invoice_regenerate_batch_size,
+        )
+
+
+@celery_app.task(name="invoices.regenerate")
+def regenerate_invoices_task(
+    order_ids: list[str] | None = None, paid_since: str | None = None
+) -> int:
+    """
+    Bulk regeneration, e.g. after a template change:
+        regenerate_invoices_task.delay(paid_since="2026-01-01")
+    """
+    return asyncio.run(_run(order_ids, paid_since))
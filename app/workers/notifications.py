@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud.notification_outbox import NotificationOutboxCRUD
+from app.models.notification_outbox import NotificationOutbox
+from app.services.invoice_service import InvoiceService, invoice_renderer
+from app.services.notification.notification_service import NotificationService
+from app.workers.celery_app import celery_app
+from app.workers.runtime import claimed_batches, record_failures, worker_resources
+
+logger = logging.getLogger(__name__)
+
+outbox_sent = metrics.counter("notification_outbox.sent")
+outbox_retried = metrics.counter("notification_outbox.retried")
+outbox_dead = metrics.counter("notification_outbox.dead")
+lag_seconds = metrics.gauge("notification_outbox.lag_seconds")
+batch_ms = metrics.histogram("notification_outbox.batch_ms")
+
+
+class SendFailed(Exception):
+    """A notification that could not be delivered on every channel."""
+
+    def __init__(self, message: str, delivered: list[str] | None = None):
+        super().__init__(message)
+        # Channels that did deliver this attempt; retries skip them
+        self.delivered = delivered or []
+
+
+async def _invoice(session_factory: async_sessionmaker, order_id: UUID) -> bytes:
+    async with session_factory() as session:
+        snapshots = await InvoiceService.load_snapshots(session, [order_id])
+    if not snapshots:
+        raise SendFailed(f"order {order_id} of the invoice no longer exists")
+    return await invoice_renderer.render(snapshots[0])
+
+
+async def _send(
+    session_factory: async_sessionmaker,
+    notification_service: NotificationService,
+    row: NotificationOutbox,
+) -> None:
+    payload = row.payload
+    channels = [
+        channel
+        for channel in payload["channels"]
+        if channel not in row.delivered_channels
+    ]
+    extra = {}
+    if payload.get("invoice_order_id") and "email" in channels:
+        order_id = UUID(payload["invoice_order_id"])
+        extra = {
+            "attachment": await _invoice(session_factory, order_id),
+            "filename": f"Invoice_{order_id}.pdf",
+        }
+
+    failed = await notification_service.notify(
+        email=payload.get("email"),
+        phone=payload.get("phone"),
+        message=payload["message"],
+        channels=channels,
+        **extra,
+    )
+    if failed:
+        raise SendFailed(
+            f"{', '.join(failed)} failed to deliver",
+            delivered=[channel for channel in channels if channel not in failed],
+        )
+
+
+async def drain_outbox(
+    session_factory: async_sessionmaker,
+    notification_service: NotificationService,
+    *,
+    batch_size: int,
+    max_batches: int,
+    max_attempts: int,
+    lease_seconds: int,
+    retry_base: float,
+    retry_max: float,
+) -> dict:
+    """
+    Send pending outbox rows: claim a batch (committed at once, so the lease
+    holds while sending), send the whole batch concurrently, then record the
+    outcomes in one transaction. Failed rows are retried with exponential
+    backoff and dead-lettered after max_attempts.
+
+    A row sent on several channels records those that delivered, and its
+    retries send only on the others. Delivery is at-least-once: a worker
+    that dies between sending and recording leaves its rows to be sent
+    again when their lease expires.
+    """
+    totals = {"batches": 0, "sent": 0, "retried": 0, "dead": 0}
+
+    async for rows in claimed_batches(
+        session_factory,
+        NotificationOutboxCRUD,
+        limit=batch_size,
+        lease_seconds=lease_seconds,
+        max_batches=max_batches,
+    ):
+        oldest = min(row.created_at for row in rows)
+        if oldest.tzinfo is None:  # SQLite drops the zone
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        lag_seconds.set(round(max(0.0, time.time() - oldest.timestamp()), 3))
+
+        with batch_ms.time():
+            results = await asyncio.gather(
+                *(_send(session_factory, notification_service, row) for row in rows),
+                return_exceptions=True,
+            )
+
+        async with session_factory() as session:
+            crud = NotificationOutboxCRUD(session)
+            sent = [row.id for row, error in zip(rows, results) if error is None]
+            await crud.mark_sent(sent)
+
+            failed = [
+                (row, error) for row, error in zip(rows, results) if error is not None
+            ]
+            for row, error in failed:
+                if isinstance(error, SendFailed) and error.delivered:
+                    await crud.mark_delivered(row, error.delivered)
+
+            failures = await record_failures(
+                crud,
+                failed,
+                max_attempts=max_attempts,
+                retry_base=retry_base,
+                retry_max=retry_max,
+            )
+            for row, error, dead in failures:
+                if dead:
+                    logger.error(
+                        f"Notification {row.dedup_key} dead-lettered after "
+                        f"{row.attempts} attempts: {error!r}"
+                    )
+                    totals["dead"] += 1
+                else:
+                    totals["retried"] += 1
+            await session.commit()
+
+        totals["batches"] += 1
+        totals["sent"] += len(sent)
+
+    if totals["batches"] < max_batches:  # drained
+        lag_seconds.set(0.0)
+
+    outbox_sent.inc(totals["sent"])
+    outbox_retried.inc(totals["retried"])
+    outbox_dead.inc(totals["dead"])
+    if totals["batches"]:
+        logger.info(f"Notification outbox: {totals}")
+    return totals
+
+
+async def outbox_status(session: AsyncSession) -> dict:
+    """Row counts per status, for the API's /metrics."""
+    return await NotificationOutboxCRUD(session).status_counts()
+
+
+async def _run() -> dict:
+    async with worker_resources() as (session_factory, _):
+        return await drain_outbox(
+            session_factory,
+            NotificationService(),
+            batch_size=settings.notification_outbox_batch_size,
+            max_batches=settings.notification_outbox_max_batches,
+            max_attempts=settings.notification_outbox_max_attempts,
+            lease_seconds=settings.notification_outbox_lease_seconds,
+            retry_base=settings.notification_outbox_retry_base,
+            retry_max=settings.notification_outbox_retry_max,
+        )
+
+
+async def _purge() -> int:
+    async with worker_resources() as (session_factory, _):
+        async with session_factory() as session:
+            purged = await NotificationOutboxCRUD(session).purge_sent(
+                timedelta(days=settings.notification_outbox_keep_sent_days)
+            )
+            await session.commit()
+    return purged
+
+
+@celery_app.task(name="notifications.drain_outbox")
+def drain_outbox_task() -> dict:
+    return asyncio.run(_run())
+
+
+@celery_app.task(name="notifications.purge_sent")
+def purge_sent_task() -> int:
+    """Sent rows only matter for deduplication while retries can still come."""
+    return asyncio.run(_purge())
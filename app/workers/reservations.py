@@ -0,0 +1,31 @@
+import asyncio
+import logging
+
+from app.core.metrics import metrics
+from app.crud.stock_reservation import StockReservationCRUD
+from app.workers.celery_app import celery_app
+from app.workers.runtime import worker_resources
+
+logger = logging.getLogger(__name__)
+
+products_released = metrics.counter("stock_reservations.expired_products")
+
+
+async def _run() -> int:
+    async with worker_resources() as (session_factory, _):
+        async with session_factory() as session:
+            released = await StockReservationCRUD(session).release_expired()
+            await session.commit()
+
+    products_released.inc(len(released))
+    if released:
+        logger.info(
+            f"Stock reservations: released expired holds on {len(released)} products"
+        )
+    return len(released)
+
+
+@celery_app.task(name="reservations.release_expired")
+def release_expired_task() -> int:
+    """Reservations expire without any write, so their storefront rows are redone here."""
+    return asyncio.run(_run())
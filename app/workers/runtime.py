@@ -0,0 +1,100 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.response_cache import settle_invalidations
+from app.db.sessions import async_db
+
+
+@asynccontextmanager
+async def worker_resources():
+    """
+    DB session factory and Redis client for one task run.
+
+    Celery tasks are sync, so each run drives its coroutine with asyncio.run()
+    on a fresh event loop; pooled connections from the API's engine/client
+    are bound to another loop and cannot be reused here. Sessions carry the
+    run's client in info["redis"], for the cache invalidations of their
+    commits (see ResponseCache.invalidate_on_commit).
+    """
+    engine = create_async_engine(async_db, poolclass=NullPool)
+    redis = Redis.from_url(settings.redis_url, decode_responses=True)
+    try:
+        yield async_sessionmaker(
+            engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            info={"redis": redis},
+        ), redis
+    finally:
+        await settle_invalidations()
+        await redis.aclose()
+        await engine.dispose()
+
+
+# QUEUE TABLES (notification_outbox, stripe_events)
+# Both CRUDs offer claim_batch(limit, lease_seconds, due_by) and
+# mark_failed(row, error, max_attempts, retry_in).
+
+
+def retry_delay(attempts: int, base: float, cap: float) -> float:
+    """Exponential backoff after the attempts-th failure, at most cap seconds."""
+    return min(base * 2 ** (attempts - 1), cap)
+
+
+async def claimed_batches(
+    session_factory: async_sessionmaker,
+    crud_cls,
+    *,
+    limit: int,
+    lease_seconds: int,
+    max_batches: int,
+) -> AsyncIterator[list]:
+    """
+    The batches of one worker run, up to max_batches, until the queue is
+    drained. Each claim is committed at once, so its lease holds while the
+    batch is worked on.
+
+    Only rows due when the run started are claimed: rows that fail in this
+    run are due again later, and are left to the next run.
+    """
+    started = datetime.now(timezone.utc)
+    for _ in range(max_batches):
+        async with session_factory() as session:
+            rows = await crud_cls(session).claim_batch(
+                limit=limit, lease_seconds=lease_seconds, due_by=started
+            )
+            await session.commit()
+        if not rows:
+            return
+        yield rows
+
+
+async def record_failures(
+    crud,
+    failures: list[tuple],
+    *,
+    max_attempts: int,
+    retry_base: float,
+    retry_max: float,
+) -> list[tuple]:
+    """
+    Schedule a retry with backoff for each (row, error), or dead-letter the
+    row once it has used max_attempts. Returns (row, error, dead) for each;
+    the caller commits.
+    """
+    recorded = []
+    for row, error in failures:
+        status = await crud.mark_failed(
+            row,
+            error=repr(error),
+            max_attempts=max_attempts,
+            retry_in=retry_delay(row.attempts, retry_base, retry_max),
+        )
+        recorded.append((row, error, status == type(status).DEAD))
+    return recorded
@@ -0,0 +1,25 @@
+import asyncio
+import logging
+
+from app.crud.storefront import CRUDStorefront
+from app.workers.celery_app import celery_app
+from app.workers.runtime import worker_resources
+
+logger = logging.getLogger(__name__)
+
+
+async def _run() -> int:
+    async with worker_resources() as (session_factory, _):
+        async with session_factory() as session:
+            refreshed = await CRUDStorefront(session).refresh_expired()
+            await session.commit()
+
+    if refreshed:
+        logger.info(f"Storefront: refreshed {refreshed} products with expired batches")
+    return refreshed
+
+
+@celery_app.task(name="storefront.refresh_expired")
+def refresh_expired_task() -> int:
+    """Batches expire without any write, so their storefront rows are redone here."""
+    return asyncio.run(_run())
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+import stripe
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud.stripe_event import StripeEventCRUD
+from app.models.stripe_event import StripeEvent
+from app.services.notification.notification_service import NotificationService
+from app.services.payment_service import PaymentService
+from app.workers.celery_app import celery_app
+from app.workers.runtime import claimed_batches, record_failures, worker_resources
+
+logger = logging.getLogger(__name__)
+
+events_processed = metrics.counter("stripe_events.processed")
+events_retried = metrics.counter("stripe_events.retried")
+events_dead = metrics.counter("stripe_events.dead")
+lag_seconds = metrics.gauge("stripe_events.lag_seconds")
+process_ms = metrics.histogram("stripe_events.process_ms")
+
+
+def _age(moment: datetime) -> float:
+    if moment.tzinfo is None:  # SQLite drops the zone
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, time.time() - moment.timestamp())
+
+
+async def _process(
+    event: StripeEvent,
+    session_factory: async_sessionmaker,
+    redis: Redis,
+    notification_service: NotificationService,
+    slots: asyncio.Semaphore,
+) -> str | None:
+    async with slots, session_factory() as session:
+        with process_ms.time():
+            outcome = await PaymentService(session, notification_service).process_event(
+                event=stripe.Event.construct_from(event.payload, stripe.api_key),
+                redis=redis,
+                db_factory=session_factory,
+            )
+    return (outcome or {}).get("status")
+
+
+async def process_stripe_events(
+    session_factory: async_sessionmaker,
+    redis: Redis,
+    notification_service: NotificationService,
+    *,
+    batch_size: int,
+    parallelism: int,
+    max_batches: int,
+    max_attempts: int,
+    lease_seconds: int,
+    retry_base: float,
+    retry_max: float,
+) -> dict:
+    """
+    Apply pending events from the stripe_events inbox.
+
+    Each claimed batch holds at most one event per order (see
+    StripeEventCRUD.claim_batch), so its events run concurrently, up to
+    parallelism at a time, while an order's events still apply in order.
+    Failed events are retried with exponential backoff and given up after
+    max_attempts; the next batch picks up the events they were blocking.
+    """
+    totals = {"batches": 0, "processed": 0, "retried": 0, "dead": 0}
+    slots = asyncio.Semaphore(parallelism)
+
+    async for events in claimed_batches(
+        session_factory,
+        StripeEventCRUD,
+        limit=batch_size,
+        lease_seconds=lease_seconds,
+        max_batches=max_batches,
+    ):
+        lag_seconds.set(round(max(_age(e.received_at) for e in events), 3))
+
+        outcomes = await asyncio.gather(
+            *(
+                _process(event, session_factory, redis, notification_service, slots)
+                for event in events
+            ),
+            return_exceptions=True,
+        )
+
+        async with session_factory() as session:
+            crud = StripeEventCRUD(session)
+            failures = []
+            for event, outcome in zip(events, outcomes):
+                if isinstance(outcome, BaseException):
+                    failures.append((event, outcome))
+                    continue
+                await crud.mark_processed(event, outcome)
+                totals["processed"] += 1
+
+            for event, error, dead in await record_failures(
+                crud,
+                failures,
+                max_attempts=max_attempts,
+                retry_base=retry_base,
+                retry_max=retry_max,
+            ):
+                if dead:
+                    logger.error(
+                        f"Stripe event {event.id} ({event.type}) given up after "
+                        f"{event.attempts} attempts: {error!r}"
+                    )
+                    totals["dead"] += 1
+                else:
+                    logger.warning(
+                        f"Stripe event {event.id} ({event.type}) failed, "
+                        f"will retry: {error!r}"
+                    )
+                    totals["retried"] += 1
+            await session.commit()
+
+        totals["batches"] += 1
+
+    if totals["batches"] < max_batches:  # drained
+        lag_seconds.set(0.0)
+
+    events_processed.inc(totals["processed"])
+    events_retried.inc(totals["retried"])
+    events_dead.inc(totals["dead"])
+    if totals["batches"]:
+        logger.info(f"Stripe events: {totals}")
+    return totals
+
+
+async def stripe_events_status(session: AsyncSession) -> dict:
+    """Inbox counts and backlog age, for the API's /metrics."""
+    return await StripeEventCRUD(session).status()
+
+
+async def _run() -> dict:
+    async with worker_resources() as (session_factory, redis):
+        return await process_stripe_events(
+            session_factory,
+            redis,
+            NotificationService(),
+            batch_size=settings.stripe_events_batch_size,
+            parallelism=settings.stripe_events_parallelism,
+            max_batches=settings.stripe_events_max_batches,
+            max_attempts=settings.stripe_events_max_attempts,
+            lease_seconds=settings.stripe_events_lease_seconds,
+            retry_base=settings.stripe_events_retry_base,
+            retry_max=settings.stripe_events_retry_max,
+        )
+
+
+async def _purge() -> int:
+    async with worker_resources() as (session_factory, _):
+        async with session_factory() as session:
+            purged = await StripeEventCRUD(session).purge_processed(
+                timedelta(days=settings.stripe_events_keep_days)
+            )
+            await session.commit()
+    return purged
+
+
+@celery_app.task(name="stripe_events.process")
+def process_stripe_events_task() -> dict:
+    return asyncio.run(_run())
+
+
+@celery_app.task(name="stripe_events.purge_processed")
+def purge_processed_task() -> int:
+    return asyncio.run(_purge())
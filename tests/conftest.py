@@ -1,19 +1,23 @@
 import json
-import os
-import tempfile
 import uuid
 from datetime import date, datetime, timedelta, timezone
 from typing import AsyncGenerator
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.pool import StaticPool
 
 from app.core.deps import get_redis, get_service, get_session_factory, get_storage
+from app.core.principal_cache import principal_cache
+from app.core.refresh_tokens import refresh_tokens
+from app.core.response_cache import storefront_cache
 from app.core.roles import UserRole
 from app.core.security import hash_password
+from app.core.token_versions import token_versions
+from app.crud.storefront import CRUDStorefront
 from app.db.base import Base
 from app.db.enums import CategoryEnum, OrderStatus
 from app.db.sessions import get_async_session
@@ -21,8 +25,14 @@ from app.main import app
 from app.models.inventory import InventoryBatch
 from app.models.product import Product
 from app.models.user import User
+from app.scripts.fake_stripe import create_app as create_fake_stripe
+from app.services.invoice_service import invoice_renderer
 from app.services.notification.notification_service import NotificationService
+from app.services.notification.transport import notification_transport
 from app.services.prescription_service import PrescriptionService
+from app.services.stripe_gateway import stripe_gateway
+from app.storage.local_storage import LocalStorage
+from tests.fake_redis import FakeRedis
 
 # DISABLE RATE LIMITING GLOBALLY
 app.state.limiter_enabled = False
@@ -111,42 +121,22 @@ def block_real_r2_storage(monkeypatch, mock_storage_service):
 # MOCKS
 @pytest.fixture
 def mock_redis():
-    redis = AsyncMock()
-    _storage = {}
-
-    async def set_val(key, val, ex=None):
-        _storage[key] = val
-
-    async def get_val(key):
-        return _storage.get(key)
-
-    async def delete_val(key):
-        _storage.pop(key, None)
-
-    redis.set = AsyncMock(side_effect=set_val)
-    redis.get = AsyncMock(side_effect=get_val)
-    redis.delete = AsyncMock(side_effect=delete_val)
-    redis.execute_command = AsyncMock()
-    return redis
+    redis = FakeRedis()
+    yield redis
+    redis.clear()
 
 
 @pytest.fixture(autouse=True)
-def mock_stripe(monkeypatch):
-    """Mock PaymentIntent.create to avoid real Stripe calls."""
-
-    def fake_create(**kwargs):
-        # Fake PaymentIntent object
-        mock_intent = MagicMock()
-        mock_intent.id = f"pi_{uuid.uuid4().hex}"
-        mock_intent.client_secret = "secret_123"
-        mock_intent.metadata = kwargs.get("metadata", {})
-        return mock_intent
-
-    # Patch the correct import path of stripe.PaymentIntent.create
-    monkeypatch.setattr(
-        "app.services.payment_service.stripe.PaymentIntent.create", fake_create
-    )
-    yield
+def fake_stripe(monkeypatch):
+    """Send the Stripe gateway's requests to the in-process fake Stripe API."""
+    fake = create_fake_stripe()
+    monkeypatch.setattr(stripe_gateway, "transport", ASGITransport(app=fake))
+    monkeypatch.setattr(stripe_gateway, "api_base", "http://stripe.test")
+    monkeypatch.setattr(stripe_gateway, "max_network_retries", 0)
+    monkeypatch.setattr(stripe_gateway, "_clients", {})
+    stripe_gateway.breaker.reset()
+    yield fake
+    stripe_gateway.breaker.reset()
 
 
 @pytest.fixture(autouse=True)
@@ -185,6 +175,28 @@ def mock_stripe_webhook(monkeypatch):
     yield
 
 
+@pytest.fixture(autouse=True)
+def sent_notifications(monkeypatch):
+    """Provider requests made by the notification transport, answered 202."""
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request)
+        return httpx.Response(202)
+
+    monkeypatch.setattr(
+        notification_transport, "transport", httpx.MockTransport(handler)
+    )
+    monkeypatch.setattr(notification_transport, "_clients", {})
+    return sent
+
+
+@pytest.fixture(autouse=True)
+def inline_invoice_rendering(monkeypatch):
+    """Render invoices on a thread; tests that want the process pool make one."""
+    monkeypatch.setattr(invoice_renderer, "processes", 0)
+
+
 @pytest.fixture
 def mock_notification_service(monkeypatch):
     mock = AsyncMock(spec=NotificationService)
@@ -339,6 +351,9 @@ async def storefront_data(db_session, sample_product_otc, sample_product_rx):
         expiry_date=datetime.now(timezone.utc) + timedelta(days=100),
     )
     db_session.add(batch)
+    # Rows are inserted directly, so build the storefront read model by hand
+    await db_session.flush()
+    await CRUDStorefront(db_session).refresh()
     await db_session.commit()
     return {"otc": sample_product_otc, "rx": sample_product_rx}
 
@@ -359,34 +374,9 @@ async def sample_order(db_session, test_customer):
 
 
 # MOCK STORAGE
-class MockR2Storage:
-    def __init__(self):
-        self.uploaded_files = {}
-        self.bucket = "test-bucket"
-        self.client = MagicMock()
-
-    def generate_presigned_url(self, key: str, expires_in: int = 300) -> str:
-        return f"https://mock-storage/{key}"
-
-    async def upload(self, file_id, file_name, file_bytes, content_type):
-        self.uploaded_files[file_id] = file_bytes
-        return file_id
-
-    async def get_file_path(self, file_id):
-        path = os.path.join(tempfile.gettempdir(), file_id)
-        with open(path, "wb") as f:
-            f.write(self.uploaded_files[file_id])
-        return path
-
-    def clear(self):
-        self.uploaded_files.clear()
-
-
 @pytest.fixture
-def mock_storage_service():
-    storage = MockR2Storage()
-    yield storage
-    storage.clear()
+def mock_storage_service(tmp_path):
+    return LocalStorage(tmp_path / "storage")
 
 
 # DEPENDENCY OVERRIDES
@@ -428,9 +418,19 @@ def override_dependencies(test_app, db_session, mock_storage_service, mock_redis
     )
     test_app.dependency_overrides[get_redis] = lambda: mock_redis
 
+    # Module-level caches hold their own Redis handle
+    principal_cache.clear()
+    principal_cache.redis = mock_redis
+    refresh_tokens.redis = mock_redis
+    token_versions.redis = mock_redis
+    storefront_cache.clear()
+    storefront_cache.redis = mock_redis
+
     yield
 
     test_app.dependency_overrides.clear()
+    principal_cache.clear()
+    storefront_cache.clear()
 
 
 # HTTP CLIENT
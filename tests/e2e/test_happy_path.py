@@ -6,14 +6,26 @@ from unittest.mock import AsyncMock, patch
 
 import pytest
 
+from app.crud.product import BatchAllocation
 from app.db.enums import OrderStatus
 from app.models.inventory import InventoryBatch
 from app.models.order import Order
+from app.models.stripe_event import StripeEvent
+from app.services.notification.notification_service import NotificationService
+from app.workers.notifications import drain_outbox
+from app.workers.stripe_events import process_stripe_events
 
 
 @pytest.mark.asyncio
 async def test_e2e_non_prescription_purchase_flow(
-    client, customer_token, test_customer, sample_product_otc, db_session, mock_redis
+    client,
+    customer_token,
+    test_customer,
+    sample_product_otc,
+    db_session,
+    mock_redis,
+    TestingAsyncSessionLocal,
+    sent_notifications,
 ):
     user_id = test_customer.id
     product_id = str(sample_product_otc.id)
@@ -56,11 +68,8 @@ async def test_e2e_non_prescription_purchase_flow(
     pi_id = order_in_db.payment_intent_id
     assert pi_id is not None
 
-    # Remove Redis checkout to allow webhook processing
-    event_id = f"evt_{uuid.uuid4().hex}"
-    await mock_redis.delete(f"stripe:event:{event_id}")
-
     # Simulate webhook
+    event_id = f"evt_{uuid.uuid4().hex}"
     stripe_payload = {
         "id": event_id,
         "type": "payment_intent.succeeded",
@@ -80,11 +89,14 @@ async def test_e2e_non_prescription_purchase_flow(
         # Create a call tracker to verify the method was called correctly
         deduct_calls = []
 
-        async def mock_deduct(product_id, quantity):
-            deduct_calls.append((product_id, quantity))
-            return None
+        async def mock_deduct(items, skip_locked=False):
+            deduct_calls.extend(items)
+            return [
+                BatchAllocation(product_id=product_id, batch_id=None, quantity=qty)
+                for product_id, qty in items
+            ]
 
-        mock_crud_instance.deduct_stock_fefo = AsyncMock(side_effect=mock_deduct)
+        mock_crud_instance.deduct_stock_for_order = AsyncMock(side_effect=mock_deduct)
         MockCRUDProduct.return_value = mock_crud_instance
 
         webhook_resp = await client.post(
@@ -93,15 +105,32 @@ async def test_e2e_non_prescription_purchase_flow(
             headers={"stripe-signature": "mock_sig"},
         )
 
-    assert webhook_resp.status_code == 200
+        # Acknowledged once stored; the Stripe events worker applies it
+        assert webhook_resp.status_code == 200
+        assert webhook_resp.json()["status"] == "received"
+        assert deduct_calls == []
+
+        totals = await process_stripe_events(
+            TestingAsyncSessionLocal,
+            mock_redis,
+            NotificationService(),
+            batch_size=10,
+            parallelism=2,
+            max_batches=5,
+            max_attempts=3,
+            lease_seconds=60,
+            retry_base=0.0,
+            retry_max=0.0,
+        )
+    assert totals["processed"] == 1
 
-    response_data = webhook_resp.json()
-    print(f"Webhook response: {response_data}")
-    assert response_data["status"] == "ok"
+    stored = await db_session.get(StripeEvent, event_id)
+    print(f"Stripe event outcome: {stored.result}")
+    assert stored.result == "ok"
 
     # VERIFY the mock was called correctly
     print(f"Deduct stock was called {len(deduct_calls)} times")
-    assert len(deduct_calls) > 0, "deduct_stock_fefo should have been called"
+    assert len(deduct_calls) > 0, "deduct_stock_for_order should have been called"
 
     # Check it was called with the right product ID
     for product_id_called, quantity_called in deduct_calls:
@@ -115,3 +144,19 @@ async def test_e2e_non_prescription_purchase_flow(
     print(f"FINAL STATUS: {order_in_db.status}")
     assert order_in_db.status == OrderStatus.PAID
     assert order_in_db.paid_at is not None
+
+    # The receipt is sent by the notifications worker, invoice attached
+    totals = await drain_outbox(
+        TestingAsyncSessionLocal,
+        NotificationService(),
+        batch_size=10,
+        max_batches=1,
+        max_attempts=3,
+        lease_seconds=60,
+        retry_base=0.0,
+        retry_max=0.0,
+    )
+    assert totals["sent"] == 1
+    [receipt] = sent_notifications
+    body = json.loads(receipt.content)
+    assert body["attachments"][0]["filename"] == f"Invoice_{order_id}.pdf"
@@ -0,0 +1,433 @@
+"""
+In-memory stand-in for redis.asyncio.Redis (decode_responses=True).
+
+Lua scripts cannot run here, so each script the app registers gets a Python
+emulation keyed by its SHA; evalsha dispatches to it.
+"""
+
+import json
+import time
+
+from redis.exceptions import NoScriptError, ResponseError
+
+from app.core import hot_stock, principal_cache, refresh_tokens
+from app.crud import cart as cart_crud
+
+WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+
+class ZSet(dict):
+    """Sorted-set value: member -> score."""
+
+
+class FakeRedis:
+    scripts: dict = {}
+
+    def __init__(self):
+        self._data: dict = {}
+        self._expires: dict = {}
+
+    @classmethod
+    def emulate(cls, script):
+        """Register a Python emulation for a registered Lua script."""
+
+        def decorator(fn):
+            cls.scripts[script.sha] = fn
+            return fn
+
+        return decorator
+
+    # KEYSPACE
+    def _alive(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def _typed(self, key, kind):
+        if not self._alive(key):
+            return None
+        value = self._data[key]
+        if not isinstance(value, kind):
+            raise ResponseError(WRONGTYPE)
+        return value
+
+    async def ping(self):
+        return True
+
+    async def type(self, key):
+        if not self._alive(key):
+            return "none"
+        value = self._data[key]
+        if isinstance(value, ZSet):
+            return "zset"
+        return "hash" if isinstance(value, dict) else "string"
+
+    async def exists(self, *keys):
+        return sum(1 for key in keys if self._alive(key))
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                removed += 1
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return removed
+
+    async def expire(self, key, seconds):
+        if not self._alive(key):
+            return False
+        self._expires[key] = time.monotonic() + int(seconds)
+        return True
+
+    async def ttl(self, key):
+        if not self._alive(key):
+            return -2
+        if key not in self._expires:
+            return -1
+        return max(0, round(self._expires[key] - time.monotonic()))
+
+    # STRINGS
+    async def get(self, key):
+        return self._typed(key, str)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and self._alive(key):
+            return None
+        self._data[key] = value if isinstance(value, str) else str(value)
+        self._expires.pop(key, None)
+        if ex:
+            self._expires[key] = time.monotonic() + int(ex)
+        return True
+
+    async def incr(self, key, amount=1):
+        value = int(self._typed(key, str) or 0) + amount
+        self._data[key] = str(value)
+        return value
+
+    # HASHES
+    def _hash(self, key):
+        value = self._typed(key, dict)
+        if isinstance(value, ZSet):
+            raise ResponseError(WRONGTYPE)
+        return value
+
+    async def hgetall(self, key):
+        return dict(self._hash(key) or {})
+
+    async def hget(self, key, field):
+        return (self._hash(key) or {}).get(str(field))
+
+    async def hexists(self, key, field):
+        return str(field) in (self._hash(key) or {})
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        data = self._hash(key)
+        if data is None:
+            data = self._data[key] = {}
+        pairs = dict(mapping or {})
+        if field is not None:
+            pairs[field] = value
+        added = sum(1 for f in pairs if str(f) not in data)
+        data.update({str(f): str(v) for f, v in pairs.items()})
+        return added
+
+    async def hincrby(self, key, field, amount=1):
+        data = self._hash(key)
+        if data is None:
+            data = self._data[key] = {}
+        data[str(field)] = str(int(data.get(str(field), 0)) + int(amount))
+        return int(data[str(field)])
+
+    async def hdel(self, key, *fields):
+        data = self._hash(key)
+        if data is None:
+            return 0
+        removed = sum(1 for f in fields if data.pop(str(f), None) is not None)
+        if not data:
+            await self.delete(key)
+        return removed
+
+    # SORTED SETS (members kept in a dict of member -> score)
+    def _zset(self, key):
+        return self._typed(key, ZSet)
+
+    async def zadd(self, key, mapping, nx=False, lt=False):
+        zset = self._zset(key)
+        if zset is None:
+            zset = self._data[key] = ZSet()
+        added = 0
+        for member, score in mapping.items():
+            member, score = str(member), float(score)
+            if member not in zset:
+                added += 1
+            elif nx or (lt and score >= zset[member]):
+                continue
+            zset[member] = score
+        return added
+
+    async def zrem(self, key, *members):
+        zset = self._zset(key)
+        if zset is None:
+            return 0
+        removed = sum(1 for m in members if zset.pop(str(m), None) is not None)
+        if not zset:
+            await self.delete(key)
+        return removed
+
+    async def zscore(self, key, member):
+        return (self._zset(key) or {}).get(str(member))
+
+    async def zcard(self, key):
+        return len(self._zset(key) or {})
+
+    async def zrange(self, key, start, end, withscores=False):
+        ordered = sorted((self._zset(key) or {}).items(), key=lambda i: (i[1], i[0]))
+        end = len(ordered) if end == -1 else end + 1
+        items = ordered[start:end]
+        return items if withscores else [member for member, _ in items]
+
+    async def zrangebyscore(self, key, min_score, max_score):
+        return [
+            member
+            for member, score in await self.zrange(key, 0, -1, withscores=True)
+            if float(min_score) <= score <= float(max_score)
+        ]
+
+    # SCRIPTING
+    async def script_load(self, script):
+        raise NoScriptError("Scripts must be emulated in tests/fake_redis.py")
+
+    async def evalsha(self, sha, numkeys, *keys_and_args):
+        if sha not in self.scripts:
+            raise NoScriptError(f"No emulation registered for script {sha}")
+        keys = list(keys_and_args[:numkeys])
+        args = [str(a) for a in keys_and_args[numkeys:]]
+        return await self.scripts[sha](self, keys, args)
+
+    def clear(self):
+        self._data.clear()
+        self._expires.clear()
+
+
+# CART SCRIPTS (app/crud/cart.py)
+# KEYS = [cart, dirty, inflight]; the user id is the last ARGV.
+async def _cart_reply(redis, key, status):
+    flat = []
+    for field, value in (await redis.hgetall(key)).items():
+        flat.extend((field, value))
+    return [status, json.dumps(flat or {})]
+
+
+async def _mark_dirty(redis, keys, args):
+    await redis.zadd(keys[1], {args[-1]: time.time()}, nx=True)
+
+
+@FakeRedis.emulate(cart_crud.READ_CART_SCRIPT)
+async def _read_cart(redis, keys, args):
+    kind = await redis.type(keys[0])
+    if kind == "string":
+        return [-2]
+    if (
+        kind == "none"
+        and await redis.zscore(keys[1], args[-1]) is None
+        and await redis.zscore(keys[2], args[-1]) is None
+    ):
+        return [-1]
+    return await _cart_reply(redis, keys[0], 0)
+
+
+@FakeRedis.emulate(cart_crud.ADD_ITEM_SCRIPT)
+async def _add_item(redis, keys, args):
+    key, (product_id, delta, cap, ttl, create, _) = keys[0], args
+    kind = await redis.type(key)
+    if kind == "string":
+        return [-2]
+    if kind == "none" and create == "0":
+        return [-1]
+    target = int(await redis.hget(key, product_id) or 0) + int(delta)
+    if int(cap) >= 0 and target > int(cap):
+        return [-3]
+    await redis.hset(key, product_id, target)
+    await redis.expire(key, ttl)
+    await _mark_dirty(redis, keys, args)
+    return await _cart_reply(redis, key, target)
+
+
+@FakeRedis.emulate(cart_crud.SET_ITEM_SCRIPT)
+async def _set_item(redis, keys, args):
+    key, (product_id, quantity, ttl, _) = keys[0], args
+    kind = await redis.type(key)
+    if kind == "string":
+        return [-2]
+    if kind == "none":
+        return [-1]
+    if not await redis.hexists(key, product_id):
+        return [-4]
+    if int(quantity) > 0:
+        await redis.hset(key, product_id, quantity)
+    else:
+        await redis.hdel(key, product_id)
+    await redis.expire(key, ttl)
+    await _mark_dirty(redis, keys, args)
+    return await _cart_reply(redis, key, int(quantity))
+
+
+@FakeRedis.emulate(cart_crud.REMOVE_ITEM_SCRIPT)
+async def _remove_item(redis, keys, args):
+    key, (product_id, ttl, _) = keys[0], args
+    kind = await redis.type(key)
+    if kind == "string":
+        return [-2]
+    if kind == "none":
+        return [-1]
+    await redis.hdel(key, product_id)
+    await redis.expire(key, ttl)
+    await _mark_dirty(redis, keys, args)
+    return await _cart_reply(redis, key, 0)
+
+
+@FakeRedis.emulate(cart_crud.CLEAR_CART_SCRIPT)
+async def _clear_cart(redis, keys, args):
+    await redis.delete(keys[0])
+    await _mark_dirty(redis, keys, args)
+    return 1
+
+
+@FakeRedis.emulate(cart_crud.REPLACE_CART_SCRIPT)
+async def _replace_cart(redis, keys, args):
+    key, ttl, pairs = keys[0], int(args[0]), args[1:]
+    await redis.delete(key)
+    if pairs:
+        await redis.hset(key, mapping=dict(zip(pairs[::2], pairs[1::2])))
+        if ttl > 0:
+            await redis.expire(key, ttl)
+    return 1
+
+
+@FakeRedis.emulate(cart_crud.CLAIM_DIRTY_SCRIPT)
+async def _claim_dirty(redis, keys, args):
+    dirty, inflight = keys
+    limit, stale_after = int(args[0]), float(args[1])
+    now = time.time()
+    for user_id in await redis.zrangebyscore(inflight, "-inf", now - stale_after):
+        await redis.zrem(inflight, user_id)
+        await redis.zadd(dirty, {user_id: now}, nx=True)
+    claimed = []
+    for user_id, score in await redis.zrange(dirty, 0, limit - 1, withscores=True):
+        await redis.zrem(dirty, user_id)
+        await redis.zadd(inflight, {user_id: now})
+        claimed.extend((user_id, str(score)))
+    return claimed
+
+
+# HOT STOCK SCRIPTS (app/core/hot_stock.py)
+# KEYS = [inflight, counters...]
+@FakeRedis.emulate(hot_stock.TAKE_SCRIPT)
+async def _take(redis, keys, args):
+    lines = list(zip(keys[1:], args[1::2], args[2::2]))
+    hot = []
+    for key, product_id, quantity in lines:
+        left = await redis.get(key)
+        if left is not None:
+            if int(left) < int(quantity):
+                return [-1, product_id]
+            hot.append((key, product_id, int(quantity)))
+    if not hot:
+        return [0]
+    for key, _, quantity in hot:
+        await redis.incr(key, -quantity)
+    items = {product_id: quantity for _, product_id, quantity in hot}
+    await redis.hset(
+        keys[0], args[0], json.dumps({"at": int(time.time()), "items": items})
+    )
+    return [0, *items]
+
+
+@FakeRedis.emulate(hot_stock.GIVE_BACK_SCRIPT)
+async def _give_back(redis, keys, args):
+    if not await redis.hdel(keys[0], args[0]):
+        return 0
+    for key, quantity in zip(keys[1:], args[1:]):
+        if await redis.exists(key):
+            await redis.incr(key, int(quantity))
+    return 1
+
+
+@FakeRedis.emulate(hot_stock.SNAPSHOT_SCRIPT)
+async def _snapshot(redis, keys, args):
+    now, held = int(time.time()), {}
+    for token, hold in (await redis.hgetall(keys[0])).items():
+        hold = json.loads(hold)
+        if now - hold["at"] > int(args[0]):
+            await redis.hdel(keys[0], token)
+            continue
+        for product_id, quantity in hold["items"].items():
+            held[product_id] = held.get(product_id, 0) + quantity
+    counters = {}
+    for key, product_id in zip(keys[1:], args[1:]):
+        left = await redis.get(key)
+        if left is not None:
+            counters[product_id] = left
+    return json.dumps({"counters": counters, "held": held})
+
+
+@FakeRedis.emulate(hot_stock.ADJUST_SCRIPT)
+async def _adjust(redis, keys, args):
+    for key, delta in zip(keys, args):
+        if await redis.exists(key):
+            await redis.incr(key, int(delta))
+    return 1
+
+
+# REFRESH TOKEN SCRIPTS (app/core/refresh_tokens.py)
+@FakeRedis.emulate(refresh_tokens.ISSUE_SCRIPT)
+async def _issue(redis, keys, args):
+    jti, family, ttl = args
+    await redis.set(keys[0], jti, ex=ttl)
+    await redis.hset(keys[1], family, 1)
+    await redis.expire(keys[1], ttl)
+    return 1
+
+
+@FakeRedis.emulate(refresh_tokens.ROTATE_SCRIPT)
+async def _rotate(redis, keys, args):
+    jti, new_jti, family, ttl = args
+    current = await redis.get(keys[0])
+    if current is None:
+        return 0
+    if current != jti:
+        await redis.delete(keys[0])
+        await redis.hdel(keys[1], family)
+        return -1
+    await redis.set(keys[0], new_jti, ex=ttl)
+    await redis.expire(keys[1], ttl)
+    return 1
+
+
+@FakeRedis.emulate(refresh_tokens.REVOKE_USER_SCRIPT)
+async def _revoke_user(redis, keys, args):
+    families = list(await redis.hgetall(keys[0]))
+    await redis.delete(*(args[0] + family for family in families), keys[0])
+    await redis.incr(keys[1])
+    return len(families)
+
+
+# PRINCIPAL CACHE SCRIPTS (app/core/principal_cache.py)
+@FakeRedis.emulate(principal_cache.STORE_SCRIPT)
+async def _store_principal(redis, keys, args):
+    generation, principal, ttl = args
+    if (await redis.get(keys[1]) or "0") != generation:
+        return 0
+    await redis.set(keys[0], principal, ex=ttl)
+    return 1
+
+
+@FakeRedis.emulate(principal_cache.INVALIDATE_SCRIPT)
+async def _invalidate_principal(redis, keys, args):
+    await redis.incr(keys[1])
+    await redis.expire(keys[1], args[0])
+    await redis.delete(keys[0])
+    return 1
@@ -1,7 +1,15 @@
+import asyncio
 import uuid
+from unittest.mock import patch
 
 import pytest
 from fastapi import status
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.exceptions import PasswordHasherBusy
+from app.core.password_hasher import PasswordHasher, password_hasher
+from app.core.security import hash_password, verify_password
 
 
 @pytest.mark.asyncio
@@ -128,3 +136,163 @@ async def test_change_password_all_roles(client, customer_token, pharmacist_toke
 
         assert response.status_code == 204
         assert response.content == b""
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_refuses_beyond_its_queue():
+    hasher = PasswordHasher(workers=1, max_queue=1, rounds=4)
+
+    # One hash runs, one waits, the third is refused without queueing
+    results = await asyncio.gather(
+        *(hasher.hash("strongpassword123") for _ in range(3)),
+        return_exceptions=True,
+    )
+    assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 1
+    assert hasher.stats()["rejected"] == 1
+    assert hasher.stats()["in_flight"] == 0
+    assert verify_password("strongpassword123", results[0])
+
+
+@pytest.mark.asyncio
+async def test_login_is_refused_with_503_when_hashing_is_saturated(
+    client, test_customer, monkeypatch
+):
+    monkeypatch.setattr(
+        password_hasher,
+        "_pending",
+        password_hasher.workers + password_hasher.max_queue,
+    )
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "test@example.com", "password": "strongpassword123"},
+    )
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_passwords_of_another_cost(
+    client, test_customer, db_session
+):
+    test_customer.hashed_password = hash_password("strongpassword123", rounds=4)
+    await db_session.commit()
+
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "test@example.com", "password": "strongpassword123"},
+    )
+    assert response.status_code == 200
+
+    await db_session.refresh(test_customer)
+    assert test_customer.hashed_password.startswith(f"$2b${settings.bcrypt_rounds}$")
+    assert verify_password("strongpassword123", test_customer.hashed_password)
+
+
+@pytest.mark.asyncio
+async def test_change_password_runs_bcrypt_verification_once(client, customer_token):
+    with patch(
+        "app.core.password_hasher.verify_password", wraps=verify_password
+    ) as verify:
+        response = await client.post(
+            "/api/v1/me/change-password",
+            json={
+                "old_password": "strongpassword123",
+                "new_password": "strongpassword123",
+            },
+            headers=customer_token,
+        )
+        assert response.status_code == 401
+        assert "cannot be the same" in response.json()["detail"]
+
+        response = await client.post(
+            "/api/v1/me/change-password",
+            json={
+                "old_password": "strongpassword123",
+                "new_password": "NewSecurePassword123!",
+            },
+            headers=customer_token,
+        )
+        assert response.status_code == 204
+
+    assert verify.call_count == 2  # one per request
+
+
+async def _login(client):
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "test@example.com", "password": "strongpassword123"},
+    )
+    assert response.status_code == 200
+    return response.json()["refresh_token"]
+
+
+async def _refresh(client, refresh_token):
+    return await client.post(
+        "/api/v1/auth/refresh", json={"refresh_token": refresh_token}
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_the_token_without_a_db_read(
+    client, test_customer, engine
+):
+    first = await _login(client)
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        response = await _refresh(client, first)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    assert response.status_code == 200
+    assert statements == []
+    second = response.json()["refresh_token"]
+    assert second != first
+
+    # The rotated token works, and can be rotated in turn
+    response = await _refresh(client, second)
+    assert response.status_code == 200
+    access = response.json()["access_token"]
+    orders = await client.get(
+        "/api/v1/orders", headers={"Authorization": f"Bearer {access}"}
+    )
+    assert orders.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_reusing_a_spent_refresh_token_revokes_its_family(client, test_customer):
+    first = await _login(client)
+    other_device = await _login(client)
+
+    second = (await _refresh(client, first)).json()["refresh_token"]
+
+    # The spent token comes back (it was copied): the family is revoked
+    response = await _refresh(client, first)
+    assert response.status_code == 401
+    assert (await _refresh(client, second)).status_code == 401
+
+    # Other logins are not affected
+    assert (await _refresh(client, other_device)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_logout_and_deactivation_revoke_refresh_tokens(
+    client, test_customer, customer_token, mock_redis
+):
+    token = await _login(client)
+    response = await client.post("/api/v1/auth/logout", json={"refresh_token": token})
+    assert response.status_code == 204
+    assert (await _refresh(client, token)).status_code == 401
+
+    tokens = [await _login(client) for _ in range(3)]
+    response = await client.delete("/api/v1/customer/me", headers=customer_token)
+    assert response.status_code == 204
+    for token in tokens:
+        assert (await _refresh(client, token)).status_code == 401
+    assert not await mock_redis.exists(f"refresh_user:{test_customer.id}")
@@ -124,3 +124,158 @@ async def test_clear_cart(client, customer_token, storefront_data, mock_redis):
     response = await client.delete("/api/v1/cart/clear", headers=customer_token)
 
     assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_add_item_covered_by_several_batches(
+    client, customer_token, storefront_data, db_session, mock_redis
+):
+    """A quantity no single batch holds is accepted if batches cover it together."""
+    from datetime import datetime, timedelta, timezone
+
+    from app.models.inventory import InventoryBatch
+
+    product = storefront_data["otc"]
+    db_session.add(
+        InventoryBatch(
+            product_id=product.id,
+            batch_number="B2",
+            initial_quantity=30,
+            current_quantity=30,
+            price=10.0,
+            expiry_date=datetime.now(timezone.utc) + timedelta(days=200),
+        )
+    )
+    await db_session.commit()
+
+    response = await client.post(
+        "/api/v1/cart/add",
+        json={"product_id": str(product.id), "quantity": 70},
+        headers=customer_token,
+    )
+
+    assert response.status_code == 200
+    assert response.json()["cart"]["total_items"] == 70
+
+
+@pytest.mark.asyncio
+async def test_update_item_beyond_stock_fails(
+    client, customer_token, storefront_data, mock_redis
+):
+    product_id = str(storefront_data["otc"].id)
+    await client.post(
+        "/api/v1/cart/add",
+        json={"product_id": product_id, "quantity": 1},
+        headers=customer_token,
+    )
+
+    response = await client.patch(
+        "/api/v1/cart/update",
+        json={"product_id": product_id, "quantity": 51},
+        headers=customer_token,
+    )
+
+    assert response.status_code == 400
+    assert "exceeds available stock" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_validate_cart_reports_every_short_line(db_session, storefront_data):
+    from fastapi import HTTPException
+
+    from app.services.cart_service import CartService
+
+    otc, rx = storefront_data["otc"], storefront_data["rx"]
+    service = CartService(db_session)
+
+    stock = await service.validate_cart(
+        [
+            {"product_id": str(otc.id), "quantity": 20},
+            {"product_id": str(otc.id), "quantity": 30},
+        ]
+    )
+    assert stock[otc.id].available == 50
+
+    with pytest.raises(HTTPException) as exc:
+        await service.validate_cart(
+            [
+                {"product_id": str(otc.id), "quantity": 51},
+                {"product_id": str(rx.id), "quantity": 1},
+            ]
+        )
+
+    assert exc.value.status_code == 400
+    assert otc.name in exc.value.detail and rx.name in exc.value.detail
+
+
+@pytest.mark.asyncio
+async def test_v1_json_cart_is_migrated_to_hash(
+    client, customer_token, test_customer, storefront_data, mock_redis
+):
+    import json
+
+    product_id = str(storefront_data["otc"].id)
+    key = f"cart:{test_customer.id}"
+    await mock_redis.set(
+        key, json.dumps({"v": 1, "items": [{"product_id": product_id, "quantity": 2}]})
+    )
+
+    response = await client.post(
+        "/api/v1/cart/add",
+        json={"product_id": product_id, "quantity": 1},
+        headers=customer_token,
+    )
+
+    assert response.status_code == 200
+    assert response.json()["cart"]["total_items"] == 3
+    assert await mock_redis.type(key) == "hash"
+    assert await mock_redis.hgetall(key) == {product_id: "3"}
+
+
+@pytest.mark.asyncio
+async def test_v1_json_cart_without_ttl_gets_cart_ttl(
+    client, customer_token, test_customer, storefront_data, mock_redis
+):
+    import json
+
+    from app.crud.cart import CartCRUD
+
+    product_id = str(storefront_data["otc"].id)
+    key = f"cart:{test_customer.id}"
+    await mock_redis.set(
+        key, json.dumps({"v": 1, "items": [{"product_id": product_id, "quantity": 2}]})
+    )
+
+    # A read migrates the key without a mutation refreshing the TTL
+    response = await client.get("/api/v1/cart", headers=customer_token)
+
+    assert response.status_code == 200
+    assert await mock_redis.type(key) == "hash"
+    assert 0 < await mock_redis.ttl(key) <= CartCRUD.CART_TTL
+
+
+@pytest.mark.asyncio
+async def test_concurrent_adds_never_exceed_stock(
+    db_session, test_customer, storefront_data, mock_redis
+):
+    import asyncio
+
+    from fastapi import HTTPException
+
+    from app.services.cart_service import CartService
+
+    product_id = storefront_data["otc"].id
+    service = CartService(db_session)
+
+    results = await asyncio.gather(
+        *(
+            service.add_item(mock_redis, test_customer.id, product_id, 10)
+            for _ in range(6)
+        ),
+        return_exceptions=True,
+    )
+
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 1
+    cart = await service.get_cart(mock_redis, test_customer.id)
+    assert cart["total_items"] == 50
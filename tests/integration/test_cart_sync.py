@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import select
+
+from app.crud.cart import CartCRUD
+from app.models.cart import CartItem
+from app.workers.cart_sync import STATS_KEY, flush_dirty_carts
+
+
+async def _flush(mock_redis, TestingAsyncSessionLocal, **kwargs):
+    options = {"batch_size": 100, "max_batches": 10, "stale_after": 300}
+    options.update(kwargs)
+    return await flush_dirty_carts(mock_redis, TestingAsyncSessionLocal, **options)
+
+
+async def _db_cart(db_session, user_id):
+    db_session.expire_all()
+    rows = await db_session.execute(
+        select(CartItem.product_id, CartItem.quantity).where(
+            CartItem.user_id == user_id
+        )
+    )
+    return {str(product_id): quantity for product_id, quantity in rows.all()}
+
+
+@pytest.mark.asyncio
+async def test_many_mutations_are_written_once(
+    client,
+    customer_token,
+    test_customer,
+    storefront_data,
+    db_session,
+    mock_redis,
+    TestingAsyncSessionLocal,
+):
+    user_id, product_id = test_customer.id, str(storefront_data["otc"].id)
+
+    for _ in range(5):
+        response = await client.post(
+            "/api/v1/cart/add",
+            json={"product_id": product_id, "quantity": 1},
+            headers=customer_token,
+        )
+        assert response.status_code == 200
+
+    # Nothing is written until the worker runs
+    assert await _db_cart(db_session, user_id) == {}
+    assert await mock_redis.zcard(CartCRUD.DIRTY_KEY) == 1
+
+    totals = await _flush(mock_redis, TestingAsyncSessionLocal)
+
+    assert totals == {"batches": 1, "carts": 1, "rows": 1, "dropped": 0}
+    assert await _db_cart(db_session, user_id) == {product_id: 5}
+    assert await mock_redis.zcard(CartCRUD.DIRTY_KEY) == 0
+    assert (await mock_redis.hgetall(STATS_KEY))["rows_written"] == "1"
+
+    # Unchanged carts are not rewritten
+    await mock_redis.zadd(CartCRUD.DIRTY_KEY, {str(user_id): 0})
+    assert (await _flush(mock_redis, TestingAsyncSessionLocal))["rows"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cleared_cart_is_not_restored_from_stale_rows(
+    client,
+    customer_token,
+    test_customer,
+    storefront_data,
+    db_session,
+    mock_redis,
+    TestingAsyncSessionLocal,
+):
+    user_id, product_id = test_customer.id, str(storefront_data["otc"].id)
+    await client.post(
+        "/api/v1/cart/add",
+        json={"product_id": product_id, "quantity": 2},
+        headers=customer_token,
+    )
+    await _flush(mock_redis, TestingAsyncSessionLocal)
+
+    await client.delete("/api/v1/cart/clear", headers=customer_token)
+
+    # DB rows still exist until the next flush, but must not come back
+    assert await _db_cart(db_session, user_id) == {product_id: 2}
+    response = await client.get("/api/v1/cart", headers=customer_token)
+    assert response.json()["total_items"] == 0
+
+    await _flush(mock_redis, TestingAsyncSessionLocal)
+    assert await _db_cart(db_session, user_id) == {}
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_requeued(
+    test_customer, storefront_data, mock_redis, monkeypatch
+):
+    crud = CartCRUD(session=None)
+    await crud.add_quantity(
+        mock_redis,
+        test_customer.id,
+        storefront_data["otc"].id,
+        1,
+        cap=-1,
+        ttl=60,
+        create=True,
+    )
+
+    def broken_factory():
+        raise ConnectionError("database down")
+
+    with pytest.raises(ConnectionError):
+        await _flush(mock_redis, broken_factory)
+
+    assert await mock_redis.zcard(CartCRUD.DIRTY_KEY) == 1
+    assert await mock_redis.zcard(CartCRUD.INFLIGHT_KEY) == 0
@@ -0,0 +1,174 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+import stripe
+from sqlalchemy import event, update
+
+from app.crud.cart import CartCRUD
+from app.db.connection_report import ConnectionHoldReport
+from app.db.enums import OrderStatus
+from app.models.order import Order
+from app.services.stripe_gateway import stripe_gateway
+
+
+@pytest.fixture
+def report(engine):
+    report = ConnectionHoldReport()
+    report.install(engine)
+    yield report
+    report.uninstall(engine)
+
+
+@pytest.fixture
+def checkouts(engine):
+    checkouts = []
+
+    def record(dbapi_connection, connection_record, proxy):
+        checkouts.append(connection_record)
+
+    event.listen(engine.sync_engine, "checkout", record)
+    yield checkouts
+    event.remove(engine.sync_engine, "checkout", record)
+
+
+@pytest.mark.asyncio
+async def test_redis_served_and_refused_requests_never_take_a_connection(
+    client,
+    db_session,
+    test_customer,
+    customer_token,
+    sample_product_otc,
+    mock_redis,
+    checkouts,
+    report,
+):
+    await CartCRUD(db_session).set_redis_items(
+        mock_redis,
+        test_customer.id,
+        [{"product_id": sample_product_otc.id, "quantity": 1}],
+        ttl=3600,
+    )
+    await db_session.close()
+    checkouts.clear()
+
+    assert (await client.get("/api/v1/orders")).status_code == 401
+    assert (await client.get("/api/v1/cart")).status_code == 401
+    assert (await client.get("/api/v1/cart", headers=customer_token)).status_code == 200
+    assert checkouts == []
+    assert report.stats() == {}
+
+    # Routes that query are reported by route template
+    assert (
+        await client.get("/api/v1/orders", headers=customer_token)
+    ).status_code == 200
+    stats = report.stats()
+    assert list(stats) == ["GET /api/v1/orders"]
+    assert stats["GET /api/v1/orders"]["count"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_payment_intent_releases_the_connection_before_calling_stripe(
+    client, db_session, test_customer, customer_token, mock_redis
+):
+    order = Order(
+        customer_id=test_customer.id,
+        total_amount=Decimal("100.00"),
+        status=OrderStatus.READY_FOR_PAYMENT,
+    )
+    db_session.add(order)
+    await db_session.commit()
+    await mock_redis.set(f"checkout:{test_customer.id}", "1", ex=600)
+
+    create = stripe_gateway.create_payment_intent
+    held = []
+
+    async def spy(**kwargs):
+        held.append(db_session.in_transaction())
+        return await create(**kwargs)
+
+    with patch.object(stripe_gateway, "create_payment_intent", side_effect=spy):
+        response = await client.post(
+            f"/api/v1/payments/order/{order.id}", headers=customer_token
+        )
+
+    assert response.status_code == 200
+    assert held == [False]
+    await db_session.refresh(order)
+    assert order.payment_intent_id
+
+
+async def _order_with_intent(client, db_session, customer, customer_token, redis):
+    order = Order(
+        customer_id=customer.id,
+        total_amount=Decimal("100.00"),
+        status=OrderStatus.READY_FOR_PAYMENT,
+    )
+    db_session.add(order)
+    await db_session.commit()
+    await redis.set(f"checkout:{customer.id}", "1", ex=600)
+    response = await client.post(
+        f"/api/v1/payments/order/{order.id}", headers=customer_token
+    )
+    assert response.status_code == 200
+    await db_session.refresh(order)
+    return order
+
+
+async def _set_status(db_session, order, status):
+    await db_session.execute(
+        update(Order).where(Order.id == order.id).values(status=status)
+    )
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_a_refund_event_during_the_stripe_call_is_not_overwritten(
+    client, db_session, test_customer, customer_token, admin_token, mock_redis
+):
+    order = await _order_with_intent(
+        client, db_session, test_customer, customer_token, mock_redis
+    )
+    await _set_status(db_session, order, OrderStatus.PAID)
+    create = stripe_gateway.create_refund
+
+    async def refunded_meanwhile(**kwargs):
+        refund = await create(**kwargs)
+        # charge.refunded processed before the refund endpoint writes
+        await _set_status(db_session, order, OrderStatus.REFUNDED)
+        return refund
+
+    with patch.object(stripe_gateway, "create_refund", side_effect=refunded_meanwhile):
+        response = await client.post(
+            f"/api/v1/payments/refund/{order.id}", headers=admin_token
+        )
+
+    assert response.status_code == 200
+    await db_session.refresh(order)
+    assert order.status == OrderStatus.REFUNDED
+
+
+@pytest.mark.asyncio
+async def test_a_cancel_racing_the_payment_leaves_the_order_paid(
+    client, db_session, test_customer, customer_token, mock_redis
+):
+    order = await _order_with_intent(
+        client, db_session, test_customer, customer_token, mock_redis
+    )
+
+    async def paid_meanwhile(*args, **kwargs):
+        # payment_intent.succeeded processed; Stripe refuses the cancel
+        await _set_status(db_session, order, OrderStatus.PAID)
+        raise stripe.error.InvalidRequestError("already succeeded", None)
+
+    with patch.object(
+        stripe_gateway, "cancel_payment_intent", side_effect=paid_meanwhile
+    ):
+        response = await client.post(
+            f"/api/v1/payments/cancel/{order.id}", headers=customer_token
+        )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Paid orders must be refunded"
+    await db_session.refresh(order)
+    assert order.status == OrderStatus.PAID
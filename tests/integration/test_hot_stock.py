@@ -0,0 +1,202 @@
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db.enums import OrderStatus
+from app.models.inventory import InventoryBatch
+from app.models.order import Order
+from app.models.stock_allocation import StockAllocation
+from app.models.stock_reservation import StockReservation
+from app.services.notification.notification_service import NotificationService
+from app.workers.hot_stock import reconcile_hot_stock
+from app.workers.stripe_events import process_stripe_events
+
+COUNTER = "hot_stock:{}"
+
+
+async def _hot_product(client, admin_token, db_session, product, quantity):
+    batch = InventoryBatch(
+        product_id=product.id,
+        batch_number="BATCH-HOT",
+        initial_quantity=quantity,
+        current_quantity=quantity,
+        price=Decimal("50.00"),
+        expiry_date=datetime.now(timezone.utc) + timedelta(days=365),
+    )
+    db_session.add(batch)
+    await db_session.commit()
+
+    resp = await client.patch(
+        f"/api/v1/product/{product.id}/toggle-hot-stock", headers=admin_token
+    )
+    assert resp.status_code == 200
+    assert resp.json()["hot_stock"] is True
+    return batch
+
+
+async def _checkout(client, customer_token, customer, product, redis, quantity):
+    await redis.set(
+        f"cart:{customer.id}",
+        json.dumps({"items": [{"product_id": str(product.id), "quantity": quantity}]}),
+    )
+    return await client.post("/api/v1/cart/checkout", headers=customer_token)
+
+
+async def _reconcile(redis, session_factory):
+    return await reconcile_hot_stock(
+        redis, session_factory, batch_size=100, stale_after=60
+    )
+
+
+@pytest.mark.asyncio
+async def test_hot_checkout_and_payment_skip_the_batches_until_reconciled(
+    client,
+    admin_token,
+    customer_token,
+    test_customer,
+    sample_product_otc,
+    db_session,
+    mock_redis,
+    TestingAsyncSessionLocal,
+):
+    product = sample_product_otc
+    batch = await _hot_product(client, admin_token, db_session, product, 5)
+    assert await mock_redis.get(COUNTER.format(product.id)) == "5"
+
+    resp = await _checkout(
+        client, customer_token, test_customer, product, mock_redis, 3
+    )
+    assert resp.status_code == 200
+    order_id = resp.json()["order_id"]
+    assert await mock_redis.get(COUNTER.format(product.id)) == "2"
+    assert not await mock_redis.hgetall("hot_stock:inflight")
+
+    payment = await client.post(
+        f"/api/v1/payments/order/{order_id}", headers=customer_token
+    )
+    intent_id = payment.json()["client_secret"].split("_secret_")[0]
+    await client.post(
+        "/api/v1/payments/webhooks/stripe",
+        json={
+            "id": "evt_hot",
+            "type": "payment_intent.succeeded",
+            "data": {"object": {"id": intent_id, "metadata": {"order_id": order_id}}},
+        },
+        headers={"stripe-signature": "mock_sig"},
+    )
+    totals = await process_stripe_events(
+        TestingAsyncSessionLocal,
+        mock_redis,
+        NotificationService(),
+        batch_size=10,
+        parallelism=1,
+        max_batches=1,
+        max_attempts=1,
+        lease_seconds=60,
+        retry_base=0.0,
+        retry_max=0.0,
+    )
+    assert totals["processed"] == 1
+
+    # Paid, with the units still held by the sold reservation
+    order = await db_session.get(Order, UUID(order_id))
+    await db_session.refresh(order)
+    assert order.status == OrderStatus.PAID
+    await db_session.refresh(batch)
+    assert batch.current_quantity == 5
+    assert await db_session.scalar(select(StockReservation.sold)) is True
+
+    result = await _reconcile(mock_redis, TestingAsyncSessionLocal)
+    assert result["orders_applied"] == 1
+    assert result["drift_units"] == 0
+
+    await db_session.refresh(batch)
+    assert batch.current_quantity == 2
+    assert await db_session.scalar(select(StockReservation)) is None
+    assert await db_session.scalar(select(func.sum(StockAllocation.quantity))) == 3
+
+
+@pytest.mark.asyncio
+async def test_short_counter_rejects_checkout_and_failed_checkouts_give_back(
+    client,
+    admin_token,
+    customer_token,
+    test_customer,
+    sample_product_otc,
+    db_session,
+    mock_redis,
+):
+    product = sample_product_otc
+    await _hot_product(client, admin_token, db_session, product, 2)
+
+    resp = await _checkout(
+        client, customer_token, test_customer, product, mock_redis, 3
+    )
+    assert resp.status_code == 409
+    assert await mock_redis.get(COUNTER.format(product.id)) == "2"
+
+    # Counter ahead of Postgres: admitted, refused by Postgres, given back
+    await mock_redis.set(COUNTER.format(product.id), 10)
+    resp = await _checkout(
+        client, customer_token, test_customer, product, mock_redis, 3
+    )
+    assert resp.status_code == 400
+    assert await mock_redis.get(COUNTER.format(product.id)) == "10"
+    assert not await mock_redis.hgetall("hot_stock:inflight")
+
+
+@pytest.mark.asyncio
+async def test_reconcile_repairs_drift_and_reloads_lost_counters(
+    client,
+    admin_token,
+    customer_token,
+    test_customer,
+    sample_product_otc,
+    db_session,
+    mock_redis,
+    TestingAsyncSessionLocal,
+):
+    product = sample_product_otc
+    await _hot_product(client, admin_token, db_session, product, 5)
+    resp = await _checkout(
+        client, customer_token, test_customer, product, mock_redis, 2
+    )
+    order_id = resp.json()["order_id"]
+
+    # Cancelling frees Postgres stock; the counter catches up on reconcile
+    await client.post(f"/api/v1/orders/{order_id}/cancel", headers=customer_token)
+    assert await mock_redis.get(COUNTER.format(product.id)) == "3"
+
+    result = await _reconcile(mock_redis, TestingAsyncSessionLocal)
+    assert result == {
+        "orders_applied": 0,
+        "hot_products": 1,
+        "repaired": 1,
+        "drift_units": 2,
+    }
+    assert await mock_redis.get(COUNTER.format(product.id)) == "5"
+
+    # Units of checkouts in flight are not handed out again
+    await mock_redis.hset(
+        "hot_stock:inflight",
+        "in-flight",
+        json.dumps(
+            {"at": int(datetime.now().timestamp()), "items": {str(product.id): 1}}
+        ),
+    )
+    await mock_redis.set(COUNTER.format(product.id), 4)
+    assert (await _reconcile(mock_redis, TestingAsyncSessionLocal))["repaired"] == 0
+
+    await mock_redis.delete(COUNTER.format(product.id))
+    await _reconcile(mock_redis, TestingAsyncSessionLocal)
+    assert await mock_redis.get(COUNTER.format(product.id)) == "5"
+
+    resp = await client.patch(
+        f"/api/v1/product/{product.id}/toggle-hot-stock", headers=admin_token
+    )
+    assert resp.json()["hot_stock"] is False
+    assert not await mock_redis.exists(COUNTER.format(product.id))
@@ -0,0 +1,155 @@
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql
+
+from app.crud.product import CRUDProduct
+from app.crud.storefront import CRUDStorefront
+from app.models.inventory import InventoryBatch
+from app.models.notification_outbox import NotificationOutbox
+from app.models.storefront import StorefrontProduct
+from app.services.checkout_service import CheckoutService
+from app.services.notification.notification_service import NotificationService
+from app.workers.inventory import sweep_expiry
+
+SELLABLE_INDEX = "ix_inventory_batches_sellable"
+
+
+def _batch(product, number, *, days, quantity=10):
+    return InventoryBatch(
+        product_id=product.id,
+        batch_number=number,
+        initial_quantity=10,
+        current_quantity=quantity,
+        price=Decimal("50.00"),
+        expiry_date=datetime.now(timezone.utc) + timedelta(days=days),
+    )
+
+
+async def _plans(engine, session, run) -> list[str]:
+    """EXPLAIN QUERY PLAN of each inventory_batches query run() makes."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM inventory_batches" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        await run()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    conn = await session.connection()
+    plans = []
+    for statement, parameters in statements:
+        rows = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        plans.append("\n".join(row[-1] for row in rows))
+    return plans
+
+
+@pytest.mark.asyncio
+async def test_stock_queries_read_the_sellable_batches_index(
+    engine, db_session, sample_product_otc, test_customer, mock_redis
+):
+    product_id, user_id = sample_product_otc.id, test_customer.id
+    db_session.add(_batch(sample_product_otc, "BATCH-PLAN", days=365))
+    await db_session.commit()
+    crud = CRUDProduct(db_session)
+
+    async def stock_queries():
+        await crud.get_sellable_stock([product_id])
+        await crud.get_available_products()
+        await CRUDStorefront(db_session).refresh([product_id])
+        await crud.deduct_stock_for_order(items=[(product_id, 1)])
+        await db_session.rollback()
+
+    # Postgres proves the index predicate only from literals: with a bound
+    # 0, generic plans of the prepared statements could not use the index
+    where = select(InventoryBatch.id).where(
+        *InventoryBatch.sellable(datetime.now(timezone.utc))
+    )
+    assert (
+        "NOT inventory_batches.is_blocked AND inventory_batches.current_quantity > 0"
+        in str(where.compile(dialect=postgresql.dialect()))
+    )
+
+    plans = await _plans(engine, db_session, stock_queries)
+    assert len(plans) >= 4
+    for plan in plans:
+        assert SELLABLE_INDEX in plan, plan
+
+    # Checkout reserves through the same FEFO allocation
+    await mock_redis.set(
+        f"cart:{user_id}",
+        json.dumps({"items": [{"product_id": str(product_id), "quantity": 1}]}),
+    )
+    checkout = CheckoutService(db_session)
+    plans = await _plans(
+        engine,
+        db_session,
+        lambda: checkout.checkout(user_id=user_id, redis=mock_redis),
+    )
+    assert plans
+    for plan in plans:
+        assert SELLABLE_INDEX in plan, plan
+
+
+@pytest.mark.asyncio
+async def test_sweeper_blocks_expired_batches_and_warns_admins_once(
+    db_session, sample_product_otc, test_admin, mock_redis, TestingAsyncSessionLocal
+):
+    product = sample_product_otc
+    expired = _batch(product, "BATCH-OLD", days=365)
+    expiring = _batch(product, "BATCH-SOON", days=10)
+    db_session.add_all(
+        [
+            expired,
+            expiring,
+            _batch(product, "BATCH-FRESH", days=365),
+            _batch(product, "BATCH-SOLD-OUT", days=5, quantity=0),
+        ]
+    )
+    await db_session.commit()
+    await CRUDStorefront(db_session).refresh([product.id])
+    await db_session.commit()
+
+    # Batches expire without any write
+    expired.expiry_date = datetime.now(timezone.utc) - timedelta(hours=1)
+    await db_session.commit()
+
+    result = await sweep_expiry(
+        mock_redis, TestingAsyncSessionLocal, NotificationService(), near_expiry_days=30
+    )
+    assert result == {"blocked": 1, "near_expiry": 1}
+
+    await db_session.refresh(expired)
+    await db_session.refresh(expiring)
+    assert expired.is_blocked
+    assert not expiring.is_blocked
+    assert expiring.near_expiry_notified_at is not None
+
+    storefront = await db_session.get(StorefrontProduct, product.id)
+    await db_session.refresh(storefront)
+    assert storefront.sellable_quantity == 20
+
+    outbox = (await db_session.scalars(select(NotificationOutbox))).all()
+    assert [row.dedup_key for row in outbox] == [
+        f"batch-near-expiry:{expiring.id}:{test_admin.id}"
+    ]
+    assert outbox[0].payload["email"] == test_admin.email
+    assert "BATCH-SOON" in outbox[0].payload["message"]
+
+    # Nothing new on the next pass
+    result = await sweep_expiry(
+        mock_redis, TestingAsyncSessionLocal, NotificationService(), near_expiry_days=30
+    )
+    assert result == {"blocked": 0, "near_expiry": 0}
+    assert len((await db_session.scalars(select(NotificationOutbox))).all()) == 1
+    assert await mock_redis.hgetall("inventory:stats") == {
+        "expired_batches_blocked": "1",
+        "near_expiry_batches": "1",
+    }
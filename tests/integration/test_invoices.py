@@ -0,0 +1,122 @@
+import asyncio
+import multiprocessing
+import re
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.db.enums import OrderStatus
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.services.invoice_service import (
+    ROWS_PER_PAGE,
+    InvoiceLine,
+    InvoiceRenderer,
+    InvoiceSnapshot,
+    render_invoice,
+)
+from app.workers import invoices
+from app.workers.invoices import invoice_key, regenerate_invoices
+
+
+def _page_count(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b(?!s)", pdf))
+
+
+def _snapshot(lines: int) -> InvoiceSnapshot:
+    return InvoiceSnapshot(
+        order_id="order-1",
+        paid_at=datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc),
+        total=Decimal("12.50") * lines,
+        lines=tuple(
+            InvoiceLine(
+                name=f"Amoxicillin Capsules 500mg, pack of 21 ({i}) " * (i % 3 + 1),
+                quantity=1,
+                unit_price=Decimal("12.50"),
+            )
+            for i in range(lines)
+        ),
+    )
+
+
+def test_long_orders_continue_on_further_pages():
+    assert _page_count(render_invoice(_snapshot(0))) == 1
+    assert _page_count(render_invoice(_snapshot(10))) == 1
+    # A full last page leaves no room for the total, which gets its own page
+    assert _page_count(render_invoice(_snapshot(ROWS_PER_PAGE))) == 2
+    assert _page_count(render_invoice(_snapshot(ROWS_PER_PAGE * 3 + 1))) == 4
+
+
+@pytest.mark.asyncio
+async def test_process_pool_renders_in_input_order():
+    renderer = InvoiceRenderer(processes=2)
+    try:
+        snapshots = [_snapshot(n) for n in (1, ROWS_PER_PAGE * 2, 3)]
+        pdfs = await renderer.render_many(snapshots, chunksize=1)
+        assert [_page_count(pdf) for pdf in pdfs] == [1, 3, 1]
+        assert (await renderer.render(snapshots[0])).startswith(b"%PDF")
+    finally:
+        renderer.shutdown()
+
+
+def _render_in_worker(results):
+    renderer = InvoiceRenderer(processes=2)
+    try:
+        pdf = asyncio.run(renderer.render(_snapshot(3)))
+        results.put(_page_count(pdf))
+    except BaseException as e:
+        results.put(repr(e))
+    finally:
+        renderer.shutdown()
+
+
+def test_daemonic_worker_processes_render_on_a_thread():
+    # Celery's prefork children are daemonic and may not start processes
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    worker = context.Process(target=_render_in_worker, args=(results,), daemon=True)
+    worker.start()
+    try:
+        assert results.get(timeout=60) == 1
+    finally:
+        worker.join(timeout=10)
+
+
+@pytest.mark.asyncio
+async def test_bulk_regeneration_stores_every_paid_invoice(
+    TestingAsyncSessionLocal, test_customer, sample_product_otc, mock_storage_service
+):
+    async with TestingAsyncSessionLocal() as session:
+        orders = []
+        for status, paid_at in [
+            (OrderStatus.PAID, datetime.now(timezone.utc)),
+            (OrderStatus.FULFILLED, datetime.now(timezone.utc)),
+            (OrderStatus.CREATED, None),
+        ]:
+            order = Order(
+                customer_id=test_customer.id,
+                total_amount=Decimal("20.00"),
+                status=status,
+                paid_at=paid_at,
+            )
+            order.items = [
+                OrderItem(
+                    product_id=sample_product_otc.id,
+                    quantity=2,
+                    price_at_purchase=Decimal("10.00"),
+                )
+            ]
+            session.add(order)
+            orders.append(order)
+        await session.commit()
+
+    written = await regenerate_invoices(
+        TestingAsyncSessionLocal, mock_storage_service, batch_size=1
+    )
+
+    assert written == 2
+    for order in orders[:2]:
+        assert mock_storage_service.read(invoice_key(order.id)).startswith(b"%PDF")
+    assert not (mock_storage_service.root / invoice_key(orders[2].id)).exists()
+    assert invoices.invoices_regenerated.value >= 2
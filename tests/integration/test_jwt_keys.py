@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+
+from app.core.config import settings
+from app.core.jwt_keys import jwt_keyring
+from app.scripts.generate_jwt_key import generate
+
+
+@pytest.fixture
+def keyring():
+    yield jwt_keyring
+    jwt_keyring.load([])
+
+
+async def _login(client) -> str:
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "test@example.com", "password": "strongpassword123"},
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+async def _orders(client, access_token):
+    return await client.get(
+        "/api/v1/orders", headers={"Authorization": f"Bearer {access_token}"}
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("algorithm", ["EdDSA", "ES256"])
+async def test_tokens_are_signed_with_the_keyring_and_published_as_jwks(
+    client, test_customer, keyring, algorithm
+):
+    keyring.load([generate(algorithm)])
+
+    access = await _login(client)
+    header = jwt.get_unverified_header(access)
+    assert header["alg"] == algorithm
+    assert header["kid"]
+    assert (await _orders(client, access)).status_code == 200
+
+    # Anyone can verify with the published keys alone
+    response = await client.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert "max-age" in response.headers["cache-control"]
+    jwks = jwt.PyJWKSet.from_dict(response.json())
+    key = jwks[header["kid"]]
+    assert "d" not in response.json()["keys"][0]
+    claims = jwt.decode(access, key.key, algorithms=[key.algorithm_name])
+    assert claims["sub"] == str(test_customer.id)
+
+
+@pytest.mark.asyncio
+async def test_rotation_keeps_old_tokens_until_their_key_is_dropped(
+    client, test_customer, keyring
+):
+    old_key, new_key = generate("EdDSA"), generate("ES256")
+    keyring.load([old_key])
+    old_token = await _login(client)
+
+    keyring.load([new_key, old_key])
+    new_token = await _login(client)
+    assert (
+        jwt.get_unverified_header(new_token)["kid"]
+        != jwt.get_unverified_header(old_token)["kid"]
+    )
+    assert (await _orders(client, old_token)).status_code == 200
+    assert (await _orders(client, new_token)).status_code == 200
+    assert len((await client.get("/.well-known/jwks.json")).json()["keys"]) == 2
+
+    keyring.load([new_key])
+    assert (await _orders(client, old_token)).status_code == 401
+    assert (await _orders(client, new_token)).status_code == 200
+    assert keyring.unknown_kid.value >= 1
+
+
+@pytest.mark.asyncio
+async def test_secret_signed_tokens_only_pass_while_switching_over(
+    client, test_customer, keyring
+):
+    secret_token = jwt.encode(
+        {
+            "sub": str(test_customer.id),
+            "type": "access",
+            "email": test_customer.email,
+            "role": test_customer.role.value,
+            "exp": datetime.now(timezone.utc) + timedelta(minutes=5),
+        },
+        settings.secret_key,
+        algorithm=settings.jwt_algorithm,
+    )
+
+    keyring.load([generate("EdDSA")], accept_secret_signed=True)
+    assert (await _orders(client, secret_token)).status_code == 200
+
+    keyring.load([generate("EdDSA")])
+    assert (await _orders(client, secret_token)).status_code == 401
+    assert (await client.get("/.well-known/jwks.json")).json()["keys"]
@@ -0,0 +1,186 @@
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app.crud.notification_outbox import NotificationOutboxCRUD
+from app.db.enums import OutboxStatus
+from app.models.notification_outbox import NotificationOutbox
+from app.services.notification.notification_service import NotificationService
+from app.services.notification.transport import notification_transport
+from app.workers.notifications import drain_outbox
+
+
+async def _drain(session_factory, **overrides) -> dict:
+    options = dict(
+        batch_size=10,
+        max_batches=5,
+        max_attempts=3,
+        lease_seconds=60,
+        retry_base=0.0,
+        retry_max=0.0,
+    )
+    return await drain_outbox(
+        session_factory, NotificationService(), **(options | overrides)
+    )
+
+
+async def _rows(session_factory) -> list[NotificationOutbox]:
+    async with session_factory() as session:
+        return (await session.execute(select(NotificationOutbox))).scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_is_deduplicated_and_rolls_back_with_the_change(
+    TestingAsyncSessionLocal,
+):
+    service = NotificationService()
+    message = dict(email="a@b.co", phone=None, message="hi", channels=["email"])
+
+    async with TestingAsyncSessionLocal() as session:
+        assert await service.enqueue(session, dedup_key="welcome:1", **message)
+        assert not await service.enqueue(session, dedup_key="welcome:1", **message)
+        await session.commit()
+
+    async with TestingAsyncSessionLocal() as session:
+        await service.enqueue(session, dedup_key="welcome:2", **message)
+        await session.rollback()
+
+    assert [row.dedup_key for row in await _rows(TestingAsyncSessionLocal)] == [
+        "welcome:1"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_registration_queues_the_welcome_email_for_the_worker(
+    client, TestingAsyncSessionLocal, sent_notifications
+):
+    response = await client.post(
+        "/api/v1/auth/register",
+        json={
+            "full_name": "Jane Doe",
+            "email": f"jane_{uuid.uuid4().hex[:6]}@example.com",
+            "phone_number": "+1230000000000",
+            "address": "example street 123",
+            "date_of_birth": "1999-01-01",
+            "password": "strongpassword123",
+        },
+    )
+    assert response.status_code == 201
+    assert sent_notifications == []  # nothing is sent by the request itself
+
+    [row] = await _rows(TestingAsyncSessionLocal)
+    assert row.dedup_key == f"welcome:{response.json()['user']}"
+    assert row.status == OutboxStatus.PENDING
+
+    totals = await _drain(TestingAsyncSessionLocal)
+    assert totals["sent"] == 1
+    assert len(sent_notifications) == 1
+
+    [row] = await _rows(TestingAsyncSessionLocal)
+    assert row.status == OutboxStatus.SENT
+    assert row.sent_at is not None
+
+    # Sent rows are not sent again
+    assert (await _drain(TestingAsyncSessionLocal))["sent"] == 0
+    assert len(sent_notifications) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_sends_are_retried_then_dead_lettered(
+    TestingAsyncSessionLocal, monkeypatch
+):
+    monkeypatch.setattr(
+        notification_transport,
+        "transport",
+        httpx.MockTransport(lambda request: httpx.Response(503)),
+    )
+    monkeypatch.setattr(notification_transport, "max_attempts", 1)
+
+    async with TestingAsyncSessionLocal() as session:
+        await NotificationService().enqueue(
+            session,
+            dedup_key="refund:1",
+            email="a@b.co",
+            phone=None,
+            message="refunded",
+            channels=["email"],
+        )
+        await session.commit()
+
+    # One run never claims the same row twice
+    assert await _drain(TestingAsyncSessionLocal, max_attempts=2) == {
+        "batches": 1,
+        "sent": 0,
+        "retried": 1,
+        "dead": 0,
+    }
+    [row] = await _rows(TestingAsyncSessionLocal)
+    assert (row.status, row.attempts) == (OutboxStatus.PENDING, 1)
+    assert "failed to deliver" in row.last_error
+
+    assert (await _drain(TestingAsyncSessionLocal, max_attempts=2))["dead"] == 1
+    [row] = await _rows(TestingAsyncSessionLocal)
+    assert (row.status, row.attempts) == (OutboxStatus.DEAD, 2)
+
+    # Dead rows are kept but never claimed again
+    assert (await _drain(TestingAsyncSessionLocal))["batches"] == 0
+    async with TestingAsyncSessionLocal() as session:
+        assert (await NotificationOutboxCRUD(session).status_counts())["dead"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_only_resend_the_channels_that_failed(
+    TestingAsyncSessionLocal, monkeypatch
+):
+    service = NotificationService()
+    sent = []
+    whatsapp_up = False
+
+    async def send_email(recipient, message, **kwargs):
+        sent.append("email")
+        return True
+
+    async def send_whatsapp(recipient, message, **kwargs):
+        sent.append("whatsapp")
+        if not whatsapp_up:
+            raise RuntimeError("provider down")
+        return True
+
+    monkeypatch.setattr(service.channels["email"], "send", send_email)
+    monkeypatch.setattr(service.channels["whatsapp"], "send", send_whatsapp)
+
+    async with TestingAsyncSessionLocal() as session:
+        await service.enqueue(
+            session,
+            dedup_key="order-cancelled:1",
+            email="a@b.co",
+            phone="+2348000000000",
+            message="cancelled",
+            channels=["email", "whatsapp"],
+        )
+        await session.commit()
+
+    options = dict(
+        batch_size=10,
+        max_batches=5,
+        max_attempts=3,
+        lease_seconds=60,
+        retry_base=0.0,
+        retry_max=0.0,
+    )
+    assert (await drain_outbox(TestingAsyncSessionLocal, service, **options))[
+        "retried"
+    ] == 1
+    [row] = await _rows(TestingAsyncSessionLocal)
+    assert row.delivered_channels == ["email"]
+    assert row.last_error.startswith("SendFailed('whatsapp failed to deliver'")
+
+    whatsapp_up = True
+    assert (await drain_outbox(TestingAsyncSessionLocal, service, **options))[
+        "sent"
+    ] == 1
+    assert sorted(sent) == ["email", "whatsapp", "whatsapp"]
+    [row] = await _rows(TestingAsyncSessionLocal)
+    assert row.status == OutboxStatus.SENT
@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services.notification.email import EmailNotification
+from app.services.notification.notification_service import NotificationService
+from app.services.notification.transport import HttpTransport
+
+
+def _transport(handler, **overrides) -> HttpTransport:
+    options = dict(
+        max_connections=5,
+        max_in_flight=2,
+        timeout=1.0,
+        connect_timeout=1.0,
+        max_attempts=3,
+        backoff_base=0.001,
+        backoff_max=0.01,
+        transport=httpx.MockTransport(handler),
+    )
+    return HttpTransport(**(options | overrides))
+
+
+@pytest.mark.asyncio
+async def test_welcome_email_is_posted_to_sendgrid(sent_notifications):
+    await NotificationService().notify(
+        email="jane@example.com",
+        phone=None,
+        message="Welcome Jane",
+        channels=["email"],
+        attachment=b"%PDF",
+        filename="Invoice_1.pdf",
+    )
+
+    [request] = sent_notifications
+    assert request.url == "https://api.sendgrid.com/v3/mail/send"
+    assert request.headers["authorization"].startswith("Bearer ")
+    body = json.loads(request.content)
+    assert body["personalizations"][0]["to"] == [{"email": "jane@example.com"}]
+    assert body["attachments"][0]["filename"] == "Invoice_1.pdf"
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried_and_bad_requests_are_not():
+    statuses = iter([503, 429, 202])
+    calls = []
+
+    def flaky(request):
+        calls.append(request)
+        return httpx.Response(next(statuses))
+
+    assert await EmailNotification(_transport(flaky)).send("a@b.co", "hi") is True
+    assert len(calls) == 3
+
+    def rejecting(request):
+        calls.append(request)
+        return httpx.Response(400, json={"errors": ["bad from"]})
+
+    calls.clear()
+    assert await EmailNotification(_transport(rejecting)).send("a@b.co", "hi") is False
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_in_flight_requests_are_bounded():
+    active = peak = 0
+
+    async def slow(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        return httpx.Response(202)
+
+    transport = _transport(slow, max_in_flight=2)
+    await asyncio.gather(*(transport.post("https://x.test") for _ in range(6)))
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_channels_are_notified_concurrently(monkeypatch):
+    service = NotificationService()
+    started = []
+
+    async def slow_send(recipient, message, **kwargs):
+        started.append(recipient)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(service.channels["email"], "send", slow_send)
+    monkeypatch.setattr(service.channels["whatsapp"], "send", slow_send)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await service.notify(
+        email="a@b.co",
+        phone="+2348000000000",
+        message="hi",
+        channels=["email", "whatsapp"],
+    )
+
+    assert sorted(started) == ["+2348000000000", "a@b.co"]
+    assert loop.time() - start < 0.09  # not one after the other
@@ -48,7 +48,7 @@ async def test_full_order_checkout_flow(
     # LIST ORDERS
     list_resp = await client.get("/api/v1/orders", headers=customer_token)
     assert list_resp.status_code == 200
-    assert any(o["id"] == order_id for o in list_resp.json())
+    assert any(o["id"] == order_id for o in list_resp.json()["items"])
 
     # CANCEL ORDER
     cancel_resp = await client.post(
@@ -56,3 +56,97 @@ async def test_full_order_checkout_flow(
     )
     assert cancel_resp.status_code == 200
     assert cancel_resp.json()["status"] == OrderStatus.CANCELLED.value
+
+
+@pytest.mark.asyncio
+async def test_checkout_round_trips_do_not_grow_with_cart_size(
+    engine, TestingAsyncSessionLocal, db_session, mock_redis
+):
+    from datetime import date, datetime, timedelta, timezone
+
+    from sqlalchemy import event, select
+
+    from app.crud.cart import CartCRUD
+    from app.db.enums import CategoryEnum
+    from app.models.inventory import InventoryBatch
+    from app.models.order_item import OrderItem
+    from app.models.product import Product
+    from app.models.user import User
+    from app.services.checkout_service import CheckoutService
+
+    products = [
+        Product(
+            name=f"Product {i}",
+            slug=f"product-{i}",
+            category=CategoryEnum.SUPPLEMENT,
+            prescription_required=False,
+            is_active=True,
+        )
+        for i in range(10)
+    ]
+    db_session.add_all(products)
+    await db_session.flush()
+    for product in products:
+        # FEFO: the batch expiring first sets the price
+        for days, price in [(400, "9.00"), (100, "5.00")]:
+            db_session.add(
+                InventoryBatch(
+                    product_id=product.id,
+                    batch_number=f"B-{product.slug}-{days}",
+                    initial_quantity=10,
+                    current_quantity=10,
+                    price=Decimal(price),
+                    expiry_date=datetime.now(timezone.utc) + timedelta(days=days),
+                )
+            )
+    users = [
+        User(
+            full_name=f"buyer {i}",
+            email=f"buyer{i}@example.com",
+            phone_number=f"+123000000010{i}",
+            address="example street 123",
+            date_of_birth=date(1999, 1, 1),
+            hashed_password="x",
+        )
+        for i in range(2)
+    ]
+    db_session.add_all(users)
+    await db_session.commit()
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def checkout(user, lines):
+        await CartCRUD(db_session).set_redis_items(
+            mock_redis,
+            user.id,
+            [{"product_id": str(p.id), "quantity": 2} for p in products[:lines]],
+            600,
+        )
+        statements.clear()
+        async with TestingAsyncSessionLocal() as session:
+            event.listen(engine.sync_engine, "before_cursor_execute", count)
+            try:
+                result = await CheckoutService(session).checkout(
+                    user_id=user.id, redis=mock_redis
+                )
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", count)
+        return result, len(statements)
+
+    _, one_line = await checkout(users[0], 1)
+    result, ten_lines = await checkout(users[1], 10)
+
+    assert ten_lines == one_line
+
+    async with TestingAsyncSessionLocal() as session:
+        items = (
+            await session.scalars(
+                select(OrderItem).where(OrderItem.order_id == result["order_id"])
+            )
+        ).all()
+    assert len(items) == 10
+    assert {item.price_at_purchase for item in items} == {Decimal("5.00")}
+    assert result["status"] == OrderStatus.READY_FOR_PAYMENT
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.crud.order import OrderCRUD
+from app.crud.storefront import CRUDStorefront
+from app.db.enums import OrderStatus
+from app.models.order import Order
+from app.models.product import Product
+
+
+@pytest.mark.asyncio
+async def test_storefront_cursor_walks_every_row_once(client, storefront_data):
+    names, cursor = [], None
+    while True:
+        params = {"limit": 1} | ({"cursor": cursor} if cursor else {})
+        response = await client.get("/api/v1/customer/store", params=params)
+        assert response.status_code == 200
+
+        page = response.json()
+        assert len(page["items"]) <= 1
+        names += [row["name"] for row in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert names == ["Amoxicillin 500mg", "Vitamin C 1000mg"]
+
+
+@pytest.mark.asyncio
+async def test_search_cursor_continues_the_ranking(client, db_session):
+    db_session.add_all(
+        Product(name=f"Zinc {n}", slug=f"zinc-{n}", category="supplement")
+        for n in range(3)
+    )
+    await db_session.flush()
+    await CRUDStorefront(db_session).refresh()
+    await db_session.commit()
+
+    first = (
+        await client.get(
+            "/api/v1/customer/store", params={"search": "zinc", "limit": 2}
+        )
+    ).json()
+    rest = (
+        await client.get(
+            "/api/v1/customer/store",
+            params={"search": "zinc", "limit": 2, "cursor": first["next_cursor"]},
+        )
+    ).json()
+
+    assert [row["name"] for row in first["items"] + rest["items"]] == [
+        "Zinc 0",
+        "Zinc 1",
+        "Zinc 2",
+    ]
+    assert rest["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_orders_page_newest_first_with_ties_broken_by_id(
+    db_session, test_customer
+):
+    customer_id = test_customer.id
+    now = datetime.now(timezone.utc)
+    # Two orders share a timestamp: only the id keeps them apart
+    orders = [
+        Order(
+            customer_id=customer_id,
+            total_amount=10,
+            status=OrderStatus.CHECKOUT_STARTED,
+            created_at=now - timedelta(minutes=minutes),
+        )
+        for minutes in (0, 5, 5, 10)
+    ]
+    db_session.add_all(orders)
+    await db_session.commit()
+    expected = [
+        order.id
+        for order in sorted(orders, key=lambda o: (o.created_at, o.id), reverse=True)
+    ]
+
+    crud = OrderCRUD(db_session)
+    seen, cursor = [], None
+    while True:
+        page = await crud.get_customer_orders(customer_id, cursor=cursor, limit=3)
+        seen += [order.id for order in page.items]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == expected
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_a_bad_request(client, customer_token):
+    response = await client.get(
+        "/api/v1/customer/store", params={"cursor": "not-a-cursor"}
+    )
+    assert response.status_code == 400
+
+    response = await client.get(
+        "/api/v1/orders", params={"cursor": "WzFd"}, headers=customer_token
+    )
+    assert response.status_code == 400
@@ -0,0 +1,134 @@
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.core.payment_intent_cache import payment_intent_cache
+from app.models.inventory import InventoryBatch
+from app.services.notification.notification_service import NotificationService
+from app.workers.stripe_events import process_stripe_events
+
+
+async def _checkout(client, customer_token, customer, product, db_session, redis):
+    db_session.add(
+        InventoryBatch(
+            product_id=product.id,
+            batch_number="BATCH-CACHE",
+            initial_quantity=10,
+            current_quantity=10,
+            price=Decimal("50.00"),
+            expiry_date=datetime.now(timezone.utc) + timedelta(days=365),
+        )
+    )
+    await db_session.commit()
+    await redis.set(
+        f"cart:{customer.id}",
+        json.dumps({"items": [{"product_id": str(product.id), "quantity": 1}]}),
+    )
+    resp = await client.post("/api/v1/cart/checkout", headers=customer_token)
+    assert resp.status_code == 200
+    return resp.json()["order_id"]
+
+
+@pytest.mark.asyncio
+async def test_payment_page_reloads_do_not_call_stripe(
+    client,
+    customer_token,
+    test_customer,
+    sample_product_otc,
+    db_session,
+    mock_redis,
+    fake_stripe,
+):
+    order_id = await _checkout(
+        client,
+        customer_token,
+        test_customer,
+        sample_product_otc,
+        db_session,
+        mock_redis,
+    )
+    first = await client.post(
+        f"/api/v1/payments/order/{order_id}", headers=customer_token
+    )
+    calls = fake_stripe.state.requests
+    hits = payment_intent_cache.hits.value
+
+    for _ in range(3):
+        again = await client.post(
+            f"/api/v1/payments/order/{order_id}", headers=customer_token
+        )
+        assert again.json()["client_secret"] == first.json()["client_secret"]
+
+    assert fake_stripe.state.requests == calls
+    assert payment_intent_cache.hits.value == hits + 3
+
+    # Encrypted at rest, gone with the checkout session
+    key = f"payment_intent:{order_id}"
+    stored = await mock_redis.get(key)
+    assert first.json()["client_secret"] not in stored
+    assert (
+        0
+        < await mock_redis.ttl(key)
+        <= await mock_redis.ttl(f"checkout:{test_customer.id}")
+    )
+
+
+@pytest.mark.asyncio
+async def test_payment_failed_webhook_invalidates_the_cached_intent(
+    client,
+    customer_token,
+    test_customer,
+    sample_product_otc,
+    db_session,
+    mock_redis,
+    fake_stripe,
+    TestingAsyncSessionLocal,
+):
+    order_id = await _checkout(
+        client,
+        customer_token,
+        test_customer,
+        sample_product_otc,
+        db_session,
+        mock_redis,
+    )
+    first = await client.post(
+        f"/api/v1/payments/order/{order_id}", headers=customer_token
+    )
+    intent_id = first.json()["client_secret"].split("_secret_")[0]
+
+    await client.post(
+        "/api/v1/payments/webhooks/stripe",
+        json={
+            "id": "evt_failed",
+            "type": "payment_intent.payment_failed",
+            "created": 1_700_000_000,
+            "data": {"object": {"id": intent_id, "metadata": {"order_id": order_id}}},
+        },
+        headers={"stripe-signature": "mock_sig"},
+    )
+    totals = await process_stripe_events(
+        TestingAsyncSessionLocal,
+        mock_redis,
+        NotificationService(),
+        batch_size=10,
+        parallelism=1,
+        max_batches=1,
+        max_attempts=1,
+        lease_seconds=60,
+        retry_base=0.0,
+        retry_max=0.0,
+    )
+    assert totals["processed"] == 1
+    assert not await mock_redis.exists(f"payment_intent:{order_id}")
+
+    # The next load asks Stripe again, and caches the fresh intent
+    calls = fake_stripe.state.requests
+    again = await client.post(
+        f"/api/v1/payments/order/{order_id}", headers=customer_token
+    )
+    assert again.json()["client_secret"] == first.json()["client_secret"]
+    assert fake_stripe.state.requests == calls + 1
+    assert await mock_redis.exists(f"payment_intent:{order_id}")
@@ -26,6 +26,9 @@ async def test_upload_prescription_success(
     assert data["status"] == "pending"
     assert data["order_id"] == str(order_id)
 
+    stored = list((mock_storage_service.root / "prescriptions").iterdir())
+    assert [path.read_bytes() for path in stored] == [file_content]
+
 
 @pytest.mark.asyncio
 async def test_pharmacist_list_pending(
@@ -0,0 +1,124 @@
+import uuid
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import update
+
+from app.core import deps
+from app.core.principal_cache import Principal, PrincipalCache, principal_cache
+from app.core.roles import UserRole
+from app.models import User
+
+
+@pytest.mark.asyncio
+async def test_repeat_requests_are_served_from_cache(client, customer_token):
+    """Only the first authenticated request should resolve the user from the DB."""
+    misses_before = principal_cache.misses.value
+
+    for _ in range(3):
+        response = await client.get("/api/v1/orders", headers=customer_token)
+        assert response.status_code == 200
+
+    assert principal_cache.misses.value - misses_before == 1
+
+
+@pytest.mark.asyncio
+async def test_account_deletion_invalidates_cached_principal(client, customer_token):
+    """A cached principal must not outlive the account it belongs to."""
+    warm = await client.get("/api/v1/orders", headers=customer_token)
+    assert warm.status_code == 200
+
+    deleted = await client.delete("/api/v1/customer/me", headers=customer_token)
+    assert deleted.status_code == 204
+
+    response = await client.get("/api/v1/orders", headers=customer_token)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "User account disabled"
+
+    # Endpoints authorizing from token claims refuse the token too
+    response = await client.get("/api/v1/cart", headers=customer_token)
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_local_tier_is_lru_bounded(mock_redis):
+    cache = PrincipalCache(mock_redis, local_ttl=60, redis_ttl=60, max_entries=2)
+    principals = [
+        Principal(
+            id=uuid.uuid4(),
+            email=f"user{i}@example.com",
+            role=UserRole.CUSTOMER,
+            is_active=True,
+            license_verified=True,
+        )
+        for i in range(3)
+    ]
+
+    for principal in principals:
+        await cache.set(principal)
+
+    assert cache.stats()["local_entries"] == 2
+
+    # The evicted principal is still recovered from the Redis tier
+    cache.clear()
+    assert await cache.get(principals[0].id) == principals[0]
+
+
+@pytest.mark.asyncio
+async def test_a_principal_invalidated_during_its_lookup_is_not_cached(
+    client, db_session, test_customer, customer_token
+):
+    """A deactivation racing a cache miss must not be undone by its set()."""
+    principal_cache.clear()
+    await principal_cache.invalidate(test_customer.id)
+    stale_writes = principal_cache.stale_writes.value
+    release = deps.release_connection
+
+    async def deactivate_after_the_read(session):
+        await release(session)
+        await db_session.execute(
+            update(User).where(User.id == test_customer.id).values(is_active=False)
+        )
+        await db_session.commit()
+        await principal_cache.invalidate(test_customer.id)
+
+    with patch.object(
+        deps, "release_connection", side_effect=deactivate_after_the_read
+    ):
+        # Authorized from the row read before the deactivation
+        response = await client.get("/api/v1/orders", headers=customer_token)
+    assert response.status_code == 200
+    assert principal_cache.stale_writes.value == stale_writes + 1
+    assert await principal_cache.get(test_customer.id) is None
+
+    response = await client.get("/api/v1/orders", headers=customer_token)
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_set_drops_a_principal_invalidated_since_its_generation(mock_redis):
+    cache = PrincipalCache(mock_redis, local_ttl=60, redis_ttl=60, max_entries=8)
+    principal = Principal(
+        id=uuid.uuid4(),
+        email="user@example.com",
+        role=UserRole.PHARMACIST,
+        is_active=True,
+        license_verified=True,
+    )
+
+    generation = await cache.generation(principal.id)
+    await cache.invalidate(principal.id)
+    await cache.set(principal, generation)
+    assert await cache.get(principal.id) is None
+
+    # Another process invalidated it: only the Redis generation moved
+    generation = await cache.generation(principal.id)
+    await mock_redis.incr(cache._generation_key(principal.id))
+    await cache.set(principal, generation)
+    assert await cache.get(principal.id) is None
+    assert cache.stale_writes.value >= 2
+
+    generation = await cache.generation(principal.id)
+    await cache.set(principal, generation)
+    cache.clear()
+    assert await cache.get(principal.id) == principal
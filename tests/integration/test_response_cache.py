@@ -0,0 +1,192 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from redis.exceptions import ConnectionError
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.response_cache import ResponseCache, storefront_cache
+from app.crud.product import CRUDProduct
+from app.crud.storefront import CRUDStorefront
+from app.db.base import Base
+from app.db.enums import CategoryEnum
+from app.models.inventory import InventoryBatch
+from app.models.product import Product
+from app.models.storefront import StorefrontProduct
+from app.schemas.product import BatchCreate
+from app.workers import runtime
+from app.workers import storefront as storefront_worker
+from tests.fake_redis import FakeRedis
+
+
+class LoopBoundRedis(FakeRedis):
+    """Like redis.asyncio.Redis: only usable on the event loop it first ran on."""
+
+    def __init__(self):
+        super().__init__()
+        self.loop = None
+
+    async def incr(self, key, amount=1):
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        elif self.loop is not loop:
+            raise RuntimeError("Event loop is closed")
+        return await super().incr(key, amount)
+
+    async def aclose(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_storefront_is_cached_until_the_catalog_changes(
+    client, db_session, storefront_data
+):
+    first = await client.get("/api/v1/customer/store?category=supplement")
+    etag = first.headers["etag"]
+    assert first.json()["items"][0]["sellable_quantity"] == 50
+
+    # Same page, normalized params: 304 without a body
+    response = await client.get(
+        "/api/v1/customer/store",
+        params={"category": "supplement"},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    await CRUDProduct(db_session).create_new_batch(
+        product_id=storefront_data["otc"].id,
+        obj_in=BatchCreate(
+            batch_number="VIT-NEW",
+            initial_quantity=10,
+            price=Decimal("5.00"),
+            expiry_date=datetime.now(timezone.utc) + timedelta(days=90),
+        ),
+    )
+
+    response = await client.get(
+        "/api/v1/customer/store?category=supplement",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["items"][0]["sellable_quantity"] == 60
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_compute_once(mock_redis):
+    cache = ResponseCache(mock_redis, "test", ttl=60, lock_ttl=5, lock_wait=1.0)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return '{"items": []}'
+
+    responses = await asyncio.gather(
+        *(cache.get_or_compute({"page": 1}, compute) for _ in range(10))
+    )
+    assert calls == 1
+    assert len({r.etag for r in responses}) == 1
+
+    # Another worker holds the lock: wait for its entry instead of computing
+    await cache.invalidate()
+    key = cache._key(await mock_redis.get("test:version"), {"page": 1})
+    await mock_redis.set(f"{key}:lock", "1", ex=5, nx=True)
+
+    async def other_worker():
+        await asyncio.sleep(0.05)
+        await mock_redis.set(key, '"etag"\n{"items": [1]}')
+
+    _, response = await asyncio.gather(
+        other_worker(), cache.get_or_compute({"page": 1}, compute)
+    )
+    assert response.body == '{"items": [1]}'
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_serves_uncached(mock_redis, monkeypatch):
+    cache = ResponseCache(mock_redis, "test", ttl=60, lock_ttl=5, lock_wait=1.0)
+
+    async def down(*args, **kwargs):
+        raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(mock_redis, "get", down)
+
+    async def compute():
+        return "[]"
+
+    response = await cache.get_or_compute({}, compute)
+    assert response.body == "[]"
+    assert response.matches(f"W/{response.etag}")
+
+
+async def _expired_storefront_row(url: str, *, create: bool) -> None:
+    engine = create_async_engine(url)
+    if create:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        if create:
+            product = Product(
+                name="Vitamin C 1000mg",
+                slug="vit-c",
+                category=CategoryEnum.SUPPLEMENT,
+                active_ingredients="Ascorbic Acid",
+                prescription_required=False,
+                age_restriction=0,
+                storage_condition="cool dry place",
+                is_active=True,
+            )
+            session.add(product)
+            await session.flush()
+            session.add(
+                InventoryBatch(
+                    product_id=product.id,
+                    batch_number="VIT-1",
+                    initial_quantity=5,
+                    current_quantity=5,
+                    price=Decimal("5.00"),
+                    expiry_date=datetime.now(timezone.utc) + timedelta(days=90),
+                )
+            )
+            # Through the API's client, on this (soon closed) loop
+            await CRUDStorefront(session).refresh([product.id])
+        # As if its earliest batch had just expired
+        await session.execute(
+            update(StorefrontProduct).values(
+                nearest_expiry=datetime.now(timezone.utc) - timedelta(seconds=1)
+            )
+        )
+        await session.commit()
+    await engine.dispose()
+
+
+def test_worker_runs_invalidate_through_their_own_redis_client(tmp_path, monkeypatch):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'worker.db'}"
+    clients = []
+
+    def from_url(*args, **kwargs):
+        clients.append(LoopBoundRedis())
+        return clients[-1]
+
+    monkeypatch.setattr(storefront_cache, "redis", LoopBoundRedis())
+    monkeypatch.setattr(runtime, "async_db", url)
+    monkeypatch.setattr(runtime.Redis, "from_url", from_url)
+
+    asyncio.run(_expired_storefront_row(url, create=True))
+    # Each Celery run is a new event loop in the same process
+    assert asyncio.run(storefront_worker._run()) == 1
+    asyncio.run(_expired_storefront_row(url, create=False))
+    assert asyncio.run(storefront_worker._run()) == 1
+
+    # Bumped when refreshed and again on commit, through the run's client
+    assert [client._data.get("storefront:version") for client in clients] == [
+        "2",
+        "2",
+    ]
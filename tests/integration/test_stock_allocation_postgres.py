@@ -0,0 +1,145 @@
+"""
+Concurrent stock allocation on PostgreSQL (READ COMMITTED), which the
+SQLite test database cannot reproduce: it serializes all writes.
+
+Opt-in: set TEST_POSTGRES_URL (postgresql+asyncpg://...) to a server where
+the user may create databases. Each test runs in a throwaway database.
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.crud.product import CRUDProduct
+from app.crud.stock_reservation import StockReservationCRUD
+from app.db.base import Base
+from app.db.enums import CategoryEnum, OrderStatus
+from app.models.inventory import InventoryBatch
+from app.models.order import Order
+from app.models.product import Product
+from app.models.stock_reservation import StockReservation
+from app.models.user import User
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+
+@pytest.fixture
+async def pg_sessions():
+    url = make_url(POSTGRES_URL)
+    database = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_async_engine(url, isolation_level="AUTOCOMMIT")
+    async with admin.connect() as conn:
+        await conn.execute(text(f'CREATE DATABASE "{database}"'))
+
+    engine = create_async_engine(url.set(database=database))
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.run_sync(Base.metadata.create_all)
+        yield async_sessionmaker(engine, expire_on_commit=False)
+    finally:
+        await engine.dispose()
+        async with admin.connect() as conn:
+            await conn.execute(text(f'DROP DATABASE "{database}"'))
+        await admin.dispose()
+
+
+async def _hot_product_with_two_batches(session_factory):
+    async with session_factory() as session:
+        customer = User(
+            full_name="test user",
+            email="test@example.com",
+            phone_number="+1230000000000",
+            address="example street 123",
+            date_of_birth=date(1999, 1, 1),
+            hashed_password="x",
+        )
+        product = Product(
+            name="Vitamin C 1000mg",
+            slug="vit-c",
+            category=CategoryEnum.SUPPLEMENT,
+            active_ingredients="Ascorbic Acid",
+            prescription_required=False,
+            age_restriction=0,
+            storage_condition="cool dry place",
+            is_active=True,
+            hot_stock=True,
+        )
+        session.add_all([customer, product])
+        await session.flush()
+        now = datetime.now(timezone.utc)
+        batches = [
+            InventoryBatch(
+                product_id=product.id,
+                batch_number=f"BATCH-{days}",
+                initial_quantity=5,
+                current_quantity=5,
+                price=Decimal("50.00"),
+                expiry_date=now + timedelta(days=days),
+            )
+            for days in (30, 60)
+        ]
+        orders = [
+            Order(
+                customer_id=customer.id,
+                status=OrderStatus.READY_FOR_PAYMENT,
+                total_amount=Decimal("200.00"),
+            )
+            for _ in range(2)
+        ]
+        session.add_all([*batches, *orders])
+        await session.commit()
+        return product, batches, orders
+
+
+async def _reserve(session, order, product, quantity):
+    # The hot checkout path: admitted by the Redis counter, no lock_products
+    return await StockReservationCRUD(session).reserve(
+        order_id=order.id,
+        items=[(product.id, quantity)],
+        expires_at=datetime.now(timezone.utc) + timedelta(minutes=15),
+        unrefreshed=[product.id],
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_hot_checkouts_never_over_reserve_a_batch(pg_sessions):
+    product, batches, orders = await _hot_product_with_two_batches(pg_sessions)
+
+    async with pg_sessions() as first, pg_sessions() as second:
+        await _reserve(first, orders[0], product, 4)
+
+        # Waits for the first checkout's allocation to commit
+        racing = asyncio.create_task(_reserve(second, orders[1], product, 4))
+        await asyncio.sleep(0.5)
+        assert not racing.done()
+
+        await first.commit()
+        await racing
+        await second.commit()
+
+    async with pg_sessions() as session:
+        reserved = dict(
+            (
+                await session.execute(
+                    select(
+                        StockReservation.batch_id, func.sum(StockReservation.quantity)
+                    ).group_by(StockReservation.batch_id)
+                )
+            ).all()
+        )
+        assert reserved == {batches[0].id: 5, batches[1].id: 3}
+        for batch in batches:
+            assert batch.current_quantity - reserved[batch.id] >= 0
+
+        stock = await CRUDProduct(session).get_sellable_stock([product.id])
+        assert stock[product.id].available == 2
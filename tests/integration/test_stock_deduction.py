@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from app.core.exceptions import InsufficientStockError
+from app.crud.order import OrderCRUD
+from app.crud.product import CRUDProduct
+from app.db.enums import OrderStatus
+from app.models.inventory import InventoryBatch
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.stock_allocation import StockAllocation
+
+
+def _batch(product, number, quantity, days, **kwargs):
+    return InventoryBatch(
+        product_id=product.id,
+        batch_number=number,
+        initial_quantity=quantity,
+        current_quantity=quantity,
+        price=Decimal("10.00"),
+        expiry_date=datetime.now(timezone.utc) + timedelta(days=days),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_order_deduction_is_fefo_across_batches(
+    db_session, test_customer, sample_product_otc, sample_product_rx
+):
+    otc, rx = sample_product_otc, sample_product_rx
+    soon = _batch(otc, "OTC-SOON", 2, days=30)
+    later = _batch(otc, "OTC-LATER", 10, days=300)
+    expired = _batch(otc, "OTC-EXPIRED", 50, days=-1)
+    blocked = _batch(rx, "RX-BLOCKED", 50, days=10, is_blocked=True)
+    rx_batch = _batch(rx, "RX-OK", 5, days=90)
+    db_session.add_all([soon, later, expired, blocked, rx_batch])
+
+    order = Order(
+        customer_id=test_customer.id,
+        total_amount=Decimal("60.00"),
+        status=OrderStatus.CHECKOUT_STARTED,
+    )
+    order.items = [
+        OrderItem(product_id=otc.id, quantity=5, price_at_purchase=Decimal("10")),
+        OrderItem(product_id=rx.id, quantity=1, price_at_purchase=Decimal("10")),
+    ]
+    db_session.add(order)
+    await db_session.commit()
+
+    allocations = await CRUDProduct(db_session).deduct_stock_for_order(
+        items=[(item.product_id, item.quantity) for item in order.items]
+    )
+    OrderCRUD(db_session).add_allocations(order, allocations)
+    await db_session.commit()
+
+    for batch in (soon, later, expired, blocked, rx_batch):
+        await db_session.refresh(batch)
+
+    # Earliest expiry drained first; expired and blocked batches untouched
+    assert (soon.current_quantity, later.current_quantity) == (0, 7)
+    assert (expired.current_quantity, blocked.current_quantity) == (50, 50)
+    assert rx_batch.current_quantity == 4
+
+    rows = (await db_session.execute(select(StockAllocation))).scalars().all()
+    by_batch = {row.batch_id: row.quantity for row in rows}
+    assert by_batch == {soon.id: 2, later.id: 3, rx_batch.id: 1}
+
+    otc_line = next(item for item in order.items if item.product_id == otc.id)
+    assert otc_line.batch_id == soon.id
+
+
+@pytest.mark.asyncio
+async def test_order_deduction_shortfall_changes_nothing(
+    db_session, sample_product_otc, sample_product_rx
+):
+    otc_id, rx_id = sample_product_otc.id, sample_product_rx.id
+    otc_batch = _batch(sample_product_otc, "OTC-1", 10, days=30)
+    rx_batch = _batch(sample_product_rx, "RX-1", 1, days=30)
+    db_session.add_all([otc_batch, rx_batch])
+    await db_session.commit()
+
+    with pytest.raises(InsufficientStockError) as exc:
+        await CRUDProduct(db_session).deduct_stock_for_order(
+            items=[(otc_id, 3), (rx_id, 2)]
+        )
+    await db_session.rollback()
+
+    assert str(rx_id) in str(exc.value)
+    assert str(otc_id) not in str(exc.value)
+
+    await db_session.refresh(otc_batch)
+    await db_session.refresh(rx_batch)
+    assert (otc_batch.current_quantity, rx_batch.current_quantity) == (10, 1)
@@ -0,0 +1,216 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+from app.core.security import hash_password
+from app.crud.product import CRUDProduct
+from app.crud.stock_reservation import StockReservationCRUD
+from app.db.enums import OrderStatus
+from app.models.inventory import InventoryBatch
+from app.models.order import Order
+from app.models.stock_reservation import StockReservation
+from app.models.storefront import StorefrontProduct
+from app.models.user import User
+from app.services.checkout_service import CheckoutService
+from app.services.notification.notification_service import NotificationService
+from app.workers.stripe_events import process_stripe_events
+
+
+async def _stock(db_session, product, quantity):
+    batch = InventoryBatch(
+        product_id=product.id,
+        batch_number="BATCH-HOLD",
+        initial_quantity=quantity,
+        current_quantity=quantity,
+        price=Decimal("50.00"),
+        expiry_date=datetime.now(timezone.utc) + timedelta(days=365),
+    )
+    db_session.add(batch)
+    await db_session.commit()
+    return batch
+
+
+async def _checkout(client, customer_token, customer, product, redis, quantity):
+    await redis.set(
+        f"cart:{customer.id}",
+        json.dumps({"items": [{"product_id": str(product.id), "quantity": quantity}]}),
+    )
+    return await client.post("/api/v1/cart/checkout", headers=customer_token)
+
+
+async def _available(db_session, product) -> int:
+    stock = await CRUDProduct(db_session).get_sellable_stock([product.id])
+    return stock[product.id].available if product.id in stock else 0
+
+
+@pytest.mark.asyncio
+async def test_reserved_stock_is_not_sold_twice_until_cancel(
+    client, customer_token, test_customer, sample_product_otc, db_session, mock_redis
+):
+    await _stock(db_session, sample_product_otc, 5)
+
+    resp = await _checkout(
+        client, customer_token, test_customer, sample_product_otc, mock_redis, 3
+    )
+    assert resp.status_code == 200
+    order_id = resp.json()["order_id"]
+
+    assert await _available(db_session, sample_product_otc) == 2
+    storefront = await db_session.get(StorefrontProduct, sample_product_otc.id)
+    await db_session.refresh(storefront)
+    assert storefront.in_stock
+
+    # Another customer cannot take the held units
+    other = User(
+        full_name="other buyer",
+        email="other@example.com",
+        phone_number="+1230000000001",
+        address="example street 124",
+        date_of_birth=date(1990, 1, 1),
+        hashed_password=hash_password("strongpassword123"),
+    )
+    db_session.add(other)
+    await db_session.commit()
+    await mock_redis.set(
+        f"cart:{other.id}",
+        json.dumps(
+            {"items": [{"product_id": str(sample_product_otc.id), "quantity": 3}]}
+        ),
+    )
+    with pytest.raises(HTTPException) as exc:
+        await CheckoutService(db_session).checkout(user_id=other.id, redis=mock_redis)
+    assert exc.value.status_code == 400
+    assert "available: 2" in exc.value.detail
+
+    # Cancelling hands them back
+    cancel = await client.post(
+        f"/api/v1/orders/{order_id}/cancel", headers=customer_token
+    )
+    assert cancel.status_code == 200
+    assert await _available(db_session, sample_product_otc) == 5
+    assert await db_session.scalar(select(StockReservation)) is None
+
+
+@pytest.mark.asyncio
+async def test_expired_reservations_stop_counting_and_are_purged(
+    client, customer_token, test_customer, sample_product_otc, db_session, mock_redis
+):
+    await _stock(db_session, sample_product_otc, 3)
+    resp = await _checkout(
+        client, customer_token, test_customer, sample_product_otc, mock_redis, 3
+    )
+    assert resp.status_code == 200
+    assert await _available(db_session, sample_product_otc) == 0
+    storefront = await db_session.get(StorefrontProduct, sample_product_otc.id)
+    await db_session.refresh(storefront)
+    assert not storefront.in_stock
+
+    await db_session.execute(
+        update(StockReservation).values(
+            expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)
+        )
+    )
+    await db_session.commit()
+    assert await _available(db_session, sample_product_otc) == 3
+
+    released = await StockReservationCRUD(db_session).release_expired()
+    await db_session.commit()
+    assert released == {sample_product_otc.id}
+    assert await db_session.scalar(select(StockReservation)) is None
+
+    await db_session.refresh(storefront)
+    assert storefront.in_stock
+
+
+@pytest.mark.asyncio
+async def test_payment_turns_the_reservation_into_a_deduction(
+    client,
+    customer_token,
+    test_customer,
+    sample_product_otc,
+    db_session,
+    mock_redis,
+    TestingAsyncSessionLocal,
+):
+    batch = await _stock(db_session, sample_product_otc, 3)
+    resp = await _checkout(
+        client, customer_token, test_customer, sample_product_otc, mock_redis, 3
+    )
+    order_id = resp.json()["order_id"]
+    payment = await client.post(
+        f"/api/v1/payments/order/{order_id}", headers=customer_token
+    )
+    intent_id = payment.json()["client_secret"].split("_secret_")[0]
+
+    await client.post(
+        "/api/v1/payments/webhooks/stripe",
+        json={
+            "id": "evt_paid",
+            "type": "payment_intent.succeeded",
+            "data": {"object": {"id": intent_id, "metadata": {"order_id": order_id}}},
+        },
+        headers={"stripe-signature": "mock_sig"},
+    )
+    totals = await process_stripe_events(
+        TestingAsyncSessionLocal,
+        mock_redis,
+        NotificationService(),
+        batch_size=10,
+        parallelism=1,
+        max_batches=1,
+        max_attempts=1,
+        lease_seconds=60,
+        retry_base=0.0,
+        retry_max=0.0,
+    )
+    assert totals["processed"] == 1
+
+    # The held units were the last ones, and they went to this order
+    order = await db_session.get(Order, UUID(order_id))
+    await db_session.refresh(order)
+    assert order.status == OrderStatus.PAID
+    await db_session.refresh(batch)
+    assert batch.current_quantity == 0
+    assert await db_session.scalar(select(StockReservation)) is None
+
+
+@pytest.mark.asyncio
+async def test_an_over_reserved_batch_counts_against_the_next_one(
+    test_customer, sample_product_otc, db_session
+):
+    early = await _stock(db_session, sample_product_otc, 5)
+    late = InventoryBatch(
+        product_id=sample_product_otc.id,
+        batch_number="BATCH-LATE",
+        initial_quantity=5,
+        current_quantity=5,
+        price=Decimal("60.00"),
+        expiry_date=datetime.now(timezone.utc) + timedelta(days=400),
+    )
+    order = Order(
+        customer_id=test_customer.id,
+        status=OrderStatus.READY_FOR_PAYMENT,
+        total_amount=Decimal("400.00"),
+    )
+    db_session.add_all([late, order])
+    await db_session.flush()
+    # 8 units held on a batch of 5 (an allocation race)
+    db_session.add(
+        StockReservation(
+            order_id=order.id,
+            batch_id=early.id,
+            product_id=sample_product_otc.id,
+            quantity=8,
+            expires_at=datetime.now(timezone.utc) + timedelta(minutes=15),
+        )
+    )
+    await db_session.commit()
+
+    stock = await CRUDProduct(db_session).get_sellable_stock([sample_product_otc.id])
+    assert stock[sample_product_otc.id].available == 2
+    assert stock[sample_product_otc.id].unit_price == Decimal("60.00")
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from io import BytesIO
+
+import pytest
+
+from app.core.config import settings
+from app.storage import presigned_cache, selection
+from app.storage.local_storage import LocalStorage
+from app.storage.r2_storage import R2Storage, presigned_hits
+
+
+@pytest.mark.asyncio
+async def test_r2_upload_does_not_block_the_event_loop(monkeypatch):
+    storage = R2Storage()
+    uploaded = {}
+
+    def slow_upload_fileobj(stream, bucket, key, ExtraArgs, Config):
+        time.sleep(0.3)  # a slow network, in boto3's blocking style
+        uploaded[key] = (stream.read(), ExtraArgs["ContentType"])
+
+    monkeypatch.setattr(storage.client, "upload_fileobj", slow_upload_fileobj)
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while "a.pdf" not in uploaded:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(
+        ticker(),
+        storage.upload_stream(
+            file_id="a.pdf",
+            file_name="a.pdf",
+            stream=BytesIO(b"%PDF"),
+            content_type="application/pdf",
+        ),
+    )
+
+    assert uploaded["a.pdf"] == (b"%PDF", "application/pdf")
+    # The loop kept running while boto3 slept on a storage thread
+    assert ticks >= 10
+
+
+def test_presigned_urls_are_reused_while_valid(monkeypatch):
+    storage = R2Storage()
+    now = 1000.0
+    monkeypatch.setattr(presigned_cache.time, "monotonic", lambda: now)
+    monkeypatch.setattr("app.storage.r2_storage.time.monotonic", lambda: now)
+
+    url = storage.generate_presigned_url("prescriptions/a.pdf", expires_in=300)
+    hits = presigned_hits.value
+    assert storage.generate_presigned_url("prescriptions/a.pdf", expires_in=300) == url
+    assert storage.generate_presigned_url("prescriptions/b.pdf", expires_in=300) != url
+    assert presigned_hits.value == hits + 1
+
+    # Re-signed once less than a minute of validity would be left
+    now += 250
+    storage.generate_presigned_url("prescriptions/a.pdf", expires_in=300)
+    assert presigned_hits.value == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_local_storage_streams_files_under_its_root(tmp_path):
+    storage = LocalStorage(tmp_path)
+    payload = b"x" * (3 * 1024 * 1024 + 7)
+
+    await storage.upload_stream(
+        file_id="prescriptions/big.pdf",
+        file_name="big.pdf",
+        stream=BytesIO(payload),
+        content_type="application/pdf",
+    )
+
+    path = await storage.get_file_path("prescriptions/big.pdf")
+    assert open(path, "rb").read() == payload
+    assert storage.generate_presigned_url("prescriptions/big.pdf").startswith("file://")
+
+    with pytest.raises(ValueError):
+        await storage.get_file_path("../outside.pdf")
+
+
+def test_storage_backend_is_chosen_by_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "storage_local_root", str(tmp_path))
+    monkeypatch.setattr(settings, "storage", "local")
+    selection._local_storage.cache_clear()
+    try:
+        storage = selection.get_storage()
+        assert isinstance(storage, LocalStorage)
+        assert selection.get_storage() is storage
+    finally:
+        selection._local_storage.cache_clear()
+
+    monkeypatch.setattr(settings, "storage", "s3")
+    with pytest.raises(ValueError, match="Unknown storage backend 's3'"):
+        selection.get_storage()
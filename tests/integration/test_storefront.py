@@ -1,4 +1,16 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
 import pytest
+from sqlalchemy import update
+
+from app.core.search_index import LocalSearchIndex
+from app.crud.product import CRUDProduct
+from app.crud.storefront import CRUDStorefront
+from app.models.inventory import InventoryBatch
+from app.models.storefront import StorefrontProduct
+from app.schemas.product import BatchCreate
+from app.services.admin.product_service import AdminProductService
 
 
 @pytest.mark.asyncio
@@ -7,7 +19,7 @@ async def test_customer_list_products_filter_by_category(client, storefront_data
     response = await client.get("/api/v1/customer/store?category=supplement")
 
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["items"]
 
     # Assertions
     assert len(data) >= 1
@@ -23,4 +35,162 @@ async def test_customer_search_products(client, storefront_data):
     response = await client.get("/api/v1/customer/store?search=Amox")
 
     assert response.status_code == 200
-    assert response.json()[0]["name"] == "Amoxicillin 500mg"
+    assert response.json()["items"][0]["name"] == "Amoxicillin 500mg"
+
+
+def _batch(product, number, quantity, days, price="10.00", **kwargs):
+    return InventoryBatch(
+        product_id=product.id,
+        batch_number=number,
+        initial_quantity=max(quantity, 1),
+        current_quantity=quantity,
+        price=Decimal(price),
+        expiry_date=datetime.now(timezone.utc) + timedelta(days=days),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_storefront_serves_precomputed_stock_and_fefo_price(
+    client, db_session, sample_product_otc, sample_product_rx
+):
+    db_session.add_all(
+        [
+            _batch(sample_product_otc, "LATER", 10, days=300, price="12.00"),
+            _batch(sample_product_otc, "SOON", 5, days=30, price="9.50"),
+            _batch(sample_product_otc, "EXPIRED", 50, days=-1, price="1.00"),
+            _batch(sample_product_otc, "BLOCKED", 50, days=5, is_blocked=True),
+            _batch(sample_product_otc, "EMPTY", 0, days=2, price="2.00"),
+        ]
+    )
+    await db_session.flush()
+    await CRUDStorefront(db_session).refresh()
+    await db_session.commit()
+
+    response = await client.get("/api/v1/customer/store")
+
+    assert response.status_code == 200
+    rows = {row["name"]: row for row in response.json()["items"]}
+
+    vitamin = rows["Vitamin C 1000mg"]
+    assert vitamin["sellable_quantity"] == 15
+    assert Decimal(vitamin["unit_price"]) == Decimal("9.50")
+    assert vitamin["in_stock"] is True
+    assert "batches" not in vitamin
+
+    # Active products without sellable stock are still listed
+    amoxicillin = rows["Amoxicillin 500mg"]
+    assert amoxicillin["sellable_quantity"] == 0
+    assert amoxicillin["unit_price"] is None
+    assert amoxicillin["in_stock"] is False
+
+
+@pytest.mark.asyncio
+async def test_storefront_follows_catalog_changes(
+    db_session, storefront_data, test_customer
+):
+    otc_id, rx_id = storefront_data["otc"].id, storefront_data["rx"].id
+    crud = CRUDProduct(db_session)
+    storefront = CRUDStorefront(db_session)
+
+    await crud.create_new_batch(
+        product_id=rx_id,
+        obj_in=BatchCreate(
+            batch_number="RX-NEW",
+            initial_quantity=8,
+            price=Decimal("20.00"),
+            expiry_date=datetime.now(timezone.utc) + timedelta(days=60),
+        ),
+    )
+    await crud.deduct_stock_for_order(items=[(otc_id, 20)])
+    await db_session.commit()
+
+    rows = {row.product_id: row for row in (await storefront.get_page()).items}
+    assert rows[rx_id].sellable_quantity == 8
+    assert rows[rx_id].in_stock is True
+    assert rows[otc_id].sellable_quantity == 30
+
+    # Deactivated products leave the storefront
+    await AdminProductService(db_session).toggle_active_status(otc_id)
+    assert [row.product_id for row in (await storefront.get_page()).items] == [rx_id]
+
+
+@pytest.mark.asyncio
+async def test_refresh_expired_drops_stock_of_expired_batches(
+    db_session, storefront_data
+):
+    otc_id = storefront_data["otc"].id
+    storefront = CRUDStorefront(db_session)
+
+    # Age the only batch past its expiry without touching the read model
+    await db_session.execute(
+        update(InventoryBatch)
+        .where(InventoryBatch.product_id == otc_id)
+        .values(expiry_date=datetime.now(timezone.utc) - timedelta(minutes=1))
+    )
+    await db_session.execute(
+        update(StorefrontProduct)
+        .where(StorefrontProduct.product_id == otc_id)
+        .values(nearest_expiry=datetime.now(timezone.utc) - timedelta(minutes=1))
+    )
+    await db_session.commit()
+
+    assert await storefront.refresh_expired() == 1
+    await db_session.commit()
+
+    row = await db_session.get(StorefrontProduct, otc_id, populate_existing=True)
+    assert row.sellable_quantity == 0
+    assert row.in_stock is False
+    assert row.nearest_expiry is None
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_prefix_typo_and_ingredient_matches(client, storefront_data):
+    # Prefix of the name
+    response = await client.get("/api/v1/customer/store?search=vitam")
+    assert [row["name"] for row in response.json()["items"]] == ["Vitamin C 1000mg"]
+
+    # Typo in a drug name
+    response = await client.get("/api/v1/customer/store?search=amoxcilin")
+    assert [row["name"] for row in response.json()["items"]] == ["Amoxicillin 500mg"]
+
+    # Active ingredient, combined with a category filter
+    response = await client.get(
+        "/api/v1/customer/store?search=ascorbic&category=supplement"
+    )
+    assert [row["name"] for row in response.json()["items"]] == ["Vitamin C 1000mg"]
+    response = await client.get("/api/v1/customer/store?search=ascorbic&category=otc")
+    assert response.json() == {"items": [], "next_cursor": None}
+
+
+@pytest.mark.asyncio
+async def test_suggest_autocompletes_product_names(client, storefront_data):
+    response = await client.get("/api/v1/customer/store/suggest?q=amo")
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "product_id": str(storefront_data["rx"].id),
+            "name": "Amoxicillin 500mg",
+            "slug": storefront_data["rx"].slug,
+            "category": "prescription",
+            "in_stock": False,
+        }
+    ]
+
+    # Single characters are rejected rather than matching everything
+    response = await client.get("/api/v1/customer/store/suggest?q=a")
+    assert response.status_code == 422
+
+
+def test_local_search_index_requires_every_word():
+    index = LocalSearchIndex(typo_threshold=0.4)
+    index.add("amox", "Amoxicillin 500mg", "Amoxicillin 500mg amoxicillin")
+    index.add("para", "Paracetamol 500mg", "Paracetamol 500mg paracetamol otc")
+    index.add("para-syrup", "Paracetamol Syrup", "Paracetamol Syrup paracetamol otc")
+
+    assert index.search("500") == ["amox", "para"]
+    assert index.search("paracetmol 500") == ["para"]
+    # Exact and name matches outrank prefix matches
+    assert index.search("paracetamol") == ["para", "para-syrup"]
+    assert index.search("ibuprofen") == []
@@ -0,0 +1,213 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+import stripe
+from sqlalchemy import select
+
+from app.db.enums import OrderStatus, StripeEventStatus
+from app.models.inventory import InventoryBatch
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.stripe_event import StripeEvent
+from app.services.notification.notification_service import NotificationService
+from app.services.payment_service import PaymentService
+from app.workers.stripe_events import process_stripe_events
+
+
+def _event(event_id: str, intent: str, created: int) -> dict:
+    return {
+        "id": event_id,
+        "type": "payment_intent.succeeded",
+        "created": created,
+        "data": {"object": {"id": intent, "metadata": {}}},
+    }
+
+
+async def _post(client, payload: dict):
+    return await client.post(
+        "/api/v1/payments/webhooks/stripe",
+        json=payload,
+        headers={"stripe-signature": "mock_sig"},
+    )
+
+
+async def _process(session_factory, redis) -> dict:
+    return await process_stripe_events(
+        session_factory,
+        redis,
+        NotificationService(),
+        batch_size=10,
+        parallelism=4,
+        max_batches=10,
+        max_attempts=3,
+        lease_seconds=60,
+        retry_base=0.0,
+        retry_max=0.0,
+    )
+
+
+@pytest.fixture
+def applied(monkeypatch):
+    """Replaces event processing; records event ids as they are applied."""
+    log = {"order": [], "running": 0, "max_running": 0, "fail": set()}
+
+    async def fake_process_event(self, *, event, redis, db_factory):
+        log["running"] += 1
+        log["max_running"] = max(log["max_running"], log["running"])
+        await asyncio.sleep(0.01)
+        log["running"] -= 1
+        if event.id in log["fail"]:
+            log["fail"].discard(event.id)
+            raise RuntimeError("database went away")
+        log["order"].append(event.id)
+        return {"status": "ok"}
+
+    monkeypatch.setattr(PaymentService, "process_event", fake_process_event)
+    return log
+
+
+@pytest.mark.asyncio
+async def test_webhook_stores_the_event_once_and_acks(
+    client, TestingAsyncSessionLocal, applied
+):
+    payload = _event("evt_1", "pi_a", 1_700_000_000)
+
+    first = await _post(client, payload)
+    again = await _post(client, payload)  # Stripe redelivers
+
+    assert first.status_code == again.status_code == 200
+    assert first.json() == {"status": "received"}
+    assert again.json() == {"status": "duplicate"}
+    assert applied["order"] == []  # nothing is applied by the request
+
+    async with TestingAsyncSessionLocal() as session:
+        [event] = (await session.execute(select(StripeEvent))).scalars().all()
+    assert (event.id, event.ordering_key) == ("evt_1", "pi_a")
+    assert event.status == StripeEventStatus.PENDING
+
+
+@pytest.mark.asyncio
+async def test_events_apply_in_order_per_order_and_in_parallel_across_orders(
+    client, TestingAsyncSessionLocal, mock_redis, applied
+):
+    # evt_late arrives first but was created after evt_early
+    for payload in [
+        _event("evt_late", "pi_a", 1_700_000_005),
+        _event("evt_early", "pi_a", 1_700_000_001),
+        _event("evt_b", "pi_b", 1_700_000_003),
+        _event("evt_c", "pi_c", 1_700_000_004),
+    ]:
+        await _post(client, payload)
+
+    totals = await _process(TestingAsyncSessionLocal, mock_redis)
+
+    assert totals["processed"] == 4
+    assert totals["batches"] == 2  # evt_late waits for evt_early's batch
+    order = applied["order"]
+    assert order.index("evt_early") < order.index("evt_late")
+    assert applied["max_running"] == 3
+
+
+@pytest.mark.asyncio
+async def test_a_failing_event_holds_back_its_order_until_it_succeeds(
+    client, TestingAsyncSessionLocal, mock_redis, applied
+):
+    await _post(client, _event("evt_1", "pi_a", 1_700_000_001))
+    await _post(client, _event("evt_2", "pi_a", 1_700_000_002))
+    await _post(client, _event("evt_other", "pi_b", 1_700_000_001))
+    applied["fail"].add("evt_1")
+
+    totals = await _process(TestingAsyncSessionLocal, mock_redis)
+    assert (totals["processed"], totals["retried"]) == (1, 1)
+    assert applied["order"] == ["evt_other"]
+
+    # The next run retries evt_1, then lets evt_2 through
+    totals = await _process(TestingAsyncSessionLocal, mock_redis)
+    assert totals["processed"] == 2
+    assert applied["order"] == ["evt_other", "evt_1", "evt_2"]
+
+    async with TestingAsyncSessionLocal() as session:
+        retried = await session.get(StripeEvent, "evt_1")
+    assert (retried.status, retried.attempts) == (StripeEventStatus.PROCESSED, 2)
+    assert retried.result == "ok"
+
+
+@pytest.mark.asyncio
+async def test_a_refund_that_fails_midway_restocks_once_on_retry(
+    db_session,
+    test_customer,
+    sample_product_otc,
+    sample_product_rx,
+    mock_redis,
+    TestingAsyncSessionLocal,
+):
+    products = [sample_product_otc, sample_product_rx]
+    batches = [
+        InventoryBatch(
+            product_id=product.id,
+            batch_number=f"BATCH-REFUND-{n}",
+            initial_quantity=10,
+            current_quantity=5,
+            price=Decimal("10.00"),
+            expiry_date=datetime.now(timezone.utc) + timedelta(days=365),
+        )
+        for n, product in enumerate(products)
+    ]
+    order = Order(
+        customer_id=test_customer.id,
+        total_amount=Decimal("50.00"),
+        status=OrderStatus.PAID,
+        payment_intent_id="pi_refunded",
+    )
+    db_session.add_all([*batches, order])
+    await db_session.flush()
+    db_session.add_all(
+        OrderItem(
+            order_id=order.id,
+            product_id=product.id,
+            quantity=n + 2,
+            price_at_purchase=Decimal("10.00"),
+        )
+        for n, product in enumerate(products)
+    )
+    await db_session.commit()
+
+    event = stripe.Event.construct_from(
+        {
+            "id": "evt_refund",
+            "type": "charge.refunded",
+            "data": {"object": {"id": "ch_1", "payment_intent": "pi_refunded"}},
+        },
+        stripe.api_key,
+    )
+    service = PaymentService(db_session, NotificationService())
+
+    async def apply():
+        return await service.process_event(
+            event=event, redis=mock_redis, db_factory=TestingAsyncSessionLocal
+        )
+
+    # Every line is restocked, then the email cannot be queued
+    with patch.object(
+        NotificationService, "enqueue", side_effect=RuntimeError("database went away")
+    ):
+        with pytest.raises(RuntimeError):
+            await apply()
+
+    for batch in batches:
+        await db_session.refresh(batch)
+    await db_session.refresh(order)
+    assert [batch.current_quantity for batch in batches] == [5, 5]
+    assert order.status == OrderStatus.PAID
+
+    # The retry restocks exactly once; a redelivery changes nothing
+    assert await apply() == {"status": "inventory_restored"}
+    assert await apply() == {"status": "already_refunded"}
+    for batch in batches:
+        await db_session.refresh(batch)
+    await db_session.refresh(order)
+    assert [batch.current_quantity for batch in batches] == [7, 8]
+    assert order.status == OrderStatus.REFUNDED
@@ -0,0 +1,137 @@
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+import stripe
+
+from app.core.exceptions import StripeUnavailable
+from app.models.inventory import InventoryBatch
+from app.services.stripe_gateway import stripe_gateway
+
+
+async def _checkout(client, customer_token, customer, product, db_session, redis):
+    db_session.add(
+        InventoryBatch(
+            product_id=product.id,
+            batch_number="BATCH-STRIPE",
+            initial_quantity=10,
+            current_quantity=10,
+            price=Decimal("50.00"),
+            expiry_date=datetime.now(timezone.utc) + timedelta(days=365),
+        )
+    )
+    await db_session.commit()
+    await redis.set(
+        f"cart:{customer.id}",
+        json.dumps({"items": [{"product_id": str(product.id), "quantity": 1}]}),
+    )
+    resp = await client.post("/api/v1/cart/checkout", headers=customer_token)
+    assert resp.status_code == 200
+    return resp.json()["order_id"]
+
+
+@pytest.mark.asyncio
+async def test_payment_intent_is_created_once_per_order(
+    client,
+    customer_token,
+    test_customer,
+    sample_product_otc,
+    db_session,
+    mock_redis,
+    fake_stripe,
+):
+    order_id = await _checkout(
+        client,
+        customer_token,
+        test_customer,
+        sample_product_otc,
+        db_session,
+        mock_redis,
+    )
+
+    first = await client.post(
+        f"/api/v1/payments/order/{order_id}", headers=customer_token
+    )
+    second = await client.post(
+        f"/api/v1/payments/order/{order_id}", headers=customer_token
+    )
+
+    assert first.status_code == second.status_code == 200
+    # The second call retrieves the intent stored on the order
+    assert first.json()["client_secret"] == second.json()["client_secret"]
+    assert first.json()["client_secret"].startswith("pi_")
+
+    # A retried create with the same key gets Stripe's stored response back
+    intents = [
+        await stripe_gateway.create_payment_intent(
+            amount=5000, currency="ngn", idempotency_key=f"payment-order-{order_id}"
+        )
+        for _ in range(2)
+    ]
+    assert intents[0].id == intents[1].id
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_on_outage_and_api_answers_503(
+    client,
+    customer_token,
+    test_customer,
+    sample_product_otc,
+    db_session,
+    mock_redis,
+    fake_stripe,
+):
+    order_id = await _checkout(
+        client,
+        customer_token,
+        test_customer,
+        sample_product_otc,
+        db_session,
+        mock_redis,
+    )
+    threshold = stripe_gateway.breaker.failure_threshold
+    fake_stripe.state.fail_next = threshold
+
+    for _ in range(threshold):
+        with pytest.raises(StripeUnavailable):
+            await stripe_gateway.retrieve_payment_intent("pi_missing")
+    assert stripe_gateway.breaker.state == "open"
+
+    # Stripe is no longer called while the circuit is open
+    calls = fake_stripe.state.requests
+    resp = await client.post(
+        f"/api/v1/payments/order/{order_id}", headers=customer_token
+    )
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"]
+    assert fake_stripe.state.requests == calls
+
+    # After the reset timeout one trial call goes through and closes it again
+    stripe_gateway.breaker.opened_at -= stripe_gateway.breaker.reset_timeout
+    resp = await client.post(
+        f"/api/v1/payments/order/{order_id}", headers=customer_token
+    )
+    assert resp.status_code == 200
+    assert stripe_gateway.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_rejected_requests_pass_through_without_tripping_breaker(fake_stripe):
+    for _ in range(stripe_gateway.breaker.failure_threshold + 1):
+        with pytest.raises(stripe.error.InvalidRequestError):
+            await stripe_gateway.retrieve_payment_intent("pi_missing")
+    assert stripe_gateway.breaker.state == "closed"
+
+    intent = await stripe_gateway.create_payment_intent(
+        amount=1000, currency="ngn", idempotency_key="refund-test"
+    )
+    refund = await stripe_gateway.create_refund(
+        payment_intent=intent.id, amount=500, idempotency_key="refund-order-test"
+    )
+    assert refund.amount == 500
+
+    cancelled = await stripe_gateway.cancel_payment_intent(
+        intent.id, idempotency_key="cancel-order-test"
+    )
+    assert cancelled.status == "canceled"
@@ -0,0 +1,108 @@
+from unittest.mock import patch
+
+import pytest
+from redis.exceptions import ConnectionError
+from sqlalchemy import event
+
+from app.core.deps import CurrentUser
+from app.core.principal_cache import Principal, principal_cache
+from app.core.token_versions import token_versions
+from app.crud.cart import CartCRUD
+
+
+def _record_statements(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    return statements, lambda: event.remove(
+        engine.sync_engine, "before_cursor_execute", record
+    )
+
+
+@pytest.mark.asyncio
+async def test_cart_endpoints_authorize_from_claims_without_postgres(
+    client,
+    engine,
+    db_session,
+    test_customer,
+    customer_token,
+    sample_product_otc,
+    mock_redis,
+):
+    await CartCRUD(db_session).set_redis_items(
+        mock_redis,
+        test_customer.id,
+        [{"product_id": sample_product_otc.id, "quantity": 2}],
+        ttl=3600,
+    )
+    # Cold principal cache: get_current_user would query the users table
+    principal_cache.clear()
+    await principal_cache.invalidate(test_customer.id)
+
+    statements, stop = _record_statements(engine)
+    try:
+        response = await client.get("/api/v1/cart", headers=customer_token)
+    finally:
+        stop()
+
+    assert response.status_code == 200
+    assert response.json()["total_items"] == 2
+    assert statements == []
+    assert await principal_cache.get(test_customer.id) is None
+
+    # The full row, only when asked for
+    principal = Principal.from_user(test_customer)
+    statements, stop = _record_statements(engine)
+    try:
+        current = CurrentUser(principal, db_session)
+        assert statements == []
+        db_session.expunge_all()
+        user = await current.load()
+        assert await current.load() is user
+    finally:
+        stop()
+    assert user.email == test_customer.email
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_password_change_revokes_access_tokens_on_the_claims_path(
+    client, test_customer, customer_token
+):
+    assert (await client.get("/api/v1/cart", headers=customer_token)).status_code == 200
+
+    response = await client.post(
+        "/api/v1/me/change-password",
+        json={"old_password": "strongpassword123", "new_password": "newpassword456"},
+        headers=customer_token,
+    )
+    assert response.status_code == 204
+    assert await token_versions.current(test_customer.id) == 1
+
+    response = await client.get("/api/v1/cart", headers=customer_token)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "test@example.com", "password": "newpassword456"},
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert (await client.get("/api/v1/cart", headers=headers)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_claims_path_falls_back_to_the_user_lookup_without_redis(
+    client, test_customer, customer_token
+):
+    fallbacks = token_versions.fallbacks.value
+    with patch.object(
+        token_versions, "current", side_effect=ConnectionError("redis down")
+    ):
+        response = await client.get("/api/v1/cart", headers=customer_token)
+
+    assert response.status_code == 200
+    assert token_versions.fallbacks.value == fallbacks + 1